@@ -47,7 +47,11 @@ with app.app_context():
         # Client portal models
         ClientPortalUser,
         # Case milestone models
-        CaseMilestone
+        CaseMilestone,
+        # Background job queue
+        Job, JobSchedule,
+        # Incremental Kenya Law sync
+        SyncState
     )
     db.create_all()
     logger.info("Database tables created")
@@ -72,6 +76,7 @@ from routes.document_sharing import document_sharing_bp
 from routes.milestone import milestone_bp
 from routes.org_roles import org_roles
 from routes.organization import organization
+from routes.jobs import jobs_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(cases_bp)
@@ -92,6 +97,12 @@ app.register_blueprint(document_sharing_bp)
 app.register_blueprint(milestone_bp)
 app.register_blueprint(org_roles)
 app.register_blueprint(organization)
+app.register_blueprint(jobs_bp)
+
+# Run the periodic jobs (such as the Kenya Law sync) from this process when configured to
+if app.config.get("JOB_IN_PROCESS") and app.config.get("JOB_IN_PROCESS_PERIODIC"):
+    from utils.job_queue import ensure_worker_started
+    ensure_worker_started(app)
 
 # Load user loader callback
 from models import User, ClientPortalUser
@@ -0,0 +1,137 @@
+"""
+Memory benchmark for full-text extraction of long judgments.
+This script serves a generated 5 MB judgment from a local stand-in for Kenya Law and
+extracts it with get_case_details (whole page, soup tree and texts in memory) and with
+stream_case_details (parsed as it downloads, text streamed to the ruling text store).
+Each method runs in its own process so the peak RSS it adds can be measured; the peak
+of Python allocations (tracemalloc) and the time taken are reported as well. The script
+exits non-zero if streaming extraction adds more than --max-stream-mb to the peak RSS.
+
+    python benchmark_extraction.py
+    python benchmark_extraction.py --size-mb 20
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmark_scraper import FixtureServer, make_scraper
+from utils.text_store import TextStore
+
+JUDGMENT_PATH = '/akn/ke/judgment/kehc/2023/1/eng@2023-03-12'
+
+PARAGRAPH = ("The appellant contends that the learned magistrate erred in law and in fact by failing to "
+             "consider the evidence of the defence witnesses and by shifting the burden of proof. Having "
+             "re-evaluated the record, this court finds that the prosecution proved its case to the "
+             "required standard and that the trial was conducted in accordance with Article 50. ")
+
+def make_judgment(size_bytes):
+    """Build a judgment page of about `size_bytes` in Kenya Law's layout"""
+    head = ("<html><head><title>Mwangi v Republic</title><script>var analytics = {};</script></head><body>"
+            "<nav><a href=\"/judgments/\">Judgments</a></nav>"
+            "<h1>Mwangi v Republic (Criminal Appeal 12 of 2022) [2023] KEHC 101 (KLR) (12 March 2023) (Judgment)</h1>"
+            "<div class=\"case-meta\">Citation: [2023] KEHC 101 (KLR)\nCourt: High Court\n"
+            "Coram: A. Mrima, J. Ngugi\nDate: 12 March 2023</div>"
+            "<main><p>REPUBLIC OF KENYA</p><p>IN THE HIGH COURT AT NAIROBI</p><h2>JUDGMENT</h2>")
+    tail = "<p>The appeal is dismissed.</p></main><footer>Kenya Law</footer></body></html>"
+    parts = [head]
+    size = len(head) + len(tail)
+    number = 0
+    while size < size_bytes:
+        number += 1
+        paragraph = f"<p>{number}. {PARAGRAPH}</p>"
+        parts.append(paragraph)
+        size += len(paragraph)
+    parts.append(tail)
+    return ''.join(parts)
+
+def max_rss_kib():
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_worker(method, size_bytes):
+    """Extract the judgment once with `method` in this process and report what it cost"""
+    logging.getLogger().setLevel(logging.ERROR)
+    page = make_judgment(size_bytes).encode('utf-8')
+    with tempfile.TemporaryDirectory() as text_dir, FixtureServer(routes={JUDGMENT_PATH: page}) as server:
+        scraper = make_scraper(server.base_url)
+        text_store = TextStore(text_dir)
+        url = server.base_url + JUDGMENT_PATH
+
+        def extract():
+            if method == 'stream_case_details':
+                return scraper.stream_case_details(url, text_store)
+            return scraper.get_case_details(url)
+
+        rss_before = max_rss_kib()
+        started = time.perf_counter()
+        case = extract()
+        elapsed = time.perf_counter() - started
+        rss_added = max_rss_kib() - rss_before
+
+        tracemalloc.start()
+        extract()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        text_length = case.get('text_length') if 'text_key' in case else len(case['ruling'] or '')
+        return {
+            'method': method,
+            'page_mb': round(len(page) / 1024 / 1024, 2),
+            'seconds': round(elapsed, 3),
+            'rss_added_mb': round(rss_added / 1024, 1),
+            'traced_peak_mb': round(traced_peak / 1024 / 1024, 1),
+            'text_length': text_length,
+            'judges': case['judges']
+        }
+
+def run_benchmark(size_bytes):
+    """Run each extraction method in a fresh process"""
+    results = []
+    for method in ('get_case_details', 'stream_case_details'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', method, '--size-mb', str(size_bytes / 1024 / 1024)],
+            check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Memory benchmark for full-text extraction of long judgments")
+    parser.add_argument('--size-mb', type=float, default=5.0, help="Size of the generated judgment page")
+    parser.add_argument('--max-stream-mb', type=float, default=32.0,
+                        help="Peak RSS streaming extraction may add before it counts as a regression")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size_bytes = int(args.size_mb * 1024 * 1024)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, size_bytes)))
+        return
+
+    results = run_benchmark(size_bytes)
+
+    print(f"=== Full-text extraction of a {results[0]['page_mb']} MB judgment ===\n")
+    print(f"{'Method':<22} {'Time':>8} {'RSS added':>11} {'Python peak':>13} {'Text chars':>12}")
+    for result in results:
+        print(f"{result['method']:<22} {result['seconds']:>7.2f}s {result['rss_added_mb']:>8.1f} MB "
+              f"{result['traced_peak_mb']:>10.1f} MB {result['text_length']:>12,}")
+
+    buffered, streamed = results
+    if streamed['judges'] != buffered['judges'] or streamed['text_length'] != buffered['text_length']:
+        print("\n✗ Streaming extraction doesn't match get_case_details")
+        sys.exit(1)
+    if streamed['rss_added_mb'] > args.max_stream_mb:
+        print(f"\n✗ Streaming extraction added {streamed['rss_added_mb']} MB of RSS (limit {args.max_stream_mb} MB)")
+        sys.exit(1)
+    print("\n✓ Streaming extraction stays within its memory limit")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Parsing benchmark for the Kenya Law scraper.
+This script times the scraper's page parsers against the pages saved in data_extracted/
+(see direct_extract.py), once through BeautifulSoup's pure-Python html.parser and once through
+the lxml path the scraper uses by default, and checks that both extract the same results.
+"""
+import argparse
+import logging
+import os
+import time
+
+from utils.http_cache import HTTPCache
+from utils.scraper import KenyaLawScraper, HTML_PARSER
+
+# Saved page, parser method and extra arguments
+PAGES = [
+    ('supreme_court.html', 'parse_case_law', {'limit': 50}),
+    ('search_results.html', 'parse_search_results', {'query': 'constitutional rights'}),
+    ('legislation.html', 'parse_legislation', {'limit': 200}),
+]
+
+def load_pages(directory):
+    """Load the saved pages, adding variants without the cell-title markup to exercise the link fallbacks"""
+    pages = []
+    for filename, method, kwargs in PAGES:
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            print(f"Skipping {filename}: not found in {directory}")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        pages.append((filename, method, kwargs, html))
+        if 'cell-title' in html:
+            pages.append((f"{filename} (fallback)", method, kwargs, html.replace('cell-title', 'cell')))
+    return pages
+
+def time_parser(scraper, method, kwargs, html, iterations):
+    """Parse a page repeatedly and return (results, milliseconds per parse)"""
+    parse = getattr(scraper, method)
+    results = parse(html, **kwargs)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse(html, **kwargs)
+    return results, (time.perf_counter() - started) * 1000 / iterations
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the Kenya Law scraper's HTML parsing")
+    parser.add_argument('--dir', default='data_extracted', help="Directory with the saved pages")
+    parser.add_argument('--iterations', type=int, default=20, help="Parses per page and parser")
+    args = parser.parse_args()
+
+    # The parsers log every strategy they try
+    logging.getLogger('utils.scraper').setLevel(logging.WARNING)
+
+    pages = load_pages(args.dir)
+    if not pages:
+        print("No saved pages to benchmark. Run direct_extract.py first.")
+        return
+
+    # An in-memory cache keeps the benchmark from touching the on-disk page cache
+    baseline = KenyaLawScraper(http_cache=HTTPCache(path=None), html_parser='html.parser')
+    fast = KenyaLawScraper(http_cache=HTTPCache(path=None), html_parser=HTML_PARSER)
+
+    print(f"=== Parsing benchmark: html.parser vs {HTML_PARSER} ({args.iterations} iterations) ===\n")
+    print(f"{'Page':<32} {'Results':>8} {'html.parser':>12} {HTML_PARSER:>12} {'Speedup':>8}  Same")
+
+    total_baseline = total_fast = 0.0
+    mismatches = 0
+    for name, method, kwargs, html in pages:
+        baseline_results, baseline_ms = time_parser(baseline, method, kwargs, html, args.iterations)
+        fast_results, fast_ms = time_parser(fast, method, kwargs, html, args.iterations)
+        same = baseline_results == fast_results
+        mismatches += 0 if same else 1
+        total_baseline += baseline_ms
+        total_fast += fast_ms
+        print(f"{name:<32} {len(fast_results):>8} {baseline_ms:>10.1f}ms {fast_ms:>10.1f}ms "
+              f"{baseline_ms / fast_ms:>7.2f}x  {'yes' if same else 'NO'}")
+
+    print(f"\n{'Total':<32} {'':>8} {total_baseline:>10.1f}ms {total_fast:>10.1f}ms {total_baseline / total_fast:>7.2f}x")
+    if mismatches:
+        print(f"\n✗ {mismatches} page(s) parsed differently by the two paths")
+    else:
+        print("\n✓ Both paths extracted identical results")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Offline benchmark and regression check for the Kenya Law scraper.
+This script serves the HTML snapshots in data_extracted/ from a local HTTP server that stands
+in for new.kenyalaw.org, runs get_case_law, search_cases and get_legislation against it and
+reports, per page, the results extracted, parse time, links extracted per second and peak
+memory per parse. The numbers are compared with data_extracted/scraper_benchmark_baseline.json
+and the script exits non-zero if extraction counts drop or parsing gets slower or hungrier.
+
+    python benchmark_scraper.py                     # check against the baseline
+    python benchmark_scraper.py --update-baseline   # record this machine's numbers
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from utils.http_cache import HTTPCache
+from utils.scraper import KenyaLawScraper
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_extracted')
+BASELINE_FILE = os.path.join(FIXTURE_DIR, 'scraper_benchmark_baseline.json')
+
+# Benchmarked page: (snapshot, path it is served at, scraper method and arguments, parser method and arguments)
+PAGES = {
+    'case_law': ('supreme_court.html', '/judgments/KESC/',
+                 ('get_case_law', ('KESC',), {'limit': 1000}), ('parse_case_law', {'limit': 1000})),
+    'search': ('search_results.html', '/search/',
+               ('search_cases', ('constitutional rights',), {}), ('parse_search_results', {'query': 'constitutional rights'})),
+    'legislation': ('legislation.html', '/legislation/',
+                    ('get_legislation', (), {'limit': 1000}), ('parse_legislation', {'limit': 1000})),
+}
+
+# How much slower / bigger than the baseline a parse may get before it counts as a regression
+TIME_TOLERANCE = float(os.environ.get("SCRAPER_BENCHMARK_TIME_TOLERANCE", "3.0"))
+MEMORY_TOLERANCE = float(os.environ.get("SCRAPER_BENCHMARK_MEMORY_TOLERANCE", "1.5"))
+
+class FixtureServer:
+    """Local HTTP server answering Kenya Law paths with the saved snapshots (or the given pages)"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, routes=None):
+        if routes is None:
+            routes = {}
+            for snapshot, path, _, _ in PAGES.values():
+                with open(os.path.join(fixture_dir, snapshot), 'rb') as f:
+                    routes[path] = f.read()
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                server.requests.append(self.path)
+                body = routes.get(path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body or b'')))
+                self.end_headers()
+                self.wfile.write(body or b'')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def make_scraper(base_url):
+    """Scraper against the stand-in whose cache never serves a page without fetching it"""
+    cache = HTTPCache(path=None, ttls={page_type: -1 for page_type in ('listing', 'search', 'judgment', 'legislation')})
+    return KenyaLawScraper(base_url=base_url, http_cache=cache, debug_dir=None)
+
+def benchmark_page(scraper, name, iterations):
+    """
+    Benchmark one page
+
+    Returns:
+        Dictionary with the result count, fetch + parse time, parse time, links per second and peak memory
+    """
+    _, _, (method, args, kwargs), (parse_method, parse_kwargs) = PAGES[name]
+    fetch_and_parse = getattr(scraper, method)
+    parse = getattr(scraper, parse_method)
+
+    results = fetch_and_parse(*args, **kwargs)
+    html = scraper._fetch_html(scraper.base_url + PAGES[name][1])
+
+    end_to_end = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fetch_and_parse(*args, **kwargs)
+        end_to_end.append(time.perf_counter() - started)
+
+    parse_times = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        parse(html, **parse_kwargs)
+        parse_times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    parse(html, **parse_kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    parse_seconds = statistics.median(parse_times)
+    return {
+        'count': len(results),
+        'fetch_parse_ms': round(statistics.median(end_to_end) * 1000, 2),
+        'parse_ms': round(parse_seconds * 1000, 2),
+        'links_per_second': round(len(results) / parse_seconds, 1) if parse_seconds > 0 else 0.0,
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+def run_benchmark(iterations=10, fixture_dir=FIXTURE_DIR):
+    """
+    Benchmark every page through a local stand-in for Kenya Law
+
+    Args:
+        iterations: Timed runs per page (medians are reported)
+        fixture_dir: Directory with the saved pages
+
+    Returns:
+        Dictionary of page name -> measurements
+    """
+    # The scraper logs every strategy it tries (and warns on every empty search)
+    scraper_logger = logging.getLogger('utils.scraper')
+    level = scraper_logger.level
+    scraper_logger.setLevel(logging.ERROR)
+    try:
+        with FixtureServer(fixture_dir) as server:
+            scraper = make_scraper(server.base_url)
+            return {name: benchmark_page(scraper, name, iterations) for name in PAGES}
+    finally:
+        scraper_logger.setLevel(level)
+
+def check_regressions(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Compare benchmark results with the baseline
+
+    Args:
+        results: Output of run_benchmark
+        baseline: Recorded results to compare against
+        time_tolerance: Allowed parse time as a multiple of the baseline
+        memory_tolerance: Allowed peak memory as a multiple of the baseline
+
+    Returns:
+        List of regression descriptions (empty if there are none)
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            regressions.append(f"{name}: not benchmarked")
+            continue
+        if actual['count'] < expected['count']:
+            regressions.append(f"{name}: extracted {actual['count']} results, baseline {expected['count']}")
+        if actual['parse_ms'] > expected['parse_ms'] * time_tolerance:
+            regressions.append(f"{name}: parse took {actual['parse_ms']}ms, baseline {expected['parse_ms']}ms "
+                               f"(limit {time_tolerance}x)")
+        if actual['peak_kib'] > expected['peak_kib'] * memory_tolerance:
+            regressions.append(f"{name}: parse peaked at {actual['peak_kib']} KiB, baseline {expected['peak_kib']} KiB "
+                               f"(limit {memory_tolerance}x)")
+    return regressions
+
+def load_baseline(path=BASELINE_FILE):
+    """Load the recorded baseline, or None if there isn't one"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Kenya Law scraper")
+    parser.add_argument('--iterations', type=int, default=10, help="Timed runs per page")
+    parser.add_argument('--update-baseline', action='store_true', help="Record these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.iterations)
+
+    print(f"=== Scraper benchmark ({args.iterations} iterations, medians) ===\n")
+    print(f"{'Page':<12} {'Results':>8} {'Fetch+parse':>12} {'Parse':>9} {'Links/s':>9} {'Peak memory':>12}")
+    for name, result in results.items():
+        print(f"{name:<12} {result['count']:>8} {result['fetch_parse_ms']:>10.1f}ms {result['parse_ms']:>7.1f}ms "
+              f"{result['links_per_second']:>9.0f} {result['peak_kib']:>8.0f} KiB")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Baseline written to {BASELINE_FILE}")
+        return
+
+    baseline = load_baseline()
+    if baseline is None:
+        print("\nNo baseline recorded yet. Run with --update-baseline to record one.")
+        return
+    regressions = check_regressions(results, baseline)
+    if regressions:
+        print("\n✗ Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\n✓ No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Database migration script to add the background job queue.
+This adds the Job model used for long-running research, analysis and import work.
+"""
+import os
+import logging
+import psycopg2
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, 
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def get_db_connection():
+    """Get database connection from environment variables"""
+    try:
+        # Try to load environment variables from .env file if it exists
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+            logger.info("Loaded environment variables from .env file")
+        except ImportError:
+            logger.warning("python-dotenv not installed, proceeding without loading .env file")
+            
+        # First try to use the DATABASE_URL environment variable
+        database_url = os.environ.get('DATABASE_URL')
+        if database_url:
+            logger.info("Connecting using DATABASE_URL")
+            conn = psycopg2.connect(database_url)
+            return conn
+        
+        # Fallback to individual connection parameters
+        logger.info("Connecting using individual connection parameters")
+        conn = psycopg2.connect(
+            host=os.environ.get('PGHOST'),
+            database=os.environ.get('PGDATABASE'),
+            user=os.environ.get('PGUSER'),
+            password=os.environ.get('PGPASSWORD'),
+            port=os.environ.get('PGPORT')
+        )
+        return conn
+    except Exception as e:
+        logger.error(f"Error connecting to the database: {e}")
+        return None
+
+def migrate_job_table():
+    """Create the job table for the background job queue"""
+    conn = None
+    try:
+        # Connect to the database
+        conn = get_db_connection()
+        if conn is None:
+            logger.error("Failed to establish database connection")
+            return False
+            
+        cursor = conn.cursor()
+        
+        # Create Job table
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job (
+            id SERIAL PRIMARY KEY,
+            job_type VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            progress DOUBLE PRECISION DEFAULT 0,
+            message VARCHAR(255),
+            params TEXT,
+            result TEXT,
+            error TEXT,
+            cancel_requested BOOLEAN DEFAULT FALSE,
+            worker_id VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            user_id INTEGER REFERENCES "user"(id)
+        );
+        """)
+        
+        # Workers look up queued jobs by status; users look up their own jobs
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_job_status ON job(status);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_user ON job(user_id);")
+        
+        # Commit the transaction
+        conn.commit()
+        logger.info("Successfully created job table")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error during migration: {e}")
+        if conn is not None:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                logger.error(f"Error during rollback: {rollback_error}")
+        return False
+    finally:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as close_error:
+                logger.error(f"Error closing connection: {close_error}")
+
+if __name__ == "__main__":
+    logger.info("Running job queue migration...")
+    success = migrate_job_table()
+    if success:
+        logger.info("Job queue migration completed successfully!")
+    else:
+        logger.error("Job queue migration failed!")
@@ -0,0 +1,118 @@
+"""
+Database migration script to add incremental Kenya Law sync.
+This adds the SyncState model holding each court's high-water mark and an index on
+ruling URLs for the sync's duplicate checks.
+"""
+import os
+import logging
+import psycopg2
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, 
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def get_db_connection():
+    """Get database connection from environment variables"""
+    try:
+        # Try to load environment variables from .env file if it exists
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+            logger.info("Loaded environment variables from .env file")
+        except ImportError:
+            logger.warning("python-dotenv not installed, proceeding without loading .env file")
+            
+        # First try to use the DATABASE_URL environment variable
+        database_url = os.environ.get('DATABASE_URL')
+        if database_url:
+            logger.info("Connecting using DATABASE_URL")
+            conn = psycopg2.connect(database_url)
+            return conn
+        
+        # Fallback to individual connection parameters
+        logger.info("Connecting using individual connection parameters")
+        conn = psycopg2.connect(
+            host=os.environ.get('PGHOST'),
+            database=os.environ.get('PGDATABASE'),
+            user=os.environ.get('PGUSER'),
+            password=os.environ.get('PGPASSWORD'),
+            port=os.environ.get('PGPORT')
+        )
+        return conn
+    except Exception as e:
+        logger.error(f"Error connecting to the database: {e}")
+        return None
+
+def migrate_sync_state_table():
+    """Create the sync_state and job_schedule tables and index ruling URLs"""
+    conn = None
+    try:
+        # Connect to the database
+        conn = get_db_connection()
+        if conn is None:
+            logger.error("Failed to establish database connection")
+            return False
+            
+        cursor = conn.cursor()
+        
+        # Create SyncState table
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id SERIAL PRIMARY KEY,
+            court_code VARCHAR(20) NOT NULL UNIQUE,
+            court_name VARCHAR(100),
+            last_seen_url VARCHAR(500),
+            last_seen_date DATE,
+            retry_urls TEXT,
+            last_synced_at TIMESTAMP,
+            last_status VARCHAR(20),
+            last_error TEXT,
+            last_imported_count INTEGER DEFAULT 0,
+            total_imported INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        
+        # Workers claim each periodic run (such as the sync) by advancing its row here
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_schedule (
+            id SERIAL PRIMARY KEY,
+            job_type VARCHAR(50) NOT NULL UNIQUE,
+            next_run_at TIMESTAMP NOT NULL,
+            last_job_id INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        
+        # Syncs and imports check which judgment URLs are already in the ruling table
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_ruling_url ON ruling(url);")
+        
+        # Commit the transaction
+        conn.commit()
+        logger.info("Successfully created sync_state and job_schedule tables and ruling URL index")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error during migration: {e}")
+        if conn is not None:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                logger.error(f"Error during rollback: {rollback_error}")
+        return False
+    finally:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as close_error:
+                logger.error(f"Error closing connection: {close_error}")
+
+if __name__ == "__main__":
+    logger.info("Running Kenya Law sync migration...")
+    success = migrate_sync_state_table()
+    if success:
+        logger.info("Kenya Law sync migration completed successfully!")
+    else:
+        logger.error("Kenya Law sync migration failed!")
@@ -1,9 +1,12 @@
 from datetime import datetime, timedelta
+import io
 import json
 from app import db
 from flask_login import UserMixin
+from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
 from utils.permissions import DEFAULT_ROLE_PERMISSIONS, Permissions
+from utils.text_store import get_text_store
 
 # Association tables for many-to-many relationships
 case_client_association = db.Table(
@@ -1179,9 +1182,10 @@ class Ruling(db.Model):
     court = db.Column(db.String(100), nullable=False)  # Supreme Court, Court of Appeal, etc.
     date_of_ruling = db.Column(db.Date, nullable=False)
     citation = db.Column(db.String(200))  # Official citation
-    url = db.Column(db.String(500))  # URL to the original ruling
+    url = db.Column(db.String(500), index=True)  # URL to the original ruling
     summary = db.Column(db.Text)  # Brief summary of the ruling
-    full_text = db.Column(db.Text)  # Full text of the ruling
+    # Full text of the ruling; imported rulings keep it in the ruling text store instead (see full_text)
+    _full_text = db.deferred(db.Column('full_text', db.Text))
     outcome = db.Column(db.String(50))  # Allowed, Dismissed, etc.
     category = db.Column(db.String(100))  # Constitutional, Criminal, Civil, etc.
     importance_score = db.Column(db.Integer)  # 1-10 importance score
@@ -1201,6 +1205,52 @@ class Ruling(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     user = db.relationship('User', backref=db.backref('rulings', lazy='dynamic'))
 
+    @hybrid_property
+    def full_text(self):
+        """Full text of the ruling, loaded on first access from the table or the ruling text store"""
+        if self._full_text is not None:
+            return self._full_text
+        return self.read_full_text()
+    
+    @full_text.setter
+    def full_text(self, value):
+        self._full_text = value
+    
+    @full_text.expression
+    def full_text(cls):
+        return cls._full_text
+    
+    def read_full_text(self, max_chars=None):
+        """
+        Read the ruling's full text, or just its start
+        
+        Args:
+            max_chars: Read at most this many characters (only they are decompressed)
+            
+        Returns:
+            The text, or an empty string if the ruling has none
+        """
+        if self._full_text is not None:
+            return self._full_text if max_chars is None else self._full_text[:max_chars]
+        text_store = get_text_store()
+        if text_store is None or not self.url:
+            return ''
+        return text_store.read(text_store.key_for(self.url), max_chars) or ''
+    
+    def open_full_text(self):
+        """
+        Open the ruling's full text for streaming reads
+        
+        Returns:
+            Text stream (close it when done)
+        """
+        if self._full_text is None and self.url:
+            text_store = get_text_store()
+            stream = text_store.open(text_store.key_for(self.url)) if text_store else None
+            if stream is not None:
+                return stream
+        return io.StringIO(self._full_text or '')
+    
     def __repr__(self):
         return f'<Ruling {self.case_number} - {self.title[:30]}>'
 
@@ -1274,3 +1324,133 @@ class RulingAnalysis(db.Model):
     
     def __repr__(self):
         return f'<RulingAnalysis {self.analysis_type} for {self.ruling_id}>'
+
+class Job(db.Model):
+    """Background job for long-running research, analysis and import work"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # research_issue, analyze_ruling, import_rulings
+    status = db.Column(db.String(20), nullable=False, default=QUEUED, index=True)
+    progress = db.Column(db.Float, default=0.0)  # Fraction complete, 0.0 - 1.0
+    message = db.Column(db.String(255))  # Latest progress message
+    params = db.Column(db.Text)  # JSON string of handler arguments
+    result = db.Column(db.Text)  # JSON string of the handler's result
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    worker_id = db.Column(db.String(100))  # Worker that claimed the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Last progress report from the worker
+    finished_at = db.Column(db.DateTime)
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    # Relationships
+    user = db.relationship('User', backref=db.backref('jobs', lazy='dynamic'))
+    
+    @property
+    def is_finished(self):
+        """Whether the job has stopped running for good"""
+        return self.status in self.FINISHED_STATUSES
+    
+    def get_params(self):
+        """Get the handler arguments as a dictionary"""
+        if not self.params:
+            return {}
+        try:
+            return json.loads(self.params)
+        except:
+            return {}
+    
+    def get_result(self):
+        """Get the handler's result, or None if there is none yet"""
+        if not self.result:
+            return None
+        try:
+            return json.loads(self.result)
+        except:
+            return None
+    
+    def to_dict(self, include_result=False):
+        """Status of the job as a JSON-serializable dictionary"""
+        data = {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress or 0.0,
+            'message': self.message,
+            'error': self.error,
+            'cancel_requested': bool(self.cancel_requested),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = self.get_result()
+        return data
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.job_type} {self.status}>'
+
+
+class JobSchedule(db.Model):
+    """Next run of a periodic job type; workers claim a run by advancing it with a conditional UPDATE"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), unique=True, nullable=False)
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_job_id = db.Column(db.Integer)  # Job queued by the latest claimed run
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<JobSchedule {self.job_type} {self.next_run_at}>'
+
+
+class SyncState(db.Model):
+    """High-water mark of the incremental sync of one court's Kenya Law listings"""
+    id = db.Column(db.Integer, primary_key=True)
+    court_code = db.Column(db.String(20), unique=True, nullable=False)  # KESC, KECA, KEHC, etc.
+    court_name = db.Column(db.String(100))
+    last_seen_url = db.Column(db.String(500))  # Newest judgment in the listing at the last sync
+    last_seen_date = db.Column(db.Date)  # Newest judgment date in the listing at the last sync
+    retry_urls = db.Column(db.Text)  # JSON list of judgments that failed to import, retried next sync
+    last_synced_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(20))  # succeeded, stopped, failed
+    last_error = db.Column(db.Text)
+    last_imported_count = db.Column(db.Integer, default=0)
+    total_imported = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def get_retry_urls(self):
+        """Get the judgments to retry as a list"""
+        if not self.retry_urls:
+            return []
+        try:
+            return json.loads(self.retry_urls)
+        except:
+            return []
+    
+    def to_dict(self):
+        """Sync state as a JSON-serializable dictionary"""
+        return {
+            'court_code': self.court_code,
+            'court_name': self.court_name,
+            'last_seen_url': self.last_seen_url,
+            'last_seen_date': self.last_seen_date.isoformat() if self.last_seen_date else None,
+            'retry_count': len(self.get_retry_urls()),
+            'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None,
+            'last_status': self.last_status,
+            'last_error': self.last_error,
+            'last_imported_count': self.last_imported_count or 0,
+            'total_imported': self.total_imported or 0
+        }
+    
+    def __repr__(self):
+        return f'<SyncState {self.court_code} {self.last_seen_date}>'
@@ -12,6 +12,10 @@ from wtforms.validators import Optional
 
 from models import db, User, Role, Permission, Organization
 from utils.permissions import admin_required, Permissions
+from utils.response_cache import get_response_cache
+from utils.embedding_cache import get_embedding_cache
+from utils.llm import clear_endpoint_cache, get_llm_client
+from utils.circuit_breaker import export_circuit_breakers
 from forms.admin import (
     CreateUserForm, EditUserForm, 
     CreateRoleForm, EditRoleForm,
@@ -639,9 +643,13 @@ def system_settings():
 @admin_required
 def clear_cache():
     """Clear system cache"""
-    # This would implement cache clearing functionality
     try:
-        # Implement cache clearing logic here
+        # Cached LLM responses and negotiated Ollama endpoints; embeddings are
+        # content-addressed and never go stale, so they are kept
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            response_cache.clear()
+        clear_endpoint_cache()
         flash("System cache cleared successfully", "success")
     except Exception as e:
         logger.error(f"Error clearing cache: {str(e)}")
@@ -649,6 +657,32 @@ def clear_cache():
         
     return redirect(url_for('admin.system_settings'))
 
+@admin_bp.route('/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Report hit/miss statistics for the LLM response and embedding caches"""
+    response_cache = get_response_cache()
+    embedding_cache = get_embedding_cache()
+    
+    return jsonify({
+        'response_cache': response_cache.stats() if response_cache is not None else {'enabled': False},
+        'embedding_cache': embedding_cache.stats() if embedding_cache is not None else {'enabled': False}
+    })
+
+@admin_bp.route('/llm-health')
+@login_required
+@admin_required
+def llm_health():
+    """Export circuit breaker state and latency percentiles for every LLM backend"""
+    llm_client = get_llm_client()
+    
+    return jsonify({
+        'client': type(llm_client).__name__,
+        'selection': llm_client.status() if hasattr(type(llm_client), 'status') else None,
+        'circuit_breakers': export_circuit_breakers()
+    })
+
 @admin_bp.route('/backup-database', methods=['POST'])
 @login_required
 @admin_required
@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, redirect, url_for, request, flash,
 from flask_login import login_required, current_user
 from models import Document, Case, DocumentTemplate, db
 from utils.document_generator import DocumentGenerator
+from utils.streaming import sse_event, sse_response
 import config
 
 logger = logging.getLogger(__name__)
@@ -278,3 +279,60 @@ def generate():
                           document_types=config.DOCUMENT_TYPES,
                           cases=cases,
                           user_templates=user_templates)
+
+@documents_bp.route('/generate/stream', methods=['POST'])
+@login_required
+def generate_stream():
+    """Generate an AI document, streaming the text as server-sent events and saving it when done"""
+    doc_type = request.form.get('ai_document_type')
+    instructions = request.form.get('ai_instructions')
+    context = {
+        'case_info': request.form.get('ai_case_info'),
+        'client_info': request.form.get('ai_client_info'),
+        'additional_context': request.form.get('ai_additional_context')
+    }
+    case_id = request.form.get('case_id')
+    
+    if not doc_type or not instructions:
+        return jsonify({'success': False, 'error': 'Document type and instructions are required'}), 400
+    
+    document_generator = DocumentGenerator()
+    
+    def events():
+        # Send an event straight away so the browser can show progress
+        yield sse_event({'document_type': doc_type}, event='start')
+        
+        chunks = []
+        for chunk in document_generator.generate_ai_document_stream(doc_type, instructions, context):
+            chunks.append(chunk)
+            yield sse_event({'text': chunk})
+        
+        new_document = Document(
+            title=f"{doc_type} - AI Generated",
+            document_type=doc_type,
+            content="".join(chunks),
+            status='Draft',
+            user_id=current_user.id
+        )
+        
+        # Associate with case if selected
+        if case_id:
+            case = Case.query.get(case_id)
+            if case and case.user_id == current_user.id:
+                new_document.cases.append(case)
+        
+        db.session.add(new_document)
+        try:
+            db.session.commit()
+            logger.info(f"Generated document: {new_document.title}")
+            yield sse_event({
+                'success': True,
+                'document_id': new_document.id,
+                'url': url_for('documents.view', document_id=new_document.id)
+            }, event='done')
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error saving generated document: {str(e)}")
+            yield sse_event({'success': False, 'error': f'Error saving document: {str(e)}'}, event='done')
+    
+    return sse_response(events())
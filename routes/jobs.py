@@ -0,0 +1,134 @@
+"""
+Routes for following and cancelling background jobs.
+"""
+import logging
+import time
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, abort
+from flask_login import login_required, current_user
+
+import config
+from app import db
+from models import Job
+from utils.job_queue import cancel_job
+from utils.streaming import sse_event, sse_response
+
+logger = logging.getLogger(__name__)
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+STREAM_POLL_INTERVAL = 1.0  # Seconds between status checks while streaming
+
+def job_started_response(job, message="Your request is being processed in the background"):
+    """
+    Respond to a request that queued a job
+
+    API clients (JSON requests) get 202 Accepted with the job's URLs; form posts are
+    redirected to the job's progress page.
+    """
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('jobs.job_status', job_id=job.id),
+            'stream_url': url_for('jobs.stream_job', job_id=job.id),
+            'cancel_url': url_for('jobs.cancel', job_id=job.id)
+        }), 202
+
+    flash(message, 'info')
+    return redirect(url_for('jobs.view_job', job_id=job.id))
+
+def job_result_url(job):
+    """URL of the page showing a finished job's result, if it has one"""
+    result = job.get_result() or {}
+    params = job.get_params()
+
+    if job.job_type == 'research_issue' and result.get('research_id'):
+        return url_for('research.view_research', research_id=result['research_id'])
+    if job.job_type == 'analyze_ruling':
+        return url_for('rulings.analyze_ruling', ruling_id=params.get('ruling_id'))
+    if job.job_type == 'import_rulings':
+        ruling_ids = result.get('ruling_ids') or []
+        if params.get('import_type') == 'case_url' and ruling_ids:
+            return url_for('rulings.view_ruling', ruling_id=ruling_ids[0])
+        return url_for('rulings.index')
+    if job.job_type == 'sync_rulings':
+        return url_for('rulings.index')
+    return None
+
+def job_status_data(job):
+    """Status of a job for the JSON and streaming endpoints"""
+    data = job.to_dict(include_result=True)
+    data['result_url'] = job_result_url(job) if job.status == Job.SUCCEEDED else None
+    return data
+
+def get_user_job(job_id):
+    """Get a job belonging to the current user or abort with 404"""
+    job = db.session.get(Job, job_id)
+    if job is None or (job.user_id != current_user.id and current_user.role != 'admin'):
+        abort(404)
+    return job
+
+@jobs_bp.route('/<int:job_id>')
+@login_required
+def view_job(job_id):
+    """Progress page for a job; finished jobs go straight to their result"""
+    job = get_user_job(job_id)
+
+    if job.status == Job.SUCCEEDED:
+        result_url = job_result_url(job)
+        if result_url:
+            return redirect(result_url)
+
+    return render_template('jobs/view.html', job=job, status=job_status_data(job))
+
+@jobs_bp.route('/<int:job_id>/status')
+@login_required
+def job_status(job_id):
+    """Job status as JSON, for clients that poll"""
+    return jsonify(job_status_data(get_user_job(job_id)))
+
+@jobs_bp.route('/<int:job_id>/stream')
+@login_required
+def stream_job(job_id):
+    """Stream a job's status as server-sent events until it finishes"""
+    job = get_user_job(job_id)
+
+    def events():
+        deadline = time.monotonic() + config.JOB_STREAM_TIMEOUT
+        last_sent = None
+        while True:
+            # Read the worker's latest writes rather than the session's cached row
+            db.session.expire_all()
+            current = db.session.get(Job, job.id)
+            status = job_status_data(current)
+            if status != last_sent:
+                yield sse_event(status, event='status')
+                last_sent = status
+            if current.is_finished:
+                yield sse_event(status, event='done')
+                return
+            if time.monotonic() > deadline:
+                # The browser's EventSource reconnects on its own
+                return
+            db.session.rollback()
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    return sse_response(events())
+
+@jobs_bp.route('/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel(job_id):
+    """Cancel a queued or running job"""
+    job = get_user_job(job_id)
+    cancelled = cancel_job(job.id)
+    db.session.refresh(job)
+
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify({'cancelled': cancelled, 'job': job_status_data(job)})
+
+    if cancelled:
+        flash('The job is being cancelled', 'info')
+    else:
+        flash('The job has already finished', 'warning')
+    return redirect(url_for('jobs.view_job', job_id=job.id))
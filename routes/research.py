@@ -5,7 +5,12 @@ from models import LegalResearch, Case, db, TokenUsage
 from utils.research_assistant import LegalResearchAssistant
 from utils.scraper import KenyaLawScraper
 from utils.vector_db import VectorDatabase
+from utils.hybrid_search import get_hybrid_retriever
+from utils.search_filters import court_code_for
+from utils.job_queue import enqueue
+from routes.jobs import job_started_response
 import json
+import math
 import config
 
 logger = logging.getLogger(__name__)
@@ -36,11 +41,16 @@ def search():
         case_results = scraper.search_cases(query)
         
         # If court filter is specified, filter results
+        court_code = court_code_for(court_filter)
         if court_filter:
             filtered_case_results = []
             for case in case_results:
-                # Check if court code is in URL or title
-                if court_filter in case.get('link', '') or court_filter in case.get('title', ''):
+                # Match the court code in the URL (/akn/ke/judgment/kehc/...) or the citation in the title
+                if court_code:
+                    matched = court_code_for(url=case.get('link', ''), citation=case.get('title', '')) == court_code
+                else:
+                    matched = court_filter in case.get('link', '') or court_filter in case.get('title', '')
+                if matched:
                     filtered_case_results.append(case)
             case_results = filtered_case_results
         
@@ -56,11 +66,21 @@ def search():
                     filtered_legislation.append(legislation)
             legislation_results = filtered_legislation[:10]  # Limit to 10 items
         
+        # Search the local rulings database and indexed statutes by keywords and meaning
+        try:
+            local_search = get_hybrid_retriever().search(query, limit=10,
+                                                         filters={'court': court_code} if court_code else None)
+        except Exception as e:
+            logger.error(f"Hybrid search failed for '{query}': {str(e)}")
+            local_search = {'results': [], 'timings': {}}
+        
         # Prepare results
         results = {
             'query': query,
             'cases': case_results,
-            'legislation': legislation_results
+            'legislation': legislation_results,
+            'local': local_search['results'],
+            'local_timings': local_search['timings']
         }
         
         # Save search to history with new fields
@@ -70,7 +90,7 @@ def search():
             results=json.dumps(results),
             source="kenyalaw.org",
             court_filter=court_filter,
-            result_count=len(case_results) + len(legislation_results),
+            result_count=len(case_results) + len(legislation_results) + len(results['local']),
             user_id=current_user.id
         )
         
@@ -143,51 +163,17 @@ def research_issue():
         )
         db.session.add(token_usage)
         
-        # Initialize research assistant
-        research_assistant = LegalResearchAssistant()
-        
         # Log the request
-        logger.info(f"Researching issue: {query} with court filters: {court_filters}")
+        logger.info(f"Queueing research: {query} with court filters: {court_filters}")
         
-        # Research issue
-        try:
-            results = research_assistant.research_legal_issue(query, court_filters)
-            
-            # Record success
-            result_count = 0
-            if results.get('results'):
-                result_count = len(results.get('results', []))
-            
-            # Save research to history with enhanced fields
-            research_history = LegalResearch(
-                title=f"Research: {query[:50]}",
-                query=query,
-                results=json.dumps(results),
-                source="ai_research",
-                court_filter=",".join(court_filters) if court_filters else None,
-                result_count=result_count,
-                user_id=current_user.id
-            )
-            
-            # Associate with case if selected
-            if case_id:
-                case = db.session.get(Case, case_id)
-                if case and case.user_id == current_user.id:
-                    research_history.case_id = case_id
-            
-            db.session.add(research_history)
-            db.session.commit()
-            logger.info(f"Saved research to history: {query}, found {result_count} results")
-            flash('Research completed successfully', 'success')
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error in AI research: {str(e)}")
-            flash(f'Error in research: {str(e)}', 'error')
-            
-            # Refund tokens on failure
-            current_user.add_tokens(tokens_needed)
-            db.session.commit()
+        # Scraping and LLM analysis take minutes, so the research runs as a background job
+        job = enqueue('research_issue', {
+            'query': query,
+            'court_filters': court_filters,
+            'case_id': case_id or None,
+            'tokens_charged': tokens_needed
+        }, user_id=current_user.id)
+        return job_started_response(job, 'Research started. Results will be saved to your research history.')
     
     # Get cases for selection
     cases = db.session.query(Case).filter(Case.user_id == current_user.id).all()
@@ -215,6 +201,19 @@ def research_issue():
                           has_enough_tokens=has_enough_tokens,
                           token_cost=10)
 
+DOCUMENT_ANALYSIS_MIN_TOKENS = 15  # Document analysis costs more than simple search
+
+def document_analysis_token_cost(document_text, legal_assistant):
+    """Number of tokens charged for analyzing a document, scaled with the model tokens it needs"""
+    plan = legal_assistant.plan_case_analysis(document_text)
+    return max(DOCUMENT_ANALYSIS_MIN_TOKENS, math.ceil(plan['estimated_tokens'] / config.LLM_TOKENS_PER_CREDIT))
+
+def tokens_for_usage(usage):
+    """Number of tokens charged for the model tokens an analysis actually used"""
+    if not usage:
+        return DOCUMENT_ANALYSIS_MIN_TOKENS
+    return max(DOCUMENT_ANALYSIS_MIN_TOKENS, math.ceil(usage.get('estimated_tokens', 0) / config.LLM_TOKENS_PER_CREDIT))
+
 @research_bp.route('/analyze_document', methods=['GET', 'POST'])
 @login_required
 def analyze_document():
@@ -229,27 +228,42 @@ def analyze_document():
             flash('Document text is required', 'error')
             return redirect(url_for('research.analyze_document'))
         
-        # Check if user has enough tokens for document analysis
-        tokens_needed = 15  # Example token cost - document analysis costs more than simple search
-        if not current_user.use_tokens(tokens_needed):
-            flash(f'You need {tokens_needed} tokens to use AI document analysis. Please upgrade your subscription or buy more tokens.', 'error')
+        # Initialize research assistant
+        research_assistant = LegalResearchAssistant()
+        
+        # Long judgments cost more; users short of the full cost get an analysis of the
+        # most important parts that fits what they can pay for
+        tokens_needed = document_analysis_token_cost(document_text, research_assistant.legal_assistant)
+        tokens_charged = min(tokens_needed, current_user.tokens_available)
+        if tokens_charged < DOCUMENT_ANALYSIS_MIN_TOKENS or not current_user.use_tokens(tokens_charged):
+            flash(f'You need {DOCUMENT_ANALYSIS_MIN_TOKENS} tokens to use AI document analysis. Please upgrade your subscription or buy more tokens.', 'error')
             return redirect(url_for('research.analyze_document'))
         
         # Record token usage
         token_usage = TokenUsage(
             user_id=current_user.id,
-            tokens_used=tokens_needed,
+            tokens_used=tokens_charged,
             feature='document_analysis'
         )
         db.session.add(token_usage)
         
-        # Initialize research assistant
-        research_assistant = LegalResearchAssistant()
-        
         # Analyze document
         try:
             logger.info(f"Analyzing document of length: {len(document_text)} characters")
-            analysis_results = research_assistant.analyze_legal_document(document_text)
+            analysis_results = research_assistant.analyze_legal_document(
+                document_text,
+                token_budget=tokens_charged * config.LLM_TOKENS_PER_CREDIT
+            )
+            
+            # Refund whatever the analysis did not use
+            tokens_used = tokens_for_usage(analysis_results.get('token_usage'))
+            if tokens_used < tokens_charged:
+                current_user.add_tokens(tokens_charged - tokens_used)
+                token_usage.tokens_used = tokens_used
+            
+            usage = analysis_results.get('token_usage') or {}
+            if usage.get('chunks_analyzed', 0) < usage.get('chunks_total', 0):
+                flash(f"This document is long - {usage['chunks_analyzed']} of its {usage['chunks_total']} parts were analyzed with your available tokens.", 'info')
             
             # Save analysis to history with enhanced fields
             document_type = analysis_results.get('document_type', 'Unknown document')
@@ -279,20 +293,20 @@ def analyze_document():
             flash(f'Error in document analysis: {str(e)}', 'error')
             
             # Refund tokens on failure
-            current_user.add_tokens(tokens_needed)
+            current_user.add_tokens(tokens_charged)
             db.session.commit()
     
     # Get cases for selection
     cases = db.session.query(Case).filter(Case.user_id == current_user.id).all()
     
     # Check if user has enough tokens
-    has_enough_tokens = current_user.tokens_available >= 15  # Example token cost for document analysis
+    has_enough_tokens = current_user.tokens_available >= DOCUMENT_ANALYSIS_MIN_TOKENS
     
     return render_template('research/analyze.html', 
                           analysis_results=analysis_results,
                           cases=cases,
                           has_enough_tokens=has_enough_tokens,
-                          token_cost=15)
+                          token_cost=DOCUMENT_ANALYSIS_MIN_TOKENS)
 
 @research_bp.route('/precedents', methods=['GET', 'POST'])
 @login_required
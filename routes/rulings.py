@@ -8,20 +8,24 @@ from typing import Dict, List, Any, Optional
 
 from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, current_app
 from flask_login import login_required, current_user
-from sqlalchemy import desc, func, and_, or_
+from sqlalchemy import desc, func, and_, or_, case
 from werkzeug.utils import secure_filename
 
+import config
 from app import db
 from models import Ruling, Judge, Tag, RulingReference, RulingAnnotation, RulingAnalysis
-from utils.scraper import KenyaLawScraper
 from utils.ruling_analyzer import RulingAnalyzer
 from utils.permissions import has_permission, Permissions, role_required
 from utils.gamification import GamificationService
+from utils.job_queue import enqueue
+from utils.text_store import get_text_store
+from utils.hybrid_search import get_hybrid_retriever
+from utils.search_filters import court_code_for, date_to_int
+from routes.jobs import job_started_response
 
 rulings_bp = Blueprint('rulings', __name__)
 
 # Initialize services
-scraper = KenyaLawScraper()
 analyzer = RulingAnalyzer()
 
 # Define courts and categories
@@ -97,17 +101,41 @@ def search():
     
     # Start building the query
     rulings_query = Ruling.query
+    ranked_ids = []
+    search_timings = None
     
     # Apply filters
     if query:
-        rulings_query = rulings_query.filter(
-            or_(
-                Ruling.title.ilike(f'%{query}%'),
-                Ruling.case_number.ilike(f'%{query}%'),
-                Ruling.summary.ilike(f'%{query}%'),
-                Ruling.full_text.ilike(f'%{query}%')
-            )
+        keyword_match = or_(
+            Ruling.title.ilike(f'%{query}%'),
+            Ruling.case_number.ilike(f'%{query}%'),
+            Ruling.summary.ilike(f'%{query}%'),
+            Ruling.full_text.ilike(f'%{query}%')
         )
+        # Rank by keywords (citations, case numbers) and meaning together, filtered inside
+        # the indexes so the ranked rulings all survive the database filters below
+        search_filters = {
+            'court': court if court_code_for(court) else None,
+            'category': category,
+            'date_from': date_from if date_to_int(date_from) else None,
+            'date_to': date_to if date_to_int(date_to) else None,
+            'is_landmark': is_landmark.lower() == 'true' if is_landmark else None
+        }
+        try:
+            hybrid = get_hybrid_retriever().search(query, kinds=('rulings',), limit=config.HYBRID_SEARCH_LIMIT,
+                                                   filters=search_filters)
+            # Vector hits for cases without a ruling row carry non-integer ids
+            ranked_ids = [result['id'] for result in hybrid['results']
+                          if result['kind'] == 'ruling' and isinstance(result['id'], int)]
+            search_timings = hybrid['timings']
+        except Exception as e:
+            current_app.logger.error(f"Hybrid search failed for '{query}': {str(e)}")
+        
+        if ranked_ids:
+            # The ranked rulings come first, followed by the keyword matches beyond the ranking's limit
+            rulings_query = rulings_query.filter(or_(Ruling.id.in_(ranked_ids), keyword_match))
+        else:
+            rulings_query = rulings_query.filter(keyword_match)
     
     if court:
         rulings_query = rulings_query.filter(Ruling.court == court)
@@ -156,7 +184,11 @@ def search():
     # Paginate results
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    rulings = rulings_query.order_by(desc(Ruling.date_of_ruling)).paginate(page=page, per_page=per_page)
+    ordering = [desc(Ruling.date_of_ruling)]
+    if ranked_ids:
+        ordering.insert(0, case({ruling_id: rank for rank, ruling_id in enumerate(ranked_ids)},
+                                value=Ruling.id, else_=len(ranked_ids)))
+    rulings = rulings_query.order_by(*ordering).paginate(page=page, per_page=per_page)
     
     # Get tags for filtering
     all_tags = Tag.query.order_by(Tag.name).all()
@@ -175,6 +207,7 @@ def search():
                           selected_tags=tags,
                           judge_id=judge_id,
                           is_landmark=is_landmark,
+                          search_timings=search_timings,
                           all_tags=all_tags,
                           all_judges=all_judges,
                           COURTS=COURTS,
@@ -236,22 +269,9 @@ def analyze_ruling(ruling_id):
     ruling = Ruling.query.get_or_404(ruling_id)
     
     if request.method == 'POST':
-        # Trigger analysis
-        analysis_result = analyzer.analyze_ruling(ruling_id)
-        
-        if 'error' in analysis_result:
-            flash(f"Analysis failed: {analysis_result['error']}", 'danger')
-        else:
-            flash("Ruling analysis completed successfully", 'success')
-            
-            # Record activity for gamification
-            GamificationService.record_activity(
-                current_user, 'analyze_ruling', 
-                f"Analyzed ruling: {ruling.title}", 
-                points_earned=10
-            )
-        
-        return redirect(url_for('rulings.view_ruling', ruling_id=ruling_id))
+        # LLM analysis takes minutes, so it runs as a background job
+        job = enqueue('analyze_ruling', {'ruling_id': ruling_id}, user_id=current_user.id)
+        return job_started_response(job, f"Analyzing ruling: {ruling.title}")
     
     # Check if analysis exists
     analysis = RulingAnalysis.query.filter_by(
@@ -549,10 +569,16 @@ def delete_ruling(ruling_id):
     
     # Store title for activity log
     title = ruling.title
+    url = ruling.url
     
     db.session.delete(ruling)
     db.session.commit()
     
+    # Remove the imported full text unless another ruling was imported from the same page
+    text_store = get_text_store()
+    if text_store and url and not Ruling.query.filter_by(url=url).first():
+        text_store.delete(text_store.key_for(url))
+    
     flash("Ruling deleted successfully", 'success')
     
     # Record activity for gamification
@@ -650,88 +676,8 @@ def import_rulings():
                 flash("URL is required", 'danger')
                 return redirect(url_for('rulings.import_rulings'))
             
-            try:
-                # Get case details from URL
-                case_details = scraper.get_case_details(url)
-                
-                if not case_details:
-                    flash("Failed to retrieve case details from the provided URL", 'danger')
-                    return redirect(url_for('rulings.import_rulings'))
-                
-                # Extract case information
-                case_number = case_details.get('case_number', '')
-                title = case_details.get('title', '')
-                court = case_details.get('court', '')
-                date_str = case_details.get('date', '')
-                judges = case_details.get('judges', [])
-                citation = case_details.get('citation', '')
-                summary = case_details.get('summary', '')
-                full_text = case_details.get('content', '')
-                
-                # Parse date
-                date_of_ruling = None
-                if date_str:
-                    try:
-                        # Try various date formats
-                        for fmt in ['%d %B %Y', '%B %d, %Y', '%Y-%m-%d']:
-                            try:
-                                date_of_ruling = datetime.strptime(date_str, fmt).date()
-                                break
-                            except ValueError:
-                                continue
-                    except Exception:
-                        # If all formats fail, use current date
-                        date_of_ruling = date.today()
-                else:
-                    date_of_ruling = date.today()
-                
-                # Create the ruling
-                ruling = Ruling(
-                    case_number=case_number,
-                    title=title,
-                    court=court,
-                    date_of_ruling=date_of_ruling,
-                    citation=citation,
-                    url=url,
-                    summary=summary,
-                    full_text=full_text,
-                    user_id=current_user.id
-                )
-                
-                db.session.add(ruling)
-                db.session.flush()  # Get ID without committing
-                
-                # Add judges
-                for judge_name in judges:
-                    # Check if judge already exists
-                    judge = Judge.query.filter_by(name=judge_name).first()
-                    if not judge:
-                        # Create new judge
-                        judge = Judge(
-                            name=judge_name,
-                            court=court,
-                            is_active=True
-                        )
-                        db.session.add(judge)
-                    
-                    ruling.judges.append(judge)
-                
-                db.session.commit()
-                
-                flash(f"Successfully imported ruling: {title}", 'success')
-                
-                # Record activity for gamification
-                GamificationService.record_activity(
-                    current_user, 'import_ruling', 
-                    f"Imported ruling: {title}", 
-                    points_earned=15
-                )
-                
-                return redirect(url_for('rulings.view_ruling', ruling_id=ruling.id))
-                
-            except Exception as e:
-                flash(f"Error importing ruling: {str(e)}", 'danger')
-                return redirect(url_for('rulings.import_rulings'))
+            job = enqueue('import_rulings', {'import_type': import_type, 'case_url': url}, user_id=current_user.id)
+            return job_started_response(job, "Importing ruling in the background")
             
         elif import_type == 'court_batch':
             # Import batch from court
@@ -744,128 +690,34 @@ def import_rulings():
             
             try:
                 limit = int(limit)
-                if limit < 1 or limit > 50:
+                if limit < 1 or limit > config.CRAWL_MAX_IMPORT:
                     limit = 10
             except ValueError:
                 limit = 10
             
-            try:
-                # Get court code based on name
-                court_code = None
-                if 'supreme' in court.lower():
-                    court_code = 'KESC'
-                elif 'appeal' in court.lower():
-                    court_code = 'KECA'
-                elif 'high' in court.lower():
-                    court_code = 'KEHC'
-                elif 'employment' in court.lower() or 'labour' in court.lower():
-                    court_code = 'ELRC'
-                elif 'environment' in court.lower() or 'land' in court.lower():
-                    court_code = 'ELC'
-                else:
-                    court_code = 'KEHC'  # Default to High Court
-                
-                # Get cases from court
-                cases = scraper.get_case_law(court_code, limit=limit)
-                
-                if not cases:
-                    flash(f"No cases found for {court}", 'danger')
-                    return redirect(url_for('rulings.import_rulings'))
-                
-                imported_count = 0
-                for case in cases:
-                    # Get the URL from the 'link' key (the scraper returns 'link' not 'url')
-                    case_url = case.get('link', '')
-                    if not case_url:
-                        continue
-                        
-                    # Check if ruling already exists with this URL
-                    existing = Ruling.query.filter_by(url=case_url).first()
-                    if existing:
-                        continue
-                    
-                    # Get full case details
-                    case_details = scraper.get_case_details(case_url)
-                    
-                    if not case_details:
-                        continue
-                    
-                    # Extract case information
-                    case_number = case_details.get('case_number', '')
-                    title = case_details.get('title', '')
-                    court_name = case_details.get('court', court)
-                    date_str = case_details.get('date', '')
-                    judges = case_details.get('judges', [])
-                    citation = case_details.get('citation', '')
-                    summary = case_details.get('summary', '')
-                    full_text = case_details.get('content', '')
-                    
-                    # Parse date
-                    date_of_ruling = None
-                    if date_str:
-                        try:
-                            # Try various date formats
-                            for fmt in ['%d %B %Y', '%B %d, %Y', '%Y-%m-%d']:
-                                try:
-                                    date_of_ruling = datetime.strptime(date_str, fmt).date()
-                                    break
-                                except ValueError:
-                                    continue
-                        except Exception:
-                            # If all formats fail, use current date
-                            date_of_ruling = date.today()
-                    else:
-                        date_of_ruling = date.today()
-                    
-                    # Create the ruling
-                    ruling = Ruling(
-                        case_number=case_number,
-                        title=title,
-                        court=court_name,
-                        date_of_ruling=date_of_ruling,
-                        citation=citation,
-                        url=case_url,
-                        summary=summary,
-                        full_text=full_text,
-                        user_id=current_user.id
-                    )
-                    
-                    db.session.add(ruling)
-                    db.session.flush()  # Get ID without committing
-                    
-                    # Add judges
-                    for judge_name in judges:
-                        # Check if judge already exists
-                        judge = Judge.query.filter_by(name=judge_name).first()
-                        if not judge:
-                            # Create new judge
-                            judge = Judge(
-                                name=judge_name,
-                                court=court_name,
-                                is_active=True
-                            )
-                            db.session.add(judge)
-                        
-                        ruling.judges.append(judge)
-                    
-                    imported_count += 1
-                
-                db.session.commit()
-                
-                flash(f"Successfully imported {imported_count} rulings from {court}", 'success')
-                
-                # Record activity for gamification
-                GamificationService.record_activity(
-                    current_user, 'import_batch_rulings', 
-                    f"Imported {imported_count} rulings from {court}", 
-                    points_earned=25
-                )
-                
-                return redirect(url_for('rulings.index'))
-                
-            except Exception as e:
-                flash(f"Error importing rulings: {str(e)}", 'danger')
-                return redirect(url_for('rulings.import_rulings'))
+            # Get court code based on name
+            court_code = None
+            if 'supreme' in court.lower():
+                court_code = 'KESC'
+            elif 'appeal' in court.lower():
+                court_code = 'KECA'
+            elif 'high' in court.lower():
+                court_code = 'KEHC'
+            elif 'employment' in court.lower() or 'labour' in court.lower():
+                court_code = 'ELRC'
+            elif 'environment' in court.lower() or 'land' in court.lower():
+                court_code = 'ELC'
+            else:
+                court_code = 'KEHC'  # Default to High Court
+            
+            # Scraping a whole batch takes minutes, so it runs as a background job
+            job = enqueue('import_rulings', {
+                'import_type': import_type,
+                'court': court,
+                'court_code': court_code,
+                'limit': limit
+            }, user_id=current_user.id)
+            return job_started_response(job, f"Importing up to {limit} rulings from {court} in the background")
     
     return render_template('rulings/import.html',
                           COURTS=COURTS)
@@ -9,6 +9,7 @@ from flask_login import login_required, current_user
 from app import db
 from models import User, TokenUsage
 from utils.llm import OllamaClient, LegalAssistant
+from utils.streaming import sse_event, sse_response
 
 logger = logging.getLogger(__name__)
 
@@ -96,25 +97,13 @@ def improve_text():
             'error': 'No text provided for improvement'
         })
     
-    # Check if user has tokens available
-    tokens_required = 10  # Higher cost for improvement vs analysis
-    if len(text) > 300:
-        tokens_required += (len(text) // 300)  # Additional token per 300 chars
-    
-    if not current_user.use_tokens(tokens_required):
+    tokens_required = charge_improvement_tokens(text)
+    if tokens_required is None:
         return jsonify({
             'success': False,
-            'error': f'Insufficient tokens. This improvement requires {tokens_required} tokens.'
+            'error': f'Insufficient tokens. This improvement requires {improvement_token_cost(text)} tokens.'
         })
     
-    # Record token usage
-    db.session.add(TokenUsage(
-        user_id=current_user.id,
-        tokens_used=tokens_required,
-        feature='writing_assistant_improve'
-    ))
-    db.session.commit()
-    
     try:
         # Generate improved text
         improved_text = improve_legal_writing(text, improvements)
@@ -131,6 +120,70 @@ def improve_text():
             'error': f'Error improving text: {str(e)}'
         })
 
+@writing_bp.route('/improve/stream', methods=['POST'])
+@login_required
+def improve_text_stream():
+    """Stream the improved version of legal text as server-sent events"""
+    text = request.form.get('text', '')
+    improvements = request.form.get('improvements', '')
+    
+    if not text:
+        return jsonify({
+            'success': False,
+            'error': 'No text provided for improvement'
+        })
+    
+    tokens_required = charge_improvement_tokens(text)
+    if tokens_required is None:
+        return jsonify({
+            'success': False,
+            'error': f'Insufficient tokens. This improvement requires {improvement_token_cost(text)} tokens.'
+        })
+    
+    def events():
+        # Send an event straight away so the browser can show progress
+        yield sse_event({'tokens_used': tokens_required}, event='start')
+        try:
+            for chunk in stream_improved_legal_writing(text, improvements):
+                yield sse_event({'text': chunk})
+            yield sse_event({'success': True}, event='done')
+        except Exception as e:
+            logger.error(f"Error streaming improved text: {str(e)}")
+            yield sse_event({'success': False, 'error': f'Error improving text: {str(e)}'}, event='done')
+    
+    return sse_response(events())
+
+def improvement_token_cost(text):
+    """Number of tokens charged for improving a piece of text"""
+    tokens_required = 10  # Higher cost for improvement vs analysis
+    if len(text) > 300:
+        tokens_required += (len(text) // 300)  # Additional token per 300 chars
+    return tokens_required
+
+def charge_improvement_tokens(text):
+    """
+    Charge the current user for a text improvement
+    
+    Args:
+        text: Original legal text
+        
+    Returns:
+        Number of tokens charged, or None if the user does not have enough tokens
+    """
+    tokens_required = improvement_token_cost(text)
+    
+    if not current_user.use_tokens(tokens_required):
+        return None
+    
+    # Record token usage
+    db.session.add(TokenUsage(
+        user_id=current_user.id,
+        tokens_used=tokens_required,
+        feature='writing_assistant_improve'
+    ))
+    db.session.commit()
+    return tokens_required
+
 def analyze_legal_writing(text, analysis_type='full'):
     """
     Analyze legal writing text and provide suggestions for improvement
@@ -335,21 +388,7 @@ def improve_legal_writing(text, improvements):
     if not llm_client:
         return generate_fallback_improvement(text, improvements)
     
-    # Limit text size
-    max_chars = 8000
-    if len(text) > max_chars:
-        text = text[:max_chars] + "... [truncated]"
-    
-    prompt = f"""Rewrite the following legal text incorporating these improvement suggestions.
-Maintain the same meaning and legal intent, but improve the writing based on the suggestions.
-
-ORIGINAL TEXT:
-{text}
-
-IMPROVEMENT SUGGESTIONS:
-{improvements}
-
-IMPROVED TEXT:"""
+    prompt = build_improvement_prompt(text, improvements)
     
     try:
         improved_text = llm_client.generate(prompt=prompt, temperature=0.4, max_tokens=2000)
@@ -365,6 +404,51 @@ IMPROVED TEXT:"""
         return generate_fallback_improvement(text, improvements)
 
 
+def stream_improved_legal_writing(text, improvements):
+    """
+    Generate an improved version of legal text, yielding it as it is generated
+    
+    Args:
+        text: Original legal text
+        improvements: Suggestions for improvement
+        
+    Yields:
+        Chunks of the improved text
+    """
+    if not llm_client:
+        yield generate_fallback_improvement(text, improvements)
+        return
+    
+    prompt = build_improvement_prompt(text, improvements)
+    yield from llm_client.generate_stream(prompt=prompt, temperature=0.4, max_tokens=2000)
+
+def build_improvement_prompt(text, improvements):
+    """
+    Build the LLM prompt for rewriting legal text
+    
+    Args:
+        text: Original legal text
+        improvements: Suggestions for improvement
+        
+    Returns:
+        Prompt string
+    """
+    # Limit text size
+    max_chars = 8000
+    if len(text) > max_chars:
+        text = text[:max_chars] + "... [truncated]"
+    
+    return f"""Rewrite the following legal text incorporating these improvement suggestions.
+Maintain the same meaning and legal intent, but improve the writing based on the suggestions.
+
+ORIGINAL TEXT:
+{text}
+
+IMPROVEMENT SUGGESTIONS:
+{improvements}
+
+IMPROVED TEXT:"""
+
 def generate_fallback_improvement(text, improvements):
     """
     Generate a fallback improvement message when LLM is not available
@@ -0,0 +1,208 @@
+"""
+Test script for the async LLM clients.
+This script tests concurrent generation, counter-checking and the synchronous facade
+against a mocked Ollama server.
+"""
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+import config
+from utils.circuit_breaker import reset_circuit_breakers
+from utils.llm import FailoverLLMClient, LazyLLMClient, MockLLMClient, OllamaClient, clear_endpoint_cache
+from utils.async_llm import (
+    AsyncOllamaClient,
+    AsyncCounterCheckLLMClient,
+    AsyncClientAdapter,
+    SyncLLMClient,
+    async_client_for,
+    get_async_llm_client
+)
+
+def make_ollama_transport(delay=0.0, responses=None, calls=None):
+    """Build a mock transport answering the OpenAI-compatible chat endpoint"""
+    responses = responses or {}
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        if calls is not None:
+            calls.append((request.url.path, payload))
+        await asyncio.sleep(delay)
+        if request.url.path == "/api/embed":
+            return httpx.Response(200, json={"embeddings": [[0.5, 0.25] for _ in payload["input"]]})
+        prompt = payload["messages"][-1]["content"]
+        content = responses.get(payload["model"], f"Answer to {prompt}")
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    return httpx.MockTransport(handler)
+
+class TestAsyncLLMClients(unittest.TestCase):
+    """Test case for the async LLM clients"""
+
+    def setUp(self):
+        """Isolate shared caches and circuit breakers between tests"""
+        self.embedding_cache_patch = patch.object(config, 'EMBEDDING_CACHE_ENABLED', False)
+        self.embedding_cache_patch.start()
+        self.version_patch = patch.object(config, 'OLLAMA_VERSION', '0.6.4')
+        self.version_patch.start()
+        reset_circuit_breakers()
+        clear_endpoint_cache()
+
+    def tearDown(self):
+        """Restore settings"""
+        self.embedding_cache_patch.stop()
+        self.version_patch.stop()
+        reset_circuit_breakers()
+        clear_endpoint_cache()
+
+    def test_async_ollama_generate_concurrently(self):
+        """Test that independent prompts run concurrently with asyncio.gather"""
+        calls = []
+
+        async def run():
+            async with httpx.AsyncClient(transport=make_ollama_transport(delay=0.2, calls=calls)) as http_client:
+                client = AsyncOllamaClient(base_url="http://ollama.test", model="llama3", http_client=http_client)
+                started = time.monotonic()
+                results = await asyncio.gather(*(client.generate(f"Issue {i}") for i in range(6)))
+                return results, time.monotonic() - started
+
+        results, elapsed = asyncio.run(run())
+
+        self.assertEqual(results, [f"Answer to Issue {i}" for i in range(6)], "Results should keep prompt order")
+        self.assertLess(elapsed, 0.2 * 6 / 2, "Prompts should not run one after another")
+        self.assertEqual(len(calls), 6)
+        self.assertTrue(all(path == "/v1/chat/completions" for path, _ in calls))
+
+    def test_async_ollama_concurrency_limit(self):
+        """Test that max_concurrency bounds the requests in flight"""
+        in_flight = []
+        peak = []
+
+        async def handler(request):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.pop()
+            return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+                client = AsyncOllamaClient(base_url="http://ollama.test", model="llama3",
+                                           http_client=http_client, max_concurrency=2)
+                await asyncio.gather(*(client.generate(f"Issue {i}") for i in range(6)))
+
+        asyncio.run(run())
+        self.assertEqual(max(peak), 2)
+
+    def test_async_ollama_embeddings(self):
+        """Test batched async embeddings"""
+        async def run():
+            async with httpx.AsyncClient(transport=make_ollama_transport()) as http_client:
+                client = AsyncOllamaClient(base_url="http://ollama.test", model="nomic", http_client=http_client)
+                return await client.get_embeddings(["a", "b", "c"], batch_size=2)
+
+        self.assertEqual(asyncio.run(run()), [[0.5, 0.25]] * 3)
+
+    def test_async_ollama_error_response(self):
+        """Test that failed endpoints return an error string like the sync client"""
+        async def handler(request):
+            return httpx.Response(500, json={"error": "model not loaded"})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+                client = AsyncOllamaClient(base_url="http://ollama.test", model="llama3", http_client=http_client)
+                return await client.generate("Test")
+
+        self.assertTrue(asyncio.run(run()).startswith("Error generating response with OLLAMA"))
+
+    def test_async_counter_check(self):
+        """Test that both models are awaited and their agreement is scored"""
+        responses = {
+            "llama3": "The appeal is allowed with costs",
+            "deepseek": "The appeal is allowed"
+        }
+
+        async def run():
+            async with httpx.AsyncClient(transport=make_ollama_transport(delay=0.1, responses=responses)) as http_client:
+                client = AsyncCounterCheckLLMClient(base_url="http://ollama.test", primary_model="llama3",
+                                                    secondary_model="deepseek", http_client=http_client, mode="both")
+                started = time.monotonic()
+                result = await client.generate("Outcome?")
+                return client, result, time.monotonic() - started
+
+        client, result, elapsed = asyncio.run(run())
+
+        self.assertTrue(result.startswith("The appeal is allowed with costs"))
+        self.assertIn("[Agreement between models: 67%]", result)
+        self.assertLess(elapsed, 0.2, "Both models should be called concurrently")
+        self.assertEqual(client.get_agreement("Outcome?")["status"], "complete")
+
+    def test_sync_facade_generate_many(self):
+        """Test that the sync facade runs prompts concurrently on the background loop"""
+        facade = SyncLLMClient(AsyncClientAdapter(MockLLMClient()))
+
+        self.assertIn("Case Analysis", facade.generate("Please analyze this case"))
+        results = facade.generate_many(["Please analyze this case", "Summarize this case"])
+        self.assertEqual(len(results), 2)
+        self.assertIn("Case Analysis", results[0])
+        self.assertEqual(results[1], facade.generate("Summarize this case"))
+        self.assertEqual(len(facade.get_embedding("land dispute")), 384)
+
+    def test_sync_facade_generate_each(self):
+        """Test that each request is generated with its own settings"""
+        client = MagicMock()
+        client.generate.side_effect = lambda prompt, model, temperature, max_tokens: f"{prompt}:{temperature}:{max_tokens}"
+        facade = SyncLLMClient(AsyncClientAdapter(client))
+
+        results = facade.generate_each([
+            {'prompt': "principles", 'temperature': 0.2, 'max_tokens': 800},
+            {'prompt': "recommendations", 'temperature': 0.3}
+        ])
+
+        self.assertEqual(results, ["principles:0.2:800", "recommendations:0.3:1000"])
+
+    def test_async_client_for(self):
+        """Test that sync clients get the async counterpart of their backend"""
+        async_client = async_client_for(OllamaClient(base_url="http://ollama.test", model="llama3"))
+        self.assertIsInstance(async_client, AsyncOllamaClient)
+        self.assertEqual((async_client.base_url, async_client.model), ("http://ollama.test", "llama3"))
+
+        mock_client = MockLLMClient()
+        adapter = async_client_for(mock_client)
+        self.assertIsInstance(adapter, AsyncClientAdapter)
+        self.assertIs(adapter.client, mock_client)
+
+    def test_default_client_from_lazy_client(self):
+        """Test that the default async client follows the lazy client's backend selection"""
+        lazy_client = LazyLLMClient(probe=lambda: None)
+        self.assertTrue(lazy_client.wait_for_probe(timeout=5))
+
+        with patch('utils.async_llm.get_llm_client', return_value=lazy_client):
+            async_client = get_async_llm_client()
+            self.assertIsInstance(async_client, AsyncClientAdapter)
+            self.assertIs(async_client.client, lazy_client, "The fallback should keep re-probing")
+            self.assertIn("Case Analysis", SyncLLMClient().generate("Please analyze this case"))
+
+        lazy_client = LazyLLMClient(probe=lambda: OllamaClient(base_url="http://ollama.test", model="llama3"))
+        self.assertTrue(lazy_client.wait_for_probe(timeout=5))
+        with patch('utils.async_llm.get_llm_client', return_value=lazy_client):
+            self.assertIsInstance(get_async_llm_client(), AsyncOllamaClient)
+
+    def test_default_client_keeps_failover(self):
+        """Test that the OpenAI-to-Ollama failover client is kept on the async path"""
+        failover_client = FailoverLLMClient([MockLLMClient()])
+
+        with patch('utils.async_llm.get_llm_client', return_value=failover_client), \
+                patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-test'}):
+            async_client = get_async_llm_client()
+
+        self.assertIsInstance(async_client, AsyncClientAdapter)
+        self.assertIs(async_client.client, failover_client)
+
+if __name__ == "__main__":
+    unittest.main()
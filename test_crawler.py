@@ -0,0 +1,178 @@
+"""
+Test script for the concurrent ruling crawler.
+This script tests politeness limits, robots.txt, deduplication, batch inserts and resumable checkpoints
+against a fake Kenya Law server.
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from app import app, db
+from models import Ruling, Judge
+from utils.crawler import HostThrottle, RulingCrawler, parse_ruling_date
+from utils.http_cache import HTTPCache
+from utils.scraper import KenyaLawScraper
+from utils.text_store import TextStore
+
+class FakeKenyaLaw:
+    """Answers listing, judgment and robots.txt requests like new.kenyalaw.org"""
+
+    def __init__(self, token, cases=6, delay=0.05):
+        self.token = token
+        self.cases = cases
+        self.delay = delay
+        self.paths = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def case_path(self, number):
+        folder = 'private' if number == 0 else self.token
+        return f"/akn/ke/judgment/kehc/{folder}/{number}"
+
+    def send(self, request, **kwargs):
+        path = request.path_url
+        with self.lock:
+            self.paths.append(path)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if path == '/robots.txt':
+                body = "User-agent: *\nDisallow: /akn/ke/judgment/kehc/private/\n"
+            elif path.startswith('/judgments/'):
+                rows = "".join(
+                    f'<tr><td class="cell-title"><a href="{self.case_path(i)}">Case {i} v Republic</a></td></tr>'
+                    for i in range(self.cases)
+                )
+                body = f"<html><body><table>{rows}</table></body></html>"
+            else:
+                number = path.rsplit('/', 1)[-1]
+                body = (f"<html><body><h1>Case {number} v Republic</h1>"
+                        f"<div class=\"case-meta\">Court: High Court\nCoram: {self.token} Judge A, {self.token} Judge B\n"
+                        f"Date: 12 March 2023</div><main>JUDGMENT The appeal is dismissed.</main></body></html>")
+            response = requests.Response()
+            response.status_code = 200
+            response._content = body.encode('utf-8')
+            response._content_consumed = True
+            response.encoding = 'utf-8'
+            response.url = request.url
+            response.request = request
+            return response
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def judgment_requests(self):
+        return [path for path in self.paths if path.startswith('/akn/')]
+
+class TestCrawler(unittest.TestCase):
+    """Test case for RulingCrawler"""
+
+    def setUp(self):
+        """Point a scraper with an in-memory cache at the fake server"""
+        self.token = f"crawl{time.time_ns()}"
+        self.server = FakeKenyaLaw(self.token)
+        self.adapter_patch = patch.object(requests.adapters.HTTPAdapter, 'send', side_effect=self.server.send)
+        self.adapter_patch.start()
+        self.checkpoint_dir = tempfile.mkdtemp()
+        self.text_dir = tempfile.mkdtemp()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Remove the imported rulings and judges"""
+        db.session.rollback()
+        for ruling in Ruling.query.filter(Ruling.url.like(f"%/{self.token}/%")).all():
+            ruling.judges = []
+            db.session.delete(ruling)
+        Judge.query.filter(Judge.name.like(f"{self.token}%")).delete(synchronize_session=False)
+        db.session.commit()
+        self.app_context.pop()
+        self.adapter_patch.stop()
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        shutil.rmtree(self.text_dir, ignore_errors=True)
+
+    def make_crawler(self, **kwargs):
+        scraper = KenyaLawScraper(base_url="https://kenyalaw.test", http_cache=HTTPCache(path=None))
+        options = dict(max_workers=8, throttle=HostThrottle(requests_per_second=1000, max_in_flight=3),
+                       batch_size=2, checkpoint_dir=self.checkpoint_dir, text_store=TextStore(self.text_dir))
+        options.update(kwargs)
+        return RulingCrawler(scraper=scraper, **options)
+
+    def test_crawl_imports_new_rulings(self):
+        """Test a full crawl: robots.txt, concurrency limits, judges and the report"""
+        report = self.make_crawler().crawl_court('KEHC', limit=6, default_court='High Court')
+
+        self.assertEqual(report['discovered'], 6)
+        self.assertEqual(report['skipped_robots'], 1)
+        self.assertEqual(report['imported_count'], 5)
+        self.assertEqual(report['errors'], 0)
+        self.assertNotIn('/akn/ke/judgment/kehc/private/0', self.server.paths)
+        self.assertLessEqual(self.server.peak_in_flight, 3)
+        self.assertGreater(self.server.peak_in_flight, 1, "Judgments should be fetched concurrently")
+        self.assertIn('judgments_per_second', report)
+
+        rulings = Ruling.query.filter(Ruling.url.like(f"%/{self.token}/%")).all()
+        self.assertEqual(len(rulings), 5)
+        self.assertEqual(rulings[0].date_of_ruling.isoformat(), '2023-03-12')
+        self.assertEqual(Judge.query.filter(Judge.name.like(f"{self.token}%")).count(), 2, "Judges are shared, not duplicated")
+        self.assertEqual(len(rulings[0].judges), 2)
+
+    def test_existing_rulings_are_skipped(self):
+        """Test that a second crawl doesn't fetch judgments already in the database"""
+        self.make_crawler().crawl_court('KEHC', limit=6)
+        self.server.paths.clear()
+
+        report = self.make_crawler().crawl_court('KEHC', limit=6)
+
+        self.assertEqual(report['skipped_existing'], 5)
+        self.assertEqual(report['imported_count'], 0)
+        self.assertEqual(self.server.judgment_requests(), [])
+
+    def test_stopped_crawl_resumes_from_checkpoint(self):
+        """Test that a stopped crawl keeps its imports and the next run finishes the rest"""
+        fetched = []
+        report = self.make_crawler(max_workers=1, batch_size=1).crawl_court(
+            'KEHC', limit=6, should_stop=lambda: fetched.append(1) or len(fetched) >= 2
+        )
+        self.assertTrue(report['stopped'])
+        self.assertEqual(report['imported_count'], 2)
+
+        self.server.paths.clear()
+        report = self.make_crawler().crawl_court('KEHC', limit=6)
+
+        self.assertFalse(any(path.startswith('/judgments/') for path in self.server.paths),
+                         "The resumed crawl reuses the discovered URLs")
+        self.assertEqual(report['imported_count'], 3)
+        self.assertEqual(Ruling.query.filter(Ruling.url.like(f"%/{self.token}/%")).count(), 5)
+
+    def test_host_throttle_rate_limit(self):
+        """Test that requests to one host are spaced by the rate limit"""
+        throttle = HostThrottle(requests_per_second=20, max_in_flight=4)
+        started = time.monotonic()
+        for _ in range(5):
+            with throttle.slot("https://kenyalaw.test/a"):
+                pass
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+        started = time.monotonic()
+        with throttle.slot("https://other.test/a"):
+            pass
+        self.assertLess(time.monotonic() - started, 0.05, "Hosts are throttled independently")
+
+    def test_parse_ruling_date(self):
+        """Test ruling date formats"""
+        self.assertEqual(parse_ruling_date('12 March 2023').isoformat(), '2023-03-12')
+        self.assertEqual(parse_ruling_date('March 12, 2023').isoformat(), '2023-03-12')
+        self.assertIsNotNone(parse_ruling_date('sometime'))
+        self.assertIsNone(parse_ruling_date('sometime', default=None))
+
+if __name__ == "__main__":
+    unittest.main()
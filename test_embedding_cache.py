@@ -0,0 +1,74 @@
+"""
+Test script for the embedding cache.
+This script tests the in-memory and SQLite tiers, eviction and model invalidation.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from utils.embedding_cache import EmbeddingCache
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test case for the EmbeddingCache"""
+    
+    def setUp(self):
+        """Set up a temporary cache file"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "embeddings.sqlite3")
+    
+    def tearDown(self):
+        """Remove the temporary cache file"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted as hits or misses"""
+        cache = EmbeddingCache(path=None)
+        self.assertIsNone(cache.get("model-a", "judicial review"))
+        cache.put("model-a", "judicial review", [0.5, 0.25])
+        self.assertEqual(cache.get("model-a", "  judicial   review"), [0.5, 0.25], "Whitespace should be normalized")
+        self.assertIsNone(cache.get("model-b", "judicial review"), "Keys should include the model")
+        
+        stats = cache.stats()
+        self.assertEqual(stats['memory_hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+    
+    def test_persists_to_disk(self):
+        """Test that embeddings survive a new cache instance"""
+        EmbeddingCache(path=self.path).put("model-a", "land dispute", [0.5, 0.25, 0.125])
+        
+        cache = EmbeddingCache(path=self.path)
+        self.assertEqual(cache.get("model-a", "land dispute"), [0.5, 0.25, 0.125])
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+    
+    def test_fallback_vectors_not_cached(self):
+        """Test that empty and zero fallback vectors are never stored"""
+        cache = EmbeddingCache(path=self.path)
+        cache.put_many("model-a", ["a", "b"], [[], [0.0] * 8])
+        self.assertEqual(cache.get_many("model-a", ["a", "b"]), [None, None])
+        self.assertEqual(cache.stats()['disk_items'], 0)
+    
+    def test_dimension_change_invalidates_model(self):
+        """Test that a new vector size for a model drops its old embeddings"""
+        cache = EmbeddingCache(path=self.path)
+        cache.put("model-a", "old text", [1.0, 2.0])
+        cache.put("model-a", "new text", [1.0, 2.0, 3.0])
+        
+        self.assertIsNone(cache.get("model-a", "old text"), "Old vectors should be invalidated")
+        self.assertEqual(cache.get("model-a", "new text"), [1.0, 2.0, 3.0])
+        self.assertIsNone(EmbeddingCache(path=self.path).get("model-a", "old text"), "Invalidation should reach the disk tier")
+    
+    def test_size_based_eviction(self):
+        """Test that the memory and disk tiers are bounded"""
+        cache = EmbeddingCache(path=self.path, memory_items=2, max_disk_bytes=4 * 4 * 5,
+                               size_check_interval=1)
+        for i in range(10):
+            cache.put("model-a", f"text {i}", [float(i + 1)] * 4)
+        
+        stats = cache.stats()
+        self.assertEqual(stats['memory_items'], 2)
+        self.assertLessEqual(stats['disk_bytes'], 4 * 4 * 5)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(cache.get("model-a", "text 9"), [10.0] * 4, "Most recent entries should be kept")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Test script for the scraper's HTTP cache.
+This script tests cached pages, conditional revalidation, TTLs, compression and eviction.
+"""
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from utils.http_cache import HTTPCache
+from utils.scraper import KenyaLawScraper
+
+JUDGMENT_HTML = """
+<html><body>
+<h1>Republic v Mwangi</h1>
+<div class="case-meta">Citation: [2023] KEHC 1234 (KLR)
+Court: High Court</div>
+<main><p>JUDGMENT</p><p>The appeal is dismissed with costs. The appellant failed to show that the trial court erred.</p></main>
+</body></html>
+"""
+
+class FakeServer:
+    """Stands in for the HTTP adapter, answering conditional requests like a real server"""
+
+    def __init__(self, html, etag='"v1"'):
+        self.html = html
+        self.etag = etag
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.headers['ETag'] = self.etag
+        if request.headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response._content = self.html.encode('utf-8')
+            response.encoding = 'utf-8'
+        return response
+
+class TestHTTPCache(unittest.TestCase):
+    """Test case for HTTPCache and its use by KenyaLawScraper"""
+
+    def setUp(self):
+        """Use an in-memory cache and a fake server"""
+        self.cache = HTTPCache(path=None)
+        self.server = FakeServer(JUDGMENT_HTML)
+        self.scraper = KenyaLawScraper(base_url="https://kenyalaw.test", http_cache=self.cache)
+        self.adapter_patch = patch.object(requests.adapters.HTTPAdapter, 'send', side_effect=self.server.send)
+        self.adapter_patch.start()
+
+    def tearDown(self):
+        self.adapter_patch.stop()
+
+    def test_case_details_single_fetch(self):
+        """Test that get_case_details downloads the page once for both parsers"""
+        case = self.scraper.get_case_details("https://kenyalaw.test/akn/ke/judgment/kehc/2023/1234")
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.scraper.request_count, 1)
+        self.assertEqual(case['title'], "Republic v Mwangi")
+        self.assertEqual(case['court'], "High Court")
+        self.assertIn("appeal is dismissed", case['full_text'])
+
+    def test_fresh_page_served_from_cache(self):
+        """Test that a fresh page is not requested again"""
+        url = "https://kenyalaw.test/akn/ke/judgment/kehc/2023/1234"
+        first = self.scraper.get_case_details(url)
+        second = self.scraper.get_case_details(url)
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_expired_page_is_revalidated(self):
+        """Test that an expired page is revalidated with its ETag and reused on 304"""
+        self.cache.ttls['listing'] = -1
+        url = "https://kenyalaw.test/judgments/KEHC/"
+        self.scraper._fetch_html(url)
+        html = self.scraper._fetch_html(url)
+
+        self.assertEqual(html, JUDGMENT_HTML)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(self.cache.stats()['revalidated'], 1)
+
+    def test_changed_page_is_downloaded(self):
+        """Test that an expired page the server changed is replaced"""
+        self.cache.ttls['listing'] = -1
+        url = "https://kenyalaw.test/judgments/KEHC/"
+        self.scraper._fetch_html(url)
+        self.server.html, self.server.etag = "<html>new listing</html>", '"v2"'
+
+        self.assertEqual(self.scraper._fetch_html(url), "<html>new listing</html>")
+        self.assertEqual(self.cache.get(url).etag, '"v2"')
+
+    def test_query_parameters_are_part_of_the_key(self):
+        """Test that different search queries are cached separately"""
+        self.scraper._fetch_html("https://kenyalaw.test/search/", params={'q': 'land'}, page_type='search')
+        self.scraper._fetch_html("https://kenyalaw.test/search/", params={'q': 'land'}, page_type='search')
+        self.scraper._fetch_html("https://kenyalaw.test/search/", params={'q': 'tax'}, page_type='search')
+
+        self.assertEqual([request.url for request in self.server.requests],
+                         ["https://kenyalaw.test/search/?q=land", "https://kenyalaw.test/search/?q=tax"])
+
+    def test_page_type_ttls(self):
+        """Test that judgments stay fresh longer than listings"""
+        self.cache.put("https://kenyalaw.test/listing", "a", 'listing')
+        self.cache.put("https://kenyalaw.test/judgment", "b", 'judgment')
+
+        listing = self.cache.get("https://kenyalaw.test/listing")
+        judgment = self.cache.get("https://kenyalaw.test/judgment")
+        self.assertGreater(judgment.expires_at - judgment.fetched_at, listing.expires_at - listing.fetched_at)
+
+    def test_compression_and_lru_eviction(self):
+        """Test that bodies are compressed and the least recently used pages are evicted"""
+        cache = HTTPCache(path=None, max_bytes=3000, size_check_interval=1)
+        page = "<p>The appeal is dismissed with costs.</p>" * 200
+        cache.put("https://kenyalaw.test/0", page + "0", 'judgment')
+        self.assertLess(cache.stats()['stored_bytes'], len(page) / 10)
+
+        for i in range(1, 40):
+            cache.put(f"https://kenyalaw.test/{i}", page + str(i) + "x" * (i * 50), 'judgment')
+            time.sleep(0.001)
+            # Keep the first page in use
+            self.assertIsNotNone(cache.get("https://kenyalaw.test/0"))
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['stored_bytes'], 3000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNone(cache.get("https://kenyalaw.test/1"))
+        self.assertEqual(cache.get("https://kenyalaw.test/0").text, page + "0")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+"""
+Test script for hybrid keyword and semantic search.
+This script tests the BM25 index, reciprocal-rank fusion and the HybridRetriever's fused,
+re-ranked and timed results over rulings and statutes.
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from app import app, db
+from models import Ruling
+from utils.hybrid_search import BM25Index, HybridRetriever, reciprocal_rank_fusion, tokenize
+from utils.llm import MockLLMClient
+from utils.vector_db import VectorDatabase
+
+class TestHybridSearch(unittest.TestCase):
+    """Test case for utils.hybrid_search"""
+
+    def setUp(self):
+        """Add rulings to the database and a vector database in a temporary directory"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.temp_dir = tempfile.mkdtemp()
+        self.vector_db = VectorDatabase(db_path=self.temp_dir, llm_client=MockLLMClient())
+        self.prefix = f"https://kenyalaw.test/hybrid/{time.time_ns()}"
+        self.rulings = [
+            Ruling(case_number="Petition No. 12 of 2019", title="Wanjiku v Zephyrine Holdings",
+                   court="High Court", date_of_ruling=date(2019, 5, 2), citation="[2019] eKLR",
+                   summary="Zephyrine tenancy dispute over unlawful eviction", url=f"{self.prefix}/1"),
+            Ruling(case_number="Civil Appeal 40 of 2021", title="Otieno v Zephyrine Holdings",
+                   court="Court of Appeal", date_of_ruling=date(2021, 7, 9), citation="[2021] KECA 88 (KLR)",
+                   summary="Zephyrine appeal on the quantum of damages for eviction", url=f"{self.prefix}/2"),
+        ]
+        db.session.add_all(self.rulings)
+        db.session.commit()
+        self.retriever = HybridRetriever(vector_db=self.vector_db, rerank='none')
+
+    def tearDown(self):
+        """Remove the rulings and the vector database"""
+        db.session.rollback()
+        Ruling.query.filter(Ruling.url.like(f"{self.prefix}/%")).delete(synchronize_session=False)
+        db.session.commit()
+        self.app_context.pop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_tokenize_keeps_citations_and_case_numbers(self):
+        """Test that citations and case numbers become single terms"""
+        terms = tokenize("Petition No. 12 of 2019, [2019] eKLR and [2023] KEHC 101 (KLR)")
+        self.assertIn("12/2019", terms)
+        self.assertIn("[2019]eklr", terms)
+        self.assertIn("[2023]kehc101", terms)
+        self.assertNotIn("of", terms)
+
+    def test_bm25_ranks_exact_matches_first(self):
+        """Test that the document sharing the rarest terms ranks first"""
+        index = BM25Index()
+        index.add('a', "Judicial review of the eviction order", {})
+        index.add('b', "Judicial review of the tax assessment", {})
+        index.add('c', "Appeal against conviction", {})
+        self.assertEqual([key for key, _ in index.search("tax review")], ['b', 'a'])
+        self.assertEqual(index.search("unrelated words"), [])
+
+        index.add('b', "Appeal against sentence", {'version': 2})
+        index.remove('c')
+        self.assertEqual(len(index), 2)
+        self.assertEqual([key for key, _ in index.search("tax appeal")], ['b'])
+        self.assertEqual(index.get('b'), {'version': 2})
+        self.assertIsNone(index.get('c'))
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that a key found by both retrievers outranks keys found by one"""
+        fused = reciprocal_rank_fusion({'bm25': ['a', 'b'], 'vector': ['c', 'b']}, k=60)
+        self.assertEqual(fused[0][0], 'b')
+        self.assertAlmostEqual(fused[0][1], 2 / 62)
+        self.assertEqual(fused[0][2], {'bm25': 2, 'vector': 2})
+
+    def test_search_fuses_keyword_and_vector_results(self):
+        """Test that exact citations are found and bulk-indexed rulings are matched to their rows"""
+        self.vector_db.add_cases_bulk([
+            {'id': ruling.id, 'title': ruling.title, 'citation': ruling.citation, 'court': ruling.court,
+             'url': ruling.url, 'summary': ruling.summary}
+            for ruling in self.rulings
+        ])
+
+        search = self.retriever.search("[2019] eKLR Zephyrine", kinds=('rulings',), limit=5)
+
+        results = [result for result in search['results'] if result['url'].startswith(self.prefix)]
+        self.assertEqual(results[0]['id'], self.rulings[0].id)
+        self.assertEqual(set(results[0]['ranks']), {'bm25', 'vector'}, "Both retrievers should find the ruling")
+        self.assertEqual(len({(result['kind'], result['id']) for result in search['results']}), len(search['results']))
+        for stage in ('index', 'bm25', 'vector', 'fusion', 'total'):
+            self.assertIn(stage, search['timings'])
+        self.assertEqual(search['errors'], {})
+
+    def test_vector_only_ruling_ids(self):
+        """Test that vector hits without a ruling row keep the primary key from their id, or their own id"""
+        self.vector_db.add_cases_bulk([{'id': 999999999, 'title': "Xylocarp v Republic", 'url': f"{self.prefix}/gone"}])
+        self.vector_db.add_case({'id': 'xylocarp-case', 'title': "Xylocarp Holdings v Kamau",
+                                 'url': f"{self.prefix}/web"})
+
+        results = self.retriever.search("Xylocarp", kinds=('rulings',))['results']
+
+        ids = {result['url']: result['id'] for result in results}
+        self.assertEqual(ids[f"{self.prefix}/gone"], 999999999)
+        self.assertEqual(ids[f"{self.prefix}/web"], 'xylocarp-case')
+
+    def test_index_follows_database_changes(self):
+        """Test that a new ruling is searchable without restarting"""
+        self.assertEqual(self.retriever.search("Quixotica", kinds=('rulings',))['results'], [])
+
+        db.session.add(Ruling(case_number="Petition 3 of 2022", title="Quixotica Ltd v Attorney General",
+                              court="High Court", date_of_ruling=date(2022, 1, 1), url=f"{self.prefix}/3"))
+        db.session.commit()
+
+        results = self.retriever.search("Quixotica", kinds=('rulings',))['results']
+        self.assertEqual(results[0]['title'], "Quixotica Ltd v Attorney General")
+
+    def test_filters_apply_to_both_retrievers(self):
+        """Test that filters narrow keyword and vector candidates, and a court filter keeps statutes"""
+        self.vector_db.add_cases_bulk([
+            {'id': ruling.id, 'title': ruling.title, 'citation': ruling.citation, 'court': ruling.court,
+             'date': ruling.date_of_ruling, 'url': ruling.url, 'summary': ruling.summary}
+            for ruling in self.rulings
+        ])
+        self.vector_db.add_statutes_bulk([{'id': 1, 'title': "Zephyrine Landlord and Tenant Act", 'chapter': "Cap 301"}])
+
+        search = self.retriever.search("Zephyrine eviction", limit=10, filters={'court': 'Court of Appeal'})
+
+        rulings = [result for result in search['results'] if result['kind'] == 'ruling']
+        self.assertEqual([result['id'] for result in rulings], [self.rulings[1].id])
+        self.assertEqual(set(rulings[0]['ranks']), {'bm25', 'vector'})
+        self.assertIn('statute', {result['kind'] for result in search['results']})
+
+        search = self.retriever.search("Zephyrine", kinds=('rulings',), filters={'date_to': '2020-01-01'})
+        self.assertEqual([result['id'] for result in search['results'] if result['url'].startswith(self.prefix)],
+                         [self.rulings[0].id])
+
+    def test_limit_above_candidates_widens_both_retrievers(self):
+        """Test that a search for more results than the candidate count takes as many from the vector search"""
+        retriever = HybridRetriever(vector_db=self.vector_db, candidates=5, rerank='none')
+        with patch.object(self.vector_db, 'search_cases', wraps=self.vector_db.search_cases) as search_cases:
+            retriever.search("Zephyrine", kinds=('rulings',), limit=40)
+        self.assertEqual(search_cases.call_args.args[1], 40)
+
+    def test_index_updates_in_place_and_rebuilds_in_background(self):
+        """Test that changed rulings are added without a rebuild, and deletions are rebuilt off the request"""
+        self.retriever.search("Zephyrine", kinds=('rulings',))
+
+        with patch.object(self.retriever, '_build_index', wraps=self.retriever._build_index) as build:
+            self.rulings[0].title = "Wanjiku v Quillfeather Estates"
+            db.session.commit()
+            results = self.retriever.search("Quillfeather", kinds=('rulings',))['results']
+            self.assertEqual([result['id'] for result in results], [self.rulings[0].id])
+            build.assert_not_called()
+
+            db.session.delete(self.rulings[1])
+            db.session.commit()
+            self.retriever.search("Zephyrine", kinds=('rulings',))
+            for thread in threading.enumerate():
+                if thread.name == 'hybrid-index-rulings':
+                    thread.join(10)
+            build.assert_called_once_with('rulings')
+
+        results = self.retriever.search("Otieno Zephyrine", kinds=('rulings',))['results']
+        self.assertNotIn("Otieno v Zephyrine Holdings", [result['title'] for result in results])
+
+    def test_statutes_and_vector_failure(self):
+        """Test that statutes are searched and keyword results survive a failing vector search"""
+        self.vector_db.add_statutes_bulk([{'id': 1, 'title': "Zephyrine Landlord and Tenant Act", 'chapter': "Cap 301"}])
+
+        with patch.object(self.vector_db, 'embedding_function', side_effect=RuntimeError("embedding service down")):
+            search = self.retriever.search("Zephyrine eviction")
+
+        kinds = {result['kind'] for result in search['results']}
+        self.assertEqual(kinds, {'ruling', 'statute'})
+        self.assertIn('embedding service down', search['errors']['vector'])
+
+    def test_llm_rerank(self):
+        """Test that the LLM's relevance scores re-order the top results"""
+        llm_client = MagicMock()
+        llm_client.generate.return_value = "Scores: [2, 9]"
+        retriever = HybridRetriever(vector_db=self.vector_db, llm_client=llm_client, rerank='llm')
+
+        with patch.object(self.vector_db, 'embedding_function', side_effect=RuntimeError("offline")):
+            search = retriever.search("Zephyrine eviction Wanjiku", kinds=('rulings',), limit=2)
+
+        self.assertEqual([result['title'] for result in search['results']],
+                         ["Otieno v Zephyrine Holdings", "Wanjiku v Zephyrine Holdings"])
+        self.assertEqual(search['results'][0]['rerank_score'], 9.0)
+        self.assertIn('rerank', search['timings'])
+
+class TestRulingsSearchRoute(unittest.TestCase):
+    """Test case for the rulings database search built on the hybrid retriever"""
+
+    def setUp(self):
+        """Add rulings matching a keyword and sign in a user with every permission"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.prefix = f"https://kenyalaw.test/hybrid-route/{time.time_ns()}"
+        self.rulings = [
+            Ruling(case_number=f"Petition {number} of 2020", title=f"Quarrendon v Republic {number}",
+                   court="High Court", date_of_ruling=date(2020, 1, number), url=f"{self.prefix}/{number}")
+            for number in (1, 2, 3)
+        ]
+        db.session.add_all(self.rulings)
+        db.session.commit()
+        self.user = MagicMock(is_authenticated=True)
+        self.user.has_permission.return_value = True
+        app.config['LOGIN_DISABLED'] = True
+
+    def tearDown(self):
+        """Remove the rulings"""
+        app.config['LOGIN_DISABLED'] = False
+        db.session.rollback()
+        Ruling.query.filter(Ruling.url.like(f"{self.prefix}/%")).delete(synchronize_session=False)
+        db.session.commit()
+        self.app_context.pop()
+
+    def search(self, results, **args):
+        """Search the rulings page with the retriever returning the given results"""
+        retriever = MagicMock()
+        retriever.search.return_value = {'results': results, 'timings': {}}
+        with patch('routes.rulings.get_hybrid_retriever', return_value=retriever), \
+                patch('utils.permissions.current_user', self.user), \
+                patch('routes.rulings.render_template', return_value='') as render:
+            response = app.test_client().get('/rulings/search', query_string=dict(query='Quarrendon', **args))
+        self.assertEqual(response.status_code, 200)
+        return [ruling.id for ruling in render.call_args.kwargs['rulings'].items]
+
+    def test_ranked_rulings_come_before_other_keyword_matches(self):
+        """Test that ranked rulings lead, the other matches follow, and ids without a row are skipped"""
+        ids = [ruling.id for ruling in self.rulings]
+        results = [{'kind': 'ruling', 'id': 'ruling-999999'}, {'kind': 'ruling', 'id': ids[0]},
+                   {'kind': 'ruling', 'id': 'a3c2a9b0-uuid'}]
+
+        self.assertEqual(self.search(results), [ids[0], ids[2], ids[1]])
+        self.assertEqual(self.search(results, page=2, per_page=2), [ids[1]],
+                         "Pages past the ranking should list the remaining matches")
+
+    def test_keyword_fallback_without_integer_ids(self):
+        """Test that the keyword search is used when no ranked result has a ruling row"""
+        ids = [ruling.id for ruling in self.rulings]
+        self.assertEqual(self.search([{'kind': 'ruling', 'id': 'a3c2a9b0-uuid'}]), [ids[2], ids[1], ids[0]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,342 @@
+"""
+Test script for the background job queue.
+This script tests queueing, claiming, progress, cancellation, periodic jobs and the ruling import and indexing handlers.
+"""
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import config
+from app import app, db
+from models import Job, JobSchedule, Ruling, User
+from utils.job_queue import (
+    job_handler,
+    enqueue,
+    cancel_job,
+    claim_next_job,
+    requeue_stale_jobs,
+    enqueue_due_jobs,
+    load_handlers,
+    periodic_job,
+    JobWorker
+)
+import utils.job_queue as job_queue
+
+@job_handler('test_echo')
+def echo_handler(context, text, fail=False):
+    """Echo the text back, optionally failing"""
+    context.set_progress(0.5, "Echoing")
+    if fail:
+        raise ValueError("echo failed")
+    return {'text': text}
+
+@job_handler('test_wait_for_cancel')
+def wait_for_cancel_handler(context):
+    """Report progress until the job is cancelled"""
+    for step in range(200):
+        context.set_progress(step / 200, f"Step {step}")
+        context.check_cancelled()
+        time.sleep(0.02)
+    return {'finished': True}
+
+@job_handler('test_charged')
+def charged_handler(context, tokens_charged=0, fail=False):
+    """Stand in for a job the user paid tokens for"""
+    context.check_cancelled()
+    if fail:
+        raise ValueError("charged job failed")
+    return {'tokens_charged': tokens_charged}
+
+# Job types the tests queue; the tests' workers only claim these, so jobs in the
+# configured database are left alone
+TEST_JOB_TYPES = ('test_echo', 'test_wait_for_cancel', 'test_charged')
+
+class TestJobQueue(unittest.TestCase):
+    """Test case for the background job queue"""
+
+    def setUp(self):
+        """Run jobs explicitly rather than on in-process worker threads"""
+        self.in_process_patch = patch.object(config, 'JOB_IN_PROCESS', False)
+        self.in_process_patch.start()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        # Leave jobs from interrupted test runs out of the way
+        Job.query.filter(Job.job_type.like('test\\_%', escape='\\'),
+                         Job.status.in_([Job.QUEUED, Job.RUNNING])).update(
+            {'status': Job.CANCELLED}, synchronize_session=False)
+        db.session.commit()
+        self.worker = JobWorker(app, concurrency=1, poll_interval=0.05, job_types=TEST_JOB_TYPES)
+        self.job_ids = []
+        self.schedule_types = []
+        self.user_ids = []
+
+    def tearDown(self):
+        """Remove the jobs, users and schedules created by the test"""
+        self.worker.stop(timeout=5)
+        db.session.rollback()
+        if self.job_ids:
+            Job.query.filter(Job.id.in_(self.job_ids)).delete(synchronize_session=False)
+            db.session.commit()
+        if self.user_ids:
+            User.query.filter(User.id.in_(self.user_ids)).delete(synchronize_session=False)
+            db.session.commit()
+        if self.schedule_types:
+            JobSchedule.query.filter(JobSchedule.job_type.in_(self.schedule_types)).delete(synchronize_session=False)
+            db.session.commit()
+        self.app_context.pop()
+        self.in_process_patch.stop()
+
+    def enqueue(self, job_type, params):
+        job = enqueue(job_type, params)
+        self.job_ids.append(job.id)
+        return job
+
+    def reload(self, job_id):
+        db.session.expire_all()
+        return db.session.get(Job, job_id)
+
+    def test_enqueue_and_run(self):
+        """Test that a queued job runs and stores its result"""
+        job = self.enqueue('test_echo', {'text': 'hello'})
+        self.assertEqual(job.status, Job.QUEUED)
+
+        self.assertEqual(self.worker.run_pending(), 1)
+
+        job = self.reload(job.id)
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.get_result(), {'text': 'hello'})
+        self.assertEqual(job.progress, 1.0)
+        self.assertIsNotNone(job.started_at)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_records_error(self):
+        """Test that an exception in the handler fails the job with its message"""
+        job = self.enqueue('test_echo', {'text': 'hello', 'fail': True})
+
+        self.worker.run_pending()
+
+        job = self.reload(job.id)
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, "echo failed")
+        self.assertIsNone(job.get_result())
+
+    def test_unknown_job_type(self):
+        """Test that only registered job types can be queued"""
+        with self.assertRaises(ValueError):
+            enqueue('no_such_job', {})
+
+    def test_cancel_queued_job(self):
+        """Test that a cancelled queued job never runs"""
+        job = self.enqueue('test_echo', {'text': 'hello'})
+
+        self.assertTrue(cancel_job(job.id))
+        self.assertEqual(self.worker.run_pending(), 0)
+        self.assertEqual(self.reload(job.id).status, Job.CANCELLED)
+        self.assertFalse(cancel_job(job.id), "Finished jobs can't be cancelled")
+
+    def test_tokens_refunded_when_cancelled_or_failed(self):
+        """Test that a job's tokens are refunded once, whether it is cancelled before it starts or fails"""
+        user = User(username=f"jobrefund{time.time_ns()}", email=f"jobrefund{time.time_ns()}@example.com",
+                    tokens_available=10)
+        user.set_password('testpassword')
+        db.session.add(user)
+        db.session.commit()
+        self.user_ids.append(user.id)
+
+        def tokens():
+            db.session.expire_all()
+            return db.session.get(User, user.id).tokens_available
+
+        # Cancelled while queued: the handler never runs
+        queued = self.enqueue_for(user, 'test_charged', {'tokens_charged': 4})
+        self.assertTrue(cancel_job(queued.id))
+        self.assertFalse(cancel_job(queued.id))
+        self.assertEqual(tokens(), 14)
+
+        # Cancelled after being claimed, before the handler starts
+        claimed = self.enqueue_for(user, 'test_charged', {'tokens_charged': 3})
+        self.assertEqual(claim_next_job('worker', TEST_JOB_TYPES), claimed.id)
+        self.assertTrue(cancel_job(claimed.id))
+        self.assertEqual(job_queue.run_job(claimed.id), Job.CANCELLED)
+        self.assertEqual(tokens(), 17)
+
+        failed = self.enqueue_for(user, 'test_charged', {'tokens_charged': 2, 'fail': True})
+        succeeded = self.enqueue_for(user, 'test_charged', {'tokens_charged': 5})
+        self.worker.run_pending()
+        self.assertEqual(self.reload(failed.id).status, Job.FAILED)
+        self.assertEqual(self.reload(succeeded.id).status, Job.SUCCEEDED)
+        self.assertEqual(tokens(), 19)
+
+    def enqueue_for(self, user, job_type, params):
+        job = enqueue(job_type, params, user_id=user.id)
+        self.job_ids.append(job.id)
+        return job
+
+    def test_cancel_running_job(self):
+        """Test that a running job stops at its next cancellation check"""
+        job = self.enqueue('test_wait_for_cancel', {})
+        self.worker.start()
+
+        deadline = time.monotonic() + 5
+        while self.reload(job.id).status != Job.RUNNING and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertTrue(cancel_job(job.id))
+
+        while not self.reload(job.id).is_finished and time.monotonic() < deadline:
+            time.sleep(0.02)
+        job = self.reload(job.id)
+        self.assertEqual(job.status, Job.CANCELLED)
+        self.assertLess(job.progress, 1.0)
+
+    def test_claim_is_exclusive(self):
+        """Test that concurrent workers never claim the same job twice"""
+        jobs = [self.enqueue('test_echo', {'text': str(i)}) for i in range(5)]
+        claimed = []
+        claimed_lock = threading.Lock()
+
+        def claim():
+            with app.app_context():
+                while True:
+                    job_id = claim_next_job(threading.current_thread().name, TEST_JOB_TYPES)
+                    if job_id is None:
+                        return
+                    with claimed_lock:
+                        claimed.append(job_id)
+
+        threads = [threading.Thread(target=claim) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(claimed), sorted(job.id for job in jobs))
+
+    def test_stale_job_is_requeued(self):
+        """Test that a running job without heartbeats goes back on the queue"""
+        job = self.enqueue('test_echo', {'text': 'hello'})
+        self.assertEqual(claim_next_job('crashed-worker', TEST_JOB_TYPES), job.id)
+
+        requeue_stale_jobs(max_age=3600)
+        self.assertEqual(self.reload(job.id).status, Job.RUNNING)
+        Job.query.filter_by(id=job.id).update({'heartbeat_at': datetime.utcnow() - timedelta(hours=2)},
+                                              synchronize_session=False)
+        db.session.commit()
+        self.assertGreaterEqual(requeue_stale_jobs(max_age=3600), 1)
+        self.assertEqual(self.reload(job.id).status, Job.QUEUED)
+
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(self.reload(job.id).status, Job.SUCCEEDED)
+
+    def clear_schedule(self, job_type):
+        JobSchedule.query.filter_by(job_type=job_type).delete(synchronize_session=False)
+        db.session.commit()
+        self.schedule_types.append(job_type)
+
+    def test_periodic_job_is_enqueued_when_due(self):
+        """Test that a periodic job is queued once per interval and never overlaps itself"""
+        load_handlers()
+        self.clear_schedule('test_echo')
+        with patch.dict(job_queue._periodic_jobs, clear=True):
+            periodic_job('test_echo', 3600, {'text': 'tick'})
+            Job.query.filter_by(job_type='test_echo').update({'created_at': datetime.utcnow() - timedelta(hours=2)},
+                                                             synchronize_session=False)
+            db.session.commit()
+
+            queued = enqueue_due_jobs()
+            self.job_ids.extend(queued)
+            self.assertEqual(len(queued), 1)
+            self.assertEqual(enqueue_due_jobs(), [], "Not again while the first run is queued")
+
+            self.worker.run_pending()
+            self.assertEqual(enqueue_due_jobs(), [], "Not again within the interval")
+
+            later = datetime.utcnow() + timedelta(hours=2)
+            queued = enqueue_due_jobs(now=later)
+            self.job_ids.extend(queued)
+            self.assertEqual(len(queued), 1)
+            self.assertEqual(self.reload(queued[0]).get_params(), {'text': 'tick'})
+
+            periodic_job('test_echo', 0)
+            self.assertEqual(enqueue_due_jobs(now=later + timedelta(hours=2)), [])
+
+    def test_periodic_run_is_claimed_once(self):
+        """Test that workers checking the schedule at the same moment queue the run once"""
+        load_handlers()
+        self.clear_schedule('test_echo')
+        barrier = threading.Barrier(4)
+        queued = []
+
+        def check_schedule():
+            with app.app_context():
+                barrier.wait()
+                queued.extend(enqueue_due_jobs())
+
+        with patch.dict(job_queue._periodic_jobs, clear=True):
+            periodic_job('test_echo', 3600, {'text': 'tick'})
+            Job.query.filter_by(job_type='test_echo').update({'created_at': datetime.utcnow() - timedelta(hours=2)},
+                                                             synchronize_session=False)
+            db.session.commit()
+            threads = [threading.Thread(target=check_schedule) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.job_ids.extend(queued)
+        self.assertEqual(len(queued), 1)
+        self.assertEqual(JobSchedule.query.filter_by(job_type='test_echo').one().last_job_id, queued[0])
+
+    def test_import_rulings_batch(self):
+        """Test the court batch import handler against a fake scraper"""
+        prefix = f"https://kenyalaw.test/job-import/{time.time_ns()}"
+        scraper = MagicMock()
+        scraper.get_case_law.return_value = [{'link': f"{prefix}/{i}"} for i in range(3)]
+        scraper.stream_case_details.side_effect = lambda url, text_store=None: {
+            'title': f"Case at {url}", 'court': 'High Court', 'date': '12 March 2023', 'judges': []
+        }
+
+        job_id = self.enqueue('import_rulings', {
+            'import_type': 'court_batch', 'court': 'High Court', 'court_code': 'KEHC', 'limit': 3
+        }).id
+        try:
+            # Run the job directly, so jobs queued in the configured database aren't claimed
+            with patch('utils.scraper.KenyaLawScraper', return_value=scraper):
+                job_queue.run_job(job_id)
+
+            job = self.reload(job_id)
+            self.assertEqual(job.status, Job.SUCCEEDED)
+            self.assertEqual(job.get_result()['imported_count'], 3)
+            rulings = Ruling.query.filter(Ruling.url.like(f"{prefix}/%")).all()
+            self.assertEqual(len(rulings), 3)
+            self.assertEqual(rulings[0].date_of_ruling.isoformat(), '2023-03-12')
+        finally:
+            Ruling.query.filter(Ruling.url.like(f"{prefix}/%")).delete(synchronize_session=False)
+            db.session.commit()
+
+    def test_index_rulings(self):
+        """Test that the indexing handler streams every ruling into the case and passage collections in batches"""
+        vector_db = MagicMock()
+        vector_db.add_cases_bulk.side_effect = lambda records, batch_size, progress, total: {
+            'indexed': sum(1 for _ in records), 'total': total, 'batch_size': batch_size
+        }
+        vector_db.index_ruling_passages.side_effect = lambda records, batch_size, progress, total: {
+            'parents': sum(1 for record in records if 'full_text' in record)
+        }
+
+        job_id = self.enqueue('index_rulings', {'batch_size': 2}).id
+        with patch('utils.vector_db.VectorDatabase', return_value=vector_db):
+            job_queue.run_job(job_id)
+
+        job = self.reload(job_id)
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        result = job.get_result()
+        self.assertEqual(result['indexed'], Ruling.query.count())
+        self.assertEqual(result['total'], result['indexed'])
+        self.assertEqual(result['batch_size'], 2)
+        self.assertEqual(result['passages']['parents'], result['indexed'])
+
+if __name__ == "__main__":
+    unittest.main()
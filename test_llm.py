@@ -3,10 +3,17 @@ Test script for the LLM functionality.
 This script tests various LLM clients and their capabilities.
 """
 import os
+import time
+import threading
 import unittest
+import config
 from unittest.mock import patch, MagicMock
+from utils.circuit_breaker import CircuitBreaker, get_circuit_breaker, reset_circuit_breakers
 from utils.llm import (
     get_llm_client,
+    reset_llm_client,
+    LazyLLMClient,
+    FailoverLLMClient,
     MockLLMClient,
     OpenAIClient,
     OllamaClient,
@@ -17,13 +24,78 @@ from utils.llm import (
 class TestLLMClients(unittest.TestCase):
     """Test case for the LLM clients"""
     
+    def setUp(self):
+        """Disable the shared embedding cache so mocked responses are not reused across tests"""
+        self.embedding_cache_patch = patch.object(config, 'EMBEDDING_CACHE_ENABLED', False)
+        self.embedding_cache_patch.start()
+        # Failures recorded by one test must not open circuits for the next
+        reset_circuit_breakers()
+    
+    def tearDown(self):
+        """Restore the embedding cache setting"""
+        self.embedding_cache_patch.stop()
+        reset_circuit_breakers()
+    
     def test_get_llm_client_fallback(self):
         """Test that get_llm_client falls back to MockLLMClient when Ollama is unavailable"""
+        reset_llm_client()
         # Mock the environment without OpenAI API key and simulate Ollama connection failure
         with patch.dict('os.environ', {'OPENAI_API_KEY': ''}):
-            with patch('requests.get', side_effect=Exception("Connection refused")):
+            with patch('requests.Session.get', side_effect=Exception("Connection refused")):
                 client = get_llm_client()
-                self.assertIsInstance(client, MockLLMClient, "Client should be MockLLMClient when Ollama is unavailable")
+                self.assertIs(get_llm_client(), client, "Client should be memoized process-wide")
+                self.assertTrue(client.wait_for_probe(timeout=10), "Background probe should finish")
+                self.assertIsInstance(client.active_client, MockLLMClient, "Client should be MockLLMClient when Ollama is unavailable")
+                self.assertEqual(client.status()["state"], "fallback")
+        reset_llm_client()
+    
+    def test_lazy_llm_client_reprobes_with_backoff(self):
+        """Test that client selection does not block and failed probes are retried on a schedule"""
+        release_probe = threading.Event()
+        healthy_client = MockLLMClient()
+        outcomes = [None, healthy_client]
+        
+        def probe():
+            release_probe.wait(5)
+            return outcomes.pop(0)
+        
+        with patch.object(config, 'LLM_REPROBE_INITIAL_DELAY', 60):
+            client = LazyLLMClient(probe=probe)
+            self.assertEqual(client.status()["state"], "probing", "Creating the client should not wait for the probe")
+            release_probe.set()
+            self.assertTrue(client.wait_for_probe(timeout=5))
+            
+            self.assertIsNot(client.active_client, healthy_client, "Failed probe should fall back to the mock client")
+            self.assertEqual(len(outcomes), 1, "No re-probe before the backoff delay has passed")
+            self.assertGreater(client.status()["next_probe_in"], 50)
+            
+            client._next_probe_at = 0.0
+            client.active_client
+            deadline = time.time() + 5
+            while client.status()["state"] != "healthy" and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertIs(client.active_client, healthy_client, "Successful re-probe should switch backends")
+    
+    def test_lazy_llm_client_reports_starting_backend(self):
+        """Test that requests outlasting the probe wait get an error instead of mock text"""
+        release_probe = threading.Event()
+        healthy_client = MockLLMClient()
+        
+        def probe():
+            release_probe.wait(5)
+            return healthy_client
+        
+        with patch.object(config, 'LLM_PROBE_WAIT_TIMEOUT', 0.05):
+            client = LazyLLMClient(probe=probe)
+            response = client.generate("analyze this case")
+            self.assertTrue(response.startswith("[Error"), "A still-running probe should not be answered by the mock")
+            self.assertEqual(list(client.generate_stream("analyze this case")), [response])
+            with self.assertRaises(RuntimeError):
+                client.get_embedding("land dispute")
+            
+            release_probe.set()
+            self.assertTrue(client.wait_for_probe(timeout=5))
+            self.assertIs(client.active_client, healthy_client)
     
     def test_mock_llm_client_generate(self):
         """Test MockLLMClient generate method"""
@@ -99,7 +171,7 @@ class TestLLMClients(unittest.TestCase):
         self.skipTest("Skipping OpenAI no API key test due to mocking complexities")
         # We'll rely on integration testing with actual keys instead
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_ollama_client(self, mock_post):
         """Test OllamaClient with mocked requests"""
         # Setup mock response for generate
@@ -160,7 +232,181 @@ class TestLLMClients(unittest.TestCase):
             self.assertTrue("Ollama response" in chat_response or "Default response" in chat_response, 
                            f"Should return mocked Ollama response, got: {chat_response}")
     
-    @patch('requests.post')
+    def test_ollama_clients_share_pooled_session(self):
+        """Test that Ollama clients reuse one pooled keep-alive session"""
+        from utils.http_session import get_http_session
+
+        client1 = OllamaClient()
+        client2 = OllamaClient(model="other-model")
+        counter_client = CounterCheckLLMClient(primary_model="model1", secondary_model="model2")
+
+        session = get_http_session()
+        self.assertIs(client1.session, session, "Clients should use the shared session")
+        self.assertIs(client2.session, session, "Clients should use the shared session")
+        self.assertIs(counter_client.primary_client.session, session, "Counter-check clients should share the session")
+        self.assertIs(counter_client.secondary_client.session, session, "Counter-check clients should share the session")
+
+        adapter = session.get_adapter("http://localhost:11434")
+        self.assertEqual(adapter._pool_maxsize, config.HTTP_POOL_MAXSIZE, "Adapter should use the configured pool size")
+        self.assertEqual(adapter.max_retries.connect, config.HTTP_MAX_RETRIES, "Adapter should retry connection errors")
+        self.assertEqual(adapter.max_retries.read, 0, "Adapter should not resend requests after a read error")
+
+    @patch('requests.Session.post')
+    def test_ollama_endpoint_discovery_cache(self, mock_post):
+        """Test that OllamaClient remembers the endpoint that worked and re-probes on 404"""
+        import requests
+        from utils.llm import clear_endpoint_cache
+
+        supported = {'/api/generate'}
+
+        def side_effect(url, **kwargs):
+            response = MagicMock()
+            if any(url.endswith(path) for path in supported):
+                response.raise_for_status = MagicMock()
+                response.json.return_value = {"response": "Legacy response",
+                                              "choices": [{"text": "Completion response"}]}
+            else:
+                error_response = MagicMock(status_code=404)
+                response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+                    "404 Not Found", response=error_response)
+            return response
+
+        mock_post.side_effect = side_effect
+        base_url = "http://discovery-test:11434"
+        clear_endpoint_cache(base_url)
+        client = OllamaClient(base_url=base_url, model="llama3")
+
+        # First call probes the OpenAI-compatible endpoints before the legacy one
+        self.assertEqual(client.generate("Test prompt"), "Legacy response")
+        self.assertEqual(mock_post.call_count, 3, "First call should probe until a working endpoint is found")
+        self.assertEqual(client.negotiated_endpoints["llama3|generate"]["url"], f"{base_url}/api/generate")
+
+        # Second call goes straight to the negotiated endpoint
+        mock_post.reset_mock()
+        self.assertEqual(client.generate("Test prompt"), "Legacy response")
+        self.assertEqual(mock_post.call_count, 1, "Cached endpoint should be used without probing")
+
+        # A 404 on the negotiated endpoint forces a new probe
+        mock_post.reset_mock()
+        supported.clear()
+        supported.add('/v1/completions')
+        self.assertEqual(client.generate("Test prompt"), "Completion response")
+        self.assertEqual(client.negotiated_endpoints["llama3|generate"]["url"], f"{base_url}/v1/completions")
+        clear_endpoint_cache(base_url)
+
+    @patch('requests.Session.post')
+    def test_ollama_batch_embeddings(self, mock_post):
+        """Test that OllamaClient.get_embeddings chunks texts into batch requests"""
+        from utils.llm import clear_endpoint_cache
+
+        def side_effect(url, json=None, **kwargs):
+            response = MagicMock()
+            response.raise_for_status = MagicMock()
+            if url.endswith('/api/embed'):
+                response.json.return_value = {
+                    "embeddings": [[float(len(text))] * 4 for text in json["input"]]
+                }
+            else:
+                response.raise_for_status.side_effect = Exception("Unexpected endpoint")
+            return response
+
+        mock_post.side_effect = side_effect
+        base_url = "http://batch-test:11434"
+        clear_endpoint_cache(base_url)
+        client = OllamaClient(base_url=base_url, model="nomic-embed-text")
+
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        embeddings = client.get_embeddings(texts, batch_size=2)
+
+        self.assertEqual(mock_post.call_count, 3, "Five texts in batches of two should take three requests")
+        self.assertEqual([embedding[0] for embedding in embeddings], [1.0, 2.0, 3.0, 4.0, 5.0],
+                         "Embeddings should come back in input order")
+        for call in mock_post.call_args_list:
+            self.assertTrue(call.args[0].endswith('/api/embed'), "Should use the batch endpoint")
+        clear_endpoint_cache(base_url)
+
+    @patch('requests.Session.post')
+    def test_ollama_embeddings_use_cache(self, mock_post):
+        """Test that repeated texts are served from the embedding cache without a network call"""
+        from utils.llm import clear_endpoint_cache
+        from utils.embedding_cache import EmbeddingCache
+
+        def side_effect(url, json=None, **kwargs):
+            response = MagicMock()
+            response.raise_for_status = MagicMock()
+            response.json.return_value = {
+                "embeddings": [[float(len(text))] * 4 for text in json["input"]]
+            }
+            return response
+
+        mock_post.side_effect = side_effect
+        base_url = "http://cache-test:11434"
+        clear_endpoint_cache(base_url)
+        client = OllamaClient(base_url=base_url, model="nomic-embed-text")
+
+        with patch.object(config, 'EMBEDDING_CACHE_ENABLED', True), \
+             patch('utils.embedding_cache._embedding_cache', EmbeddingCache(path=None)):
+            first = client.get_embeddings(["land dispute", "tax appeal"])
+            self.assertEqual(mock_post.call_count, 1, "First lookup should reach the server")
+
+            second = client.get_embeddings(["land  dispute ", "tax appeal", "new query"])
+            self.assertEqual(mock_post.call_count, 2, "Only the uncached text should be requested")
+            self.assertEqual(mock_post.call_args.kwargs["json"]["input"], ["new query"])
+            self.assertEqual(second[:2], first, "Cached embeddings should match the originals")
+            self.assertEqual(client.get_embedding("tax appeal"), first[1])
+            self.assertEqual(mock_post.call_count, 2, "Single lookups should share the cache")
+        clear_endpoint_cache(base_url)
+
+    def test_mock_llm_client_stream(self):
+        """Test that MockLLMClient streams chunks that join to the full response"""
+        client = MockLLMClient()
+        
+        chunks = list(client.generate_stream("analyze this case"))
+        self.assertGreater(len(chunks), 1, "Response should arrive in several chunks")
+        self.assertEqual("".join(chunks), client.generate("analyze this case"))
+        
+        messages = [{"role": "user", "content": "draft a legal document"}]
+        self.assertEqual("".join(client.chat_stream(messages)), client.chat(messages))
+
+    @patch('requests.Session.post')
+    def test_ollama_generate_stream(self, mock_post):
+        """Test that OllamaClient.generate_stream yields tokens from the streaming endpoint"""
+        from utils.llm import clear_endpoint_cache
+
+        def side_effect(url, json=None, stream=False, **kwargs):
+            response = MagicMock()
+            response.raise_for_status = MagicMock()
+            if url.endswith('/api/generate') and stream:
+                response.iter_lines.return_value = iter([
+                    '{"response": "The ", "done": false}',
+                    '',
+                    '{"response": "court ", "done": false}',
+                    '{"response": "held.", "done": false}',
+                    '{"response": "", "done": true}'
+                ])
+            else:
+                response.raise_for_status.side_effect = Exception("Unexpected endpoint")
+            return response
+
+        mock_post.side_effect = side_effect
+        base_url = "http://stream-test:11434"
+        clear_endpoint_cache(base_url)
+        client = OllamaClient(base_url=base_url)
+
+        chunks = list(client.generate_stream("Test prompt"))
+        self.assertEqual(chunks, ["The ", "court ", "held."])
+        self.assertTrue(mock_post.call_args.kwargs["json"]["stream"], "Request should ask for a stream")
+        self.assertEqual(client.negotiated_endpoints["llama3:latest|generate_stream"]["url"], f"{base_url}/api/generate")
+
+        # When nothing can stream, a single error message is yielded
+        mock_post.side_effect = ConnectionError("Connection refused")
+        clear_endpoint_cache(base_url)
+        chunks = list(client.generate_stream("Test prompt"))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith("Error generating"))
+        clear_endpoint_cache(base_url)
+
+    @patch('requests.Session.post')
     def test_ollama_client_error_handling(self, mock_post):
         """Test OllamaClient error handling with failed requests"""
         # Setup mock to raise an exception when called
@@ -224,6 +470,52 @@ class TestLLMClients(unittest.TestCase):
         )
         self.assertIn("FORCE MAJEURE", clause, "Clause should include the expected heading")
 
+    def test_legal_assistant_map_reduce_long_case(self):
+        """Test that a case too long for one prompt is analyzed chunk by chunk within the budget"""
+        mock_client = MockLLMClient()
+        assistant = LegalAssistant(llm_client=mock_client)
+        prompts = []
+        lock = threading.Lock()
+        
+        def fake_generate(prompt, temperature=0.7, max_tokens=1000):
+            with lock:
+                prompts.append(prompt)
+            return "Citation\nCivil Appeal No. 1 of 2023\nCourt\nCourt of Appeal\nJudges\nJudge A"
+        
+        paragraphs = [f"{number}. The appellant contends that the learned judge erred in law on ground {number} "
+                      f"when assessing the evidence of the surveyor and the title documents." for number in range(1, 121)]
+        case_text = "JUDGMENT\n\n" + "\n\n".join(paragraphs[:60]) + "\n\nANALYSIS AND DETERMINATION\n\n" + \
+                    "\n\n".join(paragraphs[60:]) + "\n\nThe appeal is allowed with costs."
+        
+        with patch.object(config, 'LLM_CONTEXT_TOKENS', 1000), \
+             patch.object(config, 'LLM_CHUNK_TOKENS', 400), \
+             patch.object(config, 'LLM_MAP_MAX_TOKENS', 100), \
+             patch.object(mock_client, 'generate', side_effect=fake_generate):
+            plan = assistant.plan_case_analysis(case_text)
+            analysis = assistant.analyze_case(case_text)
+            
+            usage = analysis['token_usage']
+            self.assertGreater(usage['chunks_total'], 3, "Long case should be chunked")
+            self.assertEqual(usage['chunks_analyzed'], usage['chunks_total'])
+            self.assertEqual(usage['chunks_total'], plan['chunks'], "Plan should match the analysis")
+            self.assertEqual(len(prompts), usage['chunks_total'] + 1, "One call per chunk plus the merge")
+            self.assertIn("partial analyses", prompts[-1], "Last call should merge the chunk analyses")
+            self.assertIn("Civil Appeal No. 1 of 2023", analysis['citation'])
+            
+            # A budget for only a few chunks keeps the opening and the closing of the judgment
+            prompts.clear()
+            budget = plan['estimated_tokens'] // 3
+            limited = assistant.analyze_case(case_text, token_budget=budget)
+        
+        limited_usage = limited['token_usage']
+        self.assertLess(limited_usage['chunks_analyzed'], limited_usage['chunks_total'])
+        self.assertGreater(limited_usage['chunks_analyzed'], 0)
+        self.assertLessEqual(limited_usage['estimated_tokens'], budget)
+        map_prompts = prompts[:-1]
+        self.assertTrue(any("ground 1 " in prompt for prompt in map_prompts), "First chunk should be analyzed")
+        self.assertTrue(any("allowed with costs" in prompt for prompt in map_prompts), "Last chunk should be analyzed")
+        self.assertIn("token budget", prompts[-1], "Merge prompt should mention skipped excerpts")
+
     def test_extract_section(self):
         """Test the _extract_section method in LegalAssistant"""
         assistant = LegalAssistant(llm_client=MockLLMClient())
@@ -312,6 +604,148 @@ Judges: Judge A, Judge B
         embedding = client.get_embedding("Test text")
         self.assertEqual(embedding, [0.1, 0.2, 0.3], "Should return primary client embedding")
 
+    @patch('utils.llm.OllamaClient')
+    def test_counter_check_runs_models_concurrently(self, mock_ollama_client):
+        """Test that CounterCheckLLMClient calls both models in parallel and supports first-good mode"""
+        import time
+        import threading
+
+        mock_primary = MagicMock()
+        mock_secondary = MagicMock()
+        mock_ollama_client.side_effect = [mock_primary, mock_secondary]
+        client = CounterCheckLLMClient(primary_model="model1", secondary_model="model2")
+
+        def slow_response(text, delay):
+            def respond(**kwargs):
+                time.sleep(delay)
+                return text
+            return respond
+
+        mock_primary.generate.side_effect = slow_response("Primary answer about appeals.", 0.3)
+        mock_secondary.generate.side_effect = slow_response("Secondary answer about appeals.", 0.3)
+
+        start = time.monotonic()
+        response = client.generate("Test prompt")
+        elapsed = time.monotonic() - start
+        self.assertIn("Primary answer", response, "Should return primary client response")
+        self.assertIn("Agreement between models:", response, "Should indicate agreement level")
+        self.assertLess(elapsed, 0.55, "Both models should run concurrently")
+
+        # First-good mode returns the primary answer without waiting for the secondary model
+        client.mode = CounterCheckLLMClient.MODE_FIRST_GOOD
+        secondary_done = threading.Event()
+
+        def slow_secondary(**kwargs):
+            time.sleep(0.4)
+            secondary_done.set()
+            return "Secondary answer about appeals."
+
+        mock_primary.generate.side_effect = slow_response("Primary answer about appeals.", 0.05)
+        mock_secondary.generate.side_effect = slow_secondary
+
+        start = time.monotonic()
+        response = client.generate("Another prompt")
+        elapsed = time.monotonic() - start
+        self.assertEqual(response, "Primary answer about appeals.", "Should return the primary answer as-is")
+        self.assertLess(elapsed, 0.3, "Should not wait for the secondary model")
+        self.assertEqual(client.get_agreement("Another prompt")["status"], "pending")
+
+        secondary_done.wait(2)
+        time.sleep(0.05)
+        agreement = client.get_agreement("Another prompt")
+        self.assertEqual(agreement["status"], "complete", "Agreement should be computed in the background")
+        self.assertGreater(agreement["score"], 0.0)
+
+        # A failed primary falls back to the secondary answer
+        mock_primary.generate.side_effect = None
+        mock_primary.generate.return_value = "Error generating response with OLLAMA - all endpoints failed"
+        mock_secondary.generate.side_effect = None
+        mock_secondary.generate.return_value = "Secondary answer about appeals."
+        response = client.generate("Third prompt")
+        self.assertIn("Secondary answer", response, "Should fall back to the secondary model")
+
+    @patch('utils.llm.OllamaClient')
+    def test_counter_check_stream(self, mock_ollama_client):
+        """Test that the counter-check client streams the primary model and scores agreement afterwards"""
+        mock_primary = MagicMock()
+        mock_primary.model = "primary"
+        mock_primary.generate_stream.return_value = iter(["The court ", "dismissed the appeal"])
+        mock_secondary = MagicMock()
+        mock_secondary.model = "secondary"
+        mock_secondary.generate.return_value = "The court dismissed the appeal"
+        mock_ollama_client.side_effect = [mock_primary, mock_secondary]
+
+        client = CounterCheckLLMClient(primary_model="primary", secondary_model="secondary")
+        chunks = list(client.generate_stream("Test prompt"))
+
+        self.assertEqual(chunks, ["The court ", "dismissed the appeal"])
+        deadline = time.time() + 5
+        while client.get_agreement("Test prompt")["status"] == "pending" and time.time() < deadline:
+            time.sleep(0.01)
+        mock_secondary.generate.assert_called_once()
+        self.assertEqual(client.get_agreement("Test prompt")["status"], "complete")
+        self.assertEqual(client.get_agreement("Test prompt")["score"], 1.0)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        """Test that a breaker opens after repeated failures and closes after a good trial call"""
+        breaker = CircuitBreaker("test-backend", failure_threshold=3, recovery_timeout=60)
+        for latency in (0.1, 0.2):
+            breaker.record_failure(latency)
+        self.assertTrue(breaker.allow_request(), "Circuit should stay closed below the threshold")
+        breaker.record_failure(0.3)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request(), "Open circuit should reject calls")
+        
+        breaker._opened_at -= 60
+        self.assertTrue(breaker.allow_request(), "A trial call is allowed after the recovery timeout")
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow_request(), "Only one trial call at a time")
+        breaker.record_success(0.05)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        
+        snapshot = breaker.snapshot()
+        self.assertEqual(snapshot["total_failures"], 3)
+        self.assertEqual(snapshot["latency"]["p50"], 0.1)
+        self.assertEqual(snapshot["latency"]["p99"], 0.3)
+
+    @patch('requests.Session.post')
+    def test_ollama_circuit_fails_fast(self, mock_post):
+        """Test that an open circuit stops OllamaClient from waiting on a dead server"""
+        mock_post.side_effect = ConnectionError("Connection refused")
+        client = OllamaClient(base_url="http://breaker-test:11434", model="breaker-model")
+        
+        for _ in range(config.CIRCUIT_BREAKER_FAILURE_THRESHOLD):
+            client.generate("Test prompt")
+        calls_before = mock_post.call_count
+        
+        response = client.generate("Test prompt")
+        self.assertTrue(response.startswith("Error generating"))
+        self.assertIn("Circuit open", response)
+        self.assertEqual(mock_post.call_count, calls_before, "Open circuit should not send requests")
+        self.assertEqual(get_circuit_breaker("ollama:breaker-model").state, CircuitBreaker.OPEN)
+
+    def test_failover_client_routes_to_healthy_backend(self):
+        """Test that the failover client skips open circuits and falls back to the mock client"""
+        unhealthy = MagicMock()
+        unhealthy.breaker_names = ["backend-a"]
+        unhealthy.generate.return_value = "Error generating response"
+        healthy = MagicMock()
+        healthy.breaker_names = ["backend-b"]
+        healthy.generate.return_value = "Healthy response"
+        client = FailoverLLMClient([unhealthy, healthy])
+        
+        self.assertEqual(client.generate("Test prompt"), "Healthy response", "Failed response should fail over")
+        
+        for _ in range(config.CIRCUIT_BREAKER_FAILURE_THRESHOLD):
+            get_circuit_breaker("backend-a").record_failure(1.0)
+        unhealthy.generate.reset_mock()
+        self.assertEqual(client.ranked_backends(), [healthy])
+        client.generate("Test prompt")
+        unhealthy.generate.assert_not_called()
+        
+        healthy.generate.return_value = "Error generating response"
+        self.assertIn("mock response", client.generate("Test prompt"), "All backends failing should use the mock client")
+
     def test_real_ollama_connection(self):
         """
         Test connection to a real Ollama server if it's running.
@@ -0,0 +1,198 @@
+"""
+Test script for the LegalResearchAssistant pipeline.
+This script tests that independent research stages run concurrently and report their timings,
+and that local rulings and statutes come from the hybrid retriever.
+"""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from app import app
+from utils.llm import MockLLMClient
+from utils.research_assistant import LegalResearchAssistant
+from utils.scraper import KenyaLawScraper
+
+class SlowScraper:
+    """Scraper stand-in whose calls take a fixed time"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def search_cases(self, query):
+        time.sleep(self.delay)
+        return [{'title': f'Case {i}', 'link': f'https://kenyalaw.test/KEHC/{i}'} for i in range(1, 5)]
+
+    def get_case_details(self, url):
+        time.sleep(self.delay)
+        return {'title': url.rsplit('/', 1)[-1], 'url': url, 'full_text': f'Judgment text for {url}'}
+
+    def get_legislation(self):
+        time.sleep(self.delay)
+        return [{'title': f'Act {i}'} for i in range(5)]
+
+class SlowLLMClient(MockLLMClient):
+    """Mock LLM client whose generations take a fixed time"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def generate(self, prompt, model=None, temperature=0.7, max_tokens=1000):
+        time.sleep(self.delay)
+        return super().generate(prompt, model, temperature, max_tokens)
+
+class TestLegalResearchAssistant(unittest.TestCase):
+    """Test case for LegalResearchAssistant.research_legal_issue"""
+
+    def setUp(self):
+        """Build an assistant with slow stand-ins for the scraper, LLM and retriever"""
+        self.delay = 0.2
+        self.app_context = app.app_context()
+        self.app_context.push()
+        self.local_results = [
+            {'kind': 'statute', 'id': 's1', 'title': 'Land Act'},
+            {'kind': 'ruling', 'id': 1, 'title': 'Wanjiku v Kamau'},
+            {'kind': 'ruling', 'id': 2, 'title': 'Otieno v Republic'}
+        ]
+        self.retriever = MagicMock()
+        self.retriever.search.side_effect = lambda query, **kwargs: time.sleep(self.delay) or {'results': self.local_results}
+        self.vector_db = MagicMock()
+        self.vector_db.search_passages.return_value = [{
+            'title': 'Mwangi v Republic', 'citation': '[2023] KEHC 101 (KLR)',
+            'passages': [{'heading': 'ANALYSIS', 'paragraph_start': 4, 'paragraph_end': 6, 'text': 'Adverse possession requires twelve years.'}]
+        }]
+        self.assistant = LegalResearchAssistant(
+            scraper=SlowScraper(self.delay),
+            llm_client=SlowLLMClient(self.delay),
+            vector_db=self.vector_db,
+            retriever=self.retriever
+        )
+
+    def tearDown(self):
+        """Pop the application context"""
+        self.app_context.pop()
+
+    def test_stages_run_concurrently(self):
+        """Test that the research result is complete and independent stages overlap"""
+        started = time.monotonic()
+        results = self.assistant.research_legal_issue("land dispute", court_filters=['KEHC'])
+        elapsed = time.monotonic() - started
+
+        self.assertNotIn('error', results)
+        self.assertEqual([case['title'] for case in results['cases']], ['1', '2', '3'], "Cases should keep search order")
+        self.assertTrue(all('analysis' in case for case in results['cases']))
+        self.assertEqual(len(results['statutes']), 3)
+        self.assertEqual([case['id'] for case in results['vector_cases']], [1, 2])
+        self.assertEqual(results['vector_statutes'], [self.local_results[0]])
+        self.assertEqual(results['passages'][0]['title'], 'Mwangi v Republic')
+        self.assertTrue(results['summary'])
+        self.assertTrue(results['principles'])
+        self.assertTrue(results['recommendations'])
+
+        # Run one after another this would take 14 delays (search, legislation, hybrid search,
+        # 3 x details + analysis, summary, principles, recommendations)
+        self.assertLess(elapsed, self.delay * 8)
+
+        timings = results['timings']
+        for stage in ('search', 'legislation', 'hybrid_search', 'passages', 'guidance',
+                      'case_1_details', 'case_1_analysis', 'cases', 'summary', 'total'):
+            self.assertIn(stage, timings)
+        self.assertAlmostEqual(timings['total'], elapsed, delta=0.1)
+
+        # The court filter is applied inside the indexes rather than to their results
+        self.assertEqual(self.retriever.search.call_args.kwargs['filters'], {'court': ['KEHC']})
+        self.assertEqual(self.vector_db.search_passages.call_args.kwargs['filters'], {'court': ['KEHC']})
+
+    def test_summary_prompt_quotes_passages(self):
+        """Test that the summary prompt cites the best passages with their location"""
+        prompt = self.assistant._summary_prompt("land dispute", [], [], self.vector_db.search_passages.return_value)
+        self.assertIn("[Mwangi v Republic [2023] KEHC 101 (KLR) - ANALYSIS paras 4-6]", prompt)
+        self.assertIn("Adverse possession requires twelve years.", prompt)
+
+    def test_stage_failure_is_reported(self):
+        """Test that a failing stage is reported in the result instead of raising"""
+        self.retriever.search.side_effect = RuntimeError("vector store offline")
+
+        results = self.assistant.research_legal_issue("land dispute")
+
+        self.assertEqual(results['error'], "vector store offline")
+        self.assertIn('total', results['timings'])
+
+    def test_argument_prompts_generated_concurrently(self):
+        """Test that the arguments, evidence and rebuttal prompts overlap on the async client"""
+        started = time.monotonic()
+        results = self.assistant.generate_legal_arguments("adverse possession", "Occupied since 2001",
+                                                          opposing_arguments="Occupation was permissive")
+        elapsed = time.monotonic() - started
+
+        self.assertNotIn('error', results)
+        self.assertTrue(results['arguments'])
+        self.assertTrue(results['evidence'])
+        self.assertTrue(results['rebuttals'])
+        # Search, 5 x case details and legislation are sequential; the three prompts take one delay together
+        self.assertLess(elapsed, self.delay * 9)
+
+class TestFindRelevantPrecedents(unittest.TestCase):
+    """Test case for LegalResearchAssistant.find_relevant_precedents"""
+
+    def setUp(self):
+        """Build an assistant around a scraper that records its calls"""
+        self.scraper = MagicMock()
+        self.scraper.request_count = 0
+        self.count_lock = threading.Lock()
+        self.scraper.search_cases.side_effect = self.search_cases
+        self.scraper.get_case_details.side_effect = self.get_case_details
+        self.retriever = MagicMock()
+        self.retriever.search.return_value = {'results': [{'kind': 'ruling', 'id': 1, 'title': 'Wanjiku v Kamau'}]}
+        self.app_context = app.app_context()
+        self.app_context.push()
+        self.assistant = LegalResearchAssistant(scraper=self.scraper, llm_client=MockLLMClient(),
+                                                vector_db=MagicMock(), retriever=self.retriever)
+
+    def tearDown(self):
+        """Pop the application context"""
+        self.app_context.pop()
+
+    def search_cases(self, query):
+        self.scraper.request_count += 1
+        # Kenya Law URLs carry the court code in lower case
+        return [{'link': f'https://kenyalaw.test/akn/ke/judgment/{court.lower()}/2023/{i}'}
+                for court in ('KEHC', 'KESC', 'KECA', 'KEELC') for i in range(1, 4)]
+
+    def get_case_details(self, url):
+        with self.count_lock:
+            self.scraper.request_count += 1
+        return {'title': url, 'full_text': f'Judgment at {url}'}
+
+    def test_single_search_partitioned_by_court(self):
+        """Test that one search serves every court in the hierarchy"""
+        results = self.assistant.find_relevant_precedents("adverse possession", "High Court")
+
+        self.scraper.search_cases.assert_called_once_with("adverse possession")
+        self.scraper.get_case_law.assert_not_called()
+        self.assertEqual(self.scraper.get_case_details.call_count, 6, "Two cases for each of three courts")
+
+        self.assertEqual([case['title'].split('/')[-3] for case in results['binding_precedents']], ['kesc', 'kesc'])
+        self.assertEqual([case['title'].split('/')[-3] for case in results['persuasive_precedents']],
+                         ['keca', 'keca', 'kehc', 'kehc'])
+        self.assertEqual(results['http_requests'], 7)
+        self.assertEqual(results['vector_results'], self.retriever.search.return_value['results'])
+        self.assertEqual(self.retriever.search.call_args.kwargs['kinds'], ('rulings',))
+        self.assertEqual(self.retriever.search.call_args.kwargs['filters'], {'court': ['KESC', 'KECA', 'KEHC']})
+
+    def test_scraper_counts_http_requests(self):
+        """Test that the scraper's session counts every request it sends"""
+        scraper = KenyaLawScraper(base_url="https://kenyalaw.test")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"<html></html>"
+
+        with patch.object(requests.adapters.HTTPAdapter, 'send', return_value=response):
+            scraper.session.get("https://kenyalaw.test/judgments/KESC/")
+            scraper.session.get("https://kenyalaw.test/judgments/KECA/")
+
+        self.assertEqual(scraper.request_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
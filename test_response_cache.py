@@ -0,0 +1,112 @@
+"""
+Test script for the LLM response cache.
+This script tests TTL and LRU eviction, both backends, and the LegalAssistant integration.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from utils.response_cache import ResponseCache, MemoryResponseBackend, SQLiteResponseBackend
+from utils.llm import FailoverLLMClient, LazyLLMClient, LegalAssistant, MockLLMClient
+
+class TestResponseCache(unittest.TestCase):
+    """Test case for the ResponseCache"""
+    
+    def setUp(self):
+        """Set up a temporary cache file"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "responses.sqlite3")
+    
+    def tearDown(self):
+        """Remove the temporary cache file"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_key_includes_call_parameters(self):
+        """Test that model, temperature and max_tokens are part of the key"""
+        cache = ResponseCache(backend=MemoryResponseBackend(10), ttl=60, max_temperature=0.7)
+        cache.set("llama3", "prompt", 0.2, 1000, "answer")
+        
+        self.assertEqual(cache.get("llama3", "prompt", 0.2, 1000), "answer")
+        self.assertIsNone(cache.get("deepseek", "prompt", 0.2, 1000))
+        self.assertIsNone(cache.get("llama3", "prompt", 0.3, 1000))
+        self.assertIsNone(cache.get("llama3", "prompt", 0.2, 500))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 3)
+    
+    def test_high_temperature_bypasses_cache(self):
+        """Test that calls above the temperature threshold are never cached"""
+        cache = ResponseCache(backend=MemoryResponseBackend(10), ttl=60, max_temperature=0.5)
+        cache.set("llama3", "prompt", 0.9, 1000, "creative answer")
+        
+        self.assertIsNone(cache.get("llama3", "prompt", 0.9, 1000))
+        self.assertEqual(cache.stats()['items'], 0)
+        self.assertEqual(cache.stats()['bypassed'], 1)
+    
+    def test_ttl_and_lru_eviction(self):
+        """Test that entries expire and the least recently used entry is evicted"""
+        for backend in (MemoryResponseBackend(2), SQLiteResponseBackend(self.path, 2)):
+            cache = ResponseCache(backend=backend, ttl=60, max_temperature=1.0)
+            cache.set("m", "first", 0.0, 10, "1")
+            cache.set("m", "second", 0.0, 10, "2")
+            cache.get("m", "first", 0.0, 10)
+            cache.set("m", "third", 0.0, 10, "3")
+            
+            self.assertEqual(cache.get("m", "first", 0.0, 10), "1", f"{backend.name}: recently used entry should stay")
+            self.assertIsNone(cache.get("m", "second", 0.0, 10), f"{backend.name}: LRU entry should be evicted")
+            self.assertEqual(cache.stats()['evictions'], 1)
+            
+            cache.ttl = -1
+            cache.set("m", "stale", 0.0, 10, "old")
+            self.assertIsNone(cache.get("m", "stale", 0.0, 10), f"{backend.name}: expired entry should be dropped")
+    
+    def test_sqlite_backend_shared_between_instances(self):
+        """Test that separate caches on the same SQLite file see each other's entries"""
+        writer = ResponseCache(backend=SQLiteResponseBackend(self.path, 10), ttl=60)
+        reader = ResponseCache(backend=SQLiteResponseBackend(self.path, 10), ttl=60)
+        writer.set("llama3", "summarize ruling", 0.7, 1000, "summary")
+        self.assertEqual(reader.get("llama3", "summarize ruling", 0.7, 1000), "summary")
+    
+    def test_legal_assistant_reuses_cached_analysis(self):
+        """Test that repeated analyses of the same text call the LLM once"""
+        llm_client = MagicMock()
+        llm_client.model = "llama3"
+        llm_client.generate.return_value = "Case summary text"
+        cache = ResponseCache(backend=MemoryResponseBackend(10), ttl=60)
+        assistant = LegalAssistant(llm_client=llm_client, response_cache=cache)
+        
+        self.assertEqual(assistant.generate_case_summary("ruling text"), "Case summary text")
+        self.assertEqual(assistant.generate_case_summary("ruling text"), "Case summary text")
+        self.assertEqual(llm_client.generate.call_count, 1)
+        
+        llm_client.generate.return_value = "Error generating response with OLLAMA"
+        assistant.generate_case_summary("another ruling")
+        assistant.generate_case_summary("another ruling")
+        self.assertEqual(llm_client.generate.call_count, 3, "Error responses should not be cached")
+    
+    def test_legal_assistant_skips_mock_fallback_answers(self):
+        """Test that failover answers are cached under the answering model, and mock fallback answers not at all"""
+        backend = MagicMock()
+        backend.model = "llama3"
+        backend.breaker_names = []
+        backend.generate.return_value = "Error generating response with OLLAMA"
+        fallback = MockLLMClient()
+        cache = ResponseCache(backend=MemoryResponseBackend(10), ttl=60)
+        assistant = LegalAssistant(llm_client=FailoverLLMClient([backend], fallback=fallback), response_cache=cache)
+        
+        self.assertIn("CASE SUMMARY", assistant.generate_case_summary("ruling text"))
+        self.assertEqual(cache.backend.count(), 0, "Mock fallback answers should not be cached")
+        
+        backend.generate.return_value = "Case summary text"
+        self.assertEqual(assistant.generate_case_summary("ruling text"), "Case summary text")
+        self.assertEqual(assistant.generate_case_summary("ruling text"), "Case summary text")
+        self.assertEqual(backend.generate.call_count, 2, "The recovered backend's answer should be cached")
+        
+        lazy_client = LazyLLMClient(probe=lambda: None)
+        self.assertTrue(lazy_client.wait_for_probe(timeout=5))
+        assistant = LegalAssistant(llm_client=lazy_client, response_cache=cache)
+        assistant.generate_case_summary("another ruling")
+        self.assertEqual(cache.backend.count(), 1, "The lazy client's mock fallback answers should not be cached")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Test script for the incremental Kenya Law sync.
+This script tests high-water marks, early stopping, catch-up, retries and the periodic sync job
+against a fake Kenya Law server.
+"""
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import requests
+
+from app import app, db
+from models import Ruling, SyncState
+from utils.crawler import HostThrottle, RulingCrawler
+from utils.http_cache import HTTPCache
+from utils.ruling_sync import RulingSync
+from utils.scraper import KenyaLawScraper
+from utils.text_store import TextStore
+
+class FakeListing:
+    """Serves a paginated, newest-first court listing and its judgments"""
+
+    def __init__(self, token, cases=12, page_size=5):
+        self.token = token
+        self.cases = cases
+        self.page_size = page_size
+        self.broken = set()
+        self.paths = []
+
+    def case_date(self, number):
+        return date(2023, 1, 1) + timedelta(days=number)
+
+    def listing(self, page):
+        numbers = list(range(self.cases - 1, -1, -1))
+        pages = [numbers[i:i + self.page_size] for i in range(0, len(numbers), self.page_size)]
+        # Past the end the last page repeats, like an out-of-range page number on the site
+        rows = "".join(
+            f'<tr><td class="cell-title"><a href="/akn/ke/judgment/test/{self.token}/{number}">'
+            f'Case {number} v Republic ({self.case_date(number).strftime("%d %B %Y")}) (Judgment)</a></td></tr>'
+            for number in pages[min(page, len(pages)) - 1]
+        )
+        return f"<html><body><table>{rows}</table></body></html>"
+
+    def send(self, request, **kwargs):
+        path = request.path_url
+        self.paths.append(path)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        response._content_consumed = True
+        number = path.rsplit('/', 1)[-1]
+        if path.startswith('/judgments/'):
+            response.status_code = 200
+            response._content = self.listing(int(path.rsplit('page=', 1)[-1])).encode('utf-8')
+        elif number in self.broken:
+            response.status_code = 500
+            response._content = b"Server error"
+        else:
+            day = self.case_date(int(number)).strftime("%d %B %Y")
+            response.status_code = 200
+            response._content = (f"<html><body><h1>Case {number} v Republic</h1>"
+                                 f"<div class=\"case-meta\">Court: High Court\nDate: {day}</div>"
+                                 f"<main>JUDGMENT The appeal is dismissed.</main></body></html>").encode('utf-8')
+        return response
+
+    def listing_requests(self):
+        return [path for path in self.paths if path.startswith('/judgments/')]
+
+class TestRulingSync(unittest.TestCase):
+    """Test case for RulingSync"""
+
+    def setUp(self):
+        """Point the sync at a fake listing"""
+        self.token = f"sync{time.time_ns()}"
+        self.court_code = f"T{time.time_ns() % 10 ** 12}"
+        self.server = FakeListing(self.token)
+        self.adapter_patch = patch.object(requests.adapters.HTTPAdapter, 'send', side_effect=self.server.send)
+        self.adapter_patch.start()
+        self.text_dir = tempfile.mkdtemp()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Remove the imported rulings and the sync state"""
+        db.session.rollback()
+        Ruling.query.filter(Ruling.url.like(f"%/{self.token}/%")).delete(synchronize_session=False)
+        SyncState.query.filter_by(court_code=self.court_code).delete()
+        db.session.commit()
+        self.app_context.pop()
+        self.adapter_patch.stop()
+        shutil.rmtree(self.text_dir, ignore_errors=True)
+
+    def sync(self, max_new=100):
+        """Run one sync with a fresh scraper, as a later scheduled run would"""
+        scraper = KenyaLawScraper(base_url="https://kenyalaw.test", http_cache=HTTPCache(path=None))
+        crawler = RulingCrawler(scraper=scraper, max_workers=4, respect_robots=False, checkpoint_dir='',
+                                throttle=HostThrottle(requests_per_second=1000, max_in_flight=4),
+                                text_store=TextStore(self.text_dir))
+        self.server.paths.clear()
+        return RulingSync(crawler=crawler, max_new=max_new).sync_court(self.court_code, 'High Court')
+
+    def imported_numbers(self):
+        rulings = Ruling.query.filter(Ruling.url.like(f"%/{self.token}/%")).all()
+        return sorted(int(ruling.url.rsplit('/', 1)[-1]) for ruling in rulings)
+
+    def state(self):
+        db.session.expire_all()
+        return SyncState.query.filter_by(court_code=self.court_code).first()
+
+    def test_first_sync_sets_high_water_mark(self):
+        """Test that the first sync imports the listing and records the newest judgment"""
+        report = self.sync()
+
+        self.assertEqual(report['imported_count'], 12)
+        self.assertEqual(self.imported_numbers(), list(range(12)))
+        state = self.state()
+        self.assertEqual(state.last_seen_url, f"https://kenyalaw.test/akn/ke/judgment/test/{self.token}/11")
+        self.assertEqual(state.last_seen_date, self.server.case_date(11))
+        self.assertEqual(state.last_status, 'succeeded')
+        self.assertEqual(state.total_imported, 12)
+
+    def test_later_sync_stops_at_known_content(self):
+        """Test that a later sync reads only the pages with new judgments"""
+        self.sync()
+        self.server.cases = 14
+
+        report = self.sync()
+
+        self.assertEqual(report['new'], 2)
+        self.assertEqual(report['imported_count'], 2)
+        self.assertTrue(report['reached_known'])
+        self.assertEqual(len(self.server.listing_requests()), 1, "Only the first listing page is read")
+        self.assertEqual(self.imported_numbers(), list(range(14)))
+
+        report = self.sync()
+        self.assertEqual(report['imported_count'], 0)
+        self.assertEqual([path for path in self.server.paths if '/akn/' in path], [])
+
+    def test_existing_rulings_stop_the_walk(self):
+        """Test that a court without a mark stops at a page of already imported rulings"""
+        self.sync()
+        SyncState.query.filter_by(court_code=self.court_code).delete()
+        db.session.commit()
+
+        report = self.sync()
+
+        self.assertEqual(report['imported_count'], 0)
+        self.assertTrue(report['reached_known'])
+        self.assertEqual(len(self.server.listing_requests()), 1)
+        self.assertIsNotNone(self.state().last_seen_url)
+
+    def test_backlog_is_caught_up_oldest_first(self):
+        """Test that a backlog larger than max_new is imported over several syncs without gaps"""
+        self.sync()
+        self.server.cases = 20
+
+        report = self.sync(max_new=3)
+        self.assertFalse(report['caught_up'])
+        self.assertEqual(self.imported_numbers(), list(range(15)))
+        self.assertEqual(self.state().last_seen_date, self.server.case_date(14))
+
+        self.sync(max_new=3)
+        report = self.sync(max_new=3)
+        self.assertTrue(report['caught_up'])
+        self.assertEqual(self.imported_numbers(), list(range(20)))
+
+    def test_failed_judgments_are_retried(self):
+        """Test that a judgment that failed to import is retried by the next sync"""
+        self.server.broken.add('7')
+        report = self.sync()
+        self.assertEqual(report['imported_count'], 11)
+        self.assertEqual(len(self.state().get_retry_urls()), 1)
+
+        self.server.broken.clear()
+        report = self.sync()
+        self.assertEqual(report['retried'], 1)
+        self.assertEqual(report['imported_count'], 1)
+        self.assertEqual(self.state().get_retry_urls(), [])
+        self.assertEqual(self.imported_numbers(), list(range(12)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Test script for the offline scraper benchmark.
+This script replays the pages saved in data_extracted/ through the local stand-in for Kenya Law
+and fails if the scraper extracts fewer results, or parses much slower, than the recorded baseline.
+"""
+import os
+import unittest
+
+from benchmark_scraper import (FIXTURE_DIR, FixtureServer, check_regressions, load_baseline, make_scraper,
+                               run_benchmark)
+
+@unittest.skipUnless(os.path.exists(os.path.join(FIXTURE_DIR, 'supreme_court.html')), "No saved pages in data_extracted/")
+class TestScraperBenchmark(unittest.TestCase):
+    """Test case for benchmark_scraper"""
+
+    def test_scraper_fetches_from_stand_in(self):
+        """Test that the scraper fetches every page from the local server and writes no debug files"""
+        with FixtureServer() as server:
+            scraper = make_scraper(server.base_url)
+            cases = scraper.get_case_law('KESC', limit=1000)
+            legislation = scraper.get_legislation(limit=1000)
+            scraper.search_cases('constitutional rights')
+            scraper.search_cases('constitutional rights')
+
+        self.assertTrue(cases)
+        self.assertTrue(all(case['link'].startswith(server.base_url + '/akn/') for case in cases))
+        self.assertTrue(legislation)
+        self.assertEqual(len(server.requests), 4, "The cache never answers without fetching")
+        self.assertIsNone(scraper.debug_dir)
+
+    def test_check_regressions(self):
+        """Test that fewer results, slower parsing and higher memory are all reported"""
+        baseline = {'case_law': {'count': 50, 'parse_ms': 5.0, 'peak_kib': 40.0}}
+
+        self.assertEqual(check_regressions({'case_law': {'count': 50, 'parse_ms': 9.0, 'peak_kib': 50.0}}, baseline), [])
+        regressions = check_regressions({'case_law': {'count': 49, 'parse_ms': 20.0, 'peak_kib': 80.0}}, baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertEqual(check_regressions({}, baseline), ["case_law: not benchmarked"])
+
+    def test_no_regressions_against_baseline(self):
+        """Test the saved pages against the recorded baseline"""
+        baseline = load_baseline()
+        if baseline is None:
+            self.skipTest("No benchmark baseline recorded")
+
+        results = run_benchmark(iterations=3)
+
+        self.assertEqual({name: result['count'] for name, result in results.items()},
+                         {name: expected['count'] for name, expected in baseline.items()})
+        # Timings on a loaded test machine are noisy; counts and memory are not
+        self.assertEqual(check_regressions(results, baseline, time_tolerance=10.0), [])
+
+if __name__ == "__main__":
+    unittest.main()
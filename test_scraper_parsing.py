@@ -0,0 +1,92 @@
+"""
+Test script for the scraper's HTML parsing.
+This script tests that the lxml fast path and the BeautifulSoup path extract the same cases
+and legislation, including the link fallbacks, without any network access.
+"""
+import os
+import unittest
+
+from utils.http_cache import HTTPCache
+from utils.scraper import KenyaLawScraper
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_extracted')
+
+LISTING_HTML = """
+<html><body><table>
+<tr><td class="cell-title"><a href="/akn/ke/judgment/kesc/2023/1/eng@2023-03-12">Mwangi v Republic (Petition 3 of 2022) (12 March 2023) (Judgment)</a></td></tr>
+<tr><td class="cell-title"><a href="">Empty link</a></td></tr>
+<tr><td class="cell-title"><a href="akn/ke/judgment/kesc/2023/2">Otieno v Attorney General (Reference 1 of 2023) (1 June 2023) (Advisory Opinion)</a></td></tr>
+</table></body></html>
+"""
+
+FALLBACK_HTML = """
+<html><body>
+<nav><a href="/judgments/">Judgments</a></nav>
+<div><a href="https://new.kenyalaw.org/akn/ke/judgment/keca/2021/7">Judgment of 4 May 2021 in Civil Appeal No. 7 of 2021</a></div>
+<p><a href="/reports/12">[2019] eKLR 45</a></p>
+<ul><li><a href="/akn/ke/act/2010/constitution">The Constitution of Kenya, 2010</a></li><li><a href="/x">Act</a></li></ul>
+</body></html>
+"""
+
+class TestScraperParsing(unittest.TestCase):
+    """Test case for the KenyaLawScraper parse_* methods"""
+
+    def setUp(self):
+        """Create a scraper for each parsing path"""
+        self.fast = KenyaLawScraper(base_url="https://new.kenyalaw.org", http_cache=HTTPCache(path=None))
+        self.slow = KenyaLawScraper(base_url="https://new.kenyalaw.org", http_cache=HTTPCache(path=None),
+                                    html_parser='html.parser')
+
+    def test_listing_titles_and_metadata(self):
+        """Test that title-cell links are normalized and their title annotations extracted"""
+        cases = self.fast.parse_case_law(LISTING_HTML)
+
+        self.assertEqual(cases, self.slow.parse_case_law(LISTING_HTML))
+        self.assertEqual(len(cases), 2)
+        self.assertEqual(cases[0]['link'], "https://new.kenyalaw.org/akn/ke/judgment/kesc/2023/1/eng@2023-03-12")
+        self.assertEqual(cases[0]['metadata'], {'Date': '12 March 2023', 'Type': 'Judgment',
+                                                'Case Number': 'Petition 3 of 2022'})
+        self.assertEqual(cases[1]['link'], "https://new.kenyalaw.org/akn/ke/judgment/kesc/2023/2")
+        self.assertEqual(self.fast.parse_case_law(LISTING_HTML, limit=1), cases[:1])
+
+    def test_link_fallbacks(self):
+        """Test the judgment-URL, KLR and legislation fallbacks on a page without title cells"""
+        for scraper in (self.fast, self.slow):
+            cases = scraper.parse_case_law(FALLBACK_HTML)
+            self.assertEqual([case['link'] for case in cases], ["https://new.kenyalaw.org/akn/ke/judgment/keca/2021/7"])
+            self.assertEqual(cases[0]['metadata'], {'Date': '4 May 2021', 'Case Number': 'Civil Appeal No. 7 of 2021'})
+
+            klr_page = FALLBACK_HTML.replace('/judgment/', '/decision/')
+            self.assertEqual([case['title'] for case in scraper.parse_case_law(klr_page)], ["[2019] eKLR 45"])
+
+            legislation = scraper.parse_legislation(FALLBACK_HTML)
+            self.assertEqual([item['title'] for item in legislation], ["The Constitution of Kenya, 2010"])
+
+    def test_unparseable_page(self):
+        """Test that a page lxml rejects falls back to BeautifulSoup instead of failing"""
+        self.assertEqual(self.fast.parse_case_law(""), [])
+        self.assertEqual(self.fast.parse_legislation(""), [])
+
+    @unittest.skipUnless(os.path.isdir(DATA_DIR), "No saved pages in data_extracted/")
+    def test_saved_pages_parse_identically(self):
+        """Test that both parsing paths agree on the pages saved from Kenya Law"""
+        with open(os.path.join(DATA_DIR, 'supreme_court.html'), encoding='utf-8') as f:
+            court_page = f.read()
+        with open(os.path.join(DATA_DIR, 'legislation.html'), encoding='utf-8') as f:
+            legislation_page = f.read()
+
+        cases = self.fast.parse_case_law(court_page, limit=100)
+        self.assertGreater(len(cases), 0)
+        self.assertEqual(cases, self.slow.parse_case_law(court_page, limit=100))
+
+        legislation = self.fast.parse_legislation(legislation_page, limit=500)
+        self.assertGreater(len(legislation), 0)
+        self.assertEqual(legislation, self.slow.parse_legislation(legislation_page, limit=500))
+
+        # Without the title cells both paths fall back to the same links
+        stripped = legislation_page.replace('cell-title', 'cell')
+        self.assertEqual(self.fast.parse_legislation(stripped, limit=500),
+                         self.slow.parse_legislation(stripped, limit=500))
+
+if __name__ == "__main__":
+    unittest.main()
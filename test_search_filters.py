@@ -0,0 +1,69 @@
+"""
+Test script for search filter normalization.
+This script tests that courts and dates are normalized the same way at index and query time,
+and that filters become Chroma where clauses that the in-memory matcher agrees with.
+"""
+import unittest
+from datetime import date, datetime
+
+from utils.search_filters import build_where, court_code_for, date_to_int, index_metadata, matches
+
+class TestSearchFilters(unittest.TestCase):
+    """Test case for utils.search_filters"""
+
+    def test_court_code_for(self):
+        """Test that court names, codes, Kenya Law URLs and citations give the same code"""
+        self.assertEqual(court_code_for("High Court"), 'KEHC')
+        self.assertEqual(court_code_for("kehc"), 'KEHC')
+        self.assertEqual(court_code_for("Magistrates Court"), 'KEMC')
+        self.assertEqual(court_code_for("Environment and Land Court at Nakuru"), 'KEELC')
+        self.assertEqual(court_code_for(url="https://new.kenyalaw.org/akn/ke/judgment/kehc/2023/101/eng@2023-03-12"), 'KEHC')
+        self.assertEqual(court_code_for(citation="[2021] KECA 88 (KLR)"), 'KECA')
+        self.assertEqual(court_code_for("Tribunal", url="https://kenyalaw.test/akn/ke/judgment/kehcx/1"), '')
+
+    def test_date_to_int(self):
+        """Test that dates in every stored form become YYYYMMDD integers"""
+        self.assertEqual(date_to_int(date(2023, 3, 12)), 20230312)
+        self.assertEqual(date_to_int(datetime(2023, 3, 12, 10, 30)), 20230312)
+        self.assertEqual(date_to_int('2023-03-12T10:30:00'), 20230312)
+        self.assertEqual(date_to_int('12 March 2023'), 20230312)
+        self.assertEqual(date_to_int(20230312), 20230312)
+        self.assertIsNone(date_to_int('last year'))
+        self.assertIsNone(date_to_int(None))
+
+    def test_index_metadata(self):
+        """Test that only the fields a record has are stored"""
+        self.assertEqual(
+            index_metadata({'court': 'Supreme Court', 'date': '2023-05-15', 'category': ' constitutional',
+                            'is_landmark': 1}),
+            {'court_code': 'KESC', 'date_int': 20230515, 'category': 'Constitutional', 'is_landmark': True}
+        )
+        self.assertEqual(index_metadata({'created_at': '2023-06-20', 'organization_id': '4'}, date_key='created_at'),
+                         {'date_int': 20230620, 'organization_id': 4})
+
+    def test_build_where(self):
+        """Test the where clauses built from filters"""
+        self.assertIsNone(build_where({}))
+        self.assertIsNone(build_where({'court': '', 'category': None}, parent_kind=None))
+        self.assertEqual(build_where({'court': 'High Court'}), {'court_code': 'KEHC'})
+        self.assertEqual(
+            build_where({'court': ['KESC', 'Court of Appeal'], 'date_from': '2020-01-01', 'is_landmark': False},
+                        parent_kind='ruling'),
+            {'$and': [{'parent_kind': 'ruling'}, {'court_code': {'$in': ['KESC', 'KECA']}},
+                      {'date_int': {'$gte': 20200101}}, {'is_landmark': False}]}
+        )
+        for filters in ({'court': 'Tribunal of Nowhere'}, {'date_to': 'soon'}, {'judge': 'Mrima'}):
+            with self.assertRaises(ValueError):
+                build_where(filters)
+
+    def test_matches(self):
+        """Test that the in-memory matcher agrees with the where clauses"""
+        metadata = {'court_code': 'KECA', 'date_int': 20210709, 'category': 'Civil'}
+        self.assertTrue(matches(metadata, None))
+        self.assertTrue(matches(metadata, build_where({'court': ['KECA', 'KESC'], 'date_to': '2021-07-09'})))
+        self.assertFalse(matches(metadata, build_where({'court': 'KEHC'})))
+        self.assertFalse(matches(metadata, build_where({'date_from': '2022-01-01'})))
+        self.assertFalse(matches(metadata, build_where({'is_landmark': True})), "A missing field never matches")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Test script for token estimation and section-aware chunking.
+This script tests that long judgments are split along their headings and paragraphs without losing text,
+and into overlapping passages that remember their paragraph numbers.
+"""
+import unittest
+from utils.text_chunking import estimate_tokens, truncate_to_tokens, split_into_sections, chunk_text, chunk_passages
+
+def build_judgment(paragraphs=60):
+    """Build a synthetic judgment with headings and numbered paragraphs"""
+    lines = ["REPUBLIC OF KENYA", "IN THE HIGH COURT OF KENYA AT NAIROBI", "JUDGMENT", ""]
+    for number in range(1, paragraphs + 1):
+        if number == paragraphs // 2:
+            lines.extend(["ANALYSIS AND DETERMINATION", ""])
+        lines.append(f"{number}. The appellant contends that the trial court erred in law and fact "
+                     f"when it dismissed the claim under section {number} of the Land Act without "
+                     f"considering the evidence of the surveyor and the title documents produced.")
+        lines.append("")
+    lines.extend(["ORDERS", "", "The appeal is allowed with costs."])
+    return "\n".join(lines)
+
+class TestTextChunking(unittest.TestCase):
+    """Test case for the text chunking helpers"""
+    
+    def test_estimate_tokens(self):
+        """Test that token estimates grow with the text and are never zero for real text"""
+        self.assertEqual(estimate_tokens(""), 0)
+        short = estimate_tokens("The appeal is allowed.")
+        self.assertGreater(short, 0)
+        self.assertGreater(estimate_tokens("The appeal is allowed. " * 10), short * 5)
+    
+    def test_truncate_to_tokens(self):
+        """Test that truncation respects the token limit"""
+        text = "The appellant contends that the trial court erred. " * 100
+        truncated = truncate_to_tokens(text, 50)
+        self.assertLessEqual(estimate_tokens(truncated), 50)
+        self.assertTrue(text.startswith(truncated))
+        self.assertEqual(truncate_to_tokens("Short text", 50), "Short text")
+    
+    def test_split_into_sections(self):
+        """Test that sections start at upper-case headings"""
+        sections = split_into_sections(build_judgment(10))
+        headings = [section["heading"] for section in sections]
+        self.assertEqual(headings, ["JUDGMENT", "ANALYSIS AND DETERMINATION", "ORDERS"])
+        self.assertIn("REPUBLIC OF KENYA", sections[0]["text"], "Consecutive headings should stay in the text")
+    
+    def test_chunk_text_respects_limit(self):
+        """Test that chunks fit the limit, keep their headings and lose no paragraphs"""
+        text = build_judgment(60)
+        chunks = chunk_text(text, 400)
+        
+        self.assertGreater(len(chunks), 3, "A long judgment should be split")
+        self.assertEqual([chunk["index"] for chunk in chunks], list(range(len(chunks))))
+        for chunk in chunks:
+            self.assertLessEqual(chunk["tokens"], 400)
+        self.assertEqual(chunks[-1]["heading"], "ANALYSIS AND DETERMINATION")
+        self.assertIn("ORDERS", chunks[-1]["text"], "A short closing section should merge into the last chunk")
+        
+        combined = "\n".join(chunk["text"] for chunk in chunks)
+        for number in range(1, 61):
+            self.assertIn(f"under section {number} of the Land Act", combined)
+        
+        # Chunks break between numbered paragraphs, not inside them
+        for chunk in chunks:
+            self.assertRegex(chunk["text"].lstrip(), r'^(\d+\. |[A-Z]{4})')
+    
+    def test_short_text_is_one_chunk(self):
+        """Test that text within the limit is not split"""
+        chunks = chunk_text("RULING\n\nThe application is dismissed.", 400)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]["heading"], "RULING")
+
+    def test_chunk_passages_overlap_and_paragraphs(self):
+        """Test that passages stay within a section, overlap and record their paragraph numbers"""
+        passages = chunk_passages(build_judgment(), 200, 40)
+        
+        self.assertEqual([passage["index"] for passage in passages], list(range(len(passages))))
+        for passage in passages:
+            self.assertLessEqual(passage["tokens"], 200)
+            self.assertLessEqual(passage["paragraph_start"] or 0, passage["paragraph_end"] or 0)
+        self.assertEqual(passages[0]["heading"], "JUDGMENT")
+        self.assertEqual(passages[0]["paragraph_start"], 1)
+        
+        # Neighbouring passages of a section share text
+        for previous, passage in zip(passages, passages[1:]):
+            if previous["heading"] == passage["heading"]:
+                self.assertLessEqual(passage["paragraph_start"], previous["paragraph_end"])
+                self.assertIn(passage["text"].split("\n\n")[0][-40:], previous["text"])
+        
+        # Passages never span two sections
+        analysis = [passage for passage in passages if passage["heading"] == "ANALYSIS AND DETERMINATION"]
+        self.assertEqual(analysis[0]["paragraph_start"], 30)
+        self.assertNotIn("ANALYSIS AND DETERMINATION", "".join(p["text"] for p in passages if p["heading"] == "JUDGMENT"))
+        
+        combined = "\n".join(passage["text"] for passage in passages)
+        for number in range(1, 61):
+            self.assertIn(f"under section {number} of the Land Act", combined)
+    
+    def test_chunk_passages_without_numbered_paragraphs(self):
+        """Test that unnumbered text gets no paragraph numbers and short text is one passage"""
+        passages = chunk_passages("RULING\n\nThe application is dismissed.", 200, 40)
+        self.assertEqual(len(passages), 1)
+        self.assertIsNone(passages[0]["paragraph_start"])
+        self.assertEqual(chunk_passages("", 200), [])
+
+if __name__ == "__main__":
+    unittest.main()
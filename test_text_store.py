@@ -0,0 +1,179 @@
+"""
+Test script for streaming full-text extraction and the ruling text store.
+This script tests that stream_case_details extracts the same details and text as get_case_details
+while holding far less in memory, and that Ruling.full_text reads stored texts lazily.
+"""
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+import requests
+
+import app  # noqa: F401 - models import the app's db, so the app is created first
+from models import Ruling
+from utils.http_cache import HTTPCache
+from utils.scraper import KenyaLawScraper, RulingTextSink
+from utils.text_store import TextStore
+
+JUDGMENT_HTML = """
+<html><head><title>Mwangi v Republic</title><script>var judgment = "JUDGMENT";</script></head><body>
+<nav><a href="/judgments/">Judgments</a></nav>
+<h1> Mwangi v Republic (Criminal Appeal 12 of 2022) </h1>
+<div class="case-meta">Citation: [2023] KEHC 101 (KLR)
+Court: High Court
+Coram: A. Mrima, J. Ngugi
+Date: 12 March 2023</div>
+<main>
+  <p>REPUBLIC OF KENYA</p><p>IN THE HIGH COURT AT NAIROBI</p>
+  <h2>RULING</h2>
+  <p>1. The applicant seeks bail pending appeal.<style>p { color: red; }</style></p>
+  <p>2. The application is allowed.</p>
+</main>
+<footer>Kenya Law</footer>
+</body></html>
+"""
+
+class FakeJudgments:
+    """Serves judgment pages by path"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        body = self.pages.get(request.path_url)
+        response.status_code = 200 if body is not None else 404
+        response._content = (body or "Not found").encode('utf-8')
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+class ListWriter:
+    """Collects what a sink writes"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+class TestTextStore(unittest.TestCase):
+    """Test case for TextStore, stream_case_details and Ruling.full_text"""
+
+    def setUp(self):
+        """Create a text store in a temporary directory"""
+        self.text_dir = tempfile.mkdtemp()
+        self.store = TextStore(self.text_dir)
+        self.scraper = KenyaLawScraper(base_url="https://kenyalaw.test", http_cache=HTTPCache(path=None))
+
+    def tearDown(self):
+        """Remove the stored texts"""
+        shutil.rmtree(self.text_dir, ignore_errors=True)
+
+    def serve(self, pages):
+        adapter_patch = patch.object(requests.adapters.HTTPAdapter, 'send', side_effect=FakeJudgments(pages).send)
+        adapter_patch.start()
+        self.addCleanup(adapter_patch.stop)
+
+    def test_store_round_trip(self):
+        """Test writing, partial reads, failed writes and deletion"""
+        key = self.store.key_for("https://kenyalaw.test/akn/ke/judgment/kehc/2023/1")
+        self.assertIsNone(self.store.read(key))
+
+        with self.store.writer(key) as writer:
+            writer.write("JUDGMENT ")
+            writer.write("The appeal is dismissed.")
+        self.assertEqual(writer.length, 33)
+        self.assertEqual(self.store.read(key), "JUDGMENT The appeal is dismissed.")
+        self.assertEqual(self.store.read(key, max_chars=8), "JUDGMENT")
+
+        with self.assertRaises(RuntimeError):
+            with self.store.writer(key) as writer:
+                writer.write("Half a judgment")
+                raise RuntimeError("Connection reset")
+        self.assertEqual(self.store.read(key), "JUDGMENT The appeal is dismissed.", "A failed write keeps the old text")
+
+        self.store.delete(key)
+        self.assertFalse(self.store.exists(key))
+
+    def test_sink_matches_get_case_details_cleanup(self):
+        """Test that the sink strips whitespace and the preamble even when the heading is split across chunks"""
+        writer = ListWriter()
+        sink = RulingTextSink(writer)
+        for chunk in ["  \n REPUBLIC OF KENYA JUDG", "MENT\n The appeal", " is dismissed. ", "\n  "]:
+            sink.write(chunk)
+        sink.close()
+        self.assertEqual(''.join(writer.parts), "JUDGMENT\n The appeal is dismissed.")
+
+        writer = ListWriter()
+        sink = RulingTextSink(writer)
+        sink.write(" No heading here ")
+        sink.close()
+        self.assertEqual(''.join(writer.parts), "No heading here")
+
+    def test_stream_case_details_matches_get_case_details(self):
+        """Test that streaming extraction finds the same details and text as get_case_details"""
+        self.serve({'/akn/ke/judgment/kehc/2023/1': JUDGMENT_HTML})
+        url = "https://kenyalaw.test/akn/ke/judgment/kehc/2023/1"
+
+        expected = self.scraper.get_case_details(url)
+        case = self.scraper.stream_case_details(url, self.store)
+
+        for field in ('title', 'citation', 'court', 'judges', 'date', 'parties'):
+            self.assertEqual(case[field], expected[field], field)
+        self.assertEqual(case['judges'], ['A. Mrima', 'J. Ngugi'])
+        self.assertEqual(case['text_key'], self.store.key_for(url))
+        self.assertEqual(self.store.read(case['text_key']), expected['ruling'])
+        self.assertEqual(case['text_length'], len(expected['ruling']))
+        self.assertEqual(expected['ruling'], "JUDGMENT\n1. The applicant seeks bail pending appeal.\n2. The application is allowed.")
+
+    def test_page_without_content_root(self):
+        """Test that a page without main, article or .document-content falls back to its body text"""
+        self.serve({'/akn/ke/judgment/kehc/2023/2': "<html><body><nav>Menu</nav><div>JUDGMENT The appeal is "
+                                                    "dismissed.</div><footer>Kenya Law</footer></body></html>"})
+        case = self.scraper.stream_case_details("https://kenyalaw.test/akn/ke/judgment/kehc/2023/2", self.store)
+        self.assertEqual(self.store.read(case['text_key']), "JUDGMENT The appeal is dismissed.")
+
+        self.assertIsNone(self.scraper.stream_case_details("https://kenyalaw.test/missing", self.store))
+
+    def test_streaming_memory_is_bounded(self):
+        """Test that streaming a long judgment allocates a fraction of what get_case_details does"""
+        paragraphs = "".join(f"<p>{number}. The appeal is dismissed for want of merit.</p>" for number in range(20000))
+        self.serve({'/long': JUDGMENT_HTML.replace("</main>", paragraphs + "</main>")})
+        url = "https://kenyalaw.test/long"
+
+        def traced_peak(extract):
+            tracemalloc.start()
+            case = extract()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return case, peak
+
+        expected, buffered_peak = traced_peak(lambda: self.scraper.get_case_details(url))
+        case, streamed_peak = traced_peak(lambda: self.scraper.stream_case_details(url, self.store))
+
+        self.assertEqual(case['text_length'], len(expected['ruling']))
+        self.assertLess(streamed_peak, buffered_peak / 10)
+
+    def test_ruling_full_text_is_lazy(self):
+        """Test that Ruling.full_text reads imported rulings from the text store"""
+        url = "https://kenyalaw.test/akn/ke/judgment/kehc/2023/3"
+        self.store.write(self.store.key_for(url), "JUDGMENT The appeal is allowed.")
+
+        with patch('models.get_text_store', return_value=self.store):
+            imported = Ruling(title="Imported", url=url, full_text=None)
+            self.assertEqual(imported.full_text, "JUDGMENT The appeal is allowed.")
+            self.assertEqual(imported.read_full_text(8), "JUDGMENT")
+            with imported.open_full_text() as stream:
+                self.assertEqual(stream.read(), "JUDGMENT The appeal is allowed.")
+
+            entered = Ruling(title="Entered by hand", url=url, full_text="Typed text")
+            self.assertEqual(entered.full_text, "Typed text")
+            self.assertEqual(Ruling(title="No text").full_text, '')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ import os
 import json
 import shutil
 import unittest
+from unittest.mock import patch
 import numpy as np
 from utils.vector_db import VectorDatabase
 from utils.llm import MockLLMClient
@@ -153,6 +154,25 @@ class TestVectorDatabase(unittest.TestCase):
         self.assertIn('documents', results, "Results should include documents collection")
         self.assertIn('contracts', results, "Results should include contracts collection")
     
+    def test_search_all_embeds_query_once(self):
+        """Test that search_all embeds the query once and merges the collections by relevance"""
+        self.vector_db.add_case(self.sample_case)
+        self.vector_db.add_statute(self.sample_statute)
+        self.vector_db.add_document(self.sample_document)
+        self.vector_db.add_contract(self.sample_contract)
+        
+        with patch.object(self.mock_llm, 'get_embeddings', wraps=self.mock_llm.get_embeddings) as batch_call:
+            results = self.vector_db.search_all("legal rights")
+        
+        batch_call.assert_called_once_with(["legal rights"])
+        merged = results['merged']
+        self.assertEqual(len(merged), 4, "Merged ranking should include every collection's results")
+        self.assertEqual({result['collection'] for result in merged}, {'cases', 'statutes', 'documents', 'contracts'})
+        relevances = [result['relevance'] for result in merged]
+        self.assertEqual(relevances, sorted(relevances, reverse=True))
+        self.assertTrue(all(0 < relevance <= 1 for relevance in relevances))
+        self.assertEqual(results['cases'][0]['title'], self.sample_case['title'])
+    
     def test_collection_initialization(self):
         """Test that collections are properly initialized"""
         # Verify all collections exist
@@ -185,6 +205,153 @@ class TestVectorDatabase(unittest.TestCase):
         else:
             self.assertEqual(len(embedding), 1, "Should have one embedding")
 
+    def test_embedding_function_uses_batch_api(self):
+        """Test that the embedding function embeds all texts in one batched call"""
+        texts = [f"Ruling summary number {i}" for i in range(5)]
+        
+        with patch.object(self.mock_llm, 'get_embeddings', wraps=self.mock_llm.get_embeddings) as batch_call, \
+             patch.object(self.mock_llm, 'get_embedding', wraps=self.mock_llm.get_embedding) as single_call:
+            embeddings = self.vector_db.embedding_function(texts)
+        
+        batch_call.assert_called_once()
+        self.assertEqual(len(embeddings), 5, "Should return one embedding per text")
+        self.assertTrue(np.allclose(embeddings[2], self.mock_llm.get_embedding(texts[2])), "Embeddings should keep input order")
+        self.assertEqual(single_call.call_count, 5, "Mock batch API embeds each text locally")
+
+    def test_add_cases_bulk(self):
+        """Test that bulk indexing embeds in batches, reports progress and is idempotent"""
+        cases = [dict(self.sample_case, id=i, title=f"Case {i} v. Respondent", date=None) for i in range(1, 8)]
+        cases.append(dict(self.sample_case))  # No primary key
+        progress = []
+        
+        with patch.object(self.mock_llm, 'get_embeddings', wraps=self.mock_llm.get_embeddings) as batch_call:
+            report = self.vector_db.add_cases_bulk(iter(cases), batch_size=3,
+                                                   progress=lambda fraction, message: progress.append(fraction),
+                                                   total=len(cases))
+        
+        self.assertEqual(batch_call.call_count, 3, "Should embed once per batch")
+        self.assertEqual((report['indexed'], report['skipped'], report['errors'], report['batches']), (7, 1, 0, 3))
+        for field in ('embed_seconds', 'write_seconds', 'seconds', 'docs_per_second'):
+            self.assertIn(field, report)
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(progress[-1], 1.0)
+        
+        stored = self.vector_db.case_collection.get(ids=["ruling-3"])
+        self.assertEqual(stored['metadatas'][0]['title'], "Case 3 v. Respondent")
+        self.assertEqual(stored['metadatas'][0]['date'], '')
+        
+        # Indexing the same rows again updates them instead of adding copies
+        cases[2]['title'] = "Renamed v. Respondent"
+        self.vector_db.add_cases_bulk(cases + cases[:2], batch_size=4)
+        self.assertEqual(self.vector_db.case_collection.count(), 7)
+        stored = self.vector_db.case_collection.get(ids=["ruling-3"])
+        self.assertEqual(stored['metadatas'][0]['title'], "Renamed v. Respondent")
+    
+    def test_add_bulk_counts_failed_batches(self):
+        """Test that a batch failing to embed is counted and the others are still indexed"""
+        statutes = [dict(self.sample_statute, id=i) for i in range(4)]
+        real_embed = self.vector_db.embedding_function
+        calls = []
+        
+        def flaky_embed(texts):
+            calls.append(len(texts))
+            if len(calls) == 1:
+                raise RuntimeError("Embedding service unavailable")
+            return real_embed(texts)
+        
+        with patch.object(self.vector_db, 'embedding_function', side_effect=flaky_embed):
+            report = self.vector_db.add_statutes_bulk(statutes, batch_size=2)
+        
+        self.assertEqual((report['indexed'], report['errors']), (2, 2))
+        self.assertEqual(self.vector_db.statute_collection.count(), 2)
+    
+    def test_passage_search_groups_by_document(self):
+        """Test that rulings are indexed as passages and search returns their best passages per ruling"""
+        judgment = "JUDGMENT\n\n" + "\n\n".join(
+            f"{number}. The court considered the doctrine of adverse possession and the twelve year period "
+            f"under the Limitation of Actions Act in relation to parcel number {number}." for number in range(1, 40)
+        )
+        report = self.vector_db.index_ruling_passages([
+            {'id': 7, 'title': 'Mwangi v Kamau', 'citation': '[2020] eKLR', 'full_text': judgment},
+            {'id': 8, 'title': 'Republic v Otieno', 'full_text': "RULING\n\n1. Bail pending trial is granted."}
+        ], batch_size=10)
+        self.assertEqual(report['parents'], 2)
+        self.assertGreater(report['indexed'], 3, "A long judgment should give several passages")
+        
+        results = self.vector_db.search_passages("adverse possession twelve years", n_results=2, per_document=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len({result['id'] for result in results}), 2, "Passages should be grouped per ruling")
+        mwangi = next(result for result in results if result['id'] == 'ruling-7')
+        self.assertEqual(mwangi['citation'], '[2020] eKLR')
+        self.assertEqual(len(mwangi['passages']), 2)
+        self.assertEqual(mwangi['passages'][0]['heading'], 'JUDGMENT')
+        self.assertIsInstance(mwangi['passages'][0]['paragraph_start'], int)
+        
+        # Re-indexing a shorter text replaces the old passages
+        self.vector_db.index_ruling_passages([{'id': 7, 'title': 'Mwangi v Kamau', 'full_text': "JUDGMENT\n\n1. Appeal dismissed."}])
+        self.assertEqual(len(self.vector_db.passage_collection.get(where={'parent_id': 'ruling-7'})['ids']), 1)
+        self.assertEqual(self.vector_db.search_passages("bail", kind='statute'), [])
+    
+    def test_passage_reindex_removes_stale_passages_per_batch(self):
+        """Test that re-indexing deletes stale passages per written batch and keeps them when a batch fails"""
+        def judgment(paragraphs):
+            return "JUDGMENT\n\n" + "\n\n".join(
+                f"{number}. The court considered the doctrine of adverse possession and the twelve year period "
+                f"under the Limitation of Actions Act in relation to parcel number {number}." for number in range(1, paragraphs)
+            )
+        
+        def passage_count(parent_id):
+            return len(self.vector_db.passage_collection.get(where={'parent_id': parent_id})['ids'])
+        
+        rulings = [{'id': i, 'title': f'Ruling {i}', 'full_text': judgment(40)} for i in range(1, 6)]
+        self.vector_db.index_ruling_passages(rulings, batch_size=100)
+        long_count = passage_count('ruling-1')
+        self.assertGreater(long_count, 2)
+        
+        # A failed batch leaves the old passages in place
+        with patch.object(self.vector_db, 'embedding_function', side_effect=RuntimeError("offline")):
+            report = self.vector_db.index_ruling_passages([dict(rulings[0], full_text=judgment(3))])
+        self.assertGreater(report['errors'], 0)
+        self.assertEqual(passage_count('ruling-1'), long_count)
+        
+        shorter = [dict(ruling, full_text=judgment(3)) for ruling in rulings[:4]] + [dict(rulings[4], full_text='')]
+        deletes = []
+        real_delete = self.vector_db.passage_collection.delete
+        with patch.object(self.vector_db.passage_collection, 'delete',
+                          side_effect=lambda **kwargs: deletes.append(kwargs) or real_delete(**kwargs)):
+            report = self.vector_db.index_ruling_passages(shorter, batch_size=100)
+        
+        self.assertEqual(len(deletes), 2, "One delete for the written batch and one for the ruling without text")
+        self.assertEqual([passage_count(f'ruling-{i}') for i in range(1, 6)], [1, 1, 1, 1, 0])
+    
+    def test_search_filters_are_applied_in_the_index(self):
+        """Test that court, date, category and landmark filters narrow results before ranking"""
+        cases = [
+            dict(self.sample_case, id=1, court='Supreme Court', date='2023-05-15', category='constitutional', is_landmark=True),
+            dict(self.sample_case, id=2, court='High Court', date='2019-02-01', category='Constitutional', is_landmark=False),
+            dict(self.sample_case, id=3, court='', url='https://kenyalaw.test/akn/ke/judgment/keca/2021/9',
+                 date='12 March 2021', category='Criminal')
+        ]
+        self.vector_db.add_cases_bulk(cases)
+        
+        stored = self.vector_db.case_collection.get(ids=["ruling-3"])['metadatas'][0]
+        self.assertEqual((stored['court_code'], stored['date_int']), ('KECA', 20210312))
+        
+        def found(**filters):
+            return sorted(result['id'] for result in self.vector_db.search_cases("judicial review", n_results=3, filters=filters))
+        
+        self.assertEqual(found(court='High Court'), ['ruling-2'])
+        self.assertEqual(found(court=['KESC', 'KECA']), ['ruling-1', 'ruling-3'])
+        self.assertEqual(found(date_from='2020-01-01', date_to='2022-12-31'), ['ruling-3'])
+        self.assertEqual(found(category='Constitutional', is_landmark=True), ['ruling-1'])
+        self.assertEqual(found(court='Tribunal of Nowhere'), [], "An unknown court is an error, not an unfiltered search")
+        
+        # A court filter narrows the cases without emptying the statutes, which have no court
+        self.vector_db.add_statute(self.sample_statute)
+        results = self.vector_db.search_all("judicial review", n_results=3, filters={'court': 'KEHC'})
+        self.assertEqual([result['id'] for result in results['cases']], ['ruling-2'])
+        self.assertEqual(len(results['statutes']), 1)
+    
     def test_empty_search_results(self):
         """Test handling of empty search results"""
         # Search with a term unlikely to match anything in the empty database
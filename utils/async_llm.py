@@ -0,0 +1,945 @@
+"""
+Asyncio LLM clients.
+AsyncOllamaClient, AsyncOpenAIClient and AsyncCounterCheckLLMClient mirror the synchronous
+clients in utils/llm.py (same method names and arguments, as coroutines) so independent prompts
+can run concurrently with asyncio.gather instead of holding a worker thread per call.
+SyncLLMClient wraps any async client for code that is not async, such as Flask views.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+import config
+from utils.circuit_breaker import get_circuit_breaker
+from utils.embedding_cache import get_embedding_cache
+from utils.llm import (
+    OPENAI_AVAILABLE,
+    OllamaClient,
+    CounterCheckLLMClient,
+    LazyLLMClient,
+    OpenAIClient,
+    get_llm_client,
+    _calculate_agreement,
+    _is_failed_response
+)
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a legal AI assistant for the Kenyan legal system."
+
+# httpx async clients are bound to the event loop they were first used on,
+# so each loop gets its own pooled client
+_async_http_clients = weakref.WeakKeyDictionary()
+_async_http_clients_lock = threading.Lock()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Get the pooled httpx client for the running event loop, creating it on first use
+
+    Returns:
+        Shared httpx.AsyncClient configured like the synchronous pooled session
+    """
+    loop = asyncio.get_running_loop()
+    with _async_http_clients_lock:
+        client = _async_http_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=config.HTTP_POOL_MAXSIZE,
+                    max_keepalive_connections=config.HTTP_POOL_MAXSIZE
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=config.HTTP_MAX_RETRIES)
+            )
+            _async_http_clients[loop] = client
+            logger.info(f"Created pooled async HTTP client (max connections: {config.HTTP_POOL_MAXSIZE})")
+        return client
+
+
+class _LoopSemaphores:
+    """
+    One asyncio.Semaphore per event loop, limiting a client's requests in flight
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> asyncio.Semaphore:
+        """Get the semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.limit)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+
+async def _cached_embeddings_async(model: str, texts: List[str], compute) -> List[List[float]]:
+    """
+    Return embeddings for texts, awaiting compute only for the ones that are not cached
+
+    Args:
+        model: Embedding model identifier (e.g. 'ollama/nomic-embed-text')
+        texts: Texts to embed
+        compute: Coroutine function taking a list of texts and returning their embeddings in order
+
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return await compute(texts)
+
+    results = cache.get_many(model, texts)
+    missing = [i for i, embedding in enumerate(results) if embedding is None]
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        computed = await compute(missing_texts)
+        for i, embedding in zip(missing, computed):
+            results[i] = embedding
+        cache.put_many(model, missing_texts, computed)
+    return results
+
+
+async def _embed_in_batches_async(texts: List[str], embed_batch, batch_size: Optional[int] = None) -> List[List[float]]:
+    """
+    Split texts into batches and embed them concurrently
+
+    Args:
+        texts: Texts to embed
+        embed_batch: Coroutine function taking a list of texts and returning their embeddings in order
+        batch_size: Maximum number of texts per request (defaults to config.EMBEDDING_BATCH_SIZE)
+
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    batch_size = max(1, batch_size or config.EMBEDDING_BATCH_SIZE)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [embedding for batch_result in results for embedding in batch_result]
+
+
+class AsyncOllamaClient:
+    """
+    Asyncio client for the OLLAMA API
+
+    Uses the same endpoint candidates, negotiated-endpoint cache and circuit breakers as
+    OllamaClient, so sync and async calls share what they learn about the server.
+    """
+
+    def __init__(self, base_url=None, model=None, http_client=None, max_concurrency=None):
+        """
+        Initialize async OLLAMA client
+
+        Args:
+            base_url: Base URL for OLLAMA API
+            model: Default model to use
+            http_client: httpx.AsyncClient to use (defaults to the pooled client of the running loop)
+            max_concurrency: Maximum requests in flight (defaults to config.LLM_ASYNC_MAX_CONCURRENCY)
+        """
+        self.base_url = base_url or config.OLLAMA_BASE_URL
+        self.model = model or config.OLLAMA_PRIMARY_MODEL
+        self.http_client = http_client
+        self._semaphores = _LoopSemaphores(max_concurrency or config.LLM_ASYNC_MAX_CONCURRENCY)
+        # Builds endpoint candidates and reads/writes the shared negotiated-endpoint cache
+        self._endpoints = OllamaClient(base_url=self.base_url, model=self.model)
+        logger.info(f"Initialized async OLLAMA client with base URL: {self.base_url}, model: {self.model}")
+
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding this client's backend"""
+        return [f"ollama:{self.model}"]
+
+    async def _post_with_discovery(self, operation: str, model: str, api_configs: List[Dict[str, Any]], timeout: int):
+        """
+        POST through the model's circuit breaker, failing fast while the circuit is open
+
+        Args:
+            operation: Operation name used as part of the cache key (e.g. 'generate')
+            model: Model the request is for
+            api_configs: Candidate endpoints in order of preference
+            timeout: Request timeout in seconds
+
+        Returns:
+            Tuple of (extracted result or None, list of error messages)
+        """
+        breaker = get_circuit_breaker(f"ollama:{model}")
+        if not breaker.allow_request():
+            logger.warning(f"Circuit for ollama:{model} is open - skipping {operation} request")
+            return None, [f"Circuit open for ollama:{model} after repeated failures"]
+
+        async with self._semaphores.get():
+            started = time.monotonic()
+            result, errors = await self._try_endpoints(operation, model, api_configs, timeout)
+        if result is None:
+            breaker.record_failure(time.monotonic() - started)
+        else:
+            breaker.record_success(time.monotonic() - started)
+        return result, errors
+
+    async def _try_endpoints(self, operation: str, model: str, api_configs: List[Dict[str, Any]], timeout: int):
+        """
+        POST to the first endpoint that works, trying the negotiated endpoint first
+
+        Returns:
+            Tuple of (extracted result or None, list of error messages)
+        """
+        cache_key = (self.base_url, model, operation)
+        cached_shape = self._endpoints._get_cached_shape(cache_key)
+        if cached_shape:
+            api_configs = sorted(api_configs, key=lambda api_config: api_config["shape"] != cached_shape)
+
+        http_client = self.http_client or get_async_http_client()
+        errors = []
+        for api_config in api_configs:
+            try:
+                logger.info(f"Trying Ollama {operation} endpoint: {api_config['url']}")
+                response = await http_client.post(api_config["url"], json=api_config["payload"], timeout=timeout)
+                response.raise_for_status()
+                result = api_config["extract"](response.json())
+                if result is None or (operation.startswith("embed") and not result):
+                    raise ValueError("No data found in response")
+
+                if api_config["shape"] != cached_shape:
+                    self._endpoints._remember_endpoint(cache_key, api_config)
+                return result, errors
+            except Exception as e:
+                error_msg = f"Error with {api_config['url']}: {str(e)}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+
+                # A 404 means the server no longer supports the negotiated endpoint
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                if api_config["shape"] == cached_shape and status_code == 404:
+                    self._endpoints._forget_endpoint(cache_key, api_config)
+                    cached_shape = None
+
+        return None, errors
+
+    async def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate text completion using OLLAMA
+
+        Args:
+            prompt: The prompt to generate a response for
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated text or error message
+        """
+        model = model or self.model
+        api_configs = self._endpoints._generate_api_configs(prompt, model, temperature, max_tokens)
+
+        result, errors = await self._post_with_discovery("generate", model, api_configs, timeout=30)
+        if result is not None:
+            return result
+
+        logger.error("Error generating text with OLLAMA - all endpoints failed")
+        return f"Error generating response with OLLAMA - all endpoints failed: {'; '.join(errors)}"
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate chat completion using OLLAMA
+
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response
+        """
+        model = model or self.model
+        api_configs = self._endpoints._chat_api_configs(messages, model, temperature, max_tokens)
+
+        result, errors = await self._post_with_discovery("chat", model, api_configs, timeout=30)
+        if result is not None:
+            return result
+
+        if config.OLLAMA_VERSION.startswith("0.6"):
+            error_msg = f"Error generating chat response with OLLAMA - all endpoints failed: {'; '.join(errors)}"
+            logger.error(error_msg)
+            return error_msg
+
+        # Older servers without the chat API - fall back to generate
+        logger.warning(f"Error using chat API with OLLAMA, falling back to generate: {'; '.join(errors)}")
+        return await self.generate(self._endpoints._format_chat_messages(messages), model, temperature, max_tokens)
+
+    async def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """
+        Get embedding vector for text using OLLAMA
+
+        Args:
+            text: The text to get embedding for
+            model: Model to use (defaults to configured model)
+
+        Returns:
+            List of float values representing the embedding or fallback embedding
+        """
+        model = model or self.model
+
+        async def fetch(missing):
+            return [await self._fetch_embedding(missing[0], model)]
+
+        return (await _cached_embeddings_async(f"ollama/{model}", [text], fetch))[0]
+
+    async def _fetch_embedding(self, text: str, model: str) -> List[float]:
+        """Request an embedding vector from the OLLAMA server, bypassing the cache"""
+        api_configs = self._endpoints._embedding_api_configs(text, model)
+        embedding, errors = await self._post_with_discovery("embedding", model, api_configs, timeout=10)
+        if embedding:
+            return embedding
+
+        logger.error("All embedding endpoints failed - returning fallback vector")
+        return [0.0] * 384  # Return zero vector as fallback
+
+    async def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Get embedding vectors for several texts using the batch embedding endpoints
+
+        Args:
+            texts: The texts to get embeddings for
+            model: Model to use (defaults to configured model)
+            batch_size: Maximum number of texts per request (defaults to config.EMBEDDING_BATCH_SIZE)
+
+        Returns:
+            List of embeddings in the same order as texts (fallback vectors for failed texts)
+        """
+        model = model or self.model
+
+        async def embed_batch(batch):
+            api_configs = self._endpoints._batch_embedding_api_configs(batch, model)
+            embeddings, errors = await self._post_with_discovery("embed_batch", model, api_configs, timeout=60)
+            if embeddings:
+                return embeddings
+
+            # Server has no batch endpoint - fall back to one request per text
+            logger.warning("Batch embedding endpoints failed - embedding texts one at a time")
+            return list(await asyncio.gather(*(self._fetch_embedding(text, model) for text in batch)))
+
+        return await _cached_embeddings_async(
+            f"ollama/{model}", texts,
+            lambda missing: _embed_in_batches_async(missing, embed_batch, batch_size)
+        )
+
+
+# AsyncOpenAI clients hold an httpx.AsyncClient, so share one per (event loop, API key)
+_async_openai_sdk_clients = weakref.WeakKeyDictionary()
+_async_openai_sdk_clients_lock = threading.Lock()
+
+
+def _get_async_openai_sdk_client(api_key: str):
+    """
+    Get the shared AsyncOpenAI SDK client for the running event loop and API key
+
+    Args:
+        api_key: OpenAI API key
+
+    Returns:
+        AsyncOpenAI SDK client instance
+    """
+    loop = asyncio.get_running_loop()
+    with _async_openai_sdk_clients_lock:
+        clients = _async_openai_sdk_clients.setdefault(loop, {})
+        if api_key not in clients:
+            from openai import AsyncOpenAI
+            clients[api_key] = AsyncOpenAI(api_key=api_key, max_retries=config.HTTP_MAX_RETRIES)
+        return clients[api_key]
+
+
+class AsyncOpenAIClient:
+    """
+    Asyncio client for the OpenAI API
+    """
+
+    def __init__(self, api_key=None, model=None, sdk_client=None, max_concurrency=None):
+        """
+        Initialize async OpenAI client
+
+        Args:
+            api_key: OpenAI API key
+            model: Default model to use
+            sdk_client: AsyncOpenAI client to use (defaults to the shared client of the running loop)
+            max_concurrency: Maximum requests in flight (defaults to config.LLM_ASYNC_MAX_CONCURRENCY)
+        """
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.model = model or "gpt-4o"
+        self.embedding_model = "text-embedding-3-small"
+        self.sdk_client = sdk_client
+        self._semaphores = _LoopSemaphores(max_concurrency or config.LLM_ASYNC_MAX_CONCURRENCY)
+        self.breaker = get_circuit_breaker("openai")
+
+        if not self.api_key and sdk_client is None:
+            logger.warning("No OpenAI API key provided. Set OPENAI_API_KEY environment variable.")
+
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding this client's backend"""
+        return ["openai"]
+
+    def _client(self):
+        """Get the SDK client, or None if no API key is configured"""
+        if self.sdk_client is not None:
+            return self.sdk_client
+        if not self.api_key or not OPENAI_AVAILABLE:
+            return None
+        return _get_async_openai_sdk_client(self.api_key)
+
+    async def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate text completion using OpenAI
+
+        Args:
+            prompt: The prompt to generate a response for
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated text
+        """
+        return await self.chat(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate chat completion using OpenAI
+
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response
+        """
+        client = self._client()
+        if client is None:
+            logger.error("OpenAI client not initialized. API key missing.")
+            return "[OpenAI API key not configured. Please set the OPENAI_API_KEY environment variable.]"
+
+        if not self.breaker.allow_request():
+            return "[Error generating chat response with OpenAI: circuit open after repeated failures]"
+
+        async with self._semaphores.get():
+            started = time.monotonic()
+            try:
+                response = await client.chat.completions.create(
+                    model=model or self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                self.breaker.record_success(time.monotonic() - started)
+                return response.choices[0].message.content
+            except Exception as e:
+                self.breaker.record_failure(time.monotonic() - started)
+                logger.error(f"Error generating chat response with OpenAI: {str(e)}")
+                return f"[Error generating chat response with OpenAI: {str(e)}]"
+
+    async def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """
+        Get embedding vector for text using OpenAI
+
+        Args:
+            text: The text to get embedding for
+            model: Model to use (defaults to embedding model)
+
+        Returns:
+            List of float values representing the embedding
+        """
+        return (await self.get_embeddings([text], model))[0]
+
+    async def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Get embedding vectors for several texts using batched OpenAI requests
+
+        Args:
+            texts: The texts to get embeddings for
+            model: Model to use (defaults to embedding model)
+            batch_size: Maximum number of texts per request (defaults to config.EMBEDDING_BATCH_SIZE)
+
+        Returns:
+            List of embeddings in the same order as texts (empty lists for failed texts)
+        """
+        client = self._client()
+        if client is None:
+            logger.error("OpenAI client not initialized. API key missing.")
+            return [[] for _ in texts]
+
+        embedding_model = model or self.embedding_model
+
+        async def embed_batch(batch):
+            async with self._semaphores.get():
+                try:
+                    response = await client.embeddings.create(model=embedding_model, input=batch)
+                    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                except Exception as e:
+                    logger.error(f"Error getting batch embeddings from OpenAI: {str(e)}")
+                    return [[] for _ in batch]
+
+        return await _cached_embeddings_async(
+            f"openai/{embedding_model}", texts,
+            lambda missing: _embed_in_batches_async(missing, embed_batch, batch_size)
+        )
+
+
+class AsyncCounterCheckLLMClient:
+    """
+    Asyncio version of CounterCheckLLMClient: both models are awaited concurrently and the
+    responses are compared. In "first_good" mode the preferred model's answer is returned as
+    soon as it arrives and the agreement score is computed when the other model finishes.
+    """
+
+    MODE_BOTH = CounterCheckLLMClient.MODE_BOTH
+    MODE_FIRST_GOOD = CounterCheckLLMClient.MODE_FIRST_GOOD
+
+    def __init__(self, base_url=None, primary_model=None, secondary_model=None, http_client=None,
+                 mode=None, timeout=None):
+        """
+        Initialize async counter-check client with two model instances
+
+        Args:
+            base_url: Base URL for OLLAMA API
+            primary_model: Primary model to use for generation
+            secondary_model: Secondary model to use for verification
+            http_client: httpx.AsyncClient shared by both model clients
+            mode: "both" or "first_good" (defaults to config.COUNTERCHECK_MODE)
+            timeout: Deadline in seconds for the model calls (defaults to config.COUNTERCHECK_TIMEOUT)
+        """
+        self.base_url = base_url or config.OLLAMA_BASE_URL
+        self.primary_model = primary_model or config.OLLAMA_PRIMARY_MODEL
+        self.secondary_model = secondary_model or config.OLLAMA_SECONDARY_MODEL
+        self.mode = mode or config.COUNTERCHECK_MODE
+        self.timeout = timeout or config.COUNTERCHECK_TIMEOUT
+
+        self.primary_client = AsyncOllamaClient(base_url=self.base_url, model=self.primary_model, http_client=http_client)
+        self.secondary_client = AsyncOllamaClient(base_url=self.base_url, model=self.secondary_model, http_client=http_client)
+
+        # Agreement scores by request, kept for later display (most recent last)
+        self._agreements = OrderedDict()
+        self._agreements_lock = threading.Lock()
+        # Background agreement tasks, referenced so they are not garbage collected mid-flight
+        self._pending_tasks = set()
+
+        logger.info(f"Initialized async CounterCheck client with models: {self.primary_model} (primary) and {self.secondary_model} (secondary), mode: {self.mode}")
+
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding both models"""
+        return self.primary_client.breaker_names + self.secondary_client.breaker_names
+
+    async def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate text completion using both models and counter-check results
+
+        Args:
+            prompt: The prompt to generate a response for
+            model: Override model (will still use both for checking, but return this one's response)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated text with confidence note
+        """
+        return await self._counter_check(
+            lambda client: client.generate(prompt=prompt, temperature=temperature, max_tokens=max_tokens),
+            request_key=self._request_key(prompt),
+            preferred_model=model or self.primary_model
+        )
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate chat completion using both models and counter-check results
+
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Override model (will still use both for checking, but return this one's response)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response with confidence note
+        """
+        return await self._counter_check(
+            lambda client: client.chat(messages=messages, temperature=temperature, max_tokens=max_tokens),
+            request_key=self._request_key(messages),
+            preferred_model=model or self.primary_model
+        )
+
+    def get_agreement(self, prompt_or_messages) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored agreement result for an earlier request
+
+        Args:
+            prompt_or_messages: The prompt string or chat messages that were sent
+
+        Returns:
+            Dictionary with 'status' ('pending', 'complete' or 'failed') and 'score',
+            or None if the request is unknown
+        """
+        with self._agreements_lock:
+            entry = self._agreements.get(self._request_key(prompt_or_messages))
+            return dict(entry) if entry else None
+
+    async def _counter_check(self, call, request_key: str, preferred_model: str) -> str:
+        """
+        Run a call against both models concurrently and combine the results
+
+        Args:
+            call: Function taking a model client and returning a coroutine for its response
+            request_key: Key under which the agreement score is stored
+            preferred_model: Model whose response should be returned
+
+        Returns:
+            Generated response, with a confidence note in "both" mode
+        """
+        deadline = time.monotonic() + self.timeout
+        primary_task = asyncio.ensure_future(call(self.primary_client))
+        secondary_task = asyncio.ensure_future(call(self.secondary_client))
+
+        if preferred_model == self.primary_model:
+            preferred, other = (primary_task, self.primary_model), (secondary_task, self.secondary_model)
+        else:
+            preferred, other = (secondary_task, self.secondary_model), (primary_task, self.primary_model)
+
+        if self.mode == self.MODE_FIRST_GOOD:
+            preferred_response = await self._result_before(preferred[0], deadline)
+            if not _is_failed_response(preferred_response):
+                # Return straight away and score agreement when the other model finishes
+                self._store_agreement(request_key, {"status": "pending", "score": None})
+                self._pending_tasks.add(other[0])
+                other[0].add_done_callback(
+                    lambda task: self._complete_agreement(request_key, preferred_response, task)
+                )
+                return preferred_response
+
+            other_response = await self._result_before(other[0], deadline)
+            if _is_failed_response(other_response):
+                logger.error("Both LLM models failed to generate responses")
+                return "[Error: Both LLM models failed to generate responses]"
+            logger.warning(f"Preferred model ({preferred[1]}) failed, using {other[1]} response")
+            return f"{other_response}\n\n[Generated using only {other[1]} due to {preferred[1]} failure]"
+
+        primary_response = await self._result_before(primary_task, deadline)
+        secondary_response = await self._result_before(secondary_task, deadline)
+
+        if _is_failed_response(primary_response) and _is_failed_response(secondary_response):
+            logger.error("Both LLM models failed to generate responses")
+            return "[Error: Both LLM models failed to generate responses]"
+
+        if _is_failed_response(primary_response):
+            logger.warning(f"Primary model ({self.primary_model}) failed, using secondary model response")
+            return f"{secondary_response}\n\n[Generated using only {self.secondary_model} due to primary model failure]"
+
+        if _is_failed_response(secondary_response):
+            logger.warning(f"Secondary model ({self.secondary_model}) failed, using primary model response")
+            return f"{primary_response}\n\n[Generated using only {self.primary_model} due to secondary model failure]"
+
+        agreement_score = _calculate_agreement(primary_response, secondary_response)
+        self._store_agreement(request_key, {"status": "complete", "score": agreement_score})
+        confidence_note = f"\n\n[Agreement between models: {agreement_score:.0%}]"
+
+        if preferred_model == self.primary_model:
+            return primary_response + confidence_note
+        return secondary_response + confidence_note
+
+    async def _result_before(self, task, deadline: float):
+        """
+        Await a task's result, giving up at the deadline
+
+        Returns:
+            The result, or None if the call failed or did not finish in time
+        """
+        try:
+            # Shielded so a timeout here leaves the call running for the agreement score
+            return await asyncio.wait_for(asyncio.shield(task), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM call did not finish within {self.timeout} seconds")
+            return None
+        except Exception as e:
+            logger.error(f"LLM call failed: {str(e)}")
+            return None
+
+    def _complete_agreement(self, request_key: str, preferred_response: str, other_task) -> None:
+        """Compute and store the agreement score once the other model has answered"""
+        self._pending_tasks.discard(other_task)
+        try:
+            other_response = other_task.result()
+        except BaseException as e:
+            logger.warning(f"Counter-check model failed: {str(e)}")
+            other_response = None
+
+        if _is_failed_response(other_response):
+            self._store_agreement(request_key, {"status": "failed", "score": None})
+        else:
+            score = _calculate_agreement(preferred_response, other_response)
+            self._store_agreement(request_key, {"status": "complete", "score": score})
+
+    def _store_agreement(self, request_key: str, entry: Dict[str, Any]) -> None:
+        """Store an agreement entry, keeping only the most recent requests"""
+        with self._agreements_lock:
+            self._agreements[request_key] = entry
+            self._agreements.move_to_end(request_key)
+            while len(self._agreements) > config.COUNTERCHECK_AGREEMENT_HISTORY:
+                self._agreements.popitem(last=False)
+
+    def _request_key(self, prompt_or_messages) -> str:
+        """Build a stable key for a prompt or list of chat messages"""
+        if not isinstance(prompt_or_messages, str):
+            prompt_or_messages = json.dumps(prompt_or_messages, sort_keys=True)
+        return hashlib.sha256(prompt_or_messages.encode("utf-8")).hexdigest()
+
+    async def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Get embedding vector for text using the primary model"""
+        return await self.primary_client.get_embedding(text, model)
+
+    async def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """Get embedding vectors for several texts using the primary model"""
+        return await self.primary_client.get_embeddings(texts, model, batch_size)
+
+
+class AsyncClientAdapter:
+    """
+    Async interface over a synchronous LLM client, running each call in a worker thread
+
+    Used for backends without a native async client, such as MockLLMClient.
+    """
+
+    def __init__(self, client):
+        """
+        Initialize the adapter
+
+        Args:
+            client: Synchronous LLM client to wrap
+        """
+        self.client = client
+
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding the wrapped client's backend"""
+        return getattr(self.client, "breaker_names", [])
+
+    async def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate text completion in a worker thread"""
+        return await asyncio.to_thread(self.client.generate, prompt, model, temperature, max_tokens)
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate chat completion in a worker thread"""
+        return await asyncio.to_thread(self.client.chat, messages, model, temperature, max_tokens)
+
+    async def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Get embedding vector for text in a worker thread"""
+        return await asyncio.to_thread(self.client.get_embedding, text, model)
+
+    async def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """Get embedding vectors for several texts in a worker thread"""
+        return await asyncio.to_thread(self.client.get_embeddings, texts, model, batch_size)
+
+
+def get_async_llm_client():
+    """
+    Get an async LLM client for the backend the synchronous client selected
+
+    With an OpenAI API key the synchronous OpenAI-to-Ollama failover client is wrapped in an
+    AsyncClientAdapter so failover keeps working; otherwise the Ollama backend chosen by the
+    background probe (counter-check or single model) gets its async counterpart.
+
+    Returns:
+        A configured async LLM client
+    """
+    return async_client_for(get_llm_client())
+
+
+def async_client_for(client):
+    """
+    Get the async counterpart of a synchronous LLM client
+
+    Ollama and OpenAI clients get a native async client with the same settings; any other
+    client (mocks, failover chains) is wrapped in an AsyncClientAdapter so it keeps its behavior.
+    A LazyLLMClient that has not selected a backend is wrapped too, so it keeps re-probing.
+
+    Args:
+        client: Synchronous LLM client
+
+    Returns:
+        An async LLM client for the same backend
+    """
+    if isinstance(client, LazyLLMClient):
+        active = client.active_client
+        if not isinstance(active, (CounterCheckLLMClient, OllamaClient)):
+            return AsyncClientAdapter(client)
+        client = active
+
+    if isinstance(client, CounterCheckLLMClient):
+        return AsyncCounterCheckLLMClient(
+            base_url=client.base_url,
+            primary_model=client.primary_model,
+            secondary_model=client.secondary_model,
+            mode=client.mode,
+            timeout=client.timeout
+        )
+    if isinstance(client, OllamaClient):
+        return AsyncOllamaClient(base_url=client.base_url, model=client.model)
+    if OPENAI_AVAILABLE and isinstance(client, OpenAIClient) and client.api_key:
+        return AsyncOpenAIClient(api_key=client.api_key, model=client.model)
+    return AsyncClientAdapter(client)
+
+
+# Event loop run by a daemon thread, shared by every SyncLLMClient in the process
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared background event loop, starting its thread on first use"""
+    global _background_loop
+    if _background_loop is None:
+        with _background_loop_lock:
+            if _background_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="async-llm-loop", daemon=True)
+                thread.start()
+                _background_loop = loop
+                logger.info("Started background event loop for async LLM calls")
+    return _background_loop
+
+
+def run_sync(coroutine, timeout: Optional[float] = None):
+    """
+    Run a coroutine on the shared background event loop and wait for its result
+
+    Args:
+        coroutine: Coroutine to run
+        timeout: Seconds to wait before giving up (None waits indefinitely)
+
+    Returns:
+        The coroutine's result
+    """
+    loop = _get_background_loop()
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    try:
+        return future.result(timeout=timeout)
+    except Exception:
+        future.cancel()
+        raise
+
+
+class SyncLLMClient:
+    """
+    Synchronous facade over an async LLM client
+
+    Calls run on a shared background event loop, so Flask views and other synchronous code
+    can use the async clients; generate_many, generate_each and chat_many run their prompts concurrently.
+    """
+
+    def __init__(self, async_client=None):
+        """
+        Initialize the facade
+
+        Args:
+            async_client: Async LLM client to wrap (defaults to get_async_llm_client())
+        """
+        self.async_client = async_client or get_async_llm_client()
+
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding the wrapped client's backend"""
+        return self.async_client.breaker_names
+
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate text completion"""
+        return run_sync(self.async_client.generate(prompt, model, temperature, max_tokens))
+
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate chat completion"""
+        return run_sync(self.async_client.chat(messages, model, temperature, max_tokens))
+
+    def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Get embedding vector for text"""
+        return run_sync(self.async_client.get_embedding(text, model))
+
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """Get embedding vectors for several texts"""
+        return run_sync(self.async_client.get_embeddings(texts, model, batch_size))
+
+    def generate_many(self, prompts: List[str], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> List[str]:
+        """
+        Generate completions for independent prompts concurrently
+
+        Args:
+            prompts: Prompts to generate responses for
+            model: Model to use (defaults to the client's model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate per prompt
+
+        Returns:
+            Responses in the same order as prompts
+        """
+        async def gather():
+            return await asyncio.gather(*(
+                self.async_client.generate(prompt, model, temperature, max_tokens) for prompt in prompts
+            ))
+        return list(run_sync(gather()))
+
+    def generate_each(self, requests: List[Dict[str, Any]]) -> List[str]:
+        """
+        Generate completions for independent requests concurrently, each with its own settings
+
+        Args:
+            requests: Keyword arguments of generate for each request ('prompt', and optionally
+                'model', 'temperature' and 'max_tokens')
+
+        Returns:
+            Responses in the same order as requests
+        """
+        async def gather():
+            return await asyncio.gather(*(self.async_client.generate(**request) for request in requests))
+        return list(run_sync(gather()))
+
+    def chat_many(self, conversations: List[List[Dict[str, str]]], model: Optional[str] = None,
+                  temperature: float = 0.7, max_tokens: int = 1000) -> List[str]:
+        """
+        Generate chat completions for independent conversations concurrently
+
+        Args:
+            conversations: Message lists, each with 'role' and 'content' keys
+            model: Model to use (defaults to the client's model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate per conversation
+
+        Returns:
+            Responses in the same order as conversations
+        """
+        async def gather():
+            return await asyncio.gather(*(
+                self.async_client.chat(messages, model, temperature, max_tokens) for messages in conversations
+            ))
+        return list(run_sync(gather()))
@@ -0,0 +1,254 @@
+"""
+Circuit breakers for LLM backends.
+Each backend (OpenAI, each Ollama model) gets a breaker that tracks recent error rate and
+latency. After repeated failures the circuit opens and calls fail fast instead of waiting out
+request timeouts; after a cool-down a single trial call decides whether it closes again.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker with a rolling window of call outcomes
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, error_rate_threshold: Optional[float] = None,
+                 min_calls: Optional[int] = None, window_size: Optional[int] = None, recovery_timeout: Optional[float] = None):
+        """
+        Initialize a circuit breaker
+
+        Args:
+            name: Backend name (e.g. 'openai', 'ollama:llama3:latest')
+            failure_threshold: Consecutive failures that open the circuit
+            error_rate_threshold: Error rate over the window that opens the circuit
+            min_calls: Calls needed in the window before the error rate is considered
+            window_size: Number of recent calls kept for error rate and latency statistics
+            recovery_timeout: Seconds the circuit stays open before a trial call is allowed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or config.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.error_rate_threshold = error_rate_threshold or config.CIRCUIT_BREAKER_ERROR_RATE
+        self.min_calls = min_calls or config.CIRCUIT_BREAKER_MIN_CALLS
+        self.recovery_timeout = recovery_timeout or config.CIRCUIT_BREAKER_RECOVERY_TIMEOUT
+
+        self._calls = deque(maxlen=window_size or config.CIRCUIT_BREAKER_WINDOW)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = None
+        self._total_calls = 0
+        self._total_failures = 0
+        self._rejected_calls = 0
+
+    @property
+    def state(self) -> str:
+        """Current circuit state"""
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be sent to the backend
+
+        Returns:
+            True if the circuit is closed, or if this call is the half-open trial
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_started_at = now
+                logger.info(f"Circuit for {self.name} is half-open - sending a trial request")
+                return True
+            if self._state == self.HALF_OPEN and now - self._trial_started_at >= self.recovery_timeout:
+                # The previous trial never reported back, allow another one
+                self._trial_started_at = now
+                return True
+            self._rejected_calls += 1
+            return False
+
+    def is_available(self) -> bool:
+        """Whether calls would currently be allowed, without claiming the half-open trial"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.recovery_timeout
+            return time.monotonic() - self._trial_started_at >= self.recovery_timeout
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a successful call
+
+        Args:
+            latency: Call duration in seconds
+        """
+        with self._lock:
+            self._calls.append((True, latency))
+            self._total_calls += 1
+            self._consecutive_failures = 0
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed after a successful trial request")
+                self._state = self.CLOSED
+                self._trial_started_at = None
+
+    def record_failure(self, latency: float) -> None:
+        """
+        Record a failed call, opening the circuit if the backend looks unhealthy
+
+        Args:
+            latency: Call duration in seconds
+        """
+        with self._lock:
+            self._calls.append((False, latency))
+            self._total_calls += 1
+            self._total_failures += 1
+            self._consecutive_failures += 1
+
+            if self._state == self.HALF_OPEN:
+                self._open("trial request failed")
+            elif self._state == self.CLOSED:
+                if self._consecutive_failures >= self.failure_threshold:
+                    self._open(f"{self._consecutive_failures} consecutive failures")
+                elif len(self._calls) >= self.min_calls and self._error_rate() >= self.error_rate_threshold:
+                    self._open(f"error rate {self._error_rate():.0%}")
+
+    def error_rate(self) -> float:
+        """Fraction of failed calls in the rolling window"""
+        with self._lock:
+            return self._error_rate()
+
+    def latency_percentiles(self) -> Dict[str, Optional[float]]:
+        """
+        Latency percentiles over the rolling window
+
+        Returns:
+            Dictionary with p50, p95 and p99 latencies in seconds (None without data)
+        """
+        with self._lock:
+            latencies = sorted(latency for _, latency in self._calls)
+        return {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99)
+        }
+
+    def is_slow(self) -> bool:
+        """Whether the backend's p95 latency is above the slow-call threshold"""
+        p95 = self.latency_percentiles()["p95"]
+        return p95 is not None and p95 > config.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+
+    def health_key(self):
+        """
+        Sort key for choosing the healthiest backend (lower is healthier)
+
+        Returns:
+            Tuple of (unavailable, slow, error rate rounded to 10%)
+        """
+        return (not self.is_available(), self.is_slow(), round(self.error_rate(), 1))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Export the breaker state for monitoring
+
+        Returns:
+            Dictionary with state, counters, error rate and latency percentiles
+        """
+        percentiles = self.latency_percentiles()
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state,
+                "error_rate": self._error_rate(),
+                "window_calls": len(self._calls),
+                "consecutive_failures": self._consecutive_failures,
+                "total_calls": self._total_calls,
+                "total_failures": self._total_failures,
+                "rejected_calls": self._rejected_calls,
+                "open_for": time.monotonic() - self._opened_at if self._state != self.CLOSED else None,
+                "latency": percentiles,
+                "slow": percentiles["p95"] is not None and percentiles["p95"] > config.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+            }
+
+    def reset(self) -> None:
+        """Close the circuit and forget all recorded calls"""
+        with self._lock:
+            self._calls.clear()
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_started_at = None
+
+    def _error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+
+    def _open(self, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_started_at = None
+        logger.warning(f"Circuit for {self.name} opened: {reason}")
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker for a backend, creating it on first use
+
+    Args:
+        name: Backend name (e.g. 'openai', 'ollama:llama3:latest')
+
+    Returns:
+        The backend's CircuitBreaker
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _breakers[name] = breaker
+        return breaker
+
+
+def export_circuit_breakers() -> Dict[str, Dict[str, Any]]:
+    """
+    Export the state of every circuit breaker for monitoring
+
+    Returns:
+        Dictionary of breaker snapshots keyed by backend name
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def reset_circuit_breakers() -> None:
+    """Forget every circuit breaker"""
+    with _breakers_lock:
+        _breakers.clear()
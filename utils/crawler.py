@@ -0,0 +1,488 @@
+"""
+Concurrent crawler for bulk ruling imports from Kenya Law.
+
+Builds on KenyaLawScraper: listing pages are walked to discover judgment URLs, URLs
+already in the ruling table are skipped with one IN query per chunk, and the remaining
+judgments are fetched on a bounded thread pool, their full texts streamed straight to
+the ruling text store. Every request goes through a per-host
+throttle (rate limit and max in-flight requests) and is checked against robots.txt.
+Imported rulings are written in batches and progress is checkpointed to a JSON file,
+so an interrupted crawl resumes where it stopped. Run standalone with:
+
+    python -m utils.crawler KEHC --limit 200
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import config
+from app import db
+from models import Ruling, Judge
+from utils.scraper import KenyaLawScraper
+from utils.text_store import TextStore, get_text_store
+
+logger = logging.getLogger(__name__)
+
+RULING_DATE_FORMATS = ['%d %B %Y', '%B %d, %Y', '%Y-%m-%d']
+
+# Ruling URLs per IN query when checking which ones are already imported
+DEDUP_CHUNK_SIZE = 500
+
+
+# Default of parse_ruling_date: the day it is called
+_TODAY = object()
+
+
+def parse_ruling_date(date_str: str, default: Any = _TODAY) -> Optional[date]:
+    """
+    Parse the date of a ruling as shown on Kenya Law
+
+    Args:
+        date_str: Date text (e.g. '12 March 2023')
+        default: Returned if there is no date or it could not be parsed (defaults to today)
+
+    Returns:
+        The date, or the default
+    """
+    for fmt in RULING_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    return date.today() if default is _TODAY else default
+
+
+class HostThrottle:
+    """
+    Per-host politeness: a minimum interval between requests and a cap on requests in flight
+    """
+
+    def __init__(self, requests_per_second: Optional[float] = None, max_in_flight: Optional[int] = None):
+        """
+        Initialize the throttle
+
+        Args:
+            requests_per_second: Request rate allowed per host
+            max_in_flight: Concurrent requests allowed per host
+        """
+        requests_per_second = requests_per_second or config.CRAWL_REQUESTS_PER_SECOND
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.max_in_flight = max_in_flight or config.CRAWL_MAX_IN_FLIGHT_PER_HOST
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host: str) -> Dict[str, Any]:
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = {
+                    'semaphore': threading.BoundedSemaphore(self.max_in_flight),
+                    'interval': self.interval,
+                    'next_at': 0.0
+                }
+            return self._hosts[host]
+
+    def set_crawl_delay(self, host: str, delay: float) -> None:
+        """Slow a host down to the Crawl-delay its robots.txt asks for"""
+        state = self._host(host)
+        with self._lock:
+            state['interval'] = max(state['interval'], delay)
+
+    @contextmanager
+    def slot(self, url: str):
+        """Wait for the URL's host to accept another request, and hold the slot while it runs"""
+        state = self._host(urlparse(url).netloc)
+        with state['semaphore']:
+            with self._lock:
+                now = time.monotonic()
+                wait = state['next_at'] - now
+                state['next_at'] = max(now, state['next_at']) + state['interval']
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+
+class RobotsPolicy:
+    """
+    robots.txt rules for the hosts a crawl visits, fetched once per host
+    """
+
+    def __init__(self, session, user_agent: str, throttle: Optional[HostThrottle] = None):
+        self.session = session
+        self.user_agent = user_agent
+        self.throttle = throttle
+        self._parsers = {}
+        self._lock = threading.Lock()
+
+    def _parser(self, url: str) -> Optional[RobotFileParser]:
+        parts = urlparse(url)
+        with self._lock:
+            if parts.netloc in self._parsers:
+                return self._parsers[parts.netloc]
+
+            parser = None
+            robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+            try:
+                response = self.session.get(robots_url, timeout=10)
+                if response.status_code == 200:
+                    parser = RobotFileParser(robots_url)
+                    parser.parse(response.text.splitlines())
+                    delay = parser.crawl_delay(self.user_agent)
+                    if delay and self.throttle:
+                        self.throttle.set_crawl_delay(parts.netloc, float(delay))
+            except Exception as e:
+                # No readable robots.txt means no restrictions
+                logger.warning(f"Could not read {robots_url}: {str(e)}")
+            self._parsers[parts.netloc] = parser
+            return parser
+
+    def allowed(self, url: str) -> bool:
+        """Whether robots.txt lets the crawler fetch a URL"""
+        parser = self._parser(url)
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+
+class CrawlCheckpoint:
+    """
+    JSON record of a crawl's discovered, finished and failed URLs
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.discovered: List[str] = []
+        self.done = set()
+        self.failed: Dict[str, str] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.discovered = data.get('discovered', [])
+                self.done = set(data.get('done', []))
+                self.failed = data.get('failed', {})
+                logger.info(f"Resuming crawl from {path}: {len(self.done)} of {len(self.discovered)} URLs done")
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable crawl checkpoint {path}: {str(e)}")
+
+    def save(self) -> None:
+        """Write the checkpoint atomically"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'discovered': self.discovered,
+                'done': sorted(self.done),
+                'failed': self.failed,
+                'updated_at': datetime.utcnow().isoformat()
+            }, f)
+        os.replace(temp_path, self.path)
+
+    def remove(self) -> None:
+        """Delete the checkpoint once the crawl has finished"""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def existing_ruling_urls(urls: List[str]) -> set:
+    """
+    Find which URLs have already been imported as rulings
+
+    Args:
+        urls: Ruling URLs
+
+    Returns:
+        The subset of URLs present in the ruling table
+    """
+    existing = set()
+    for start in range(0, len(urls), DEDUP_CHUNK_SIZE):
+        chunk = urls[start:start + DEDUP_CHUNK_SIZE]
+        rows = db.session.query(Ruling.url).filter(Ruling.url.in_(chunk)).all()
+        existing.update(row[0] for row in rows)
+    return existing
+
+
+def _build_ruling(url: str, case_details: Dict[str, Any], judges: Dict[str, Judge],
+                  user_id: Optional[int], default_court: str) -> Ruling:
+    """Build a ruling from scraped details, reusing or creating its judges"""
+    court = case_details.get('court') or default_court
+    ruling = Ruling(
+        case_number=case_details.get('case_number', ''),
+        title=case_details.get('title', ''),
+        court=court,
+        date_of_ruling=parse_ruling_date(case_details.get('date', '')),
+        citation=case_details.get('citation', ''),
+        url=url,
+        summary=case_details.get('summary', ''),
+        # Streamed rulings keep their text in the text store, read back through Ruling.full_text
+        full_text=None if case_details.get('text_key') else case_details.get('ruling') or case_details.get('full_text', ''),
+        user_id=user_id
+    )
+    for judge_name in case_details.get('judges', []):
+        judge_name = judge_name.strip()
+        if not judge_name:
+            continue
+        judge = judges.get(judge_name)
+        if judge is None:
+            judge = judges[judge_name] = Judge(name=judge_name, court=court, is_active=True)
+            db.session.add(judge)
+        if judge not in ruling.judges:
+            ruling.judges.append(judge)
+    return ruling
+
+
+def bulk_insert_rulings(cases: List[Tuple[str, Dict[str, Any]]], user_id: Optional[int] = None,
+                        default_court: str = '') -> Tuple[List[Ruling], Dict[str, str]]:
+    """
+    Insert a batch of scraped rulings and their judges in one transaction
+
+    Judges are looked up with a single IN query. If the batch fails to commit, the rulings
+    are retried one at a time so one bad row doesn't lose the rest.
+
+    Args:
+        cases: (URL, case details) pairs
+        user_id: User importing the rulings
+        default_court: Court used when the details don't name one
+
+    Returns:
+        The inserted rulings and a dictionary of URL -> error for rows that failed
+    """
+    if not cases:
+        return [], {}
+
+    def load_judges(batch):
+        names = {name.strip() for _, details in batch for name in details.get('judges', []) if name and name.strip()}
+        if not names:
+            return {}
+        return {judge.name: judge for judge in Judge.query.filter(Judge.name.in_(names)).all()}
+
+    try:
+        judges = load_judges(cases)
+        rulings = [_build_ruling(url, details, judges, user_id, default_court) for url, details in cases]
+        db.session.add_all(rulings)
+        db.session.commit()
+        return rulings, {}
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Batch insert of {len(cases)} rulings failed, inserting one at a time: {str(e)}")
+
+    rulings, errors = [], {}
+    for url, details in cases:
+        try:
+            ruling = _build_ruling(url, details, load_judges([(url, details)]), user_id, default_court)
+            db.session.add(ruling)
+            db.session.commit()
+            rulings.append(ruling)
+        except Exception as e:
+            db.session.rollback()
+            errors[url] = str(e)
+    return rulings, errors
+
+
+class RulingCrawler:
+    """
+    Bulk importer that discovers, fetches and stores a court's judgments concurrently
+    """
+
+    def __init__(self, scraper: Optional[KenyaLawScraper] = None, max_workers: Optional[int] = None,
+                 throttle: Optional[HostThrottle] = None, respect_robots: Optional[bool] = None,
+                 batch_size: Optional[int] = None, checkpoint_dir: Optional[str] = None,
+                 text_store: Optional[TextStore] = None):
+        """
+        Initialize the crawler
+
+        Args:
+            scraper: Kenya Law scraper (its session is throttled for the crawl)
+            max_workers: Judgments fetched in parallel
+            throttle: Per-host politeness limits
+            respect_robots: Whether to honour robots.txt
+            batch_size: Rulings written per transaction
+            checkpoint_dir: Directory for resumable checkpoints (empty disables them)
+            text_store: Store the judgments' full texts are streamed to (defaults to the shared store)
+        """
+        self.scraper = scraper or KenyaLawScraper()
+        self.max_workers = max_workers or config.CRAWL_MAX_WORKERS
+        self.throttle = throttle or HostThrottle()
+        self.respect_robots = config.CRAWL_RESPECT_ROBOTS if respect_robots is None else respect_robots
+        self.batch_size = batch_size or config.CRAWL_BATCH_SIZE
+        self.checkpoint_dir = config.CRAWL_CHECKPOINT_DIR if checkpoint_dir is None else checkpoint_dir
+        self.text_store = text_store or get_text_store()
+
+        # Every request the scraper sends now waits for its host's slot
+        self.scraper.session.throttle = self.throttle
+        self.robots = RobotsPolicy(self.scraper.session, self.scraper.session.headers.get('User-Agent', '*'), self.throttle)
+
+    def discover(self, court_code: str, limit: int) -> List[str]:
+        """
+        Walk a court's listing pages until enough judgment URLs are found
+
+        Args:
+            court_code: Court code (e.g. 'KEHC')
+            limit: Number of URLs wanted
+
+        Returns:
+            Unique judgment URLs in listing order
+        """
+        urls = []
+        seen = set()
+        page = 1
+        while len(urls) < limit:
+            cases = self.scraper.get_case_law(court_code, page=page, limit=limit)
+            new_urls = [case.get('link') for case in cases if case.get('link') and case.get('link') not in seen]
+            if not new_urls:
+                break
+            for url in new_urls:
+                seen.add(url)
+                urls.append(url)
+            page += 1
+        return urls[:limit]
+
+    def crawl_court(self, court_code: str, limit: int = 10, default_court: str = '', user_id: Optional[int] = None,
+                    progress: Optional[Callable[[float, str], None]] = None,
+                    should_stop: Optional[Callable[[], bool]] = None,
+                    urls: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Import up to `limit` of a court's latest judgments
+
+        Args:
+            court_code: Court code (e.g. 'KEHC')
+            limit: Maximum number of judgments to consider
+            default_court: Court name used when a judgment doesn't name one
+            user_id: User importing the rulings
+            progress: Optional callback receiving the fraction complete and a step description
+            should_stop: Optional callback; returning True stops the crawl after the current fetches
+            urls: Judgment URLs to import instead of discovering them (the caller tracks
+                progress, so no checkpoint is kept)
+
+        Returns:
+            Crawl report with counts, imported ruling IDs, errors and throughput
+        """
+        started = time.monotonic()
+        checkpoint = CrawlCheckpoint(
+            os.path.join(self.checkpoint_dir, f"{court_code}.json") if self.checkpoint_dir and urls is None else None
+        )
+        if urls is not None:
+            checkpoint.discovered = list(urls)[:limit]
+        report = {
+            'court_code': court_code,
+            'discovered': 0,
+            'skipped_existing': 0,
+            'skipped_robots': 0,
+            'fetched': 0,
+            'imported_count': 0,
+            'errors': 0,
+            'failed': {},
+            'ruling_ids': [],
+            'stopped': False
+        }
+
+        if urls is None and not checkpoint.discovered:
+            if progress:
+                progress(0.02, f"Listing judgments for {court_code}")
+            checkpoint.discovered = self.discover(court_code, limit)
+            checkpoint.save()
+        urls = checkpoint.discovered
+        report['discovered'] = len(urls)
+
+        # Skip what this crawl already finished and what is already in the database
+        pending = [url for url in urls if url not in checkpoint.done]
+        existing = existing_ruling_urls(pending)
+        report['skipped_existing'] = len(existing) + len(urls) - len(pending)
+        checkpoint.done.update(existing)
+        pending = [url for url in pending if url not in existing]
+
+        if self.respect_robots:
+            allowed = [url for url in pending if self.robots.allowed(url)]
+            report['skipped_robots'] = len(pending) - len(allowed)
+            checkpoint.done.update(set(pending) - set(allowed))
+            pending = allowed
+
+        batch = []
+
+        def flush():
+            rulings, errors = bulk_insert_rulings(batch, user_id=user_id, default_court=default_court)
+            report['ruling_ids'].extend(ruling.id for ruling in rulings)
+            report['imported_count'] += len(rulings)
+            report['errors'] += len(errors)
+            report['failed'].update(errors)
+            checkpoint.failed.update(errors)
+            checkpoint.done.update(url for url, _ in batch if url not in errors)
+            batch.clear()
+            checkpoint.save()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler")
+        try:
+            futures = {executor.submit(self.scraper.stream_case_details, url, self.text_store): url for url in pending}
+            for number, future in enumerate(as_completed(futures), 1):
+                url = futures[future]
+                try:
+                    case_details = future.result()
+                except Exception as e:
+                    case_details = None
+                    checkpoint.failed[url] = report['failed'][url] = str(e)
+                if case_details:
+                    report['fetched'] += 1
+                    checkpoint.failed.pop(url, None)
+                    batch.append((url, case_details))
+                else:
+                    report['errors'] += 1
+                    checkpoint.failed.setdefault(url, "Could not retrieve case details")
+                    report['failed'].setdefault(url, checkpoint.failed[url])
+
+                if len(batch) >= self.batch_size:
+                    flush()
+                if progress:
+                    progress(0.05 + 0.95 * number / max(len(pending), 1), f"Fetched {number} of {len(pending)} judgments")
+                if should_stop and should_stop():
+                    report['stopped'] = True
+                    break
+        finally:
+            # Don't start queued fetches for a stopped crawl
+            executor.shutdown(wait=True, cancel_futures=True)
+            if batch:
+                flush()
+
+        if report['stopped']:
+            checkpoint.save()
+        else:
+            checkpoint.remove()
+
+        elapsed = time.monotonic() - started
+        report['elapsed'] = round(elapsed, 2)
+        report['judgments_per_second'] = round(report['fetched'] / elapsed, 2) if elapsed > 0 else 0.0
+        report['http_requests'] = self.scraper.request_count
+        logger.info(
+            f"Crawled {court_code}: {report['imported_count']} imported, {report['skipped_existing']} already imported, "
+            f"{report['skipped_robots']} disallowed by robots.txt, {report['errors']} errors in {report['elapsed']}s "
+            f"({report['judgments_per_second']} judgments/s, {report['http_requests']} HTTP requests)"
+        )
+        return report
+
+
+def main(argv=None):
+    """Import a court's judgments from the command line"""
+    parser = argparse.ArgumentParser(description="Bulk import judgments from Kenya Law")
+    parser.add_argument('court_code', help="Court code, e.g. KESC, KECA, KEHC")
+    parser.add_argument('--limit', type=int, default=100, help="Maximum number of judgments")
+    parser.add_argument('--court', default='', help="Court name used when a judgment doesn't name one")
+    parser.add_argument('--workers', type=int, default=config.CRAWL_MAX_WORKERS, help="Judgments fetched in parallel")
+    args = parser.parse_args(argv)
+
+    from app import app
+    with app.app_context():
+        report = RulingCrawler(max_workers=args.workers).crawl_court(args.court_code, limit=args.limit,
+                                                                      default_court=args.court)
+    report.pop('ruling_ids')
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import os
 import logging
 import jinja2
 import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 import re
 from utils.llm import OllamaClient, LegalAssistant
 import config
@@ -419,6 +419,34 @@ Yours faithfully,
             logger.error(f"Error generating {document_type} document using AI: {str(e)}")
             return self._generate_template_fallback(document_type, context)
             
+    def generate_ai_document_stream(self, document_type: str, instructions: str, context: Dict[str, Any]) -> Iterator[str]:
+        """
+        Generate a document using AI, yielding the text as it is generated
+        
+        Args:
+            document_type: Type of document to generate
+            instructions: Instructions for document generation
+            context: Additional context information
+            
+        Yields:
+            Chunks of the AI-generated document
+        """
+        streamed = False
+        try:
+            for chunk in self.legal_assistant.draft_legal_document_stream(document_type, context, instructions):
+                streamed = True
+                yield chunk
+            if streamed:
+                logger.info(f"Generated {document_type} document using AI (streamed)")
+                return
+        except Exception as e:
+            logger.error(f"Error streaming {document_type} document using AI: {str(e)}")
+            if streamed:
+                return
+        
+        logger.warning(f"LLM connection failed, using template-based fallback for {document_type}")
+        yield self._generate_template_fallback(document_type, context)
+    
     def _generate_template_fallback(self, document_type: str, context: Dict[str, Any]) -> str:
         """
         Generate a document using templates when AI is not available
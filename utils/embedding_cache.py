@@ -0,0 +1,385 @@
+"""
+Content-addressed cache for text embeddings.
+Embeddings are keyed by (model, hash of the normalized text) and kept in an in-memory LRU
+tier backed by a SQLite file, so repeated texts and queries never reach the embedding API.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: in-memory LRU in front of a persistent SQLite store.
+    Vectors are stored as float32 blobs; the SQLite file is evicted by least recent
+    access once it grows past the size cap.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_items: Optional[int] = None,
+                 max_disk_bytes: Optional[int] = None, version: Optional[str] = None,
+                 size_check_interval: Optional[int] = None):
+        """
+        Initialize the embedding cache
+
+        Args:
+            path: SQLite file for the persistent tier (None keeps the cache in memory only)
+            memory_items: Maximum number of embeddings kept in the in-memory tier
+            max_disk_bytes: Size cap for stored vectors in the persistent tier
+            version: Cache version; changing it invalidates every stored embedding
+            size_check_interval: Number of disk writes between size checks
+        """
+        self.path = path
+        self.memory_items = memory_items or config.EMBEDDING_CACHE_MEMORY_ITEMS
+        self.max_disk_bytes = max_disk_bytes or config.EMBEDDING_CACHE_MAX_BYTES
+        self.version = version or config.EMBEDDING_CACHE_VERSION
+        self.size_check_interval = size_check_interval or config.EMBEDDING_CACHE_SIZE_CHECK_INTERVAL
+
+        self._memory = OrderedDict()
+        self._model_dimensions = {}
+        self._lock = threading.RLock()
+        self._writes_since_size_check = 0
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+        self._conn = None
+        if self.path:
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embedding_cache (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        dim INTEGER NOT NULL,
+                        vector BLOB NOT NULL,
+                        size_bytes INTEGER NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_model ON embedding_cache(model)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_access ON embedding_cache(last_access)")
+                self._conn.commit()
+                logger.info(f"Initialized embedding cache at {self.path}")
+            except Exception as e:
+                logger.error(f"Error opening embedding cache at {self.path}, using memory only: {str(e)}")
+                self._conn = None
+
+    def key_for(self, model: str, text: str) -> str:
+        """
+        Build the cache key for a text
+
+        Args:
+            model: Embedding model identifier
+            text: Text that was embedded
+
+        Returns:
+            Hex digest identifying the (model, normalized text) pair
+        """
+        normalized = _WHITESPACE_RE.sub(' ', text or '').strip()
+        digest = hashlib.sha256(f"{self.version}\x00{model}\x00{normalized}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Get a cached embedding for a text, or None on a miss"""
+        return self.get_many(model, [text])[0]
+
+    def put(self, model: str, text: str, embedding: List[float]) -> None:
+        """Store the embedding for a text"""
+        self.put_many(model, [text], [embedding])
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for several texts
+
+        Args:
+            model: Embedding model identifier
+            texts: Texts to look up
+
+        Returns:
+            List with the cached embedding or None for each text
+        """
+        keys = [self.key_for(model, text) for text in texts]
+        results = [None] * len(keys)
+        disk_lookups = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    results[i] = list(embedding)
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            if disk_lookups and self._conn is not None:
+                try:
+                    found = self._read_from_disk(list(disk_lookups.keys()))
+                    for key, embedding in found.items():
+                        self._remember(key, embedding)
+                        for i in disk_lookups.pop(key):
+                            results[i] = list(embedding)
+                            self._stats['disk_hits'] += 1
+                except Exception as e:
+                    logger.warning(f"Error reading embedding cache: {str(e)}")
+
+            self._stats['misses'] += sum(len(positions) for positions in disk_lookups.values())
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Store embeddings for several texts. Empty and all-zero (fallback) vectors are skipped.
+
+        Args:
+            model: Embedding model identifier
+            texts: Texts that were embedded
+            embeddings: Embeddings in the same order as texts
+        """
+        rows = []
+        now = time.time()
+
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                if embedding is None or len(embedding) == 0 or not any(embedding):
+                    continue
+                embedding = [float(value) for value in embedding]
+
+                # A different vector size means the model behind this name changed
+                known_dim = self._get_model_dimension(model)
+                if known_dim is not None and known_dim != len(embedding):
+                    logger.info(f"Embedding size for {model} changed from {known_dim} to {len(embedding)} - invalidating cached vectors")
+                    self.invalidate_model(model)
+                    rows = [row for row in rows if row[1] != model]
+                self._model_dimensions[model] = len(embedding)
+
+                key = self.key_for(model, text)
+                self._remember(key, _CachedVector(embedding, model))
+                blob = array('f', embedding).tobytes()
+                rows.append((key, model, len(embedding), blob, len(blob), now))
+                self._stats['writes'] += 1
+
+            if rows and self._conn is not None:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embedding_cache (key, model, dim, vector, size_bytes, last_access) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._conn.commit()
+                    self._writes_since_size_check += len(rows)
+                    if self._writes_since_size_check >= self.size_check_interval:
+                        self._writes_since_size_check = 0
+                        self._evict_disk()
+                except Exception as e:
+                    logger.warning(f"Error writing embedding cache: {str(e)}")
+
+    def invalidate_model(self, model: str) -> None:
+        """
+        Drop every cached embedding produced by a model
+
+        Args:
+            model: Embedding model identifier
+        """
+        with self._lock:
+            model_keys = [key for key, value in self._memory.items() if value.model == model]
+            for key in model_keys:
+                del self._memory[key]
+            self._model_dimensions.pop(model, None)
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM embedding_cache WHERE model = ?", (model,))
+                    self._conn.commit()
+                except Exception as e:
+                    logger.warning(f"Error invalidating embedding cache for {model}: {str(e)}")
+            self._stats['invalidations'] += 1
+            logger.info(f"Invalidated cached embeddings for model {model}")
+
+    def clear(self) -> None:
+        """Remove every cached embedding from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._model_dimensions.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM embedding_cache")
+                    self._conn.commit()
+                except Exception as e:
+                    logger.warning(f"Error clearing embedding cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hit/miss counters and the size of each tier
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+            stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+            stats['memory_items'] = len(self._memory)
+            stats['disk_items'] = 0
+            stats['disk_bytes'] = 0
+            if self._conn is not None:
+                try:
+                    count, size = self._conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM embedding_cache"
+                    ).fetchone()
+                    stats['disk_items'] = count
+                    stats['disk_bytes'] = size
+                except Exception as e:
+                    logger.warning(f"Error reading embedding cache size: {str(e)}")
+            return stats
+
+    def _remember(self, key: str, embedding) -> None:
+        """Add an embedding to the in-memory LRU tier"""
+        if not isinstance(embedding, _CachedVector):
+            embedding = _CachedVector(embedding)
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_from_disk(self, keys: List[str]) -> Dict[str, "_CachedVector"]:
+        """Read embeddings for the given keys from the persistent tier"""
+        found = {}
+        now = time.time()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, model, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                chunk
+            ).fetchall()
+            for key, model, blob in rows:
+                vector = array('f')
+                vector.frombytes(blob)
+                found[key] = _CachedVector(vector.tolist(), model)
+            if rows:
+                self._conn.executemany(
+                    "UPDATE embedding_cache SET last_access = ? WHERE key = ?",
+                    [(now, row[0]) for row in rows]
+                )
+        if found:
+            self._conn.commit()
+        return found
+
+    def _get_model_dimension(self, model: str) -> Optional[int]:
+        """Get the vector size stored for a model, if any"""
+        if model in self._model_dimensions:
+            return self._model_dimensions[model]
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT dim FROM embedding_cache WHERE model = ? LIMIT 1", (model,)
+            ).fetchone()
+        except Exception:
+            return None
+        if row:
+            self._model_dimensions[model] = row[0]
+            return row[0]
+        return None
+
+    def _evict_disk(self) -> None:
+        """Evict least recently used vectors until the persistent tier is under its size cap"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM embedding_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        # Evict down to 90% of the cap so eviction doesn't run on every write
+        target = int(self.max_disk_bytes * 0.9)
+        evicted = 0
+        rows = self._conn.execute(
+            "SELECT key, size_bytes FROM embedding_cache ORDER BY last_access ASC"
+        )
+        to_delete = []
+        for key, size in rows:
+            if total <= target:
+                break
+            to_delete.append((key,))
+            total -= size
+            evicted += 1
+        self._conn.executemany("DELETE FROM embedding_cache WHERE key = ?", to_delete)
+        self._conn.commit()
+        self._stats['evictions'] += evicted
+        logger.info(f"Evicted {evicted} embeddings from the persistent cache")
+
+
+class _CachedVector(list):
+    """Embedding vector that remembers which model produced it"""
+
+    def __init__(self, values, model: Optional[str] = None):
+        super().__init__(values)
+        self.model = model
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the process-wide embedding cache
+
+    Returns:
+        The shared EmbeddingCache, or None if caching is disabled
+    """
+    global _embedding_cache
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(path=config.EMBEDDING_CACHE_PATH or None)
+    return _embedding_cache
+
+
+def cached_embeddings(model: str, texts: List[str], compute) -> List[List[float]]:
+    """
+    Return embeddings for texts, computing only the ones that are not cached
+
+    Args:
+        model: Embedding model identifier (e.g. 'ollama/nomic-embed-text')
+        texts: Texts to embed
+        compute: Function taking a list of texts and returning their embeddings in order
+
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return compute(texts)
+
+    results = cache.get_many(model, texts)
+    missing = [i for i, embedding in enumerate(results) if embedding is None]
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        computed = compute(missing_texts)
+        for i, embedding in zip(missing, computed):
+            results[i] = embedding
+        cache.put_many(model, missing_texts, computed)
+    return results
@@ -0,0 +1,272 @@
+"""
+On-disk HTTP response cache for the Kenya Law scraper.
+Pages are keyed by their full URL and stored zlib-compressed in SQLite with the validators
+(ETag / Last-Modified) the server sent, so expired pages are revalidated with a conditional
+request instead of downloaded again. Each page type has its own freshness lifetime and the
+file is evicted by least recent access once it grows past the size cap.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Any, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = 6
+
+# Seconds a page stays fresh before it is revalidated, by page type
+PAGE_TYPE_TTLS = {
+    'listing': config.HTTP_CACHE_TTL_LISTING,
+    'search': config.HTTP_CACHE_TTL_SEARCH,
+    'judgment': config.HTTP_CACHE_TTL_JUDGMENT,
+    'legislation': config.HTTP_CACHE_TTL_LEGISLATION,
+}
+
+
+class CachedPage:
+    """
+    A cached page body with the validators needed to revalidate it
+    """
+
+    def __init__(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str],
+                 fetched_at: float, expires_at: float):
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self) -> bool:
+        """Whether the page can be served without asking the server"""
+        return self.expires_at > time.time()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers asking the server to answer 304 Not Modified if the page is unchanged"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """
+    SQLite store of compressed page bodies with per-page-type TTLs and LRU size eviction
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 ttls: Optional[Dict[str, int]] = None, size_check_interval: int = 100):
+        """
+        Initialize the HTTP cache
+
+        Args:
+            path: SQLite file for the cache (None keeps the cache in memory only)
+            max_bytes: Size cap for stored (compressed) page bodies
+            ttls: Freshness lifetime in seconds by page type (defaults to PAGE_TYPE_TTLS)
+            size_check_interval: Number of writes between size checks
+        """
+        self.path = path
+        self.max_bytes = max_bytes or config.HTTP_CACHE_MAX_BYTES
+        self.ttls = dict(PAGE_TYPE_TTLS, **(ttls or {}))
+        self.size_check_interval = size_check_interval
+
+        self._lock = threading.Lock()
+        self._writes_since_size_check = 0
+        self._stats = {
+            'hits': 0,
+            'revalidated': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path or ':memory:', timeout=30, check_same_thread=False)
+        if self.path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_access ON http_cache(last_access)")
+        self._conn.commit()
+
+    def key_for(self, url: str) -> str:
+        """Build the cache key for a full URL (including its query string)"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, page_type: str) -> int:
+        """Freshness lifetime in seconds for a page type"""
+        return self.ttls.get(page_type, config.HTTP_CACHE_TTL_LISTING)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """
+        Look up a cached page, fresh or not
+
+        Args:
+            url: Full URL of the page
+
+        Returns:
+            The cached page (check is_fresh before serving it), or None
+        """
+        key = self.key_for(url)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT body, etag, last_modified, fetched_at, expires_at FROM http_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute("UPDATE http_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            text = zlib.decompress(row[0]).decode('utf-8')
+        except Exception as e:
+            logger.warning(f"Error reading HTTP cache for {url}: {str(e)}")
+            self._count('errors')
+            return None
+        return CachedPage(url, text, row[1], row[2], row[3], row[4])
+
+    def put(self, url: str, text: str, page_type: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """
+        Store a page body
+
+        Args:
+            url: Full URL of the page
+            text: Decoded page body
+            page_type: Page type, selecting the TTL
+            etag: ETag response header
+            last_modified: Last-Modified response header
+        """
+        now = time.time()
+        try:
+            body = zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO http_cache "
+                    "(key, url, body, etag, last_modified, fetched_at, expires_at, size_bytes, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.key_for(url), url, body, etag, last_modified, now, now + self.ttl_for(page_type), len(body), now)
+                )
+                self._conn.commit()
+                self._stats['writes'] += 1
+                self._writes_since_size_check += 1
+                if self._writes_since_size_check >= self.size_check_interval:
+                    self._writes_since_size_check = 0
+                    self._evict()
+        except Exception as e:
+            logger.warning(f"Error writing HTTP cache for {url}: {str(e)}")
+            self._count('errors')
+
+    def refresh(self, url: str, page_type: str) -> None:
+        """Restart the freshness lifetime of a page the server confirmed unchanged"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE http_cache SET fetched_at = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                    (now, now + self.ttl_for(page_type), now, self.key_for(url))
+                )
+                self._conn.commit()
+        except Exception as e:
+            logger.warning(f"Error refreshing HTTP cache for {url}: {str(e)}")
+            self._count('errors')
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup outcome: 'hits', 'revalidated' or 'misses'"""
+        self._count(outcome)
+
+    def clear(self) -> None:
+        """Remove every cached page"""
+        with self._lock:
+            self._conn.execute("DELETE FROM http_cache")
+            self._conn.commit()
+        logger.info("Cleared HTTP cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hit/revalidation/miss counters, entry count and stored bytes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            items, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM http_cache"
+            ).fetchone()
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['revalidated']) / lookups if lookups else 0.0
+        stats['items'] = items
+        stats['stored_bytes'] = stored
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+    def _evict(self) -> None:
+        """Evict least recently used pages until the cache is under its size cap (lock held)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the cap so eviction doesn't run on every write
+        target = int(self.max_bytes * 0.9)
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size_bytes FROM http_cache ORDER BY last_access ASC"):
+            if total <= target:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM http_cache WHERE key = ?", to_delete)
+        self._conn.commit()
+        self._stats['evictions'] += len(to_delete)
+        logger.info(f"Evicted {len(to_delete)} pages from the HTTP cache")
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """
+    Get the process-wide HTTP cache
+
+    Returns:
+        The shared HTTPCache, or None if caching is disabled
+    """
+    global _http_cache
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+    if _http_cache is None:
+        with _http_cache_lock:
+            if _http_cache is None:
+                try:
+                    _http_cache = HTTPCache(path=config.HTTP_CACHE_PATH or None)
+                    logger.info(f"Initialized HTTP cache at {config.HTTP_CACHE_PATH or 'memory'}")
+                except Exception as e:
+                    logger.error(f"Error opening HTTP cache at {config.HTTP_CACHE_PATH}, using memory: {str(e)}")
+                    _http_cache = HTTPCache(path=None)
+    return _http_cache
@@ -0,0 +1,93 @@
+"""
+Shared HTTP transport for outbound API calls.
+Provides a process-wide requests.Session with connection pooling, keep-alive and
+retry/backoff on connection errors so LLM and embedding calls reuse TCP connections.
+"""
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_http_session(pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                        max_retries: Optional[int] = None, backoff_factor: Optional[float] = None,
+                        pool_block: Optional[bool] = None) -> requests.Session:
+    """
+    Create a pooled requests session
+
+    Args:
+        pool_connections: Number of per-host connection pools to keep
+        pool_maxsize: Maximum number of connections kept open per host
+        max_retries: Number of retries on connection errors
+        backoff_factor: Backoff factor between retries (seconds, exponential)
+        pool_block: Block when a host pool is exhausted instead of opening extra connections
+
+    Returns:
+        Configured requests.Session
+    """
+    pool_connections = pool_connections or config.HTTP_POOL_CONNECTIONS
+    pool_maxsize = pool_maxsize or config.HTTP_POOL_MAXSIZE
+    max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+    backoff_factor = config.HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+    pool_block = config.HTTP_POOL_BLOCK if pool_block is None else pool_block
+
+    # Only retry failures that happen before the request reaches the server, so
+    # non-idempotent POSTs (generations) are never sent twice
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=backoff_factor,
+        raise_on_status=False
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+        pool_block=pool_block
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+
+    logger.info(f"Created pooled HTTP session (pools: {pool_connections}, per-host: {pool_maxsize}, retries: {max_retries})")
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Get the shared pooled session, creating it on first use
+
+    Returns:
+        Process-wide requests.Session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_http_session()
+    return _session
+
+
+def reset_http_session() -> None:
+    """Close the shared session so the next call to get_http_session creates a fresh one"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
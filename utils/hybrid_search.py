@@ -0,0 +1,592 @@
+"""
+Hybrid keyword and semantic search over rulings and statutes.
+Embedding search misses exact citations ("[2019] eKLR") and case numbers, while keyword
+search misses matches that are worded differently. The HybridRetriever runs both: a BM25
+inverted index kept in memory over the ruling table and the vector database's statutes,
+and the vector database's nearest-neighbour search. It fuses their rankings with
+reciprocal-rank fusion and can re-rank the top results with the LLM or a cross-encoder.
+Every search reports how long each stage took.
+"""
+import heapq
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+import config
+from app import db
+from models import Ruling
+from utils.search_filters import build_where, index_metadata, matches
+from utils.text_store import get_text_store
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Neutral and report citations: "[2019] eKLR", "[2023] KEHC 101 (KLR)"
+_CITATION_RE = re.compile(r'\[(\d{4})\]\s*(eklr|klr|ke[a-z]{2,5}\s*\d+)')
+# Case numbers: "Petition No. 12 of 2019", "Civil Appeal E045 of 2021"
+_CASE_NUMBER_RE = re.compile(r'\b([a-z]?\d{1,5})\s+of\s+(\d{4})\b')
+_SPACE_RE = re.compile(r'\s+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it of on or that the this to was were with'.split()
+)
+
+SNIPPET_CHARS = 300
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms
+
+    Besides lower-cased words, each citation and case number becomes one term of its own
+    ("[2019]eklr", "12/2019"), so an exact citation outranks documents sharing its words.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms
+    """
+    if not text:
+        return []
+    text = text.lower()
+    terms = [term for term in _TOKEN_RE.findall(text) if term not in _STOPWORDS]
+    terms.extend(f"[{year}]{_SPACE_RE.sub('', report)}" for year, report in _CITATION_RE.findall(text))
+    terms.extend(f"{number}/{year}" for number, year in _CASE_NUMBER_RE.findall(text))
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 inverted index
+
+    Documents can be added, replaced and removed while other threads search it. A
+    replaced or removed document's postings stay behind, skipped, until the index is
+    rebuilt.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys = []
+        self.info = []
+        self.lengths = []
+        self.postings = {}
+        self.total_length = 0
+        self.docs = {}  # key -> position of the document's current version
+        self.removed = set()  # positions of replaced and removed documents
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, key: Any, text: str, info: Dict[str, Any]) -> None:
+        """
+        Add a document, replacing any document with the same key
+
+        Args:
+            key: Identifier of the document
+            text: Text to index
+            info: Fields returned with the document's search results
+        """
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        with self._lock:
+            self.remove(key)
+            doc = len(self.keys)
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, []).append((doc, frequency))
+            self.keys.append(key)
+            self.info.append(info)
+            self.lengths.append(length)
+            self.total_length += length
+            self.docs[key] = doc
+
+    def remove(self, key: Any) -> None:
+        """Remove a document, if the index has it"""
+        with self._lock:
+            doc = self.docs.pop(key, None)
+            if doc is not None:
+                self.removed.add(doc)
+                self.total_length -= self.lengths[doc]
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Fields of a document, or None if the index doesn't have it"""
+        with self._lock:
+            doc = self.docs.get(key)
+            return self.info[doc] if doc is not None else None
+
+    def documents(self) -> List[Tuple[Any, Dict[str, Any]]]:
+        """(key, fields) of every document"""
+        with self._lock:
+            return [(key, self.info[doc]) for key, doc in self.docs.items()]
+
+    def search(self, query: str, limit: int = 50, where: Optional[Dict[str, Any]] = None) -> List[Tuple[Any, float]]:
+        """
+        Rank documents against a query
+
+        Args:
+            query: Search query
+            limit: Number of results to return
+            where: Only rank documents whose info matches this clause (see utils.search_filters.build_where)
+
+        Returns:
+            (key, score) pairs, best first
+        """
+        with self._lock:
+            count = len(self.docs)
+            if not count:
+                return []
+            average_length = self.total_length / count or 1.0
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if postings and self.removed:
+                    postings = [posting for posting in postings if posting[0] not in self.removed]
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, frequency in postings:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / average_length)
+                    scores[doc] = scores.get(doc, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            if where:
+                scores = {doc: score for doc, score in scores.items() if matches(self.info[doc], where)}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self.keys[doc], score) for doc, score in best]
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, Sequence[Any]], k: int = 60) -> List[Tuple[Any, float, Dict[str, int]]]:
+    """
+    Fuse rankings by summing 1 / (k + rank) for every ranking a key appears in
+
+    Args:
+        rankings: Ranked keys by retriever name
+        k: Rank constant (larger values flatten the difference between top ranks)
+
+    Returns:
+        (key, fused score, rank in each retriever) triples, best first
+    """
+    scores = {}
+    ranks = {}
+    for name, keys in rankings.items():
+        for rank, key in enumerate(keys, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            ranks.setdefault(key, {})[name] = rank
+    fused = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [(key, scores[key], ranks[key]) for key in fused]
+
+
+class HybridRetriever:
+    """
+    BM25 and vector search over rulings and statutes, fused by reciprocal rank
+    """
+
+    KINDS = ('rulings', 'statutes')
+
+    def __init__(self, vector_db=None, llm_client=None, rrf_k: Optional[int] = None,
+                 candidates: Optional[int] = None, rerank: Optional[str] = None):
+        """
+        Initialize the retriever
+
+        Args:
+            vector_db: Vector database for semantic search (defaults to VectorDatabase())
+            llm_client: LLM client for LLM re-ranking (defaults to the vector database's client)
+            rrf_k: Rank constant of the fusion (defaults to config.HYBRID_RRF_K)
+            candidates: Results taken from each retriever (defaults to config.HYBRID_CANDIDATES)
+            rerank: Default re-rank stage: 'none', 'llm' or 'cross-encoder' (defaults to config.HYBRID_RERANK)
+        """
+        if vector_db is None:
+            from utils.vector_db import VectorDatabase
+            vector_db = VectorDatabase()
+        self.vector_db = vector_db
+        self.llm_client = llm_client or getattr(vector_db, 'llm_client', None)
+        self.rrf_k = rrf_k or config.HYBRID_RRF_K
+        self.candidates = candidates or config.HYBRID_CANDIDATES
+        self.rerank = rerank or config.HYBRID_RERANK
+        self._indexes = {}
+        self._signatures = {}
+        self._index_lock = threading.Lock()
+        self._rebuilding = set()
+        self._cross_encoder = None
+
+    def _signature(self, kind: str) -> Any:
+        """Cheap fingerprint of a source, which changes when its documents do"""
+        if kind == 'rulings':
+            return tuple(db.session.query(
+                func.count(Ruling.id), func.max(Ruling.updated_at), func.max(Ruling.id)
+            ).one())
+        return self.vector_db.statute_collection.count()
+
+    def _ruling_documents(self, since: Optional[Tuple[Any, ...]] = None) -> Iterable[Tuple[Any, str, Dict[str, Any]]]:
+        """
+        Rulings with the start of their full text, read a batch at a time
+
+        Args:
+            since: Signature of the rulings already indexed; only rulings added or updated
+                after it are read
+        """
+        text_store = get_text_store()
+        text_chars = config.HYBRID_INDEX_TEXT_CHARS
+        rows = db.session.query(
+            Ruling.id, Ruling.title, Ruling.case_number, Ruling.citation, Ruling.court, Ruling.category,
+            Ruling.is_landmark, Ruling.date_of_ruling, Ruling.url, Ruling.summary,
+            func.substr(Ruling._full_text, 1, text_chars)
+        )
+        if since is not None:
+            _, updated_at, max_id = since
+            # Rows updated at the indexed instant are read again, as they may have changed since
+            rows = rows.filter(or_(
+                Ruling.id > (max_id or 0),
+                Ruling.updated_at >= updated_at if updated_at is not None else Ruling.updated_at.isnot(None)
+            ))
+        rows = rows.order_by(Ruling.id).yield_per(500)
+        for (ruling_id, title, case_number, citation, court, category, is_landmark, ruling_date, url, summary,
+             text) in rows:
+            if text is None and text_store is not None and url and text_chars > 0:
+                text = text_store.read(text_store.key_for(url), text_chars)
+            info = {
+                'kind': 'ruling',
+                'id': ruling_id,
+                'title': title,
+                'case_number': case_number,
+                'citation': citation or '',
+                'court': court,
+                'category': category or '',
+                'date': ruling_date.isoformat() if ruling_date else '',
+                'url': url or '',
+                'snippet': (summary or text or '')[:SNIPPET_CHARS]
+            }
+            # Normalized court_code, date_int, category and is_landmark, for filtering
+            info.update(index_metadata({'court': court, 'citation': citation, 'url': url, 'date': ruling_date,
+                                        'category': category, 'is_landmark': is_landmark}))
+            body = ' '.join(part for part in (title, case_number, citation, court, category, summary, text) if part)
+            yield ('ruling', ruling_id), body, info
+
+    def _statute_documents(self) -> Iterable[Tuple[Any, str, Dict[str, Any]]]:
+        """Statutes stored in the vector database, read a page at a time"""
+        collection = self.vector_db.statute_collection
+        page_size = config.VECTOR_DB_BULK_BATCH_SIZE
+        offset = 0
+        while True:
+            page = collection.get(include=['documents', 'metadatas'], limit=page_size, offset=offset)
+            ids = page.get('ids') or []
+            for doc_id, document, metadata in zip(ids, page['documents'], page['metadatas']):
+                metadata = metadata or {}
+                info = {
+                    'kind': 'statute',
+                    'id': doc_id,
+                    'title': metadata.get('title', ''),
+                    'chapter': metadata.get('chapter', ''),
+                    'date': metadata.get('date', ''),
+                    'url': metadata.get('url', ''),
+                    'snippet': (document or '').strip()[:SNIPPET_CHARS]
+                }
+                info.update(index_metadata(metadata))
+                yield ('statute', doc_id), document or '', info
+            if len(ids) < page_size:
+                return
+            offset += page_size
+
+    def _get_index(self, kind: str) -> BM25Index:
+        """
+        Get the keyword index of a source, bringing it up to date if the source has changed
+
+        The first search builds the index. After that, new and updated rulings are added
+        to it in place; deleted rulings and changed statutes are handled by rebuilding the
+        index in the background while searches keep using the current one. Only one
+        search at a time updates an index; the others don't wait for it.
+
+        Must be called with an application context, as rulings are read from the database.
+        """
+        signature = self._signature(kind)
+        if kind not in self._indexes:
+            with self._index_lock:
+                if kind not in self._indexes:
+                    self._indexes[kind], self._signatures[kind] = self._build_index(kind)
+            return self._indexes[kind]
+        if self._signatures[kind] == signature or not self._index_lock.acquire(blocking=False):
+            return self._indexes[kind]
+        try:
+            index = self._indexes[kind]
+            previous = self._signatures[kind]
+            if kind == 'rulings' and previous != signature:
+                started = time.monotonic()
+                updated = 0
+                for key, text, info in self._ruling_documents(since=previous):
+                    index.add(key, text, info)
+                    updated += 1
+                self._signatures[kind] = signature
+                logger.info(f"Added {updated} new or updated rulings to the keyword index in "
+                            f"{time.monotonic() - started:.2f}s")
+                # Deleted rulings, or replaced ones outnumbering the live ones, call for a rebuild
+                if len(index) != signature[0] or len(index.removed) > len(index):
+                    self._rebuild_in_background(kind)
+            elif previous != signature:
+                self._rebuild_in_background(kind)
+            return index
+        finally:
+            self._index_lock.release()
+
+    def _build_index(self, kind: str) -> Tuple[BM25Index, Any]:
+        """Build the keyword index of a source from scratch, returning it with the signature it reflects"""
+        started = time.monotonic()
+        # Taken before reading, so changes made during the build are picked up afterwards
+        signature = self._signature(kind)
+        index = BM25Index()
+        documents = self._ruling_documents() if kind == 'rulings' else self._statute_documents()
+        for key, text, info in documents:
+            index.add(key, text, info)
+        logger.info(f"Built keyword index of {len(index)} {kind} in {time.monotonic() - started:.2f}s")
+        return index, signature
+
+    def _rebuild_in_background(self, kind: str):
+        """Rebuild the keyword index of a source on a thread, unless a rebuild is already running"""
+        if kind in self._rebuilding:
+            return
+        self._rebuilding.add(kind)
+        app = current_app._get_current_object()
+
+        def rebuild():
+            try:
+                with app.app_context():
+                    index, signature = self._build_index(kind)
+                # Swapped in once no search is updating the current index
+                with self._index_lock:
+                    self._indexes[kind], self._signatures[kind] = index, signature
+            except Exception as e:
+                logger.error(f"Rebuilding the keyword index of {kind} failed: {str(e)}")
+            finally:
+                self._rebuilding.discard(kind)
+
+        threading.Thread(target=rebuild, name=f"hybrid-index-{kind}", daemon=True).start()
+
+    def _vector_search(self, query: str, kinds: Sequence[str], n_results: int,
+                       filters: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Semantic search of the requested sources with one embedding of the query"""
+        query_embedding = self.vector_db.embedding_function([query])[0]
+        results = {}
+        if 'rulings' in kinds:
+            results['rulings'] = self.vector_db.search_cases(query, n_results, query_embedding,
+                                                             filters['rulings'])
+        if 'statutes' in kinds:
+            results['statutes'] = self.vector_db.search_statutes(query, n_results, query_embedding,
+                                                                 filters['statutes'])
+        return results
+
+    def _kind_filters(self, kinds: Sequence[str], filters: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Split search filters by source, keeping those the source stores (a court filter doesn't apply to statutes)"""
+        filterable = {'rulings': self.vector_db.FILTERABLE['cases'], 'statutes': self.vector_db.FILTERABLE['statutes']}
+        return {
+            kind: {key: value for key, value in (filters or {}).items() if key in filterable[kind]}
+            for kind in kinds
+        }
+
+    def _vector_key(self, kind: str, result: Dict[str, Any], urls: Dict[str, Any]) -> Any:
+        """Match a vector search result to the keyword index's document"""
+        doc_id = result.get('id', '')
+        if kind == 'statutes':
+            return ('statute', doc_id)
+        # Bulk-indexed rulings carry their primary key; cases added one at a time only their URL
+        if isinstance(doc_id, str) and doc_id.startswith('ruling-') and doc_id[7:].isdigit():
+            return ('ruling', int(doc_id[7:]))
+        return urls.get(result.get('url')) or ('case', doc_id)
+
+    def search(self, query: str, kinds: Sequence[str] = KINDS, limit: int = 20,
+               rerank: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Search rulings and statutes by keywords and meaning
+
+        The keyword and vector searches run concurrently. If either fails, the other's
+        results are still returned, and the failure is reported under 'errors'.
+
+        Args:
+            query: Search query
+            kinds: Sources to search: 'rulings', 'statutes' or both
+            limit: Number of results to return
+            rerank: Re-rank stage for this search: 'none', 'llm' or 'cross-encoder'
+                (defaults to the retriever's)
+            filters: Search filters (see utils.search_filters.build_where), applied inside
+                both retrievers so filtered searches still return `limit` results; each
+                source applies the filters it stores (a court filter keeps statutes)
+
+        Returns:
+            Dictionary with the fused 'results' (each with its 'kind', 'id', fused 'score'
+            and rank in each retriever under 'ranks'), any stage 'errors', and the seconds
+            spent in each stage under 'timings'
+        """
+        started = time.monotonic()
+        timings = {}
+        errors = {}
+        kinds = [kind for kind in kinds if kind in self.KINDS]
+        rerank = rerank or self.rerank
+        candidates = max(self.candidates, limit)
+        kind_filters = self._kind_filters(kinds, filters)
+        # Checked before searching, so bad filters raise ValueError rather than empty results
+        wheres = {kind: build_where(kind_filters[kind]) for kind in kinds}
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hybrid-vector")
+        try:
+            vector_future = executor.submit(self._timed, timings, 'vector', self._vector_search,
+                                            query, kinds, candidates, kind_filters)
+
+            stage_started = time.monotonic()
+            indexes = {kind: self._get_index(kind) for kind in kinds}
+            timings['index'] = time.monotonic() - stage_started
+
+            stage_started = time.monotonic()
+            keyword_hits = []
+            for kind, index in indexes.items():
+                keyword_hits.extend(index.search(query, candidates, wheres[kind]))
+            keyword_hits.sort(key=lambda hit: hit[1], reverse=True)
+            timings['bm25'] = time.monotonic() - stage_started
+
+            try:
+                vector_results = vector_future.result()
+            except Exception as e:
+                logger.error(f"Vector search failed for '{query}': {str(e)}")
+                errors['vector'] = str(e)
+                vector_results = {}
+        finally:
+            executor.shutdown(wait=False)
+
+        stage_started = time.monotonic()
+        info = {}
+        for index in indexes.values():
+            info.update(index.documents())
+        urls = {}
+        if 'rulings' in indexes:
+            urls = {document['url']: key for key, document in indexes['rulings'].documents() if document['url']}
+
+        vector_ranking = []
+        for kind, kind_results in vector_results.items():
+            for result in kind_results:
+                key = self._vector_key(kind, result, urls)
+                if key not in info:
+                    info[key] = {
+                        'kind': 'ruling' if kind == 'rulings' else 'statute',
+                        # A ruling's primary key when the vector id carries one, else the raw vector id
+                        'id': key[1] if key[0] == 'ruling' else result.get('id'),
+                        'title': result.get('title', ''),
+                        'citation': result.get('citation', ''),
+                        'court': result.get('court', ''),
+                        'date': result.get('date', ''),
+                        'url': result.get('url', ''),
+                        'snippet': (result.get('content') or '').strip()[:SNIPPET_CHARS]
+                    }
+                vector_ranking.append((key, result.get('score')))
+        # Distances from different collections share one embedding space
+        vector_ranking.sort(key=lambda item: item[1] if item[1] is not None else float('inf'))
+
+        fused = reciprocal_rank_fusion({
+            'bm25': [key for key, _ in keyword_hits],
+            'vector': list(dict.fromkeys(key for key, _ in vector_ranking))
+        }, self.rrf_k)
+        results = [dict(info[key], score=score, ranks=ranks) for key, score, ranks in fused[:limit]]
+        timings['fusion'] = time.monotonic() - stage_started
+
+        if rerank and rerank != 'none' and results:
+            stage_started = time.monotonic()
+            try:
+                results = self._rerank(rerank, query, results)
+            except Exception as e:
+                logger.error(f"Re-ranking ({rerank}) failed for '{query}': {str(e)}")
+                errors['rerank'] = str(e)
+            timings['rerank'] = time.monotonic() - stage_started
+
+        timings['total'] = time.monotonic() - started
+        logger.info(f"Hybrid search stage timings for '{query}': " + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items()))
+        return {'query': query, 'results': results, 'errors': errors, 'timings': timings}
+
+    def _timed(self, timings: Dict[str, float], stage: str, func, *args, **kwargs):
+        """Call a function and record how long it took"""
+        started = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = time.monotonic() - started
+
+    def _rerank(self, method: str, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-order the top results by a finer relevance model
+
+        Args:
+            method: 'llm' or 'cross-encoder'
+            query: Search query
+            results: Fused results, best first
+
+        Returns:
+            The results with the top config.HYBRID_RERANK_TOP re-ordered, each with its 'rerank_score'
+        """
+        top = results[:config.HYBRID_RERANK_TOP]
+        passages = [f"{result['title']}. {result.get('citation') or ''} {result.get('snippet') or ''}".strip()
+                    for result in top]
+        if method == 'llm':
+            scores = self._llm_scores(query, passages)
+        elif method == 'cross-encoder':
+            scores = [float(score) for score in self._get_cross_encoder().predict([(query, passage) for passage in passages])]
+        else:
+            raise ValueError(f"Unknown re-rank method '{method}'")
+
+        for result, score in zip(top, scores):
+            result['rerank_score'] = score
+        # Python's sort is stable, so equal scores keep their fused order
+        return sorted(top, key=lambda result: result['rerank_score'], reverse=True) + results[len(top):]
+
+    def _llm_scores(self, query: str, passages: List[str]) -> List[float]:
+        """Ask the LLM to rate each passage's relevance to the query from 0 to 10"""
+        if self.llm_client is None:
+            raise RuntimeError("No LLM client for re-ranking")
+        listing = "\n".join(f"{number}. {passage}" for number, passage in enumerate(passages, 1))
+        prompt = f"""
+        Rate how relevant each of these Kenyan legal sources is to the search query, from 0 (unrelated) to 10 (exactly what was asked for).
+
+        QUERY: {query}
+
+        SOURCES:
+        {listing}
+
+        Reply with only a JSON array of {len(passages)} numbers, one per source in the order listed.
+        """
+        response = self.llm_client.generate(prompt, temperature=0.0, max_tokens=200)
+        match = re.search(r'\[[^\[\]]*\]', response or '')
+        scores = json.loads(match.group(0)) if match else None
+        if not isinstance(scores, list) or len(scores) != len(passages):
+            raise ValueError("LLM did not return one score per source")
+        return [float(score) for score in scores]
+
+    def _get_cross_encoder(self):
+        """Load the cross-encoder model on first use"""
+        if self._cross_encoder is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                raise RuntimeError("Cross-encoder re-ranking requires the sentence-transformers package")
+            self._cross_encoder = CrossEncoder(config.HYBRID_CROSS_ENCODER_MODEL)
+        return self._cross_encoder
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_hybrid_retriever() -> HybridRetriever:
+    """
+    Get the process-wide hybrid retriever, whose keyword indexes are reused across requests
+
+    Returns:
+        The shared HybridRetriever
+    """
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = HybridRetriever()
+    return _retriever
@@ -0,0 +1,249 @@
+"""
+Background job handlers for AI research, ruling analysis, ruling imports, the
+periodic Kenya Law sync and vector indexing of rulings.
+
+Each handler runs on a job worker (see utils/job_queue.py) inside an application
+context, reports progress through its JobContext and returns a JSON-serializable result.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import config
+from app import db
+from models import User, Case, LegalResearch, Ruling
+from utils.job_queue import job_handler, periodic_job, JobContext
+from utils.crawler import bulk_insert_rulings, RulingCrawler
+from utils.gamification import GamificationService
+
+logger = logging.getLogger(__name__)
+
+def _record_activity(user_id: Optional[int], activity_type: str, description: str):
+    """Record a gamification activity for the job's user without failing the job"""
+    user = db.session.get(User, user_id) if user_id else None
+    if user is None:
+        return
+    try:
+        GamificationService.record_activity(user, activity_type, description)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not record {activity_type} activity: {str(e)}")
+
+
+@job_handler('research_issue')
+def research_issue(context: JobContext, query: str, court_filters: Optional[List[str]] = None,
+                   case_id: Optional[Any] = None, tokens_charged: int = 0) -> Dict[str, Any]:
+    """
+    Research a legal issue and save it to the user's research history
+
+    The job queue refunds the tokens charged when the job was queued if it fails or is
+    cancelled, including when it is cancelled before it starts.
+
+    Args:
+        context: Job context
+        query: Research query
+        court_filters: Court codes to filter by
+        case_id: Case to associate the research with
+        tokens_charged: Tokens taken from the user for this research
+
+    Returns:
+        ID of the saved research and the number of results
+    """
+    from utils.research_assistant import LegalResearchAssistant
+
+    context.set_progress(0.05, "Searching Kenya Law, legislation and the vector database")
+    research_assistant = LegalResearchAssistant()
+
+    def report(progress, message):
+        context.check_cancelled()
+        context.set_progress(progress, message)
+
+    results = research_assistant.research_legal_issue(query, court_filters, progress=report)
+    context.check_cancelled()
+
+    result_count = len(results.get('cases', []))
+
+    # Save research to history
+    research_history = LegalResearch(
+        title=f"Research: {query[:50]}",
+        query=query,
+        results=json.dumps(results),
+        source="ai_research",
+        court_filter=",".join(court_filters) if court_filters else None,
+        result_count=result_count,
+        tokens_used=tokens_charged,
+        user_id=context.user_id
+    )
+
+    # Associate with case if selected
+    if case_id:
+        case = db.session.get(Case, case_id)
+        if case and case.user_id == context.user_id:
+            research_history.case_id = case_id
+
+    db.session.add(research_history)
+    db.session.commit()
+    logger.info(f"Saved research to history: {query}, found {result_count} results")
+
+    return {'research_id': research_history.id, 'result_count': result_count}
+
+
+@job_handler('analyze_ruling')
+def analyze_ruling(context: JobContext, ruling_id: int) -> Dict[str, Any]:
+    """
+    Run the comprehensive AI analysis of a ruling
+
+    Args:
+        context: Job context
+        ruling_id: ID of the ruling to analyze
+
+    Returns:
+        ID of the analyzed ruling
+    """
+    from utils.ruling_analyzer import RulingAnalyzer
+
+    context.set_progress(0.1, "Analyzing ruling")
+    analysis_result = RulingAnalyzer().analyze_ruling(ruling_id)
+    if 'error' in analysis_result:
+        raise RuntimeError(f"Analysis failed: {analysis_result['error']}")
+
+    ruling = db.session.get(Ruling, ruling_id)
+    _record_activity(context.user_id, 'analyze_ruling', f"Analyzed ruling: {ruling.title}")
+    return {'ruling_id': ruling_id}
+
+
+@job_handler('import_rulings')
+def import_rulings(context: JobContext, import_type: str, case_url: Optional[str] = None,
+                   court: Optional[str] = None, court_code: Optional[str] = None,
+                   limit: int = 10) -> Dict[str, Any]:
+    """
+    Import rulings from the Kenya Law website
+
+    Batch imports run the concurrent crawler, which commits rulings in batches and
+    checkpoints its progress, so a cancelled job keeps what it has imported and a new
+    import of the same court resumes it.
+
+    Args:
+        context: Job context
+        import_type: 'case_url' for a single case or 'court_batch' for a court's latest cases
+        case_url: URL of the case to import
+        court: Court name for batch imports
+        court_code: Kenya Law court code for batch imports
+        limit: Maximum number of cases in a batch
+
+    Returns:
+        IDs of the imported rulings and how many were imported (the crawl report for batches)
+    """
+    from utils.scraper import KenyaLawScraper
+
+    scraper = KenyaLawScraper()
+
+    if import_type == 'case_url':
+        context.set_progress(0.1, "Fetching case details")
+        case_details = scraper.stream_case_details(case_url)
+        if not case_details:
+            raise RuntimeError("Failed to retrieve case details from the provided URL")
+
+        context.check_cancelled()
+        rulings, errors = bulk_insert_rulings([(case_url, case_details)], user_id=context.user_id)
+        if errors:
+            raise RuntimeError(f"Error importing ruling: {errors[case_url]}")
+        ruling = rulings[0]
+        _record_activity(context.user_id, 'import_ruling', f"Imported ruling: {ruling.title}")
+        return {'ruling_ids': [ruling.id], 'imported_count': 1, 'title': ruling.title}
+
+    if import_type != 'court_batch':
+        raise ValueError(f"Unknown import type '{import_type}'")
+
+    # Judgments are fetched concurrently and written in batches
+    report = RulingCrawler(scraper=scraper).crawl_court(
+        court_code, limit=limit, default_court=court, user_id=context.user_id,
+        progress=context.set_progress, should_stop=context.is_cancelled
+    )
+    context.check_cancelled()
+    if not report['discovered']:
+        raise RuntimeError(f"No cases found for {court}")
+
+    _record_activity(context.user_id, 'import_batch_rulings', f"Imported {report['imported_count']} rulings from {court}")
+    report['court'] = court
+    return report
+
+
+@job_handler('sync_rulings')
+def sync_rulings(context: JobContext, court_codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Import the judgments published since each court's last sync
+
+    Args:
+        context: Job context
+        court_codes: Court codes to sync (defaults to RULING_SYNC_COURTS)
+
+    Returns:
+        Sync reports by court code and the total number of imported rulings
+    """
+    from utils.ruling_sync import RulingSync
+
+    result = RulingSync().sync_all(court_codes, user_id=context.user_id, progress=context.set_progress,
+                                   should_stop=context.is_cancelled)
+    context.check_cancelled()
+    return result
+
+
+@job_handler('index_rulings')
+def index_rulings(context: JobContext, batch_size: Optional[int] = None, passages: bool = True) -> Dict[str, Any]:
+    """
+    Add every ruling to the vector database's case collection, and its full text as passages
+
+    Rulings are read from the database and embedded in batches, keyed by their primary
+    key, so running the job again updates the indexed rulings instead of duplicating them.
+
+    Args:
+        context: Job context
+        batch_size: Rulings embedded and written together (defaults to VECTOR_DB_BULK_BATCH_SIZE)
+        passages: Also split each ruling's full text into passages for passage search
+
+    Returns:
+        Throughput report of the indexing run, with the passage indexing report under 'passages'
+    """
+    from utils.vector_db import VectorDatabase
+
+    batch_size = batch_size or config.VECTOR_DB_BULK_BATCH_SIZE
+    total = Ruling.query.count()
+    vector_db = VectorDatabase()
+
+    def records(with_text=False):
+        query = Ruling.query.order_by(Ruling.id)
+        if with_text:
+            # Load the text column with each batch rather than one query per ruling
+            query = query.options(db.undefer(Ruling._full_text))
+        for ruling in query.yield_per(batch_size):
+            record = {
+                'id': ruling.id,
+                'title': ruling.title,
+                'citation': ruling.citation,
+                'court': ruling.court,
+                'date': ruling.date_of_ruling,
+                'url': ruling.url,
+                'summary': ruling.summary,
+                'category': ruling.category,
+                'is_landmark': ruling.is_landmark
+            }
+            if with_text:
+                record['full_text'] = ruling.full_text
+            yield record
+
+    def reporter(start, share):
+        def report(progress, message):
+            context.check_cancelled()
+            context.set_progress(start + progress * share, message)
+        return report
+
+    context.set_progress(0.0, f"Indexing {total} rulings")
+    result = vector_db.add_cases_bulk(records(), batch_size=batch_size,
+                                      progress=reporter(0.0, 0.3 if passages else 1.0), total=total)
+    if passages:
+        result['passages'] = vector_db.index_ruling_passages(records(with_text=True), batch_size=batch_size,
+                                                             progress=reporter(0.3, 0.7), total=total)
+    return result
+
+periodic_job('sync_rulings', config.RULING_SYNC_INTERVAL)
@@ -0,0 +1,596 @@
+"""
+Persistent background job queue for long-running research, analysis and import work.
+
+Jobs are rows in the database-backed ``job`` table, so the queue works on SQLite and
+Postgres without Redis. A worker claims a job with a conditional UPDATE, which lets any
+number of worker threads and processes share the table safely. Workers either run on
+threads inside the web process (started on the first enqueue when JOB_IN_PROCESS is set)
+or in a separate process:
+
+    python -m utils.job_queue --workers 4
+
+Job types registered with periodic_job() are also enqueued by the workers on a fixed
+interval, which is how the Kenya Law sync stays current without a separate scheduler.
+Standalone workers run the schedule; in-process workers only do when
+JOB_IN_PROCESS_PERIODIC is set, in which case they start with the app. Each run is
+claimed by a conditional UPDATE of its job type's JobSchedule row, so however many
+workers run the schedule, a run is queued once.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+import config
+from app import db
+from models import Job, JobSchedule, User
+
+logger = logging.getLogger(__name__)
+
+# Modules whose import registers the job handlers
+HANDLER_MODULES = ('utils.job_handlers',)
+
+_handlers: Dict[str, Callable[..., Any]] = {}
+
+# job type -> (interval in seconds, handler params)
+_periodic_jobs: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once cancellation of its job has been requested"""
+
+
+def job_handler(job_type: str):
+    """
+    Register a function as the handler for a job type
+
+    The handler is called with a JobContext followed by the job's params as keyword
+    arguments; its JSON-serializable return value is stored as the job's result.
+
+    Args:
+        job_type: Name the job is enqueued under
+
+    Returns:
+        Decorator registering the handler
+    """
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def load_handlers():
+    """Import the modules that register job handlers"""
+    for module_name in HANDLER_MODULES:
+        importlib.import_module(module_name)
+
+
+def get_handler(job_type: str) -> Optional[Callable[..., Any]]:
+    """Get the handler registered for a job type, or None"""
+    load_handlers()
+    return _handlers.get(job_type)
+
+
+def periodic_job(job_type: str, interval: float, params: Optional[Dict[str, Any]] = None):
+    """
+    Have the workers enqueue a job type on a fixed interval
+
+    Args:
+        job_type: Registered job type
+        interval: Seconds between runs (0 or less leaves the job unscheduled)
+        params: JSON-serializable keyword arguments for the handler
+    """
+    if interval and interval > 0:
+        _periodic_jobs[job_type] = (interval, params or {})
+    else:
+        _periodic_jobs.pop(job_type, None)
+
+
+def enqueue_due_jobs(now: Optional[datetime] = None) -> List[int]:
+    """
+    Enqueue the periodic jobs that are due
+
+    A periodic job is due when its latest run has finished and its schedule's next run
+    time has passed, so a slow run is never overlapped by the next one. The run is
+    claimed by advancing the schedule with a conditional UPDATE in the transaction that
+    queues the job, so workers in several processes never queue the same run twice.
+
+    Args:
+        now: Current time (UTC)
+
+    Returns:
+        IDs of the queued jobs
+    """
+    load_handlers()
+    now = now or datetime.utcnow()
+    queued = []
+    table = JobSchedule.__table__
+    for job_type, (interval, params) in list(_periodic_jobs.items()):
+        latest = Job.query.filter_by(job_type=job_type).order_by(Job.id.desc()).first()
+        if latest is not None and not latest.is_finished:
+            continue
+        first_run_at = latest.created_at + timedelta(seconds=interval) if latest is not None else now
+        _ensure_schedule(job_type, first_run_at)
+        # Don't hold the read transaction open while claiming (SQLite would block the write)
+        db.session.rollback()
+
+        with db.engine.begin() as conn:
+            claimed = conn.execute(
+                update(table)
+                .where(table.c.job_type == job_type, table.c.next_run_at <= now)
+                .values(next_run_at=now + timedelta(seconds=interval), updated_at=now)
+            ).rowcount
+            if not claimed:
+                continue
+            job_id = conn.execute(
+                insert(Job.__table__).values(job_type=job_type, status=Job.QUEUED, params=json.dumps(params))
+            ).inserted_primary_key[0]
+            conn.execute(update(table).where(table.c.job_type == job_type).values(last_job_id=job_id))
+        queued.append(job_id)
+        logger.info(f"Queued periodic job {job_id} ({job_type})")
+    db.session.rollback()
+    return queued
+
+
+def _ensure_schedule(job_type: str, next_run_at: datetime):
+    """Create the schedule row of a periodic job type if no worker has yet"""
+    if JobSchedule.query.filter_by(job_type=job_type).first() is not None:
+        return
+    db.session.add(JobSchedule(job_type=job_type, next_run_at=next_run_at))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker created it first
+        db.session.rollback()
+
+
+def enqueue(job_type: str, params: Optional[Dict[str, Any]] = None, user_id: Optional[int] = None) -> Job:
+    """
+    Add a job to the queue
+
+    Commits the current session so the job (and anything the caller added alongside it,
+    such as a token charge) is visible to workers in other threads and processes.
+
+    Args:
+        job_type: Registered job type
+        params: JSON-serializable keyword arguments for the handler
+        user_id: User the job belongs to
+
+    Returns:
+        The queued job
+    """
+    if get_handler(job_type) is None:
+        raise ValueError(f"No handler registered for job type '{job_type}'")
+
+    job = Job(job_type=job_type, status=Job.QUEUED, params=json.dumps(params or {}), user_id=user_id)
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Queued job {job.id} ({job_type})")
+
+    if config.JOB_IN_PROCESS:
+        ensure_worker_started(current_app._get_current_object()).notify()
+    return job
+
+
+def cancel_job(job_id: int) -> bool:
+    """
+    Cancel a job
+
+    Queued jobs are cancelled straight away (refunding the tokens charged for them);
+    running jobs are flagged and stop at the handler's next cancellation check.
+
+    Args:
+        job_id: Job ID
+
+    Returns:
+        True if the job was queued or running, False if it had already finished
+    """
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        cancelled = conn.execute(
+            update(Job.__table__)
+            .where(Job.__table__.c.id == job_id, Job.__table__.c.status == Job.QUEUED)
+            .values(status=Job.CANCELLED, cancel_requested=True, message='Cancelled', finished_at=now)
+        ).rowcount
+        if not cancelled:
+            flagged = conn.execute(
+                update(Job.__table__)
+                .where(Job.__table__.c.id == job_id, Job.__table__.c.status == Job.RUNNING)
+                .values(cancel_requested=True, message='Cancelling')
+            ).rowcount
+    if cancelled:
+        # The handler will never run, so the job's tokens are refunded here
+        _refund_tokens(job_id)
+        return True
+    return bool(flagged)
+
+
+def claim_next_job(worker_id: str, job_types: Optional[Sequence[str]] = None) -> Optional[int]:
+    """
+    Claim the oldest queued job for a worker
+
+    The claim is a conditional UPDATE on the job's status, so two workers racing for the
+    same row cannot both win; the loser moves on to the next candidate.
+
+    Args:
+        worker_id: Identifier of the claiming worker
+        job_types: Only claim jobs of these types (defaults to any type)
+
+    Returns:
+        ID of the claimed job, or None if the queue is empty
+    """
+    table = Job.__table__
+    query = select(table.c.id).where(table.c.status == Job.QUEUED)
+    if job_types:
+        query = query.where(table.c.job_type.in_(list(job_types)))
+    with db.engine.begin() as conn:
+        candidates = conn.execute(query.order_by(table.c.id).limit(5)).scalars().all()
+
+    for job_id in candidates:
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            claimed = conn.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == Job.QUEUED)
+                .values(status=Job.RUNNING, worker_id=worker_id, started_at=now, heartbeat_at=now,
+                        message='Started')
+            ).rowcount
+        if claimed:
+            return job_id
+    return None
+
+
+def requeue_stale_jobs(max_age: Optional[float] = None) -> int:
+    """
+    Put running jobs whose worker stopped sending heartbeats back on the queue
+
+    Args:
+        max_age: Seconds without a heartbeat before a job counts as stale
+
+    Returns:
+        Number of jobs requeued
+    """
+    max_age = config.JOB_STALE_SECONDS if max_age is None else max_age
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    table = Job.__table__
+    with db.engine.begin() as conn:
+        requeued = conn.execute(
+            update(table)
+            .where(table.c.status == Job.RUNNING, table.c.heartbeat_at < cutoff)
+            .values(status=Job.QUEUED, worker_id=None, message='Requeued after the worker stopped responding')
+        ).rowcount
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale job(s)")
+    return requeued
+
+
+def _update_job(job_id: int, **values):
+    """Write job bookkeeping on its own connection, outside the handler's session"""
+    with db.engine.begin() as conn:
+        conn.execute(update(Job.__table__).where(Job.__table__.c.id == job_id).values(**values))
+
+
+def _finish_job(job_id: int, status: str, **values) -> bool:
+    """
+    Record the final status of a job that is still queued or running
+
+    A failed or cancelled job's 'tokens_charged' are refunded to its user. The update is
+    conditional, so only the call that finishes the job refunds them.
+
+    Args:
+        job_id: Job ID
+        status: SUCCEEDED, FAILED or CANCELLED
+        **values: Other columns to write
+
+    Returns:
+        True if this call finished the job
+    """
+    table = Job.__table__
+    with db.engine.begin() as conn:
+        finished = conn.execute(
+            update(table)
+            .where(table.c.id == job_id, table.c.status.in_([Job.QUEUED, Job.RUNNING]))
+            .values(status=status, finished_at=datetime.utcnow(), **values)
+        ).rowcount
+    if finished and status in (Job.FAILED, Job.CANCELLED):
+        _refund_tokens(job_id)
+    return bool(finished)
+
+
+def _refund_tokens(job_id: int):
+    """Give a failed or cancelled job's user back the tokens charged when it was queued"""
+    try:
+        job = db.session.get(Job, job_id)
+        tokens = job.get_params().get('tokens_charged') if job else None
+        user = db.session.get(User, job.user_id) if tokens and job.user_id else None
+        if user is None:
+            return
+        user.add_tokens(tokens)
+        db.session.commit()
+        logger.info(f"Refunded {tokens} tokens for job {job_id} to user {user.id}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Could not refund the tokens of job {job_id}: {str(e)}")
+
+
+class JobContext:
+    """
+    Handle given to a job handler for reporting progress and honouring cancellation
+
+    Progress is written on its own connection, so on SQLite a handler should commit its
+    own work before reporting progress rather than hold a write transaction open.
+    """
+
+    def __init__(self, job_id: int, user_id: Optional[int] = None):
+        self.job_id = job_id
+        self.user_id = user_id
+
+    def set_progress(self, progress: float, message: Optional[str] = None):
+        """
+        Record how far the job has got
+
+        Args:
+            progress: Fraction complete, 0.0 - 1.0
+            message: Short description of the current step
+        """
+        values = {'progress': max(0.0, min(1.0, progress)), 'heartbeat_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message[:255]
+        try:
+            _update_job(self.job_id, **values)
+        except Exception as e:
+            # Losing a progress update must not fail the job
+            logger.warning(f"Could not record progress for job {self.job_id}: {str(e)}")
+
+    def is_cancelled(self) -> bool:
+        """Whether cancellation of the job has been requested"""
+        with db.engine.connect() as conn:
+            return bool(conn.execute(
+                select(Job.__table__.c.cancel_requested).where(Job.__table__.c.id == self.job_id)
+            ).scalar())
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation of the job has been requested"""
+        if self.is_cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+def run_job(job_id: int) -> Optional[str]:
+    """
+    Run a claimed job to completion and store its outcome
+
+    Must be called inside an application context.
+
+    Args:
+        job_id: ID of a job claimed with claim_next_job()
+
+    Returns:
+        The job's final status, or None if the job does not exist
+    """
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return None
+    job_type, params = job.job_type, job.get_params()
+    context = JobContext(job.id, job.user_id)
+    # Don't hold the read transaction open while the handler runs
+    db.session.rollback()
+
+    handler = get_handler(job_type)
+    if handler is None:
+        _finish_job(job_id, Job.FAILED, error=f"No handler registered for job type '{job_type}'")
+        return Job.FAILED
+
+    started = time.monotonic()
+    try:
+        context.check_cancelled()
+        result = handler(context, **params)
+    except JobCancelled:
+        db.session.rollback()
+        _finish_job(job_id, Job.CANCELLED, message='Cancelled')
+        logger.info(f"Job {job_id} ({job_type}) cancelled")
+        return Job.CANCELLED
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Job {job_id} ({job_type}) failed: {str(e)}")
+        _finish_job(job_id, Job.FAILED, error=str(e), message='Failed')
+        return Job.FAILED
+    finally:
+        db.session.remove()
+
+    _finish_job(job_id, Job.SUCCEEDED, progress=1.0, message='Completed', result=json.dumps(result, default=str))
+    logger.info(f"Job {job_id} ({job_type}) succeeded in {time.monotonic() - started:.2f}s")
+    return Job.SUCCEEDED
+
+
+class JobWorker:
+    """
+    Pool of threads that claim and run queued jobs
+
+    Each thread polls the queue, sleeping between polls unless notify() is called; a
+    separate thread keeps the heartbeat of the running jobs fresh so other workers don't
+    requeue them.
+    """
+
+    def __init__(self, app, concurrency: Optional[int] = None, poll_interval: Optional[float] = None,
+                 run_periodic: bool = False, job_types: Optional[Sequence[str]] = None):
+        """
+        Initialize the worker
+
+        Args:
+            app: Flask application providing the database
+            concurrency: Number of jobs run at once
+            poll_interval: Seconds an idle thread waits before polling again
+            run_periodic: Whether this worker enqueues the periodic jobs when they are due
+            job_types: Only run jobs of these types (defaults to any type)
+        """
+        self.app = app
+        self.run_periodic = run_periodic
+        self.job_types = tuple(job_types) if job_types else None
+        self.concurrency = concurrency or config.JOB_WORKERS
+        self.poll_interval = config.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.pid = os.getpid()
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._running_jobs = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads"""
+        load_handlers()
+        with self.app.app_context():
+            requeue_stale_jobs()
+            if self.run_periodic:
+                enqueue_due_jobs()
+
+        for number in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-worker-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Job worker {self.worker_id} started with {self.concurrency} thread(s)")
+        return self
+
+    def notify(self):
+        """Wake an idle thread to pick up a newly queued job"""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop polling for jobs and wait for the running ones to finish
+
+        Args:
+            timeout: Seconds to wait for each thread
+        """
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_forever(self):
+        """Run the worker in the foreground until interrupted"""
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Stopping job worker; waiting for running jobs")
+            self.stop()
+
+    def run_pending(self) -> int:
+        """
+        Run queued jobs on the calling thread until the queue is empty
+
+        Returns:
+            Number of jobs run
+        """
+        count = 0
+        while self._run_next():
+            count += 1
+        return count
+
+    def _run_next(self) -> bool:
+        """Claim and run one job; returns False if the queue was empty"""
+        with self.app.app_context():
+            job_id = claim_next_job(self.worker_id, self.job_types)
+            if job_id is None:
+                return False
+            with self._running_lock:
+                self._running_jobs.add(job_id)
+            try:
+                run_job(job_id)
+            finally:
+                with self._running_lock:
+                    self._running_jobs.discard(job_id)
+        return True
+
+    def _run(self):
+        """Thread body: run jobs until stopped"""
+        while not self._stop.is_set():
+            try:
+                if self._run_next():
+                    continue
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id} error: {str(e)}")
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    def _heartbeat(self):
+        """Thread body: refresh the heartbeat of running jobs, requeue stale ones and enqueue due periodic jobs"""
+        while not self._stop.wait(config.JOB_HEARTBEAT_INTERVAL):
+            with self._running_lock:
+                job_ids = list(self._running_jobs)
+            try:
+                with self.app.app_context():
+                    if job_ids:
+                        with db.engine.begin() as conn:
+                            conn.execute(
+                                update(Job.__table__)
+                                .where(Job.__table__.c.id.in_(job_ids))
+                                .values(heartbeat_at=datetime.utcnow())
+                            )
+                    requeue_stale_jobs()
+                    if self.run_periodic and enqueue_due_jobs():
+                        with self._wakeup:
+                            self._wakeup.notify_all()
+            except Exception as e:
+                logger.warning(f"Job worker heartbeat failed: {str(e)}")
+
+
+def ensure_worker_started(app) -> JobWorker:
+    """
+    Start the in-process worker if this process doesn't have one yet
+
+    Args:
+        app: Flask application providing the database
+
+    Returns:
+        The process's worker
+    """
+    global _worker
+    with _worker_lock:
+        # A forked web worker inherits the object but not its threads
+        if _worker is None or _worker.pid != os.getpid():
+            _worker = JobWorker(app, run_periodic=config.JOB_RUN_PERIODIC and config.JOB_IN_PROCESS_PERIODIC).start()
+        return _worker
+
+
+def main(argv=None):
+    """Run a standalone job worker"""
+    parser = argparse.ArgumentParser(description="Run background jobs from the job table")
+    parser.add_argument('--workers', type=int, default=config.JOB_WORKERS, help="Jobs run at once")
+    parser.add_argument('--poll-interval', type=float, default=config.JOB_POLL_INTERVAL,
+                        help="Seconds between polls of an empty queue")
+    parser.add_argument('--no-periodic', action='store_true', help="Don't enqueue periodic jobs from this worker")
+    parser.add_argument('--job-types', nargs='+', help="Only run jobs of these types")
+    args = parser.parse_args(argv)
+
+    from app import app
+    JobWorker(app, concurrency=args.workers, poll_interval=args.poll_interval,
+              run_periodic=config.JOB_RUN_PERIODIC and not args.no_periodic,
+              job_types=args.job_types).run_forever()
+
+
+if __name__ == "__main__":
+    # Go through the imported module so handlers register in the same registry
+    from utils.job_queue import main as run_worker
+    run_worker()
@@ -1,9 +1,19 @@
 import os
+import re
 import json
+import hashlib
 import logging
-import requests
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 import config
+from utils.http_session import get_http_session
+from utils.embedding_cache import cached_embeddings
+from utils.response_cache import get_response_cache
+from utils.circuit_breaker import get_circuit_breaker
+from utils.text_chunking import estimate_tokens, chunk_text, truncate_to_tokens
 
 try:
     from openai import OpenAI
@@ -33,6 +43,51 @@ LLM_MODELS = {
     }
 }
 
+def _embed_in_batches(texts: List[str], embed_batch, batch_size: Optional[int] = None,
+                      max_concurrency: Optional[int] = None) -> List[List[float]]:
+    """
+    Split texts into batches and embed them with bounded concurrency
+    
+    Args:
+        texts: Texts to embed
+        embed_batch: Function taking a list of texts and returning their embeddings in order
+        batch_size: Maximum number of texts per request (defaults to config.EMBEDDING_BATCH_SIZE)
+        max_concurrency: Maximum number of batches in flight (defaults to config.EMBEDDING_MAX_CONCURRENCY)
+        
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    
+    batch_size = max(1, batch_size or config.EMBEDDING_BATCH_SIZE)
+    max_concurrency = max(1, max_concurrency or config.EMBEDDING_MAX_CONCURRENCY)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    
+    if len(batches) == 1 or max_concurrency == 1:
+        results = [embed_batch(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches)),
+                                thread_name_prefix="embed") as executor:
+            results = list(executor.map(embed_batch, batches))
+    
+    return [embedding for batch_result in results for embedding in batch_result]
+
+
+def _extract_batch_embeddings(embeddings, expected: int):
+    """Accept a batch embedding response only if it has one vector per input text"""
+    if not embeddings or len(embeddings) != expected or not all(embeddings):
+        return None
+    return embeddings
+
+
+def _split_into_chunks(text: str) -> Iterator[str]:
+    """Split text into word-sized chunks that join back to the original text"""
+    chunks = re.findall(r'\s*\S+\s*', text or "")
+    return iter(chunks or [text])
+
+
 class MockLLMClient:
     """
     Mock LLM client that provides reasonable responses without requiring an actual LLM.
@@ -43,6 +98,11 @@ class MockLLMClient:
         """Initialize mock client"""
         logger.info("Initialized Mock LLM client (fallback responses)")
     
+    @property
+    def breaker_names(self) -> List[str]:
+        """The mock client has no backend to guard"""
+        return []
+    
     def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
         Generate a mock response based on the type of prompt
@@ -96,6 +156,36 @@ class MockLLMClient:
         
         return "[This is a mock response as the LLM service is currently unavailable. Please ensure Ollama server is running and properly configured if you need AI-generated responses.]"
     
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream a mock response word by word
+        
+        Args:
+            prompt: The prompt to generate a response for
+            model: Ignored in mock client
+            temperature: Ignored in mock client
+            max_tokens: Ignored in mock client
+            
+        Yields:
+            Chunks of the mock response, which join to the generate() result
+        """
+        yield from _split_into_chunks(self.generate(prompt))
+    
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream a mock chat response word by word
+        
+        Args:
+            messages: List of message objects (used to extract the last user message)
+            model: Ignored in mock client
+            temperature: Ignored in mock client
+            max_tokens: Ignored in mock client
+            
+        Yields:
+            Chunks of the mock response, which join to the chat() result
+        """
+        yield from _split_into_chunks(self.chat(messages))
+    
     def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """
         Generate a mock embedding
@@ -121,6 +211,20 @@ class MockLLMClient:
         # Generate a 384-dimension embedding with values between -1 and 1
         return [random.uniform(-1, 1) for _ in range(384)]
     
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Generate mock embeddings for several texts
+        
+        Args:
+            texts: The texts to get embeddings for
+            model: Ignored in mock client
+            batch_size: Ignored in mock client
+            
+        Returns:
+            List of mock embedding vectors in the same order as texts
+        """
+        return [self.get_embedding(text) for text in texts]
+    
     def _mock_case_analysis(self) -> str:
         """Generate a mock case analysis"""
         return """# Case Analysis
@@ -346,22 +450,13 @@ This decision clarifies the application of withholding tax on reinsurance premiu
 """
 
 
-def get_llm_client():
+def _probe_llm_backend():
     """
-    Get the appropriate LLM client based on available services
+    Probe the configured LLM backends and build a client for the first healthy one
     
     Returns:
-        A configured LLM client
+        A configured LLM client, or None if no backend responded
     """
-    # First try OpenAI if API key is available
-    if OPENAI_AVAILABLE and os.environ.get("OPENAI_API_KEY"):
-        logger.info("Using OpenAI client")
-        return OpenAIClient()
-    
-    # Create a MockLLMClient if Ollama is not available but still allow application to function
-    mock_client = MockLLMClient()
-    
-    # Then try Ollama with counter-checking if enabled
     try:
         # List of potential Ollama API endpoints to check
         endpoints_to_check = [
@@ -374,12 +469,13 @@ def get_llm_client():
         # Log the configured Ollama URL for debugging
         logger.info(f"Attempting to connect to Ollama at base URL: {config.OLLAMA_BASE_URL}")
         
+        session = get_http_session()
         ollama_detected = False
         for endpoint in endpoints_to_check:
             try:
                 url = f"{config.OLLAMA_BASE_URL}{endpoint}"
                 logger.info(f"Testing Ollama API endpoint: {url}")
-                response = requests.get(url, timeout=2)
+                response = session.get(url, timeout=config.LLM_PROBE_TIMEOUT)
                 status = response.status_code
                 logger.info(f"Response from {url}: status code {status}")
                 
@@ -392,8 +488,7 @@ def get_llm_client():
         
         if not ollama_detected:
             logger.warning(f"Ollama server not available at {config.OLLAMA_BASE_URL} - tried multiple endpoints")
-            logger.info("Using Mock LLM client instead")
-            return mock_client
+            return None
         
         if config.ENABLE_LLM_COUNTERCHECK:
             # Create counter-check client with primary and secondary models
@@ -404,7 +499,7 @@ def get_llm_client():
             # Test connection with reduced timeout
             try:
                 test_result = counter_client.generate("Test", max_tokens=5)
-                if test_result is not None:
+                if not _is_failed_response(test_result):
                     logger.info("Using Counter-Check LLM client with multiple models")
                     return counter_client
             except Exception as e:
@@ -416,18 +511,408 @@ def get_llm_client():
         # Test connection with reduced timeout
         try:
             test_result = ollama_client.generate("Test", max_tokens=5)
-            if test_result is not None:
+            if not _is_failed_response(test_result):
                 logger.info("Using Ollama client with single model")
                 return ollama_client
         except Exception as e:
             logger.warning(f"Ollama client failed: {str(e)}")
-            # Fall through to mock client
     except Exception as e:
         logger.warning(f"Ollama setup failed: {str(e)}")
     
-    # Return MockLLMClient that provides reasonable fallback responses
-    logger.info("Using Mock LLM client for fallback responses")
-    return mock_client
+    return None
+
+
+class BackendStartingLLMClient:
+    """
+    Stand-in client for requests that arrive while the first backend probe is still running.
+    Text requests get an error response (so failover moves on and nothing is cached) and
+    embedding requests raise, rather than serving mock output from a healthy backend's place.
+    """
+    
+    MESSAGE = "[Error: the LLM backend is still starting - please try again shortly]"
+    
+    @property
+    def breaker_names(self) -> List[str]:
+        """No circuit breakers guard the stand-in"""
+        return []
+    
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Report that the backend is still starting"""
+        return self.MESSAGE
+    
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Report that the backend is still starting"""
+        return self.MESSAGE
+    
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """Report that the backend is still starting"""
+        yield self.MESSAGE
+    
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """Report that the backend is still starting"""
+        yield self.MESSAGE
+    
+    def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Embeddings from another model would not match the index, so refuse"""
+        raise RuntimeError("The LLM backend is still starting")
+    
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embeddings from another model would not match the index, so refuse"""
+        raise RuntimeError("The LLM backend is still starting")
+
+
+class LazyLLMClient:
+    """
+    LLM client that selects its backend in the background.
+    Creating it never blocks: the health probe runs on a daemon thread, the first requests
+    wait for that probe, and MockLLMClient is used only once the probe has actually failed.
+    Requests that wait longer than LLM_PROBE_WAIT_TIMEOUT get a "backend still starting" error.
+    Failed probes are retried on an exponential backoff schedule, triggered by later requests.
+    """
+    
+    def __init__(self, probe=None):
+        """
+        Initialize the client and start the background probe
+        
+        Args:
+            probe: Function returning a healthy client or None (defaults to probing Ollama)
+        """
+        self._probe = probe or _probe_llm_backend
+        self._lock = threading.Lock()
+        self._probe_done = threading.Event()
+        self._client = None
+        self._mock_client = MockLLMClient()
+        self._starting_client = BackendStartingLLMClient()
+        self._probing = False
+        self._failures = 0
+        self._next_probe_at = 0.0
+        self._start_probe()
+    
+    def _start_probe(self) -> None:
+        """Start a background probe unless one is already running"""
+        with self._lock:
+            if self._probing:
+                return
+            self._probing = True
+        threading.Thread(target=self._run_probe, name="llm-probe", daemon=True).start()
+    
+    def _run_probe(self) -> None:
+        """Probe the backends and record the outcome"""
+        try:
+            client = self._probe()
+        except Exception as e:
+            logger.warning(f"LLM backend probe failed: {str(e)}")
+            client = None
+        
+        with self._lock:
+            self._probing = False
+            if client is not None:
+                self._client = client
+                self._failures = 0
+                logger.info(f"LLM backend selected: {type(client).__name__}")
+            else:
+                # Back off exponentially between probes while the backend stays down
+                self._failures += 1
+                delay = min(config.LLM_REPROBE_INITIAL_DELAY * (2 ** (self._failures - 1)), config.LLM_REPROBE_MAX_DELAY)
+                self._next_probe_at = time.monotonic() + delay
+                logger.info(f"Using Mock LLM client for fallback responses - probing again in {delay:.0f} seconds")
+        self._probe_done.set()
+    
+    def wait_for_probe(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the first probe to finish
+        
+        Args:
+            timeout: Seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if the probe has finished
+        """
+        return self._probe_done.wait(timeout)
+    
+    @property
+    def active_client(self):
+        """The client requests are sent to right now"""
+        if not self._probe_done.wait(timeout=config.LLM_PROBE_WAIT_TIMEOUT):
+            # The backend may well be healthy, so don't answer with mock text in its place
+            logger.warning("LLM backend probe is still running - reporting the backend as starting for this request")
+            return self._starting_client
+        
+        with self._lock:
+            client = self._client
+            reprobe = client is None and not self._probing and time.monotonic() >= self._next_probe_at
+        if reprobe:
+            self._start_probe()
+        if client is not None and not _backend_available(client):
+            # Every circuit of the selected backend is open - don't wait on it
+            return self._mock_client
+        return client or self._mock_client
+    
+    @property
+    def breaker_names(self) -> List[str]:
+        """Circuit breakers of the selected backend (none while probing or on the mock fallback)"""
+        with self._lock:
+            client = self._client
+        return client.breaker_names if client is not None else []
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the backend selection state
+        
+        Returns:
+            Dictionary with the probe state, selected client and failure count
+        """
+        with self._lock:
+            if not self._probe_done.is_set():
+                state = "probing"
+            elif self._client is not None:
+                state = "healthy"
+            else:
+                state = "fallback"
+            return {
+                "state": state,
+                "client": type(self._client or self._mock_client).__name__,
+                "consecutive_failures": self._failures,
+                "next_probe_in": max(0.0, self._next_probe_at - time.monotonic()) if self._client is None else None
+            }
+    
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate text with the active client"""
+        return self.active_client.generate(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def generate_with_client(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7,
+                             max_tokens: int = 1000) -> Tuple[str, Any]:
+        """Generate text with the active client, also returning the client that answered"""
+        return _generate_with_client(self.active_client, prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate a chat response with the active client"""
+        return self.active_client.chat(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """Stream text from the active client"""
+        return self.active_client.generate_stream(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """Stream a chat response from the active client"""
+        return self.active_client.chat_stream(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Get an embedding from the active client"""
+        return self.active_client.get_embedding(text, model)
+    
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """Get embeddings for several texts from the active client"""
+        return self.active_client.get_embeddings(texts, model, batch_size)
+    
+    def __getattr__(self, name):
+        # Client-specific attributes (model, get_agreement, ...) come from the active client
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.active_client, name)
+
+
+def _backend_available(client) -> bool:
+    """Whether at least one circuit breaker of a client would let a request through"""
+    names = getattr(client, "breaker_names", None) or []
+    return not names or any(get_circuit_breaker(name).is_available() for name in names)
+
+
+def _backend_health_key(client):
+    """Sort key for a client's health based on its circuit breakers (lower is healthier)"""
+    names = getattr(client, "breaker_names", None) or []
+    return min((get_circuit_breaker(name).health_key() for name in names), default=(False, False, 0.0))
+
+
+class FailoverLLMClient:
+    """
+    LLM client that routes each request to the healthiest backend.
+    Backends whose circuits are all open are skipped, slow or error-prone backends are tried
+    after healthy ones, a failed response moves on to the next backend, and MockLLMClient
+    answers when every backend has failed.
+    """
+    
+    def __init__(self, backends: List[Any], fallback=None):
+        """
+        Initialize the failover client
+        
+        Args:
+            backends: Clients in order of preference
+            fallback: Client used when every backend fails (defaults to MockLLMClient)
+        """
+        self.backends = backends
+        self.fallback = fallback or MockLLMClient()
+        logger.info(f"Initialized failover LLM client with backends: {', '.join(type(backend).__name__ for backend in backends)}")
+    
+    @property
+    def breaker_names(self) -> List[str]:
+        """Circuit breakers of every backend"""
+        return [name for backend in self.backends for name in (getattr(backend, "breaker_names", None) or [])]
+    
+    def ranked_backends(self) -> List[Any]:
+        """
+        Backends that can take a request, healthiest first
+        
+        Returns:
+            List of clients; configured order breaks ties
+        """
+        available = [(index, backend) for index, backend in enumerate(self.backends) if _backend_available(backend)]
+        available.sort(key=lambda item: (_backend_health_key(item[1]), item[0]))
+        return [backend for _, backend in available]
+    
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate text with the healthiest backend, failing over on errors"""
+        return self.generate_with_client(prompt, model=model, temperature=temperature, max_tokens=max_tokens)[0]
+    
+    def generate_with_client(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7,
+                             max_tokens: int = 1000) -> Tuple[str, Any]:
+        """Generate text like generate, also returning the client that answered"""
+        for backend in self.ranked_backends():
+            response, client = _generate_with_client(backend, prompt, model=model, temperature=temperature,
+                                                     max_tokens=max_tokens)
+            if not _is_failed_response(response):
+                return response, client
+            logger.warning(f"{type(backend).__name__} failed, trying the next LLM backend")
+        return self.fallback.generate(prompt, model=model, temperature=temperature, max_tokens=max_tokens), self.fallback
+    
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """Generate a chat response with the healthiest backend, failing over on errors"""
+        return self._call("chat", messages, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """Stream text from the healthiest backend, failing over if it errors before streaming"""
+        yield from self._stream("generate_stream", prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """Stream a chat response from the healthiest backend, failing over if it errors before streaming"""
+        yield from self._stream("chat_stream", messages, model=model, temperature=temperature, max_tokens=max_tokens)
+    
+    def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Get an embedding from the preferred backend (no failover - vector spaces differ between backends)"""
+        return self.backends[0].get_embedding(text, model)
+    
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """Get embeddings from the preferred backend (no failover - vector spaces differ between backends)"""
+        return self.backends[0].get_embeddings(texts, model, batch_size)
+    
+    def _call(self, method: str, *args, **kwargs):
+        for backend in self.ranked_backends():
+            response = getattr(backend, method)(*args, **kwargs)
+            if not _is_failed_response(response):
+                return response
+            logger.warning(f"{type(backend).__name__} failed, trying the next LLM backend")
+        return getattr(self.fallback, method)(*args, **kwargs)
+    
+    def _stream(self, method: str, *args, **kwargs) -> Iterator[str]:
+        for backend in self.ranked_backends():
+            chunks = getattr(backend, method)(*args, **kwargs)
+            first = next(chunks, None)
+            if first is None or _is_failed_response(first):
+                logger.warning(f"{type(backend).__name__} failed, trying the next LLM backend")
+                continue
+            yield first
+            yield from chunks
+            return
+        yield from getattr(self.fallback, method)(*args, **kwargs)
+
+
+def _generate_with_client(client, prompt: str, **kwargs) -> Tuple[str, Any]:
+    """
+    Generate text and report the client that actually answered
+    
+    Lazy and failover clients are looked through, so the answer can be attributed to the
+    backend (or mock fallback) that produced it.
+    
+    Args:
+        client: LLM client to generate with
+        prompt: The prompt to generate from
+        **kwargs: Arguments for generate (model, temperature, max_tokens)
+    
+    Returns:
+        Tuple of the response and the answering client
+    """
+    if isinstance(client, (LazyLLMClient, FailoverLLMClient)):
+        return client.generate_with_client(prompt, **kwargs)
+    return client.generate(prompt, **kwargs), client
+
+
+def _preferred_client(client):
+    """The client a request would be sent to first, looking through lazy and failover clients"""
+    if isinstance(client, LazyLLMClient):
+        return _preferred_client(client.active_client)
+    if isinstance(client, FailoverLLMClient):
+        backends = client.ranked_backends()
+        return _preferred_client(backends[0]) if backends else client.fallback
+    return client
+
+
+def _client_model(client) -> str:
+    """Name of the model a client answers with"""
+    return (getattr(client, 'model', None)
+            or getattr(client, 'primary_model', None)
+            or type(client).__name__)
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """
+    Get the process-wide LLM client
+    
+    Returns immediately: with an OpenAI API key requests go to OpenAI and fail over to Ollama,
+    otherwise a LazyLLMClient probes Ollama in the background and falls back to MockLLMClient.
+    
+    Returns:
+        A configured LLM client
+    """
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                # First try OpenAI if API key is available, failing over to Ollama
+                if OPENAI_AVAILABLE and os.environ.get("OPENAI_API_KEY"):
+                    logger.info("Using OpenAI client with Ollama failover")
+                    _llm_client = FailoverLLMClient([OpenAIClient(), LazyLLMClient()])
+                else:
+                    _llm_client = LazyLLMClient()
+    return _llm_client
+
+
+def reset_llm_client() -> None:
+    """Forget the process-wide LLM client so the next get_llm_client() selects again"""
+    global _llm_client
+    with _llm_client_lock:
+        _llm_client = None
+
+
+# OpenAI SDK clients keep their own HTTP connection pool, so share one per API key
+_openai_sdk_clients = {}
+_openai_sdk_clients_lock = threading.Lock()
+
+
+def _get_openai_sdk_client(api_key: str):
+    """
+    Get a shared OpenAI SDK client for the API key
+    
+    Args:
+        api_key: OpenAI API key
+        
+    Returns:
+        OpenAI SDK client instance
+    """
+    client = _openai_sdk_clients.get(api_key)
+    if client is None:
+        with _openai_sdk_clients_lock:
+            client = _openai_sdk_clients.get(api_key)
+            if client is None:
+                from openai import OpenAI
+                client = _openai_sdk_clients[api_key] = OpenAI(
+                    api_key=api_key,
+                    max_retries=config.HTTP_MAX_RETRIES
+                )
+    return client
 
 
 class OpenAIClient:
@@ -454,12 +939,18 @@ class OpenAIClient:
             self.client = None
         else:
             try:
-                from openai import OpenAI
-                self.client = OpenAI(api_key=self.api_key)
+                self.client = _get_openai_sdk_client(self.api_key)
                 logger.info(f"Initialized OpenAI client with model: {self.model}")
             except Exception as e:
                 logger.error(f"Failed to initialize OpenAI client: {str(e)}")
                 self.client = None
+        
+        self.breaker = get_circuit_breaker("openai")
+    
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding this client's backend"""
+        return ["openai"]
     
     def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
@@ -480,6 +971,10 @@ class OpenAIClient:
             
         model = model or self.model
         
+        if not self.breaker.allow_request():
+            return "[Error generating text with OpenAI: circuit open after repeated failures]"
+        
+        started = time.monotonic()
         try:
             response = self.client.chat.completions.create(
                 model=model,
@@ -491,12 +986,37 @@ class OpenAIClient:
                 max_tokens=max_tokens
             )
             
+            self.breaker.record_success(time.monotonic() - started)
             return response.choices[0].message.content
             
         except Exception as e:
+            self.breaker.record_failure(time.monotonic() - started)
             logger.error(f"Error generating text with OpenAI: {str(e)}")
             return f"[Error generating text with OpenAI: {str(e)}]"
     
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream a text completion from OpenAI as tokens arrive
+        
+        Args:
+            prompt: The prompt to generate a response for
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Generated text chunks
+        """
+        yield from self.chat_stream(
+            [
+                {"role": "system", "content": "You are a legal AI assistant for the Kenyan legal system."},
+                {"role": "user", "content": prompt}
+            ],
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    
     def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """
         Get embedding vector for text using OpenAI
@@ -515,17 +1035,57 @@ class OpenAIClient:
         # Use the latest text-embedding-3-small model (released after knowledge cutoff)
         embedding_model = model or self.embedding_model
         
-        try:
-            response = self.client.embeddings.create(
-                model=embedding_model,
-                input=text
-            )
-            
-            return response.data[0].embedding
+        def fetch(missing):
+            try:
+                response = self.client.embeddings.create(
+                    model=embedding_model,
+                    input=missing[0]
+                )
+                
+                return [response.data[0].embedding]
+                
+            except Exception as e:
+                logger.error(f"Error getting embedding from OpenAI: {str(e)}")
+                return [[]]
+        
+        # Repeated texts are served from the embedding cache
+        return cached_embeddings(f"openai/{embedding_model}", [text], fetch)[0]
+    
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Get embedding vectors for several texts using batched OpenAI requests
+        
+        Args:
+            texts: The texts to get embeddings for
+            model: Model to use (defaults to embedding model)
+            batch_size: Maximum number of texts per request (defaults to config.EMBEDDING_BATCH_SIZE)
             
-        except Exception as e:
-            logger.error(f"Error getting embedding from OpenAI: {str(e)}")
-            return []
+        Returns:
+            List of embeddings in the same order as texts (empty lists for failed texts)
+        """
+        if not self.client:
+            logger.error("OpenAI client not initialized. API key missing.")
+            return [[] for _ in texts]
+        
+        embedding_model = model or self.embedding_model
+        
+        def embed_batch(batch):
+            try:
+                response = self.client.embeddings.create(
+                    model=embedding_model,
+                    input=batch
+                )
+                ordered = sorted(response.data, key=lambda item: item.index)
+                return [item.embedding for item in ordered]
+            except Exception as e:
+                logger.error(f"Error getting batch embeddings from OpenAI: {str(e)}")
+                return [[] for _ in batch]
+        
+        # Only texts missing from the embedding cache are sent to the API
+        return cached_embeddings(
+            f"openai/{embedding_model}", texts,
+            lambda missing: _embed_in_batches(missing, embed_batch, batch_size)
+        )
     
     def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
@@ -546,6 +1106,10 @@ class OpenAIClient:
             
         model = model or self.model
         
+        if not self.breaker.allow_request():
+            return "[Error generating chat response with OpenAI: circuit open after repeated failures]"
+        
+        started = time.monotonic()
         try:
             response = self.client.chat.completions.create(
                 model=model,
@@ -554,93 +1118,187 @@ class OpenAIClient:
                 max_tokens=max_tokens
             )
             
+            self.breaker.record_success(time.monotonic() - started)
             return response.choices[0].message.content
             
         except Exception as e:
+            self.breaker.record_failure(time.monotonic() - started)
             logger.error(f"Error generating chat response with OpenAI: {str(e)}")
             return f"[Error generating chat response with OpenAI: {str(e)}]"
-
-
-class CounterCheckLLMClient:
-    """
-    Client for counter-checking responses between two different LLM models.
-    This client uses two Ollama models to generate responses and verifies they're consistent.
-    """
-    
-    def __init__(self, base_url=None, primary_model=None, secondary_model=None):
-        """
-        Initialize counter-check client with two model instances
-        
-        Args:
-            base_url: Base URL for OLLAMA API
-            primary_model: Primary model to use for generation
-            secondary_model: Secondary model to use for verification
-        """
-        # Import config here to avoid potential scope issues
-        import config as config_module
-        self.base_url = base_url or config_module.OLLAMA_BASE_URL
-        self.primary_model = primary_model or config_module.OLLAMA_PRIMARY_MODEL
-        self.secondary_model = secondary_model or config_module.OLLAMA_SECONDARY_MODEL
-        
-        # Create two OllamaClient instances, one for each model
-        self.primary_client = OllamaClient(base_url=self.base_url, model=self.primary_model)
-        self.secondary_client = OllamaClient(base_url=self.base_url, model=self.secondary_model)
-        
-        logger.info(f"Initialized CounterCheck client with models: {self.primary_model} (primary) and {self.secondary_model} (secondary)")
     
-    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
         """
-        Generate text completion using both models and counter-check results
+        Stream a chat completion from OpenAI as tokens arrive
         
         Args:
-            prompt: The prompt to generate a response for
-            model: Override model (will still use both for checking, but return this one's response)
+            messages: List of message objects with 'role' and 'content' keys
+            model: Model to use (defaults to configured model)
             temperature: Temperature for generation
             max_tokens: Maximum tokens to generate
             
-        Returns:
-            Generated text with confidence note
+        Yields:
+            Generated text chunks
         """
-        # Use specified model if provided, otherwise use primary
-        preferred_model = model or self.primary_model
-        
-        # Generate responses from both models
-        primary_response = self.primary_client.generate(
-            prompt=prompt, 
-            temperature=temperature, 
-            max_tokens=max_tokens
-        )
+        if not self.client:
+            logger.error("OpenAI client not initialized. API key missing.")
+            yield "[OpenAI API key not configured. Please set the OPENAI_API_KEY environment variable.]"
+            return
+            
+        model = model or self.model
         
-        secondary_response = self.secondary_client.generate(
-            prompt=prompt, 
-            temperature=temperature, 
-            max_tokens=max_tokens
-        )
+        if not self.breaker.allow_request():
+            yield "[Error generating chat response with OpenAI: circuit open after repeated failures]"
+            return
         
-        # If either model fails, return the successful one
-        if primary_response is None and secondary_response is None:
-            logger.error("Both LLM models failed to generate responses")
-            return "[Error: Both LLM models failed to generate responses]"
+        started = time.monotonic()
+        try:
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            self.breaker.record_success(time.monotonic() - started)
+            
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            self.breaker.record_failure(time.monotonic() - started)
+            logger.error(f"Error streaming chat response with OpenAI: {str(e)}")
+            yield f"[Error generating chat response with OpenAI: {str(e)}]"
+
+
+# Bounded pool shared by all counter-check clients for the concurrent model calls
+_counter_check_executor = None
+_counter_check_executor_lock = threading.Lock()
+
+
+def _get_counter_check_executor() -> ThreadPoolExecutor:
+    """Get the shared executor for counter-check fan-out, creating it on first use"""
+    global _counter_check_executor
+    if _counter_check_executor is None:
+        with _counter_check_executor_lock:
+            if _counter_check_executor is None:
+                _counter_check_executor = ThreadPoolExecutor(
+                    max_workers=config.COUNTERCHECK_MAX_WORKERS,
+                    thread_name_prefix="countercheck"
+                )
+    return _counter_check_executor
+
+
+def _is_failed_response(response) -> bool:
+    """Check whether a client response represents a failed generation"""
+    if response is None:
+        return True
+    if isinstance(response, str):
+        return response.startswith("Error generating") or response.startswith("[Error")
+    return False
+
+
+def _calculate_agreement(text1: str, text2: str) -> float:
+    """
+    Calculate similarity/agreement between two text responses
+    
+    Args:
+        text1: First text response
+        text2: Second text response
         
-        if primary_response is None:
-            logger.warning(f"Primary model ({self.primary_model}) failed, using secondary model response")
-            return f"{secondary_response}\n\n[Generated using only {self.secondary_model} due to primary model failure]"
+    Returns:
+        Float value between 0.0 and 1.0 representing agreement
+    """
+    # Simple string similarity based on word overlap for now
+    # Could be improved with embedding-based similarity in future
+    
+    # Normalize texts: lowercase, remove punctuation
+    def normalize(text):
+        # Remove common punctuation and lowercase
+        for char in '.,;:!?"\'()[]{}':
+            text = text.replace(char, ' ')
+        return text.lower()
+    
+    words1 = set(normalize(text1).split())
+    words2 = set(normalize(text2).split())
+    
+    # Calculate Jaccard similarity: intersection over union
+    intersection = len(words1.intersection(words2))
+    union = len(words1.union(words2))
+    
+    if union == 0:  # Avoid division by zero
+        return 0.0
         
-        if secondary_response is None:
-            logger.warning(f"Secondary model ({self.secondary_model}) failed, using primary model response")
-            return f"{primary_response}\n\n[Generated using only {self.primary_model} due to secondary model failure]"
+    return intersection / union
+
+
+class CounterCheckLLMClient:
+    """
+    Client for counter-checking responses between two different LLM models.
+    This client uses two Ollama models to generate responses and verifies they're consistent.
+    Both models are called concurrently; in "first_good" mode the preferred model's answer is
+    returned as soon as it arrives and the agreement score is computed in the background.
+    """
+    
+    MODE_BOTH = "both"
+    MODE_FIRST_GOOD = "first_good"
+    
+    def __init__(self, base_url=None, primary_model=None, secondary_model=None, session=None,
+                 mode=None, timeout=None):
+        """
+        Initialize counter-check client with two model instances
         
-        # Compare responses to calculate agreement
-        agreement_score = self._calculate_agreement(primary_response, secondary_response)
+        Args:
+            base_url: Base URL for OLLAMA API
+            primary_model: Primary model to use for generation
+            secondary_model: Secondary model to use for verification
+            session: HTTP session shared by both model clients (defaults to the pooled session)
+            mode: "both" to wait for both models, "first_good" to return the preferred
+                model's answer immediately (defaults to config.COUNTERCHECK_MODE)
+            timeout: Deadline in seconds for the model calls (defaults to config.COUNTERCHECK_TIMEOUT)
+        """
+        # Import config here to avoid potential scope issues
+        import config as config_module
+        self.base_url = base_url or config_module.OLLAMA_BASE_URL
+        self.primary_model = primary_model or config_module.OLLAMA_PRIMARY_MODEL
+        self.secondary_model = secondary_model or config_module.OLLAMA_SECONDARY_MODEL
+        self.mode = mode or config_module.COUNTERCHECK_MODE
+        self.timeout = timeout or config_module.COUNTERCHECK_TIMEOUT
         
-        # Add information about the counter-check in a footer
-        confidence_note = f"\n\n[Agreement between models: {agreement_score:.0%}]"
+        # Create two OllamaClient instances, one for each model, sharing one connection pool
+        self.session = session or get_http_session()
+        self.primary_client = OllamaClient(base_url=self.base_url, model=self.primary_model, session=self.session)
+        self.secondary_client = OllamaClient(base_url=self.base_url, model=self.secondary_model, session=self.session)
         
-        # Return the preferred model's response with the confidence note
-        if preferred_model == self.primary_model:
-            return primary_response + confidence_note
-        else:
-            return secondary_response + confidence_note
+        # Agreement scores by request, kept for later display (most recent last)
+        self._agreements = OrderedDict()
+        self._agreements_lock = threading.Lock()
+        
+        logger.info(f"Initialized CounterCheck client with models: {self.primary_model} (primary) and {self.secondary_model} (secondary), mode: {self.mode}")
+    
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding both models"""
+        return self.primary_client.breaker_names + self.secondary_client.breaker_names
+    
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate text completion using both models and counter-check results
+        
+        Args:
+            prompt: The prompt to generate a response for
+            model: Override model (will still use both for checking, but return this one's response)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated text with confidence note
+        """
+        return self._counter_check(
+            lambda client: client.generate(prompt=prompt, temperature=temperature, max_tokens=max_tokens),
+            request_key=self._request_key(prompt),
+            preferred_model=model or self.primary_model
+        )
     
     def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
@@ -655,37 +1313,172 @@ class CounterCheckLLMClient:
         Returns:
             Generated response with confidence note
         """
-        # Use specified model if provided, otherwise use primary
-        preferred_model = model or self.primary_model
+        return self._counter_check(
+            lambda client: client.chat(messages=messages, temperature=temperature, max_tokens=max_tokens),
+            request_key=self._request_key(messages),
+            preferred_model=model or self.primary_model
+        )
+    
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream the preferred model's completion while the other model runs for the counter-check
         
-        # Generate responses from both models
-        primary_response = self.primary_client.chat(
-            messages=messages, 
-            temperature=temperature, 
-            max_tokens=max_tokens
+        Args:
+            prompt: The prompt to generate a response for
+            model: Override model whose response is streamed
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Generated text chunks; the agreement score is available from get_agreement()
+            once both models have finished
+        """
+        yield from self._counter_check_stream(
+            lambda client: client.generate_stream(prompt=prompt, temperature=temperature, max_tokens=max_tokens),
+            lambda client: client.generate(prompt=prompt, temperature=temperature, max_tokens=max_tokens),
+            request_key=self._request_key(prompt),
+            preferred_model=model or self.primary_model
         )
+    
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream the preferred model's chat completion while the other model runs for the counter-check
         
-        secondary_response = self.secondary_client.chat(
-            messages=messages, 
-            temperature=temperature, 
-            max_tokens=max_tokens
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Override model whose response is streamed
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Generated text chunks; the agreement score is available from get_agreement()
+            once both models have finished
+        """
+        yield from self._counter_check_stream(
+            lambda client: client.chat_stream(messages=messages, temperature=temperature, max_tokens=max_tokens),
+            lambda client: client.chat(messages=messages, temperature=temperature, max_tokens=max_tokens),
+            request_key=self._request_key(messages),
+            preferred_model=model or self.primary_model
+        )
+    
+    def _counter_check_stream(self, stream_call, call, request_key: str, preferred_model: str) -> Iterator[str]:
+        """
+        Stream from the preferred model and score agreement against the other model in the background
+        
+        Args:
+            stream_call: Function taking a model client and returning a chunk iterator
+            call: Function taking a model client and returning its full response
+            request_key: Key under which the agreement score is stored
+            preferred_model: Model whose response should be streamed
+            
+        Yields:
+            Generated text chunks
+        """
+        if preferred_model == self.primary_model:
+            preferred_client, other_client = self.primary_client, self.secondary_client
+        else:
+            preferred_client, other_client = self.secondary_client, self.primary_client
+        
+        deadline = time.monotonic() + self.timeout
+        other_future = _get_counter_check_executor().submit(call, other_client)
+        self._store_agreement(request_key, {"status": "pending", "score": None})
+        
+        chunks = []
+        for chunk in stream_call(preferred_client):
+            if not chunks and _is_failed_response(chunk):
+                # Preferred model failed before streaming anything - use the other model's answer
+                other_response = self._result_before(other_future, deadline)
+                self._store_agreement(request_key, {"status": "failed", "score": None})
+                if _is_failed_response(other_response):
+                    logger.error("Both LLM models failed to generate responses")
+                    yield "[Error: Both LLM models failed to generate responses]"
+                else:
+                    logger.warning(f"Preferred model ({preferred_client.model}) failed, using {other_client.model} response")
+                    yield f"{other_response}\n\n[Generated using only {other_client.model} due to {preferred_client.model} failure]"
+                return
+            chunks.append(chunk)
+            yield chunk
+        
+        preferred_response = "".join(chunks)
+        other_future.add_done_callback(
+            lambda future: self._complete_agreement(request_key, preferred_response, future)
         )
+    
+    def get_agreement(self, prompt_or_messages) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored agreement result for an earlier request
+        
+        Args:
+            prompt_or_messages: The prompt string or chat messages that were sent
+            
+        Returns:
+            Dictionary with 'status' ('pending', 'complete' or 'failed') and 'score',
+            or None if the request is unknown
+        """
+        with self._agreements_lock:
+            entry = self._agreements.get(self._request_key(prompt_or_messages))
+            return dict(entry) if entry else None
+    
+    def _counter_check(self, call, request_key: str, preferred_model: str) -> str:
+        """
+        Run a call against both models concurrently and combine the results
+        
+        Args:
+            call: Function taking a model client and returning its response
+            request_key: Key under which the agreement score is stored
+            preferred_model: Model whose response should be returned
+            
+        Returns:
+            Generated response, with a confidence note in "both" mode
+        """
+        executor = _get_counter_check_executor()
+        deadline = time.monotonic() + self.timeout
+        primary_future = executor.submit(call, self.primary_client)
+        secondary_future = executor.submit(call, self.secondary_client)
+        
+        if preferred_model == self.primary_model:
+            preferred, other = (primary_future, self.primary_model), (secondary_future, self.secondary_model)
+        else:
+            preferred, other = (secondary_future, self.secondary_model), (primary_future, self.primary_model)
+        
+        if self.mode == self.MODE_FIRST_GOOD:
+            preferred_response = self._result_before(preferred[0], deadline)
+            if not _is_failed_response(preferred_response):
+                # Return straight away and score agreement when the other model finishes
+                self._store_agreement(request_key, {"status": "pending", "score": None})
+                other[0].add_done_callback(
+                    lambda future: self._complete_agreement(request_key, preferred_response, future)
+                )
+                return preferred_response
+            
+            other_response = self._result_before(other[0], deadline)
+            if _is_failed_response(other_response):
+                logger.error("Both LLM models failed to generate responses")
+                return "[Error: Both LLM models failed to generate responses]"
+            logger.warning(f"Preferred model ({preferred[1]}) failed, using {other[1]} response")
+            return f"{other_response}\n\n[Generated using only {other[1]} due to {preferred[1]} failure]"
+        
+        # Wait for both models, but never past the deadline
+        wait([primary_future, secondary_future], timeout=max(0.0, deadline - time.monotonic()))
+        primary_response = self._result_before(primary_future, deadline)
+        secondary_response = self._result_before(secondary_future, deadline)
         
         # If either model fails, return the successful one
-        if primary_response is None and secondary_response is None:
+        if _is_failed_response(primary_response) and _is_failed_response(secondary_response):
             logger.error("Both LLM models failed to generate responses")
             return "[Error: Both LLM models failed to generate responses]"
         
-        if primary_response is None:
+        if _is_failed_response(primary_response):
             logger.warning(f"Primary model ({self.primary_model}) failed, using secondary model response")
             return f"{secondary_response}\n\n[Generated using only {self.secondary_model} due to primary model failure]"
         
-        if secondary_response is None:
+        if _is_failed_response(secondary_response):
             logger.warning(f"Secondary model ({self.secondary_model}) failed, using primary model response")
             return f"{primary_response}\n\n[Generated using only {self.primary_model} due to secondary model failure]"
         
         # Compare responses to calculate agreement
         agreement_score = self._calculate_agreement(primary_response, secondary_response)
+        self._store_agreement(request_key, {"status": "complete", "score": agreement_score})
         
         # Add information about the counter-check in a footer
         confidence_note = f"\n\n[Agreement between models: {agreement_score:.0%}]"
@@ -696,6 +1489,50 @@ class CounterCheckLLMClient:
         else:
             return secondary_response + confidence_note
     
+    def _result_before(self, future, deadline: float):
+        """
+        Get a future's result, giving up at the deadline
+        
+        Returns:
+            The result, or None if the call failed or did not finish in time
+        """
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.warning(f"LLM call did not finish within {self.timeout} seconds")
+            return None
+        except Exception as e:
+            logger.error(f"LLM call failed: {str(e)}")
+            return None
+    
+    def _complete_agreement(self, request_key: str, preferred_response: str, other_future) -> None:
+        """Compute and store the agreement score once the other model has answered"""
+        try:
+            other_response = other_future.result()
+        except Exception as e:
+            logger.warning(f"Counter-check model failed: {str(e)}")
+            other_response = None
+        
+        if _is_failed_response(other_response):
+            self._store_agreement(request_key, {"status": "failed", "score": None})
+        else:
+            score = self._calculate_agreement(preferred_response, other_response)
+            self._store_agreement(request_key, {"status": "complete", "score": score})
+    
+    def _store_agreement(self, request_key: str, entry: Dict[str, Any]) -> None:
+        """Store an agreement entry, keeping only the most recent requests"""
+        with self._agreements_lock:
+            self._agreements[request_key] = entry
+            self._agreements.move_to_end(request_key)
+            while len(self._agreements) > config.COUNTERCHECK_AGREEMENT_HISTORY:
+                self._agreements.popitem(last=False)
+    
+    def _request_key(self, prompt_or_messages) -> str:
+        """Build a stable key for a prompt or list of chat messages"""
+        if not isinstance(prompt_or_messages, str):
+            prompt_or_messages = json.dumps(prompt_or_messages, sort_keys=True)
+        return hashlib.sha256(prompt_or_messages.encode("utf-8")).hexdigest()
+    
     def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """
         Get embedding vector for text
@@ -710,6 +1547,21 @@ class CounterCheckLLMClient:
         # For embeddings, just use the primary model
         return self.primary_client.get_embedding(text, model)
     
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Get embedding vectors for several texts
+        
+        Args:
+            texts: The texts to get embeddings for
+            model: Model to use (defaults to primary model)
+            batch_size: Maximum number of texts per request
+            
+        Returns:
+            List of embeddings in the same order as texts
+        """
+        # For embeddings, just use the primary model
+        return self.primary_client.get_embeddings(texts, model, batch_size)
+    
     def _calculate_agreement(self, text1: str, text2: str) -> float:
         """
         Calculate similarity/agreement between two text responses
@@ -721,27 +1573,40 @@ class CounterCheckLLMClient:
         Returns:
             Float value between 0.0 and 1.0 representing agreement
         """
-        # Simple string similarity based on word overlap for now
-        # Could be improved with embedding-based similarity in future
-        
-        # Normalize texts: lowercase, remove punctuation
-        def normalize(text):
-            # Remove common punctuation and lowercase
-            for char in '.,;:!?"\'()[]{}':
-                text = text.replace(char, ' ')
-            return text.lower()
-        
-        words1 = set(normalize(text1).split())
-        words2 = set(normalize(text2).split())
-        
-        # Calculate Jaccard similarity: intersection over union
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-        
-        if union == 0:  # Avoid division by zero
-            return 0.0
-            
-        return intersection / union
+        return _calculate_agreement(text1, text2)
+
+
+# Negotiated Ollama endpoints shared by all client instances, keyed by
+# (base_url, model, operation) -> {"url", "shape", "discovered_at"}
+_endpoint_cache = {}
+_endpoint_cache_lock = threading.Lock()
+
+
+def get_endpoint_cache() -> Dict[str, Dict[str, Any]]:
+    """
+    Get a snapshot of all negotiated Ollama endpoints
+    
+    Returns:
+        Dictionary mapping "base_url|model|operation" to the endpoint that worked
+    """
+    with _endpoint_cache_lock:
+        return {
+            "|".join(key): dict(entry)
+            for key, entry in _endpoint_cache.items()
+        }
+
+
+def clear_endpoint_cache(base_url: Optional[str] = None) -> None:
+    """
+    Forget negotiated endpoints so the next call probes again
+    
+    Args:
+        base_url: Only clear entries for this server (defaults to all servers)
+    """
+    with _endpoint_cache_lock:
+        for key in list(_endpoint_cache.keys()):
+            if base_url is None or key[0] == base_url:
+                del _endpoint_cache[key]
 
 
 class OllamaClient:
@@ -749,23 +1614,255 @@ class OllamaClient:
     Client for interacting with OLLAMA LLM API
     """
     
-    def __init__(self, base_url=None, model=None):
+    def __init__(self, base_url=None, model=None, session=None):
         """
         Initialize OLLAMA client
         
         Args:
             base_url: Base URL for OLLAMA API
             model: Default model to use
+            session: HTTP session to use (defaults to the shared pooled session)
         """
         # Import config here to avoid potential scope issues
         import config as config_module
         self.base_url = base_url or config_module.OLLAMA_BASE_URL
         self.model = model or config_module.OLLAMA_PRIMARY_MODEL
+        self.session = session or get_http_session()
         logger.info(f"Initialized OLLAMA client with base URL: {self.base_url}, model: {self.model}")
     
-    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+    @property
+    def negotiated_endpoints(self) -> Dict[str, Dict[str, Any]]:
         """
-        Generate text completion using OLLAMA
+        Endpoints negotiated for this client's server, keyed by "model|operation"
+        
+        Returns:
+            Dictionary with the URL, payload shape and discovery time of each endpoint
+        """
+        with _endpoint_cache_lock:
+            return {
+                f"{key[1]}|{key[2]}": dict(entry)
+                for key, entry in _endpoint_cache.items()
+                if key[0] == self.base_url
+            }
+    
+    def _get_cached_shape(self, cache_key) -> Optional[str]:
+        """Get the cached payload shape for an operation if it has not expired"""
+        with _endpoint_cache_lock:
+            entry = _endpoint_cache.get(cache_key)
+            if not entry:
+                return None
+            if time.time() - entry["discovered_at"] > config.OLLAMA_ENDPOINT_CACHE_TTL:
+                del _endpoint_cache[cache_key]
+                return None
+            return entry["shape"]
+    
+    @property
+    def breaker_names(self) -> List[str]:
+        """Names of the circuit breakers guarding this client's backend"""
+        return [f"ollama:{self.model}"]
+    
+    def _post_with_discovery(self, operation: str, model: str, api_configs: List[Dict[str, Any]], timeout: int):
+        """
+        POST through the model's circuit breaker, failing fast while the circuit is open
+        
+        Args:
+            operation: Operation name used as part of the cache key (e.g. 'generate')
+            model: Model the request is for
+            api_configs: Candidate endpoints in order of preference
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Tuple of (extracted result or None, list of error messages)
+        """
+        breaker = get_circuit_breaker(f"ollama:{model}")
+        if not breaker.allow_request():
+            logger.warning(f"Circuit for ollama:{model} is open - skipping {operation} request")
+            return None, [f"Circuit open for ollama:{model} after repeated failures"]
+        
+        started = time.monotonic()
+        result, errors = self._try_endpoints(operation, model, api_configs, timeout)
+        if result is None:
+            breaker.record_failure(time.monotonic() - started)
+        else:
+            breaker.record_success(time.monotonic() - started)
+        return result, errors
+    
+    def _try_endpoints(self, operation: str, model: str, api_configs: List[Dict[str, Any]], timeout: int):
+        """
+        POST to the first endpoint that works, trying the negotiated endpoint first
+        
+        Args:
+            operation: Operation name used as part of the cache key (e.g. 'generate')
+            model: Model the request is for
+            api_configs: Candidate endpoints in order of preference, each with
+                'shape', 'url', 'payload' and 'extract' keys
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Tuple of (extracted result or None, list of error messages)
+        """
+        cache_key = (self.base_url, model, operation)
+        cached_shape = self._get_cached_shape(cache_key)
+        if cached_shape:
+            api_configs = sorted(api_configs, key=lambda api_config: api_config["shape"] != cached_shape)
+        
+        errors = []
+        for api_config in api_configs:
+            try:
+                logger.info(f"Trying Ollama {operation} endpoint: {api_config['url']}")
+                response = self.session.post(
+                    api_config["url"], 
+                    json=api_config["payload"], 
+                    timeout=timeout
+                )
+                response.raise_for_status()
+                data = response.json()
+                result = api_config["extract"](data)
+                if result is None or (operation.startswith("embed") and not result):
+                    raise ValueError("No data found in response")
+                
+                if api_config["shape"] != cached_shape:
+                    self._remember_endpoint(cache_key, api_config)
+                return result, errors
+            except Exception as e:
+                error_msg = f"Error with {api_config['url']}: {str(e)}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                
+                # A 404 means the server no longer supports the negotiated endpoint
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                if api_config["shape"] == cached_shape and status_code == 404:
+                    self._forget_endpoint(cache_key, api_config)
+                    cached_shape = None
+        
+        return None, errors
+    
+    def _remember_endpoint(self, cache_key, api_config: Dict[str, Any]) -> None:
+        """Record the endpoint that worked for an operation so later calls go straight to it"""
+        with _endpoint_cache_lock:
+            _endpoint_cache[cache_key] = {
+                "url": api_config["url"],
+                "shape": api_config["shape"],
+                "discovered_at": time.time()
+            }
+        logger.info(f"Negotiated Ollama {cache_key[2]} endpoint for {cache_key[1]}: {api_config['url']}")
+    
+    def _forget_endpoint(self, cache_key, api_config: Dict[str, Any]) -> None:
+        """Drop a negotiated endpoint that stopped working so the next call probes again"""
+        logger.info(f"Negotiated endpoint {api_config['url']} returned 404 - probing again")
+        with _endpoint_cache_lock:
+            _endpoint_cache.pop(cache_key, None)
+    
+    def _stream_with_discovery(self, operation: str, model: str, api_configs: List[Dict[str, Any]],
+                               timeout: int, errors: List[str]) -> Iterator[str]:
+        """
+        Stream through the model's circuit breaker, failing fast while the circuit is open
+        
+        Args:
+            operation: Operation name used as part of the cache key (e.g. 'generate_stream')
+            model: Model the request is for
+            api_configs: Candidate endpoints in order of preference
+            timeout: Timeout in seconds for connecting and for each read
+            errors: List that collects an error message for every endpoint that failed
+            
+        Yields:
+            Text chunks as they arrive; nothing if the circuit is open or every endpoint failed
+        """
+        breaker = get_circuit_breaker(f"ollama:{model}")
+        if not breaker.allow_request():
+            logger.warning(f"Circuit for ollama:{model} is open - skipping {operation} request")
+            errors.append(f"Circuit open for ollama:{model} after repeated failures")
+            return
+        
+        started = time.monotonic()
+        streamed = False
+        try:
+            for chunk in self._stream_from_endpoints(operation, model, api_configs, timeout, errors):
+                if not streamed:
+                    # Time to first token is the latency that matters for a stream
+                    breaker.record_success(time.monotonic() - started)
+                    streamed = True
+                yield chunk
+        finally:
+            if not streamed:
+                breaker.record_failure(time.monotonic() - started)
+    
+    def _stream_from_endpoints(self, operation: str, model: str, api_configs: List[Dict[str, Any]],
+                               timeout: int, errors: List[str]) -> Iterator[str]:
+        """
+        Stream from the first endpoint that works, trying the negotiated endpoint first
+        
+        Args:
+            operation: Operation name used as part of the cache key (e.g. 'generate_stream')
+            model: Model the request is for
+            api_configs: Candidate endpoints in order of preference, each with 'shape', 'url',
+                'payload', 'extract' (chunk -> text) and 'sse' (OpenAI-style event stream) keys
+            timeout: Timeout in seconds for connecting and for each read
+            errors: List that collects an error message for every endpoint that failed
+            
+        Yields:
+            Text chunks as they arrive; nothing if every endpoint failed
+        """
+        cache_key = (self.base_url, model, operation)
+        cached_shape = self._get_cached_shape(cache_key)
+        if cached_shape:
+            api_configs = sorted(api_configs, key=lambda api_config: api_config["shape"] != cached_shape)
+        
+        for api_config in api_configs:
+            streamed = False
+            try:
+                logger.info(f"Trying Ollama {operation} endpoint: {api_config['url']}")
+                response = self.session.post(
+                    api_config["url"],
+                    json=api_config["payload"],
+                    timeout=timeout,
+                    stream=True
+                )
+                try:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line:
+                            continue
+                        if api_config["sse"]:
+                            if not line.startswith("data:"):
+                                continue
+                            line = line[len("data:"):].strip()
+                            if line == "[DONE]":
+                                break
+                        data = json.loads(line)
+                        if data.get("error"):
+                            raise ValueError(data["error"])
+                        chunk = api_config["extract"](data)
+                        if chunk:
+                            if not streamed and api_config["shape"] != cached_shape:
+                                self._remember_endpoint(cache_key, api_config)
+                            streamed = True
+                            yield chunk
+                        if data.get("done"):
+                            break
+                finally:
+                    response.close()
+                
+                if streamed:
+                    return
+                raise ValueError("No data found in streamed response")
+            except Exception as e:
+                if streamed:
+                    # Chunks were already sent to the caller, so another endpoint can't take over
+                    logger.error(f"Ollama stream from {api_config['url']} was interrupted: {str(e)}")
+                    return
+                error_msg = f"Error with {api_config['url']}: {str(e)}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                if api_config["shape"] == cached_shape and status_code == 404:
+                    self._forget_endpoint(cache_key, api_config)
+                    cached_shape = None
+    
+    def generate_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream a text completion from OLLAMA as tokens arrive
         
         Args:
             prompt: The prompt to generate a response for
@@ -773,25 +1870,128 @@ class OllamaClient:
             temperature: Temperature for generation
             max_tokens: Maximum tokens to generate
             
-        Returns:
-            Generated text or error message
+        Yields:
+            Generated text chunks, or a single error message if every endpoint failed
         """
         model = model or self.model
+        options = {"temperature": temperature, "num_predict": max_tokens}
+        api_configs = [
+            # Native endpoint streams one JSON object per line
+            {
+                "shape": "ollama_generate",
+                "url": f"{self.base_url}/api/generate",
+                "payload": {"model": model, "prompt": prompt, "stream": True, "options": options},
+                "extract": lambda data: data.get("response", ""),
+                "sse": False
+            },
+            # OpenAI-compatible endpoint streams server-sent events
+            {
+                "shape": "openai_chat",
+                "url": f"{self.base_url}/v1/chat/completions",
+                "payload": {
+                    "model": model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "stream": True
+                },
+                "extract": lambda data: (data.get("choices") or [{}])[0].get("delta", {}).get("content", ""),
+                "sse": True
+            },
+            {
+                "shape": "ollama_chat",
+                "url": f"{self.base_url}/api/chat",
+                "payload": {
+                    "model": model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "stream": True,
+                    "options": options
+                },
+                "extract": lambda data: data.get("message", {}).get("content", ""),
+                "sse": False
+            }
+        ]
         
-        # Get Ollama version to determine which endpoints to prioritize
-        # Import config here to avoid potential scope issues
-        import config as config_module
-        ollama_version = config_module.OLLAMA_VERSION
-        logger.info(f"Using Ollama version: {ollama_version}")
+        errors = []
+        streamed = False
+        for chunk in self._stream_with_discovery("generate_stream", model, api_configs, timeout=30, errors=errors):
+            streamed = True
+            yield chunk
+        
+        if not streamed:
+            logger.error("Error streaming text with OLLAMA - all endpoints failed")
+            yield f"Error generating response with OLLAMA - all endpoints failed: {'; '.join(errors)}"
+    
+    def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> Iterator[str]:
+        """
+        Stream a chat completion from OLLAMA as tokens arrive
         
-        # Configure API endpoints based on Ollama version
-        # Try all known endpoints to find one that works
-        # Newer Ollama versions might change their API structure
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Generated text chunks
+        """
+        model = model or self.model
+        api_configs = [
+            {
+                "shape": "ollama_chat",
+                "url": f"{self.base_url}/api/chat",
+                "payload": {
+                    "model": model,
+                    "messages": messages,
+                    "stream": True,
+                    "options": {"temperature": temperature, "num_predict": max_tokens}
+                },
+                "extract": lambda data: data.get("message", {}).get("content", ""),
+                "sse": False
+            },
+            {
+                "shape": "openai_chat",
+                "url": f"{self.base_url}/v1/chat/completions",
+                "payload": {
+                    "model": model,
+                    "messages": messages,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "stream": True
+                },
+                "extract": lambda data: (data.get("choices") or [{}])[0].get("delta", {}).get("content", ""),
+                "sse": True
+            }
+        ]
+        
+        errors = []
+        streamed = False
+        for chunk in self._stream_with_discovery("chat_stream", model, api_configs, timeout=30, errors=errors):
+            streamed = True
+            yield chunk
+        
+        if not streamed:
+            # Fall back to streaming a completion of the flattened conversation
+            logger.warning(f"Error streaming chat with OLLAMA, falling back to generate: {'; '.join(errors)}")
+            yield from self.generate_stream(self._format_chat_messages(messages), model, temperature, max_tokens)
+    
+    def _generate_api_configs(self, prompt: str, model: str, temperature: float, max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Candidate endpoints for a text completion, in order of preference
         
-        # Try all possible endpoints regardless of version
-        api_configs = [
+        Args:
+            prompt: The prompt to generate a response for
+            model: Model to use
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            List of endpoint configs with 'shape', 'url', 'payload' and 'extract' keys
+        """
+        return [
             # OpenAI-compatible endpoints (prioritized)
             {
+                "shape": "openai_chat",
                 "url": f"{self.base_url}/v1/chat/completions",
                 "payload": {
                     "model": model,
@@ -802,6 +2002,7 @@ class OllamaClient:
                 "extract": lambda data: data.get("choices", [{}])[0].get("message", {}).get("content", "")
             },
             {
+                "shape": "openai_completions",
                 "url": f"{self.base_url}/v1/completions",
                 "payload": {
                     "model": model,
@@ -813,6 +2014,7 @@ class OllamaClient:
             },
             # Legacy Ollama API endpoints - this is the one that works with most versions
             {
+                "shape": "ollama_generate",
                 "url": f"{self.base_url}/api/generate",
                 "payload": {
                     "model": model,
@@ -826,6 +2028,7 @@ class OllamaClient:
                 "extract": lambda data: data.get("response", "")
             },
             {
+                "shape": "ollama_chat",
                 "url": f"{self.base_url}/api/chat",
                 "payload": {
                     "model": model,
@@ -839,31 +2042,125 @@ class OllamaClient:
                 "extract": lambda data: data.get("message", {}).get("content", "")
             }
         ]
+    
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate text completion using OLLAMA
         
-        errors = []
-        for config in api_configs:
-            try:
-                logger.info(f"Trying Ollama endpoint: {config['url']}")
-                response = requests.post(
-                    config["url"], 
-                    json=config["payload"], 
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-                result = config["extract"](data)
-                logger.info(f"Successfully generated text using {config['url']}")
-                return result
-            except Exception as e:
-                error_msg = f"Error with {config['url']}: {str(e)}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
+        Args:
+            prompt: The prompt to generate a response for
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated text or error message
+        """
+        model = model or self.model
+        
+        # Get Ollama version to determine which endpoints to prioritize
+        # Import config here to avoid potential scope issues
+        import config as config_module
+        ollama_version = config_module.OLLAMA_VERSION
+        logger.info(f"Using Ollama version: {ollama_version}")
+        
+        # Try all possible endpoints regardless of version; the one that works is
+        # remembered so later calls go straight to it
+        api_configs = self._generate_api_configs(prompt, model, temperature, max_tokens)
+        
+        result, errors = self._post_with_discovery("generate", model, api_configs, timeout=30)
+        if result is not None:
+            return result
         
         # If we've tried all endpoints and none worked, return a consolidated error
         error_msg = f"Error generating response with OLLAMA - all endpoints failed: {'; '.join(errors)}"
         logger.error(f"Error generating text with OLLAMA - all endpoints failed")
         return error_msg
     
+    def _embedding_api_configs(self, text: str, model: str) -> List[Dict[str, Any]]:
+        """
+        Candidate endpoints for a single embedding, in order of preference
+        
+        Args:
+            text: The text to get embedding for
+            model: Model to use
+            
+        Returns:
+            List of endpoint configs with 'shape', 'url', 'payload' and 'extract' keys
+        """
+        # Legacy endpoints, tried with the 'prompt' field first and then 'input'
+        embedding_endpoints = [
+            {
+                "shape": "ollama_embeddings_prompt",
+                "url": f"{self.base_url}/api/embeddings",
+                "payload": {
+                    "model": model,
+                    "prompt": text
+                },
+                "extract": lambda data: data.get("embedding", None)
+            },
+            {
+                "shape": "ollama_embeddings_input",
+                "url": f"{self.base_url}/api/embeddings",
+                "payload": {
+                    "model": model,
+                    "input": text
+                },
+                "extract": lambda data: data.get("embedding") or (data.get("data") or [{}])[0].get("embedding", None)
+            }
+        ]
+        
+        # For Ollama 0.6.x - 0.6.4+ prefer the OpenAI-compatible endpoint
+        if config.OLLAMA_VERSION.startswith("0.6"):
+            embedding_endpoints.insert(0, {
+                "shape": "openai_embeddings",
+                "url": f"{self.base_url}/v1/embeddings",
+                "payload": {
+                    "model": model,
+                    "input": text
+                },
+                "extract": lambda data: data.get("data", [{}])[0].get("embedding", None)
+            })
+        
+        return embedding_endpoints
+    
+    def _batch_embedding_api_configs(self, batch: List[str], model: str) -> List[Dict[str, Any]]:
+        """
+        Candidate endpoints for embedding several texts in one request, in order of preference
+        
+        Args:
+            batch: The texts to get embeddings for
+            model: Model to use
+            
+        Returns:
+            List of endpoint configs with 'shape', 'url', 'payload' and 'extract' keys
+        """
+        return [
+            # Native batch endpoint (Ollama 0.3+)
+            {
+                "shape": "ollama_embed",
+                "url": f"{self.base_url}/api/embed",
+                "payload": {
+                    "model": model,
+                    "input": batch
+                },
+                "extract": lambda data: _extract_batch_embeddings(data.get("embeddings"), len(batch))
+            },
+            # OpenAI-compatible endpoint accepts a list input as well
+            {
+                "shape": "openai_embeddings",
+                "url": f"{self.base_url}/v1/embeddings",
+                "payload": {
+                    "model": model,
+                    "input": batch
+                },
+                "extract": lambda data: _extract_batch_embeddings(
+                    [item.get("embedding") for item in sorted(data.get("data", []), key=lambda item: item.get("index", 0))],
+                    len(batch)
+                )
+            }
+        ]
+    
     def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """
         Get embedding vector for text using OLLAMA
@@ -876,139 +2173,99 @@ class OllamaClient:
             List of float values representing the embedding or fallback embedding
         """
         model = model or self.model
-        # Import config here to avoid potential scope issues
-        import config as config_module
-        ollama_version = config_module.OLLAMA_VERSION
-        logger.info(f"Getting embeddings with Ollama version: {ollama_version}")
+        # Repeated texts are served from the embedding cache
+        return cached_embeddings(
+            f"ollama/{model}", [text],
+            lambda missing: [self._fetch_embedding(missing[0], model)]
+        )[0]
+    
+    def _fetch_embedding(self, text: str, model: str) -> List[float]:
+        """
+        Request an embedding vector for text from the OLLAMA server, bypassing the cache
+        
+        Args:
+            text: The text to get embedding for
+            model: Model to use
+            
+        Returns:
+            List of float values representing the embedding or fallback embedding
+        """
+        logger.info(f"Getting embeddings with Ollama version: {config.OLLAMA_VERSION}")
+        embedding_endpoints = self._embedding_api_configs(text, model)
         
         try:
-            # For Ollama 0.6.x - 0.6.4+ uses OpenAI-compatible endpoints
-            if ollama_version.startswith("0.6"):
-                # Try multiple embedding endpoints in order of preference
-                embedding_endpoints = [
-                    # OpenAI-compatible endpoint for 0.6.4+
-                    {
-                        "url": f"{self.base_url}/v1/embeddings",
-                        "payload": {
-                            "model": model,
-                            "input": text
-                        },
-                        "extract": lambda data: data.get("data", [{}])[0].get("embedding", None)
-                    },
-                    # Legacy endpoint with 'prompt' field
-                    {
-                        "url": f"{self.base_url}/api/embeddings",
-                        "payload": {
-                            "model": model,
-                            "prompt": text
-                        },
-                        "extract": lambda data: data.get("embedding", None)
-                    },
-                    # Legacy endpoint with 'input' field
-                    {
-                        "url": f"{self.base_url}/api/embeddings",
-                        "payload": {
-                            "model": model,
-                            "input": text
-                        },
-                        "extract": lambda data: data.get("embedding", None)
-                    }
-                ]
-                
-                for endpoint in embedding_endpoints:
-                    try:
-                        logger.info(f"Trying embeddings endpoint: {endpoint['url']}")
-                        response = requests.post(endpoint["url"], json=endpoint["payload"], timeout=10)
-                        response.raise_for_status()
-                        data = response.json()
-                        embedding = endpoint["extract"](data)
-                        if embedding:
-                            logger.info(f"Successfully retrieved embedding from {endpoint['url']}")
-                            return embedding
-                        else:
-                            logger.warning(f"No embedding data found in response from {endpoint['url']}")
-                    except Exception as e:
-                        logger.warning(f"Error with embeddings endpoint {endpoint['url']}: {str(e)}")
-                
-                # If all endpoints fail, return a fallback vector
-                logger.error("All embedding endpoints failed - returning fallback vector")
-                return [0.0] * 384  # Return zero vector as fallback
-            
-            # For other Ollama versions - try various formats
-            # Try standard Ollama embeddings API first
-            url = f"{self.base_url}/api/embeddings"
-            payload = {
-                "model": model,
-                "prompt": text
-            }
+            embedding, errors = self._post_with_discovery("embedding", model, embedding_endpoints, timeout=10)
+            if embedding:
+                return embedding
             
-            try:
-                logger.info(f"Trying embeddings endpoint with 'prompt' field: {url}")
-                response = requests.post(url, json=payload, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                if "embedding" in data:
-                    logger.info(f"Successfully retrieved embedding from {url} (embedding field)")
-                    return data["embedding"]
-                else:
-                    logger.warning(f"Unexpected response format from {url}: missing 'embedding' field")
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    # If 404, try with alternative format (input field)
-                    logger.info(f"Trying newer Ollama embeddings API format with 'input' field (404 on {url})")
-                    embeddings_url = f"{self.base_url}/api/embeddings"
-                    payload = {
-                        "model": model,
-                        "input": text
-                    }
-                    response = requests.post(embeddings_url, json=payload, timeout=10)
-                    response.raise_for_status()
-                    data = response.json()
-                    # Try different response formats
-                    if "embedding" in data:
-                        logger.info(f"Successfully retrieved embedding from {embeddings_url} (embedding field)")
-                        return data["embedding"]
-                    elif "data" in data and len(data["data"]) > 0:
-                        logger.info(f"Successfully retrieved embedding from {embeddings_url} (data field)")
-                        return data["data"][0].get("embedding", [])
-                    else:
-                        logger.warning(f"Unexpected response format from {embeddings_url}")
-                        raise ValueError("Unexpected response format from embeddings API")
-                else:
-                    raise
+            # If all endpoints fail, return a fallback vector
+            logger.error("All embedding endpoints failed - returning fallback vector")
+            return [0.0] * 384  # Return zero vector as fallback
             
         except Exception as e:
             logger.error(f"Error getting embedding from OLLAMA: {str(e)}")
             # Return zero vector with standard dimensions as a fallback
             return [0.0] * 384
     
-    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None, batch_size: Optional[int] = None) -> List[List[float]]:
         """
-        Generate chat completion using OLLAMA
+        Get embedding vectors for several texts using the batch embedding endpoints
         
         Args:
-            messages: List of message objects with 'role' and 'content' keys
+            texts: The texts to get embeddings for
             model: Model to use (defaults to configured model)
-            temperature: Temperature for generation
-            max_tokens: Maximum tokens to generate
+            batch_size: Maximum number of texts per request (defaults to config.EMBEDDING_BATCH_SIZE)
             
         Returns:
-            Generated response
+            List of embeddings in the same order as texts (fallback vectors for failed texts)
         """
         model = model or self.model
-        # Import config here to avoid potential scope issues
-        import config as config_module
-        ollama_version = config_module.OLLAMA_VERSION
-        logger.info(f"Using chat with Ollama version: {ollama_version}")
         
+        def embed_batch(batch):
+            batch_endpoints = self._batch_embedding_api_configs(batch, model)
+            
+            try:
+                embeddings, errors = self._post_with_discovery("embed_batch", model, batch_endpoints, timeout=60)
+                if embeddings:
+                    return embeddings
+            except Exception as e:
+                logger.warning(f"Error getting batch embeddings from OLLAMA: {str(e)}")
+            
+            # Server has no batch endpoint - fall back to one request per text
+            logger.warning("Batch embedding endpoints failed - embedding texts one at a time")
+            return [self._fetch_embedding(text, model) for text in batch]
+        
+        # Only texts missing from the embedding cache are sent to the server
+        return cached_embeddings(
+            f"ollama/{model}", texts,
+            lambda missing: _embed_in_batches(missing, embed_batch, batch_size)
+        )
+    
+    def _chat_api_configs(self, messages: List[Dict[str, str]], model: str, temperature: float, max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Candidate endpoints for a chat completion, in order of preference
+        
+        Ollama 0.6.x gets the OpenAI-compatible endpoints with completion fallbacks; other
+        versions get the native chat API only and fall back to generate() on failure.
+        
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Model to use
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            List of endpoint configs with 'shape', 'url', 'payload' and 'extract' keys
+        """
         # Format messages into a single prompt for models that don't support chat format natively
         prompt = self._format_chat_messages(messages)
         
         # For Ollama 0.6.4+, prioritize OpenAI-compatible endpoints
-        if ollama_version.startswith("0.6"):
-            api_configs = [
+        if config.OLLAMA_VERSION.startswith("0.6"):
+            return [
                 # OpenAI-compatible endpoint for 0.6.4+ (primary)
                 {
+                    "shape": "openai_chat",
                     "url": f"{self.base_url}/v1/chat/completions",
                     "payload": {
                         "model": model,
@@ -1020,6 +2277,7 @@ class OllamaClient:
                 },
                 # Legacy chat API for older 0.6.x versions (fallback)
                 {
+                    "shape": "ollama_chat",
                     "url": f"{self.base_url}/api/chat",
                     "payload": {
                         "model": model,
@@ -1034,6 +2292,7 @@ class OllamaClient:
                 },
                 # Fallback to OpenAI-compatible completions API
                 {
+                    "shape": "openai_completions",
                     "url": f"{self.base_url}/v1/completions",
                     "payload": {
                         "model": model,
@@ -1045,6 +2304,7 @@ class OllamaClient:
                 },
                 # Final fallback to generate API for older 0.6.x
                 {
+                    "shape": "ollama_generate",
                     "url": f"{self.base_url}/api/generate",
                     "payload": {
                         "model": model,
@@ -1058,25 +2318,51 @@ class OllamaClient:
                     "extract": lambda data: data.get("response", "")
                 }
             ]
+        
+        # For other versions, try the standard approach first
+        return [
+            {
+                "shape": "ollama_chat",
+                "url": f"{self.base_url}/api/chat",
+                "payload": {
+                    "model": model,
+                    "messages": messages,
+                    "stream": False,
+                    "options": {
+                        "temperature": temperature,
+                        "num_predict": max_tokens
+                    }
+                },
+                "extract": lambda data: data.get("message", {}).get("content", "")
+            }
+        ]
+    
+    def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate chat completion using OLLAMA
+        
+        Args:
+            messages: List of message objects with 'role' and 'content' keys
+            model: Model to use (defaults to configured model)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
             
-            errors = []
-            for config in api_configs:
-                try:
-                    logger.info(f"Trying Ollama chat endpoint: {config['url']}")
-                    response = requests.post(
-                        config["url"], 
-                        json=config["payload"], 
-                        timeout=30
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    result = config["extract"](data)
-                    logger.info(f"Successfully generated chat response using {config['url']}")
-                    return result
-                except Exception as e:
-                    error_msg = f"Error with {config['url']}: {str(e)}"
-                    logger.warning(error_msg)
-                    errors.append(error_msg)
+        Returns:
+            Generated response
+        """
+        model = model or self.model
+        # Import config here to avoid potential scope issues
+        import config as config_module
+        ollama_version = config_module.OLLAMA_VERSION
+        logger.info(f"Using chat with Ollama version: {ollama_version}")
+        
+        api_configs = self._chat_api_configs(messages, model, temperature, max_tokens)
+        
+        if ollama_version.startswith("0.6"):
+            result, errors = self._post_with_discovery("chat", model, api_configs, timeout=30)
+            if result is not None:
+                logger.info("Successfully generated chat response")
+                return result
             
             # If we've tried all endpoints and none worked, return a consolidated error
             error_msg = f"Error generating chat response with OLLAMA - all endpoints failed: {'; '.join(errors)}"
@@ -1085,29 +2371,16 @@ class OllamaClient:
         
         # For other versions, try the standard approach first, then fall back
         try:
-            url = f"{self.base_url}/api/chat"
-            payload = {
-                "model": model,
-                "messages": messages,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
-            }
-            
-            logger.info(f"Trying standard chat endpoint: {url}")
-            response = requests.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            return data.get("message", {}).get("content", "")
+            result, errors = self._post_with_discovery("chat", model, api_configs, timeout=30)
+            if result is None:
+                raise RuntimeError("; ".join(errors))
+            return result
             
         except Exception as e:
             # Fallback to generate API if chat API fails
             logger.warning(f"Error using chat API with OLLAMA, falling back to generate: {str(e)}")
             try:
-                return self.generate(prompt, model, temperature, max_tokens)
+                return self.generate(self._format_chat_messages(messages), model, temperature, max_tokens)
             except Exception as inner_e:
                 error_msg = f"Error generating chat response with OLLAMA: {str(inner_e)}"
                 logger.error(f"Error generating chat response with OLLAMA (fallback): {str(inner_e)}")
@@ -1142,53 +2415,131 @@ class OllamaClient:
         return "\n\n".join(formatted)
 
 
+# Section list shared by the single-pass, per-chunk and merge prompts of analyze_case
+CASE_ANALYSIS_SECTIONS = """1. Citation
+        2. Court
+        3. Judges
+        4. Parties Involved
+        5. Key Legal Issues
+        6. Main Legal Principles Established
+        7. Holding/Decision
+        8. Reasoning
+        9. Precedents Cited
+        10. Statutes/Regulations Referenced"""
+CASE_ANALYSIS_MAX_TOKENS = 1000  # Completion budget of the single-pass and merge calls
+CHUNK_PROMPT_OVERHEAD_TOKENS = 200  # Instructions wrapped around each excerpt
+# Headings of the parts of a judgment that carry the holding
+_KEY_SECTION_RE = re.compile(r'ANALYSIS|DETERMINATION|ISSUES|HOLDING|FINDINGS|DISPOSITION|ORDERS|JUDG(?:E)?MENT|RULING')
+
+
 class LegalAssistant:
     """
     Legal assistant using LLM for legal tasks
     """
     
-    def __init__(self, llm_client=None):
+    def __init__(self, llm_client=None, response_cache=None):
         """
         Initialize legal assistant
         
         Args:
             llm_client: LLM client (defaults to best available client)
+            response_cache: ResponseCache for repeated analyses (defaults to the
+                configured cache, None when LLM_RESPONSE_CACHE_ENABLED is off)
         """
         self.llm_client = llm_client or get_llm_client()
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
         logger.info("Legal Assistant initialized")
     
-    def analyze_case(self, case_text: str) -> Dict[str, Any]:
+    def _generate_cached(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Generate text, reusing a cached response for an identical earlier call
+        
+        Args:
+            prompt: The prompt to generate from
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated (or cached) text
+        """
+        if self.response_cache is None:
+            return self.llm_client.generate(prompt, temperature=temperature, max_tokens=max_tokens)
+        
+        # Keyed on the model behind lazy and failover clients, not on the wrapper
+        cached = self.response_cache.get(_client_model(_preferred_client(self.llm_client)), prompt,
+                                         temperature, max_tokens)
+        if cached is not None:
+            return cached
+        
+        response, client = _generate_with_client(self.llm_client, prompt, temperature=temperature, max_tokens=max_tokens)
+        # Never cache error strings or mock fallback answers - the next call should retry the model
+        if not _is_failed_response(response) and not isinstance(client, MockLLMClient):
+            self.response_cache.set(_client_model(client), prompt, temperature, max_tokens, response)
+        return response
+    
+    def analyze_case(self, case_text: str, token_budget: Optional[int] = None) -> Dict[str, Any]:
         """
         Analyze a legal case to extract key information
         
+        Judgments too long for one prompt are split into section-aware chunks, each chunk is
+        analyzed in parallel and the partial analyses are merged into the same sections.
+        
         Args:
             case_text: Full text of the case
+            token_budget: Maximum model tokens (prompts plus completions) to spend; the least
+                important chunks are skipped when the full analysis would cost more
             
         Returns:
-            Dictionary with analysis results
+            Dictionary with analysis results and a 'token_usage' summary
         """
-        prompt = f"""
+        usage = {"estimated_tokens": 0, "calls": 0, "chunks_total": 1, "chunks_analyzed": 1, "budget": token_budget}
+        prompt = self._case_analysis_prompt(case_text)
+        single_pass_tokens = estimate_tokens(prompt) + CASE_ANALYSIS_MAX_TOKENS
+        
+        if single_pass_tokens <= config.LLM_CONTEXT_TOKENS and (token_budget is None or single_pass_tokens <= token_budget):
+            analysis_text = self._generate_cached(prompt)
+            usage["estimated_tokens"] = estimate_tokens(prompt) + estimate_tokens(analysis_text)
+            usage["calls"] = 1
+        else:
+            analysis_text = self._map_reduce_case_analysis(case_text, token_budget, usage)
+        
+        analysis = self._structure_case_analysis(analysis_text)
+        analysis["token_usage"] = usage
+        return analysis
+    
+    def plan_case_analysis(self, case_text: str) -> Dict[str, Any]:
+        """
+        Estimate what analyzing a case will cost before running it
+        
+        Args:
+            case_text: Full text of the case
+            
+        Returns:
+            Dictionary with 'chunks' (number of model calls for the excerpts) and
+            'estimated_tokens' (prompts plus completions, including the merge step)
+        """
+        prompt_tokens = estimate_tokens(self._case_analysis_prompt(case_text))
+        if prompt_tokens + CASE_ANALYSIS_MAX_TOKENS <= config.LLM_CONTEXT_TOKENS:
+            return {"chunks": 1, "estimated_tokens": prompt_tokens + CASE_ANALYSIS_MAX_TOKENS}
+        
+        chunks = chunk_text(case_text, config.LLM_CHUNK_TOKENS)
+        map_tokens = sum(self._chunk_call_tokens(chunk) for chunk in chunks)
+        return {"chunks": len(chunks), "estimated_tokens": map_tokens + self._reduce_call_tokens(len(chunks))}
+    
+    def _case_analysis_prompt(self, case_text: str) -> str:
+        """Build the single-pass case analysis prompt"""
+        return f"""
         Analyze the following legal case from the Kenyan legal system and extract the key information.
         
         {case_text}
         
         Format your response as a structured analysis with the following sections:
-        1. Citation
-        2. Court
-        3. Judges
-        4. Parties Involved
-        5. Key Legal Issues
-        6. Main Legal Principles Established
-        7. Holding/Decision
-        8. Reasoning
-        9. Precedents Cited
-        10. Statutes/Regulations Referenced
+        {CASE_ANALYSIS_SECTIONS}
         """
-        
-        analysis_text = self.llm_client.generate(prompt)
-        
-        # Convert to structured format
-        analysis = {
+    
+    def _structure_case_analysis(self, analysis_text: str) -> Dict[str, Any]:
+        """Convert a sectioned analysis into the structured case analysis dictionary"""
+        return {
             "citation": self._extract_section(analysis_text, "Citation", "Court"),
             "court": self._extract_section(analysis_text, "Court", "Judges"),
             "judges": self._extract_section(analysis_text, "Judges", "Parties Involved"),
@@ -1201,8 +2552,123 @@ class LegalAssistant:
             "statutes": self._extract_section(analysis_text, "Statutes/Regulations", ""),
             "full_analysis": analysis_text
         }
+    
+    def _chunk_call_tokens(self, chunk: Dict[str, Any]) -> int:
+        """Estimated tokens for analyzing one chunk (prompt plus completion)"""
+        return chunk["tokens"] + CHUNK_PROMPT_OVERHEAD_TOKENS + config.LLM_MAP_MAX_TOKENS
+    
+    def _reduce_call_tokens(self, chunk_count: int) -> int:
+        """Estimated tokens for merging chunk analyses (prompt plus completion)"""
+        return CHUNK_PROMPT_OVERHEAD_TOKENS + chunk_count * config.LLM_MAP_MAX_TOKENS + CASE_ANALYSIS_MAX_TOKENS
+    
+    def _select_chunks(self, chunks: List[Dict[str, Any]], token_budget: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Pick the chunks to analyze within the token budget
         
-        return analysis
+        The opening (parties, court, citation) and closing (decision, orders) chunks come first,
+        then chunks under analysis/determination headings, then the rest in document order.
+        """
+        if token_budget is None:
+            return chunks
+        
+        def priority(chunk):
+            if chunk["index"] == 0:
+                return 0
+            if chunk["index"] == len(chunks) - 1:
+                return 1
+            if _KEY_SECTION_RE.search(chunk["heading"] or ""):
+                return 2
+            return 3
+        
+        selected = []
+        spent = 0
+        for chunk in sorted(chunks, key=lambda chunk: (priority(chunk), chunk["index"])):
+            cost = self._chunk_call_tokens(chunk)
+            if spent + cost + self._reduce_call_tokens(len(selected) + 1) > token_budget:
+                continue
+            selected.append(chunk)
+            spent += cost
+        
+        return sorted(selected, key=lambda chunk: chunk["index"])
+    
+    def _map_reduce_case_analysis(self, case_text: str, token_budget: Optional[int], usage: Dict[str, Any]) -> str:
+        """
+        Analyze a long case chunk by chunk and merge the partial analyses
+        
+        Args:
+            case_text: Full text of the case
+            token_budget: Maximum model tokens to spend (None for no limit)
+            usage: Token usage summary, updated in place
+            
+        Returns:
+            Sectioned analysis text
+        """
+        chunks = chunk_text(case_text, config.LLM_CHUNK_TOKENS)
+        selected = self._select_chunks(chunks, token_budget)
+        usage["chunks_total"] = len(chunks)
+        
+        if not selected:
+            # Not even one chunk fits - analyze as much of the opening as the budget allows
+            available = (token_budget or 0) - CHUNK_PROMPT_OVERHEAD_TOKENS - CASE_ANALYSIS_MAX_TOKENS
+            prompt = self._case_analysis_prompt(truncate_to_tokens(case_text, available))
+            analysis_text = self._generate_cached(prompt)
+            usage.update({
+                "chunks_analyzed": 0,
+                "calls": 1,
+                "estimated_tokens": estimate_tokens(prompt) + estimate_tokens(analysis_text)
+            })
+            return analysis_text
+        
+        logger.info(f"Analyzing case in {len(selected)} of {len(chunks)} chunks")
+        
+        def analyze_chunk(chunk):
+            heading = f" (section: {chunk['heading']})" if chunk["heading"] else ""
+            prompt = f"""
+        The following is excerpt {chunk['index'] + 1} of {len(chunks)}{heading} from a long judgment of the Kenyan courts.
+        Extract only what this excerpt says under each of these sections, writing "Not in excerpt" where it says nothing:
+        {CASE_ANALYSIS_SECTIONS}
+        
+        EXCERPT:
+        {chunk['text']}
+        """
+            response = self._generate_cached(prompt, temperature=0.2, max_tokens=config.LLM_MAP_MAX_TOKENS)
+            return prompt, response
+        
+        # Map: analyze the chunks in parallel, keeping document order
+        with ThreadPoolExecutor(max_workers=config.LLM_MAP_MAX_WORKERS, thread_name_prefix="case-map") as executor:
+            results = list(executor.map(analyze_chunk, selected))
+        
+        partials = []
+        estimated = 0
+        for chunk, (prompt, response) in zip(selected, results):
+            estimated += estimate_tokens(prompt) + estimate_tokens(response)
+            if not _is_failed_response(response):
+                partials.append(f"EXCERPT {chunk['index'] + 1}:\n{response.strip()}")
+        
+        # Reduce: merge the partial analyses into the final sections
+        skipped_note = ""
+        if len(selected) < len(chunks):
+            skipped_note = f"Only {len(selected)} of {len(chunks)} excerpts were analyzed because of the token budget.\n        "
+        combined = "\n\n".join(partials) if partials else "No excerpt could be analyzed."
+        reduce_prompt = f"""
+        Analyze the following legal case from the Kenyan legal system by combining these partial analyses
+        of consecutive excerpts of the same judgment into one analysis. Remove duplicates and resolve
+        the final holding from the latest excerpts.
+        {skipped_note}
+        {combined}
+        
+        Format your response as a structured analysis with the following sections:
+        {CASE_ANALYSIS_SECTIONS}
+        """
+        analysis_text = self._generate_cached(reduce_prompt, temperature=0.2)
+        estimated += estimate_tokens(reduce_prompt) + estimate_tokens(analysis_text)
+        
+        usage.update({
+            "chunks_analyzed": len(selected),
+            "calls": len(selected) + 1,
+            "estimated_tokens": estimated
+        })
+        return analysis_text
     
     def draft_legal_document(self, document_type: str, case_info: Dict[str, Any], instructions: str) -> str:
         """
@@ -1216,6 +2682,24 @@ class LegalAssistant:
         Returns:
             Draft document text
         """
+        return self.llm_client.generate(self._draft_document_prompt(document_type, case_info, instructions))
+    
+    def draft_legal_document_stream(self, document_type: str, case_info: Dict[str, Any], instructions: str) -> Iterator[str]:
+        """
+        Draft a legal document, yielding the text as it is generated
+        
+        Args:
+            document_type: Type of document to draft
+            case_info: Information about the case
+            instructions: Specific instructions for drafting
+            
+        Yields:
+            Chunks of the draft document text
+        """
+        yield from self.llm_client.generate_stream(self._draft_document_prompt(document_type, case_info, instructions))
+    
+    def _draft_document_prompt(self, document_type: str, case_info: Dict[str, Any], instructions: str) -> str:
+        """Build the prompt for drafting a legal document"""
         # Format case_info as string
         case_info_str = "\n".join([f"{key}: {value}" for key, value in case_info.items()])
         
@@ -1231,7 +2715,7 @@ class LegalAssistant:
         Please format the document appropriately for the Kenyan legal system.
         """
         
-        return self.llm_client.generate(prompt)
+        return prompt
     
     def analyze_statute(self, statute_text: str) -> Dict[str, Any]:
         """
@@ -1259,7 +2743,7 @@ class LegalAssistant:
         8. Related Regulations or Statutory Instruments
         """
         
-        analysis_text = self.llm_client.generate(prompt)
+        analysis_text = self._generate_cached(prompt)
         
         # Convert to structured format
         analysis = {
@@ -1351,7 +2835,7 @@ class LegalAssistant:
         8. Significance of the Decision
         """
         
-        return self.llm_client.generate(prompt)
+        return self._generate_cached(prompt)
     
     def generate_contract_clause(self, contract_type: str, clause_purpose: str, specific_requirements: str) -> str:
         """
@@ -1,9 +1,15 @@
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable
+from flask import current_app
+import config
 from utils.scraper import KenyaLawScraper
 from utils.llm import OllamaClient, LegalAssistant
-from utils.vector_db import VectorDatabase
+from utils.async_llm import SyncLLMClient, async_client_for
+from utils.hybrid_search import HybridRetriever, get_hybrid_retriever
+from utils.search_filters import court_code_for
 
 logger = logging.getLogger(__name__)
 
@@ -12,86 +18,218 @@ class LegalResearchAssistant:
     Legal research assistant for Kenyan law
     """
     
-    def __init__(self, scraper=None, llm_client=None, vector_db=None):
+    def __init__(self, scraper=None, llm_client=None, vector_db=None, retriever=None):
         """
         Initialize legal research assistant
         
         Args:
             scraper: Kenya Law scraper
             llm_client: LLM client for analysis
-            vector_db: Vector database for semantic search
+            vector_db: Vector database for passage search (defaults to the retriever's)
+            retriever: Hybrid keyword and semantic retriever over the local rulings and statutes
+                (defaults to one over vector_db, or the shared retriever)
         """
         self.scraper = scraper or KenyaLawScraper()
         self.llm_client = llm_client or OllamaClient()
+        # Runs independent prompts concurrently on the async counterpart of the same backend
+        self.async_llm = SyncLLMClient(async_client_for(self.llm_client))
         self.legal_assistant = LegalAssistant(self.llm_client)
-        self.vector_db = vector_db or VectorDatabase()
+        if retriever is None:
+            retriever = HybridRetriever(vector_db=vector_db) if vector_db is not None else get_hybrid_retriever()
+        self.retriever = retriever
+        self.vector_db = vector_db or retriever.vector_db
         
         logger.info("Initialized legal research assistant")
     
-    def research_legal_issue(self, query: str, court_filters: Optional[List[str]] = None) -> Dict[str, Any]:
+    def research_legal_issue(self, query: str, court_filters: Optional[List[str]] = None,
+                             progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
         """
         Research a legal issue
         
+        The pipeline runs as a dependency graph on a bounded thread pool: the case search,
+        legislation lookup, hybrid search of the local rulings and statutes, passage search and
+        the query-only prompts (principles and
+        recommendations, generated concurrently on the async client) start together; each found case is fetched and analyzed as soon as
+        the search returns; only the summary waits for the cases and statutes.
+        
+        Must be called with an application context, as the hybrid search reads rulings from the database.
+        
         Args:
             query: Research query
             court_filters: List of court codes to filter by
+            progress: Optional callback receiving the fraction complete and a step description
             
         Returns:
-            Research results
+            Research results, with per-stage wall-clock seconds under 'timings'
         """
         logger.info(f"Researching legal issue: {query}")
+        started = time.monotonic()
+        timings = {}
         results = {
             'query': query,
             'summary': '',
             'cases': [],
             'statutes': [],
             'principles': [],
-            'recommendations': ''
+            'recommendations': '',
+            'timings': timings
         }
         
+        # Court filters are applied inside the vector indexes, and to web results by the court code in their URL
+        court_codes = {court_code_for(court) for court in court_filters or []} - {''}
+        search_filters = {'court': sorted(court_codes)} if court_codes else None
+        
+        app = current_app._get_current_object()
+        executor = ThreadPoolExecutor(max_workers=config.RESEARCH_MAX_WORKERS, thread_name_prefix="research")
         try:
-            # Search for cases using web scraper
-            search_results = self.scraper.search_cases(query)
+            # Stages that only need the query start immediately
+            search_future = executor.submit(self._timed, timings, 'search', self.scraper.search_cases, query)
+            statutes_future = executor.submit(self._timed, timings, 'legislation', self.scraper.get_legislation)
+            # Enough results that both rulings and statutes make the top three of their kind
+            hybrid_future = executor.submit(self._timed, timings, 'hybrid_search', self._hybrid_search, app, query,
+                                            limit=10, filters=search_filters)
+            passages_future = executor.submit(self._timed, timings, 'passages', self.vector_db.search_passages, query,
+                                              n_results=3, per_document=2, filters=search_filters)
+            guidance_future = executor.submit(self._timed, timings, 'guidance', self.async_llm.generate_each, [
+                {'prompt': self._principles_prompt(query), 'temperature': 0.2, 'max_tokens': 800},
+                {'prompt': self._recommendations_prompt(query), 'temperature': 0.3, 'max_tokens': 800}
+            ])
+            
+            search_results = search_future.result()
             
             # Filter by courts if specified
-            if court_filters:
+            if court_codes:
                 search_results = [
                     result for result in search_results 
-                    if any(court_code in result.get('link', '') for court_code in court_filters)
+                    if court_code_for(url=result.get('link', '')) in court_codes
                 ]
             
-            # Get case details for top results
-            cases = []
-            for result in search_results[:3]:  # Limit to 3 cases for detail retrieval
-                case_url = result.get('link')
-                if case_url:
-                    case_details = self.scraper.get_case_details(case_url)
-                    if case_details:
-                        # Get AI analysis of the case
-                        case_analysis = self.legal_assistant.analyze_case(case_details.get('full_text', ''))
-                        
-                        # Add analysis to case details
-                        case_details['analysis'] = case_analysis
-                        cases.append(case_details)
-            
+            # Fetch and analyze the top cases in parallel, keeping search order
+            cases_started = time.monotonic()
+            case_urls = [result.get('link') for result in search_results[:3] if result.get('link')]  # Limit to 3 cases for detail retrieval
+            if progress:
+                progress(0.2, f"Fetching and analyzing {len(case_urls)} cases")
+            case_futures = [
+                executor.submit(self._fetch_and_analyze_case, case_url, timings, f'case_{number}')
+                for number, case_url in enumerate(case_urls, 1)
+            ]
+            cases = [case for case in (future.result() for future in case_futures) if case]
+            timings['cases'] = time.monotonic() - cases_started
             results['cases'] = cases
             
-            # Search for relevant statutes
-            statutes = self.scraper.get_legislation()
+            statutes = statutes_future.result()
             results['statutes'] = statutes[:3]  # Limit to 3 statutes
             
-            # Also search vector database for related documents
-            vector_results = self.vector_db.search_all(query, n_results=3)
+            # Add the local rulings and statutes, ranked by keywords and meaning together
+            hybrid_results = hybrid_future.result()['results']
+            vector_cases = [result for result in hybrid_results if result['kind'] == 'ruling'][:3]
+            if vector_cases:
+                results['vector_cases'] = vector_cases
+            
+            vector_statutes = [result for result in hybrid_results if result['kind'] == 'statute'][:3]
+            if vector_statutes:
+                results['vector_statutes'] = vector_statutes
+            
+            # The best passages of indexed rulings and statutes, grouped by document
+            results['passages'] = passages_future.result()
+            
+            # The summary is the only prompt that needs the cases and statutes
+            if progress:
+                progress(0.7, "Summarizing research")
+            results['summary'] = self._timed(
+                timings, 'summary',
+                self.llm_client.generate, self._summary_prompt(query, cases, statutes[:3], results['passages']),
+                temperature=0.3, max_tokens=1500
+            )
+            results['principles'], results['recommendations'] = guidance_future.result()
             
-            # Add vector database results
-            if vector_results.get('cases'):
-                results['vector_cases'] = vector_results['cases']
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error researching legal issue: {str(e)}")
+            results['error'] = str(e)
+            return results
+        
+        finally:
+            # Don't start queued work for a failed request; running calls finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+            timings['total'] = time.monotonic() - started
+            logger.info(f"Research stage timings for '{query}': " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in list(timings.items())))
+    
+    def _hybrid_search(self, app, query: str, **kwargs) -> Dict[str, Any]:
+        """
+        Search the hybrid retriever from a worker thread
+        
+        Args:
+            app: Flask application whose context the rulings are read in
+            query: Search query
+            **kwargs: Arguments for HybridRetriever.search
             
-            if vector_results.get('statutes'):
-                results['vector_statutes'] = vector_results['statutes']
+        Returns:
+            The retriever's search results
+        """
+        with app.app_context():
+            return self.retriever.search(query, **kwargs)
+    
+    def _timed(self, timings: Dict[str, float], stage: str, func, *args, **kwargs):
+        """
+        Call a function and record how long it took
+        
+        Args:
+            timings: Dictionary receiving the duration in seconds under the stage name
+            stage: Stage name
+            func: Function to call with the remaining arguments
+            
+        Returns:
+            The function's result
+        """
+        stage_started = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = time.monotonic() - stage_started
+    
+    def _fetch_and_analyze_case(self, case_url: str, timings: Optional[Dict[str, float]] = None,
+                                stage: str = 'case') -> Optional[Dict[str, Any]]:
+        """
+        Get a case's details and its AI analysis
+        
+        Args:
+            case_url: URL of the case on Kenya Law
+            timings: Dictionary receiving '<stage>_details' and '<stage>_analysis' durations
+            stage: Stage name prefix for the timings (e.g. 'case_1')
             
-            # Generate research summary and recommendations
-            summary_prompt = f"""
+        Returns:
+            Case details with an 'analysis' key, or None if the case could not be fetched
+        """
+        timings = {} if timings is None else timings
+        case_details = self._timed(timings, f'{stage}_details', self.scraper.get_case_details, case_url)
+        if not case_details:
+            return None
+        
+        # Get AI analysis of the case
+        case_details['analysis'] = self._timed(
+            timings, f'{stage}_analysis',
+            self.legal_assistant.analyze_case, case_details.get('full_text', '')
+        )
+        return case_details
+    
+    def _summary_prompt(self, query: str, cases: List[Dict[str, Any]], statutes: List[Dict[str, Any]],
+                        passages: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Build the research summary prompt from the analyzed cases, statutes and the most relevant passages"""
+        excerpts = []
+        for document in passages or []:
+            source = document.get('title', '')
+            if document.get('citation'):
+                source += f" {document['citation']}"
+            for passage in document.get('passages', []):
+                location = passage.get('heading') or ''
+                if passage.get('paragraph_start') is not None:
+                    location += f" paras {passage['paragraph_start']}-{passage['paragraph_end']}"
+                excerpts.append(f"[{source}{' - ' + location.strip() if location.strip() else ''}]\n{passage.get('text', '')}")
+        passages_section = "\n\n".join(excerpts) if excerpts else "None indexed"
+        
+        return f"""
             Please analyze these research results on Kenyan law regarding: {query}
             
             CASES FOUND:
@@ -105,7 +243,10 @@ class LegalResearchAssistant:
             STATUTES FOUND:
             {json.dumps([{
                 'title': statute.get('title', '')
-            } for statute in statutes[:3]], indent=2)}
+            } for statute in statutes], indent=2)}
+            
+            RELEVANT PASSAGES FROM INDEXED RULINGS AND STATUTES:
+            {passages_section}
             
             Please provide:
             1. A concise summary of the key legal principles related to this issue
@@ -113,11 +254,10 @@ class LegalResearchAssistant:
             3. How these authorities apply to the query
             4. Recommendations for further research or legal strategy
             """
-            
-            summary_response = self.llm_client.generate(summary_prompt, temperature=0.3, max_tokens=1500)
-            
-            # Extract key legal principles
-            principles_prompt = f"""
+    
+    def _principles_prompt(self, query: str) -> str:
+        """Build the key legal principles prompt"""
+        return f"""
             Based on the Kenyan law cases and statutes relating to: {query}
             
             Please extract and list the 3-5 most important legal principles established by these cases and statutes.
@@ -128,15 +268,10 @@ class LegalResearchAssistant:
             
             Format each principle clearly and concisely.
             """
-            
-            principles_response = self.llm_client.generate(principles_prompt, temperature=0.2, max_tokens=800)
-            
-            # Add generated content to results
-            results['summary'] = summary_response
-            results['principles'] = principles_response
-            
-            # Generate recommendations
-            recommendations_prompt = f"""
+    
+    def _recommendations_prompt(self, query: str) -> str:
+        """Build the recommendations prompt"""
+        return f"""
             Based on the Kenyan law research regarding: {query}
             
             Please provide specific recommendations for:
@@ -147,23 +282,14 @@ class LegalResearchAssistant:
             
             Be specific and cite relevant Kenyan legal authorities where possible.
             """
-            
-            recommendations_response = self.llm_client.generate(recommendations_prompt, temperature=0.3, max_tokens=800)
-            results['recommendations'] = recommendations_response
-            
-            return results
-        
-        except Exception as e:
-            logger.error(f"Error researching legal issue: {str(e)}")
-            results['error'] = str(e)
-            return results
     
-    def analyze_legal_document(self, document_text: str) -> Dict[str, Any]:
+    def analyze_legal_document(self, document_text: str, token_budget: Optional[int] = None) -> Dict[str, Any]:
         """
         Analyze a legal document
         
         Args:
             document_text: Text of the document
+            token_budget: Maximum model tokens to spend analyzing a judgment (None for no limit)
             
         Returns:
             Analysis results
@@ -194,7 +320,7 @@ class LegalResearchAssistant:
             
             # Analyze based on document type
             if "judgment" in document_type.lower() or "ruling" in document_type.lower():
-                analysis = self.legal_assistant.analyze_case(document_text)
+                analysis = self.legal_assistant.analyze_case(document_text, token_budget=token_budget)
             elif "statute" in document_type.lower() or "regulation" in document_type.lower():
                 analysis = self.legal_assistant.analyze_statute(document_text)
             else:
@@ -235,12 +361,14 @@ class LegalResearchAssistant:
         """
         Find relevant precedents for a legal issue
         
+        Must be called with an application context, as the hybrid search reads rulings from the database.
+        
         Args:
             issue: Legal issue
             court_level: Court level (e.g., 'Supreme Court', 'Court of Appeal')
             
         Returns:
-            Relevant precedents
+            Relevant precedents, with the number of scraper HTTP requests under 'http_requests'
         """
         logger.info(f"Finding relevant precedents for issue: {issue}, court level: {court_level}")
         
@@ -254,6 +382,8 @@ class LegalResearchAssistant:
         }
         
         courts_to_search = court_hierarchy.get(court_level, ['KESC', 'KECA', 'KEHC'])
+        app = current_app._get_current_object()
+        requests_before = getattr(self.scraper, 'request_count', None)
         
         try:
             results = {
@@ -263,41 +393,44 @@ class LegalResearchAssistant:
                 'persuasive_precedents': []
             }
             
-            # Search for precedents using web scraper
-            for court_code in courts_to_search:
-                # Get cases for this court
-                cases = self.scraper.get_case_law(court_code)
+            with ThreadPoolExecutor(max_workers=config.RESEARCH_MAX_WORKERS, thread_name_prefix="precedents") as executor:
+                # The local search doesn't depend on the web search, so run it alongside
+                hybrid_future = executor.submit(self._hybrid_search, app, issue, kinds=('rulings',), limit=5,
+                                                filters={'court': courts_to_search})
                 
-                # Search these cases for relevance to the issue
+                # One search for the issue, partitioned by court locally
                 search_results = self.scraper.search_cases(issue)
+                court_cases = []
+                for court_code in courts_to_search:
+                    court_search_results = [
+                        result for result in search_results 
+                        if result.get('link') and court_code_for(url=result['link']) == court_code
+                    ]
+                    court_cases.extend((court_code, result['link']) for result in court_search_results[:2])  # Limit to 2 cases per court
                 
-                # Filter to this court's cases
-                court_search_results = [
-                    result for result in search_results 
-                    if court_code in result.get('link', '')
+                # Fetch and analyze the selected cases in parallel, keeping court order
+                case_futures = [
+                    (court_code, executor.submit(self._fetch_and_analyze_case, case_url))
+                    for court_code, case_url in court_cases
                 ]
                 
-                # Get case details for top results
-                for result in court_search_results[:2]:  # Limit to 2 cases per court
-                    case_url = result.get('link')
-                    if case_url:
-                        case_details = self.scraper.get_case_details(case_url)
-                        if case_details:
-                            # Get AI analysis of the case
-                            case_analysis = self.legal_assistant.analyze_case(case_details.get('full_text', ''))
-                            
-                            # Add analysis to case details
-                            case_details['analysis'] = case_analysis
-                            
-                            # Determine if this is binding or persuasive precedent
-                            if court_code in courts_to_search[:courts_to_search.index(courts_to_search[0]) + 1]:
-                                results['binding_precedents'].append(case_details)
-                            else:
-                                results['persuasive_precedents'].append(case_details)
-            
-            # Also search vector database for related cases
-            vector_results = self.vector_db.search_cases(issue, n_results=5)
-            results['vector_results'] = vector_results
+                # Only the highest court in the hierarchy is binding; the rest are persuasive
+                binding_courts = courts_to_search[:1]
+                for court_code, future in case_futures:
+                    case_details = future.result()
+                    if not case_details:
+                        continue
+                    if court_code in binding_courts:
+                        results['binding_precedents'].append(case_details)
+                    else:
+                        results['persuasive_precedents'].append(case_details)
+                
+                # Also add the related local rulings
+                results['vector_results'] = hybrid_future.result()['results']
+            
+            if requests_before is not None:
+                results['http_requests'] = self.scraper.request_count - requests_before
+                logger.info(f"Precedent search for '{issue}' made {results['http_requests']} HTTP requests")
             
             # Generate analysis of found precedents
             precedents_analysis_prompt = f"""
@@ -420,8 +553,6 @@ class LegalResearchAssistant:
             Format each argument clearly with headings and structured evidence.
             """
             
-            arguments_response = self.llm_client.generate(arguments_prompt, temperature=0.3, max_tokens=1500)
-            
             # Generate evidence matrix
             evidence_prompt = f"""
             Based on the Kenyan legal issue and case facts:
@@ -441,23 +572,10 @@ class LegalResearchAssistant:
             Focus on the most compelling evidence that would be persuasive in a Kenyan court.
             """
             
-            evidence_response = self.llm_client.generate(evidence_prompt, temperature=0.2, max_tokens=1000)
-            
-            results = {
-                'issue': issue,
-                'arguments': arguments_response,
-                'evidence': evidence_response,
-                'related_cases': [{
-                    'title': case.get('title', ''),
-                    'citation': case.get('citation', ''),
-                    'court': case.get('court', ''),
-                    'link': case.get('link', '')
-                } for case in cases],
-                'related_statutes': [{
-                    'title': statute.get('title', ''),
-                    'link': statute.get('link', '')
-                } for statute in statutes]
-            }
+            generations = [
+                {'prompt': arguments_prompt, 'temperature': 0.3, 'max_tokens': 1500},
+                {'prompt': evidence_prompt, 'temperature': 0.2, 'max_tokens': 1000}
+            ]
             
             # Generate rebuttals if opposing arguments are provided
             if opposing_arguments:
@@ -487,8 +605,30 @@ class LegalResearchAssistant:
                 Focus on rebuttals that would be persuasive in a Kenyan court based on Kenyan law.
                 """
                 
-                rebuttal_response = self.llm_client.generate(rebuttal_prompt, temperature=0.3, max_tokens=1500)
-                results['rebuttals'] = rebuttal_response
+                generations.append({'prompt': rebuttal_prompt, 'temperature': 0.3, 'max_tokens': 1500})
+            
+            # The prompts are independent, so they are generated concurrently
+            responses = self.async_llm.generate_each(generations)
+            arguments_response, evidence_response = responses[:2]
+            
+            results = {
+                'issue': issue,
+                'arguments': arguments_response,
+                'evidence': evidence_response,
+                'related_cases': [{
+                    'title': case.get('title', ''),
+                    'citation': case.get('citation', ''),
+                    'court': case.get('court', ''),
+                    'link': case.get('link', '')
+                } for case in cases],
+                'related_statutes': [{
+                    'title': statute.get('title', ''),
+                    'link': statute.get('link', '')
+                } for statute in statutes]
+            }
+            
+            if opposing_arguments:
+                results['rebuttals'] = responses[2]
             
             return results
             
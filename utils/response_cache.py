@@ -0,0 +1,283 @@
+"""
+Prompt-response cache for deterministic LLM calls.
+Responses are keyed by (model, prompt hash, temperature, max_tokens) and expire after a TTL.
+The in-process backend serves a single worker; the SQLite backend is shared by every
+gunicorn worker on the host.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryResponseBackend:
+    """
+    In-process LRU store for cached responses
+    """
+
+    name = "memory"
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get an unexpired value, or None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: float) -> int:
+        """Store a value and return the number of entries evicted to make room"""
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            evicted = 0
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._items.clear()
+
+    def count(self) -> int:
+        """Number of stored entries"""
+        with self._lock:
+            return len(self._items)
+
+
+class SQLiteResponseBackend:
+    """
+    SQLite store for cached responses, shared across processes on the same host
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_items: int):
+        self.path = path
+        self.max_items = max_items
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get an unexpired value, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str, expires_at: float) -> int:
+        """Store a value and return the number of entries evicted to make room"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            # Expired entries go first, then the least recently used ones
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] - self.max_items
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key IN "
+                    "(SELECT key FROM response_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+            self._conn.commit()
+            return max(overflow, 0)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Number of stored entries"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for LLM responses with a pluggable backend
+    """
+
+    def __init__(self, backend=None, ttl: Optional[int] = None, max_temperature: Optional[float] = None):
+        """
+        Initialize the response cache
+
+        Args:
+            backend: Storage backend (defaults to an in-process MemoryResponseBackend)
+            ttl: Seconds a cached response stays valid
+            max_temperature: Calls with a higher temperature bypass the cache
+        """
+        self.backend = backend or MemoryResponseBackend(config.LLM_RESPONSE_CACHE_MAX_ITEMS)
+        self.ttl = ttl if ttl is not None else config.LLM_RESPONSE_CACHE_TTL
+        self.max_temperature = max_temperature if max_temperature is not None else config.LLM_RESPONSE_CACHE_MAX_TEMPERATURE
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'writes': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+
+    def should_cache(self, temperature: float) -> bool:
+        """Whether a call at this temperature is deterministic enough to cache"""
+        return temperature <= self.max_temperature
+
+    def make_key(self, model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """
+        Build the cache key for a call
+
+        Args:
+            model: Model identifier
+            prompt: Prompt text
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Hex digest identifying the call
+        """
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{model}|{prompt_hash}|{temperature:.3f}|{max_tokens}".encode('utf-8')).hexdigest()
+
+    def get(self, model: str, prompt: str, temperature: float, max_tokens: int) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Returns:
+            The cached response, or None on a miss or when the call bypasses the cache
+        """
+        if not self.should_cache(temperature):
+            self._count('bypassed')
+            return None
+        try:
+            value = self.backend.get(self.make_key(model, prompt, temperature, max_tokens))
+        except Exception as e:
+            logger.warning(f"Error reading response cache: {str(e)}")
+            self._count('errors')
+            return None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, model: str, prompt: str, temperature: float, max_tokens: int, response: str) -> None:
+        """Store a response for a call"""
+        if not self.should_cache(temperature):
+            return
+        try:
+            evicted = self.backend.set(
+                self.make_key(model, prompt, temperature, max_tokens),
+                response,
+                time.time() + self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Error writing response cache: {str(e)}")
+            self._count('errors')
+            return
+        self._count('writes')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        self.backend.clear()
+        logger.info("Cleared LLM response cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hit/miss counters, backend name and entry count
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['backend'] = self.backend.name
+        stats['ttl'] = self.ttl
+        stats['max_temperature'] = self.max_temperature
+        try:
+            stats['items'] = self.backend.count()
+        except Exception as e:
+            logger.warning(f"Error counting response cache entries: {str(e)}")
+            stats['items'] = None
+        return stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide response cache configured in config.py
+
+    Returns:
+        The shared ResponseCache, or None if response caching is disabled
+    """
+    global _response_cache
+    if not config.LLM_RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                backend = None
+                if config.LLM_RESPONSE_CACHE_BACKEND == "sqlite":
+                    try:
+                        backend = SQLiteResponseBackend(config.LLM_RESPONSE_CACHE_PATH, config.LLM_RESPONSE_CACHE_MAX_ITEMS)
+                    except Exception as e:
+                        logger.error(f"Error opening response cache at {config.LLM_RESPONSE_CACHE_PATH}, using memory: {str(e)}")
+                _response_cache = ResponseCache(backend=backend)
+                logger.info(f"Initialized LLM response cache ({_response_cache.backend.name} backend)")
+    return _response_cache
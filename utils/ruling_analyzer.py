@@ -59,7 +59,8 @@ class RulingAnalyzer:
             "date": str(ruling.date_of_ruling),
             "outcome": ruling.outcome,
             "summary": ruling.summary or "",
-            "full_text": ruling.full_text or ""
+            # Only the start of the text goes into the prompt, so only that is read
+            "full_text": ruling.read_full_text(5000)
         }
         
         # Use LLM to analyze the ruling
@@ -0,0 +1,273 @@
+"""
+Incremental sync of Kenya Law court listings into the ruling database.
+
+Each court keeps a high-water mark (SyncState): the newest judgment URL and date seen at
+its last sync. A sync walks the court's listing pages newest first and stops as soon as
+it reaches known content: the high-water URL, a judgment older than the high-water date,
+or a page whose judgments are all imported already. Each page is checked against the
+ruling table with one IN query, and only the new judgments are fetched, through the
+concurrent crawler. Syncs run as the periodic 'sync_rulings' background job (every
+RULING_SYNC_INTERVAL seconds) or from the command line:
+
+    python -m utils.ruling_sync KESC KECA
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, date
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from app import db
+from models import SyncState
+from utils.crawler import RulingCrawler, existing_ruling_urls, parse_ruling_date
+
+logger = logging.getLogger(__name__)
+
+# Cases taken from each listing page (Kenya Law lists 50 per page)
+LISTING_PAGE_LIMIT = 1000
+
+
+def listing_date(case: Dict[str, Any]) -> Optional[date]:
+    """
+    Parse the judgment date shown in a court listing
+
+    Args:
+        case: Case summary from KenyaLawScraper.get_case_law
+
+    Returns:
+        The date, or None if the listing doesn't show one
+    """
+    return parse_ruling_date((case.get('metadata') or {}).get('Date'), default=None)
+
+
+class RulingSync:
+    """
+    Keeps the ruling database up to date with the latest judgments of each court
+    """
+
+    def __init__(self, crawler: Optional[RulingCrawler] = None, max_pages: Optional[int] = None,
+                 max_new: Optional[int] = None):
+        """
+        Initialize the sync service
+
+        Args:
+            crawler: Crawler used to fetch and store new judgments
+            max_pages: Listing pages walked per court when no known content is reached
+            max_new: Judgments imported per court per sync
+        """
+        self.crawler = crawler or RulingCrawler()
+        self.max_pages = max_pages or config.RULING_SYNC_MAX_PAGES
+        self.max_new = max_new or config.RULING_SYNC_MAX_NEW
+
+    def get_state(self, court_code: str, court_name: str = '') -> SyncState:
+        """Get a court's sync state, creating it on the first sync"""
+        state = SyncState.query.filter_by(court_code=court_code).first()
+        if state is None:
+            state = SyncState(court_code=court_code, court_name=court_name)
+            db.session.add(state)
+            db.session.commit()
+        elif court_name and state.court_name != court_name:
+            state.court_name = court_name
+            db.session.commit()
+        return state
+
+    def find_new(self, court_code: str, state: SyncState) -> Dict[str, Any]:
+        """
+        Walk a court's listing from the newest judgment until known content is reached
+
+        Args:
+            court_code: Court code (e.g. 'KEHC')
+            state: The court's sync state
+
+        Returns:
+            Dictionary with the new (URL, date) pairs newest first, the newest URL and date
+            listed, the number of pages walked and whether known content was reached
+        """
+        scan = {'new': [], 'newest_url': None, 'newest_date': None, 'pages': 0, 'reached_known': False}
+        seen = set()
+
+        for page in range(1, self.max_pages + 1):
+            cases = self.crawler.scraper.get_case_law(court_code, page=page, limit=LISTING_PAGE_LIMIT)
+            page_cases = []
+            for case in cases:
+                url = case.get('link')
+                if url and url not in seen:
+                    seen.add(url)
+                    page_cases.append((url, listing_date(case)))
+            if not page_cases:
+                # Past the last page (or the listing repeats itself)
+                break
+            scan['pages'] = page
+
+            if scan['newest_url'] is None:
+                scan['newest_url'] = page_cases[0][0]
+            dates = [listed for _, listed in page_cases if listed]
+            if dates and (scan['newest_date'] is None or max(dates) > scan['newest_date']):
+                scan['newest_date'] = max(dates)
+
+            existing = existing_ruling_urls([url for url, _ in page_cases])
+            for url, listed in page_cases:
+                if url == state.last_seen_url or (listed and state.last_seen_date and listed < state.last_seen_date):
+                    scan['reached_known'] = True
+                    break
+                if url not in existing:
+                    scan['new'].append((url, listed))
+
+            if len(existing) == len(page_cases):
+                scan['reached_known'] = True
+            if scan['reached_known']:
+                break
+        return scan
+
+    def sync_court(self, court_code: str, court_name: str = '', user_id: Optional[int] = None,
+                   progress: Optional[Callable[[float, str], None]] = None,
+                   should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Import a court's judgments published since its last sync
+
+        The high-water mark only moves forward once the new judgments are imported.
+        When more than `max_new` judgments are new, the oldest ones are imported first
+        and the mark moves up to the newest of those, so the next sync carries on from
+        there; a court's first sync imports its latest `max_new` judgments. Judgments
+        that fail to import are retried on the next sync.
+
+        Args:
+            court_code: Court code (e.g. 'KEHC')
+            court_name: Court name used when a judgment doesn't name one
+            user_id: User the rulings are imported for
+            progress: Optional callback receiving the fraction complete and a step description
+            should_stop: Optional callback; returning True stops the sync after the current fetches
+
+        Returns:
+            Sync report with the listing scan and the crawl counts
+        """
+        started = time.monotonic()
+        state = self.get_state(court_code, court_name)
+        report = {
+            'court_code': court_code,
+            'pages': 0,
+            'new': 0,
+            'retried': 0,
+            'imported_count': 0,
+            'errors': 0,
+            'reached_known': False,
+            'caught_up': True,
+            'stopped': False
+        }
+
+        try:
+            if progress:
+                progress(0.01, f"Checking the {court_code} listing for new judgments")
+            scan = self.find_new(court_code, state)
+            new = scan['new']
+            has_mark = bool(state.last_seen_url or state.last_seen_date)
+            mark_url, mark_date = scan['newest_url'], scan['newest_date']
+            if len(new) > self.max_new:
+                report['caught_up'] = False
+                if has_mark:
+                    # Catch up from the mark: the oldest new judgments first
+                    new = new[-self.max_new:]
+                    mark_url = new[0][0]
+                    mark_date = max((listed for _, listed in new if listed), default=state.last_seen_date)
+                else:
+                    new = new[:self.max_new]
+
+            retry = [url for url in state.get_retry_urls() if url not in {url for url, _ in new}]
+            urls = [url for url, _ in new] + retry
+            report.update(pages=scan['pages'], new=len(new), retried=len(retry), reached_known=scan['reached_known'])
+
+            crawl = {'imported_count': 0, 'errors': 0, 'failed': {}, 'ruling_ids': [], 'stopped': False}
+            if urls:
+                crawl = self.crawler.crawl_court(court_code, limit=len(urls), default_court=court_name, user_id=user_id,
+                                                 progress=progress, should_stop=should_stop, urls=urls)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error syncing {court_code}: {str(e)}")
+            state = self.get_state(court_code)
+            state.last_synced_at = datetime.utcnow()
+            state.last_status = 'failed'
+            state.last_error = str(e)
+            db.session.commit()
+            report['error'] = str(e)
+            return report
+
+        report.update(imported_count=crawl['imported_count'], errors=crawl['errors'], failed=crawl['failed'],
+                      ruling_ids=crawl['ruling_ids'], stopped=crawl['stopped'])
+
+        state = self.get_state(court_code)
+        state.last_synced_at = datetime.utcnow()
+        state.last_imported_count = crawl['imported_count']
+        state.total_imported = (state.total_imported or 0) + crawl['imported_count']
+        state.last_error = None
+        if crawl['stopped']:
+            # Keep the old mark; what was imported is skipped next time
+            state.last_status = 'stopped'
+        else:
+            state.last_status = 'succeeded'
+            if mark_url:
+                state.last_seen_url = mark_url
+            if mark_date:
+                state.last_seen_date = mark_date
+            state.retry_urls = json.dumps(sorted(crawl['failed'])) if crawl['failed'] else None
+        db.session.commit()
+
+        report['elapsed'] = round(time.monotonic() - started, 2)
+        logger.info(
+            f"Synced {court_code}: {report['new']} new judgments in {report['pages']} listing page(s), "
+            f"{report['imported_count']} imported, {report['errors']} errors in {report['elapsed']}s"
+        )
+        return report
+
+    def sync_all(self, court_codes: Optional[List[str]] = None, user_id: Optional[int] = None,
+                 progress: Optional[Callable[[float, str], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Sync several courts one after another
+
+        Args:
+            court_codes: Court codes to sync (defaults to RULING_SYNC_COURTS)
+            user_id: User the rulings are imported for
+            progress: Optional callback receiving the fraction complete and a step description
+            should_stop: Optional callback; returning True stops after the current fetches
+
+        Returns:
+            Sync reports by court code and the total number of imported rulings
+        """
+        court_codes = court_codes or config.RULING_SYNC_COURTS
+        court_names = {code: name for name, code in config.COURT_LEVELS.items()}
+        reports = {}
+        for number, court_code in enumerate(court_codes):
+            if should_stop and should_stop():
+                break
+
+            def court_progress(fraction, message, number=number):
+                if progress:
+                    progress((number + fraction) / len(court_codes), message)
+
+            reports[court_code] = self.sync_court(court_code, court_names.get(court_code, ''), user_id=user_id,
+                                                  progress=court_progress, should_stop=should_stop)
+        return {
+            'courts': reports,
+            'imported_count': sum(report['imported_count'] for report in reports.values())
+        }
+
+
+def main(argv=None):
+    """Sync court listings from the command line (e.g. from cron)"""
+    parser = argparse.ArgumentParser(description="Import judgments published since the last sync")
+    parser.add_argument('court_codes', nargs='*', help="Court codes to sync (default: RULING_SYNC_COURTS)")
+    parser.add_argument('--max-new', type=int, default=config.RULING_SYNC_MAX_NEW, help="Judgments imported per court")
+    args = parser.parse_args(argv)
+
+    from app import app
+    with app.app_context():
+        result = RulingSync(max_new=args.max_new).sync_all(args.court_codes or None)
+    for report in result['courts'].values():
+        report.pop('ruling_ids', None)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
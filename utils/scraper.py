@@ -1,26 +1,375 @@
+import codecs
 import logging
+import tempfile
 import trafilatura
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+import os
 import re
+import threading
 import time
 from config import KENYALAW_BASE_URL
+from utils.http_cache import get_http_cache
+from utils.text_store import get_text_store
 
 logger = logging.getLogger(__name__)
 
+# Prefer lxml (C parser) for page trees and link scans; fall back to the pure-Python parser
+try:
+    import lxml.etree
+    import lxml.html
+    from lxml.etree import ParserError
+    HTML_PARSER = 'lxml'
+except ImportError:
+    lxml = None
+    HTML_PARSER = 'html.parser'
+
+# Annotations in court listing titles, e.g. "... (12 March 2023) (Judgment) (Petition 3 of 2022)"
+LISTING_DATE_RE = re.compile(r'\((\d+\s+\w+\s+\d{4})\)')
+LISTING_TYPE_RE = re.compile(r'\((Judgment|Ruling|Advisory Opinion|Order)\)')
+LISTING_CASE_NUMBER_RE = re.compile(r'\((Petition|Reference|Application|Civil Appeal|Criminal Appeal)\s+[^)]+\)')
+
+# Looser patterns for titles of links found by URL pattern
+TITLE_DATE_RE = re.compile(r'\b(\d{1,2}\s+\w+\s+\d{4})\b')
+TITLE_CASE_NUMBER_RE = re.compile(r'\b(Petition|Reference|Application|Civil Appeal|Criminal Appeal)\s+No\.\s+\d+\s+of\s+\d{4}\b')
+
+# Judgment page metadata
+CITATION_RE = re.compile(r'Citation:?\s*([^\n]+)')
+COURT_RE = re.compile(r'Court:?\s*([^\n]+)')
+JUDGES_RE = re.compile(r'(?:Judge|Coram):?\s*([^\n]+)')
+JUDGE_SEPARATOR_RE = re.compile(r',|;')
+DATE_RE = re.compile(r'Date:?\s*([^\n]+)')
+PARTIES_RE = re.compile(r'([^v]+)\s+v\.?\s+([^(]+)', re.IGNORECASE)
+RULING_PREAMBLE_RE = re.compile(r'^.*?(?:JUDGMENT|RULING)', re.DOTALL)
+RULING_HEADING_RE = re.compile(r'JUDGMENT|RULING')
+
+# Judgment page containers, in the order get_case_details looks for them
+META_SECTIONS = ('.decision-details', '.case-meta', '.document-metadata', 'header')
+CONTENT_ROOTS = ('main', 'article', '.document-content')
+
+# Streaming extraction (stream_case_details)
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read from the response at a time
+STREAM_META_LIMIT = 64 * 1024  # Characters kept of the title and each metadata section
+STREAM_SPOOL_SIZE = 1024 * 1024  # Fallback page text kept in memory before spilling to a temporary file
+PREAMBLE_SEARCH_LIMIT = 64 * 1024  # Characters at the start of a ruling searched for its JUDGMENT/RULING heading
+TEXTLESS_TAGS = {'script', 'style', 'template'}  # Not part of an element's text (as with BeautifulSoup)
+BOILERPLATE_TAGS = {'nav', 'header', 'footer', 'aside', 'form'}  # Left out of the fallback page text
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}  # Whitespace-only text kept as is (elsewhere it is collapsed, as BeautifulSoup does)
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+class CountingSession(requests.Session):
+    """
+    requests.Session that counts every HTTP request it sends and can be throttled per host
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.request_count = 0
+        self.throttle = None  # Optional per-host politeness limits (see utils/crawler.py)
+        self._count_lock = threading.Lock()
+    
+    def send(self, request, **kwargs):
+        with self._count_lock:
+            self.request_count += 1
+        if self.throttle is None:
+            return super().send(request, **kwargs)
+        with self.throttle.slot(request.url):
+            return super().send(request, **kwargs)
+
+def _matches(selector, tag, attrib):
+    """Check an element against a tag ('main') or class ('.case-meta') selector"""
+    if selector.startswith('.'):
+        return selector[1:] in attrib.get('class', '').split()
+    return tag == selector
+
+class RulingTextSink:
+    """
+    Cleans up a ruling's text as it streams in, the way get_case_details does
+    
+    Surrounding whitespace is stripped and everything before the first JUDGMENT or
+    RULING heading is replaced by 'JUDGMENT'. Only the first PREAMBLE_SEARCH_LIMIT
+    characters are searched for the heading, so the text is never held in full.
+    """
+    
+    def __init__(self, writer):
+        self.writer = writer
+        self._head = ''
+        self._head_done = False
+        self._pending_space = ''
+    
+    def write(self, text):
+        """Append text"""
+        if self._head_done:
+            self._emit(text)
+            return
+        if not self._head:
+            text = text.lstrip()
+            if not text:
+                return
+        searched = max(len(self._head) - len('JUDGMENT') + 1, 0)
+        self._head += text
+        heading = RULING_HEADING_RE.search(self._head, searched)
+        if heading:
+            self._head = 'JUDGMENT' + self._head[heading.end():]
+        if heading or len(self._head) > PREAMBLE_SEARCH_LIMIT:
+            self._flush_head()
+    
+    def close(self):
+        """Write out what is still held back"""
+        if not self._head_done:
+            self._flush_head()
+    
+    def _flush_head(self):
+        self._head_done = True
+        head, self._head = self._head, ''
+        self._emit(head)
+    
+    def _emit(self, text):
+        # Hold back trailing whitespace until more text follows it
+        stripped = text.rstrip()
+        if stripped:
+            self.writer.write(self._pending_space + stripped)
+            self._pending_space = text[len(stripped):]
+        else:
+            self._pending_space += text
+
+class JudgmentPageTarget:
+    """
+    lxml parser target that takes a judgment page apart as it is parsed, without building a tree
+    
+    The title (first h1) and the metadata sections are collected; the text of the first
+    content root (main, article or .document-content) is passed straight to the sink.
+    Pages without a content root fall back to their body text, less navigation and
+    other boilerplate, which is spooled to a temporary file until the page ends.
+    """
+    
+    def __init__(self, sink):
+        self.sink = sink
+        self.title = None
+        self.meta_sections = {}  # Selector -> text of the first matching element
+        self.found_content = False
+        self._depth = 0
+        self._textless_depth = None
+        self._boilerplate_depth = None
+        self._content_depth = None
+        self._in_body = False
+        self._preserve_depth = None
+        self._blank = None  # Whitespace-only text seen so far in the current text node
+        self._node_start = True
+        self._captures = {}  # Selector ('h1' for the title) -> [depth, parts, length]
+        self._fallback = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_SIZE, mode='w+', encoding='utf-8')
+    
+    def start(self, tag, attrib):
+        self._end_text_node()
+        self._depth += 1
+        if tag in PRESERVE_WHITESPACE_TAGS and self._preserve_depth is None:
+            self._preserve_depth = self._depth
+        if tag in TEXTLESS_TAGS and self._textless_depth is None:
+            self._textless_depth = self._depth
+        if tag in BOILERPLATE_TAGS and self._boilerplate_depth is None:
+            self._boilerplate_depth = self._depth
+        if tag == 'body':
+            self._in_body = True
+        
+        if tag == 'h1' and self.title is None and 'h1' not in self._captures:
+            self._captures['h1'] = [self._depth, [], 0]
+        for selector in META_SECTIONS:
+            if selector not in self.meta_sections and selector not in self._captures and _matches(selector, tag, attrib):
+                self._captures[selector] = [self._depth, [], 0]
+        if not self.found_content and any(_matches(selector, tag, attrib) for selector in CONTENT_ROOTS):
+            self.found_content = True
+            self._content_depth = self._depth
+    
+    def end(self, tag):
+        self._end_text_node()
+        for selector, (depth, parts, _) in list(self._captures.items()):
+            if depth == self._depth:
+                del self._captures[selector]
+                if selector == 'h1':
+                    self.title = ''.join(parts)
+                else:
+                    self.meta_sections[selector] = ''.join(parts)
+        if self._content_depth == self._depth:
+            self._content_depth = None
+        if self._textless_depth == self._depth:
+            self._textless_depth = None
+        if self._boilerplate_depth == self._depth:
+            self._boilerplate_depth = None
+        if self._preserve_depth == self._depth:
+            self._preserve_depth = None
+        self._depth -= 1
+    
+    def data(self, data):
+        if self._textless_depth is not None:
+            return
+        # A text node may arrive in several pieces; hold it back while it is only whitespace
+        if self._blank is not None:
+            if not data.strip(ASCII_SPACES):
+                self._blank += data
+                return
+            data, self._blank = self._blank + data, None
+        elif self._node_start and not data.strip(ASCII_SPACES):
+            self._blank = data
+            return
+        self._node_start = False
+        self._text(data)
+    
+    def comment(self, text):
+        self._end_text_node()
+    
+    def _end_text_node(self):
+        if self._blank is not None:
+            blank, self._blank = self._blank, None
+            if self._preserve_depth is None:
+                blank = '\n' if '\n' in blank else ' '
+            self._text(blank)
+        self._node_start = True
+    
+    def _text(self, data):
+        for capture in self._captures.values():
+            if capture[2] < STREAM_META_LIMIT:
+                capture[1].append(data)
+                capture[2] += len(data)
+        if self._content_depth is not None:
+            self.sink.write(data)
+        elif not self.found_content and self._in_body and self._boilerplate_depth is None:
+            self._fallback.write(data)
+    
+    def close(self):
+        self._end_text_node()
+        if not self.found_content:
+            self._fallback.seek(0)
+            for text in iter(lambda: self._fallback.read(STREAM_CHUNK_SIZE), ''):
+                self.sink.write(text)
+        self._fallback.close()
+        self.sink.close()
+
 class KenyaLawScraper:
     """
     Scraper for retrieving legal content from new.kenyalaw.org
     """
     
-    def __init__(self, base_url=KENYALAW_BASE_URL):
+    def __init__(self, base_url=KENYALAW_BASE_URL, http_cache=None, html_parser=HTML_PARSER, debug_dir='.'):
         self.base_url = base_url
-        self.session = requests.Session()
+        self.http_cache = http_cache or get_http_cache()
+        self.html_parser = html_parser
+        self.debug_dir = debug_dir  # Where pages without results are saved for inspection (None disables)
+        self.session = CountingSession()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
     
+    @property
+    def request_count(self):
+        """Number of HTTP requests this scraper has made"""
+        return self.session.request_count
+    
+    def _fetch_html(self, url, params=None, page_type='listing'):
+        """
+        Fetch a page through the HTTP cache
+        
+        Fresh pages are served from the cache; expired ones are revalidated with a
+        conditional request and only downloaded again if the server says they changed.
+        
+        Args:
+            url: Page URL
+            params: Query parameters
+            page_type: 'listing', 'search', 'judgment' or 'legislation' (selects the TTL)
+            
+        Returns:
+            Decoded HTML of the page
+        """
+        if params:
+            url = requests.Request('GET', url, params=params).prepare().url
+        
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached and cached.is_fresh:
+            self.http_cache.record('hits')
+            return cached.text
+        
+        response = self.session.get(url, headers=cached.conditional_headers() if cached else None)
+        if cached and response.status_code == 304:
+            self.http_cache.refresh(url, page_type)
+            self.http_cache.record('revalidated')
+            return cached.text
+        response.raise_for_status()
+        
+        if self.http_cache:
+            self.http_cache.record('misses')
+            self.http_cache.put(url, response.text, page_type,
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+        return response.text
+    
+    def _save_debug_html(self, filename, html):
+        """Save a page that yielded no results so its markup can be inspected"""
+        if not self.debug_dir:
+            return
+        path = os.path.join(self.debug_dir, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        logger.info(f"Saved HTML to {path} for inspection")
+    
+    def _make_soup(self, html):
+        """Parse HTML with the configured tree builder"""
+        return BeautifulSoup(html, self.html_parser)
+    
+    def _normalize_link(self, href):
+        """Turn a relative or absolute href into a full URL on the Kenya Law site"""
+        if href.startswith('/'):
+            return urljoin(self.base_url, href)
+        if href.startswith('http'):
+            return href
+        return urljoin(self.base_url, '/' + href)
+    
+    def _scan_links(self, html):
+        """
+        Collect the candidates of every link strategy in a single pass over the page's anchors
+        
+        Listing pages only need their anchors, so with lxml available they are scanned
+        straight from the lxml tree without building a BeautifulSoup tree.
+        
+        Args:
+            html: HTML of the page
+            
+        Returns:
+            Dict with 'title_cell', 'judgment', 'klr' and 'legislation' lists of (title, href) tuples
+        """
+        anchors = None
+        if self.html_parser == 'lxml' and lxml is not None:
+            try:
+                root = lxml.html.fromstring(html)
+                anchors = (
+                    (anchor.text_content(), anchor.get('href', ''), any(
+                        'cell-title' in (cell.get('class') or '').split() for cell in anchor.iterancestors('td')
+                    ))
+                    for anchor in root.iter('a')
+                )
+            except (ParserError, ValueError) as e:
+                logger.debug(f"lxml could not parse the page, using BeautifulSoup: {str(e)}")
+        if anchors is None:
+            soup = self._make_soup(html)
+            anchors = (
+                (anchor.get_text(), anchor.get('href', ''), anchor.find_parent('td', class_='cell-title') is not None)
+                for anchor in soup.find_all('a')
+            )
+        
+        links = {'title_cell': [], 'judgment': [], 'klr': [], 'legislation': []}
+        for text, href, in_title_cell in anchors:
+            link = (text.strip(), href)
+            if in_title_cell:
+                links['title_cell'].append(link)
+            # '/akn/ke/judgment/' paths also contain '/judgment/'
+            if href and '/judgment/' in href:
+                links['judgment'].append(link)
+            if 'KLR' in text:
+                links['klr'].append(link)
+            if href and ('/akn/ke/act/' in href or '/legislation/' in href or
+                         'Act' in text or 'Constitution' in text):
+                links['legislation'].append(link)
+        return links
+    
     def get_case_law(self, court_code, page=1, limit=10):
         """
         Retrieve case law listings from a specific court
@@ -36,144 +385,8 @@ class KenyaLawScraper:
         url = f"{self.base_url}/judgments/{court_code}/?page={page}"
         try:
             logger.info(f"Fetching case law from {url}")
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            cases = []
-            
-            # Direct approach: Extract all links in cells with cell-title class
-            case_links = soup.select('td.cell-title a')
-            if case_links:
-                logger.info(f"Found {len(case_links)} case links using td.cell-title a selector")
-                count = 0
-                for link_elem in case_links:
-                    # Skip if we've reached the limit
-                    if count >= limit:
-                        break
-                    
-                    # Get title and URL
-                    title = link_elem.text.strip()
-                    href = link_elem.get('href', '')
-                    
-                    # Skip empty links or navigation
-                    if not title or not href:
-                        continue
-                    
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    # Get metadata - looking for date/court information in the title
-                    meta = {}
-                    
-                    # Extract date from title if present
-                    date_match = re.search(r'\((\d+\s+\w+\s+\d{4})\)', title)
-                    if date_match:
-                        meta['Date'] = date_match.group(1)
-                    
-                    # Extract case type if present
-                    type_match = re.search(r'\((Judgment|Ruling|Advisory Opinion|Order)\)', title)
-                    if type_match:
-                        meta['Type'] = type_match.group(1)
-                    
-                    # Extract case number if present
-                    case_num_match = re.search(r'\((Petition|Reference|Application|Civil Appeal|Criminal Appeal)\s+[^)]+\)', title)
-                    if case_num_match:
-                        meta['Case Number'] = case_num_match.group(0).strip('()')
-                    
-                    # Create case dictionary and add to results
-                    cases.append({
-                        'title': title,
-                        'link': link,
-                        'metadata': meta
-                    })
-                    count += 1
-            
-            # If no cases found, look for all links that point to judgment URLs
-            if not cases:
-                # Get all links on the page
-                all_links = soup.find_all('a')
-                judgment_links = [link for link in all_links if link.get('href') and 
-                                  ('/judgment/' in link.get('href') or 
-                                   '/akn/ke/judgment/' in link.get('href'))]
-                
-                logger.info(f"Found {len(judgment_links)} judgment links by URL pattern")
-                count = 0
-                for link_elem in judgment_links:
-                    # Skip if we've reached the limit
-                    if count >= limit:
-                        break
-                    
-                    # Skip links without text or with very short text
-                    title = link_elem.text.strip()
-                    if len(title) < 15:  # Skip very short titles, likely navigation
-                        continue
-                    
-                    href = link_elem.get('href', '')
-                    
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    # Get metadata from title if available
-                    meta = {}
-                    
-                    # Extract date from title if present
-                    date_match = re.search(r'\b(\d{1,2}\s+\w+\s+\d{4})\b', title)
-                    if date_match:
-                        meta['Date'] = date_match.group(1)
-                    
-                    # Extract case number if present
-                    case_num_match = re.search(r'\b(Petition|Reference|Application|Civil Appeal|Criminal Appeal)\s+No\.\s+\d+\s+of\s+\d{4}\b', title)
-                    if case_num_match:
-                        meta['Case Number'] = case_num_match.group(0)
-                    
-                    # Create case dictionary and add to results
-                    cases.append({
-                        'title': title,
-                        'link': link,
-                        'metadata': meta
-                    })
-                    count += 1
-            
-            # Last resort: find any links with "KLR" in the text, which indicates Kenya Law Reports
-            if not cases:
-                klr_links = [link for link in soup.find_all('a') if 'KLR' in link.text]
-                
-                logger.info(f"Found {len(klr_links)} KLR links as last resort")
-                count = 0
-                for link_elem in klr_links:
-                    # Skip if we've reached the limit
-                    if count >= limit:
-                        break
-                    
-                    title = link_elem.text.strip()
-                    href = link_elem.get('href', '')
-                    
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    # Create case dictionary and add to results (minimal metadata)
-                    cases.append({
-                        'title': title,
-                        'link': link,
-                        'metadata': {}
-                    })
-                    count += 1
+            html = self._fetch_html(url, page_type='listing')
+            cases = self.parse_case_law(html, limit=limit)
             
             # Print debug information
             if cases:
@@ -181,9 +394,7 @@ class KenyaLawScraper:
             else:
                 logger.warning("No cases found on the page")
                 # Save HTML for debugging
-                with open('debug_output.html', 'w', encoding='utf-8') as f:
-                    f.write(soup.prettify())
-                logger.info("Saved HTML to debug_output.html for inspection")
+                self._save_debug_html('debug_output.html', html)
             
             return cases
         
@@ -194,6 +405,140 @@ class KenyaLawScraper:
             logger.error(traceback.format_exc())
             return []
     
+    def parse_case_law(self, html, limit=10):
+        """
+        Extract case summaries from a court listing page
+        
+        Args:
+            html: HTML of the listing page
+            limit: Maximum number of cases to return
+            
+        Returns:
+            List of case summaries with links
+        """
+        links = self._scan_links(html)
+        cases = []
+        
+        # Direct approach: Extract all links in cells with cell-title class
+        if links['title_cell']:
+            logger.info(f"Found {len(links['title_cell'])} case links using td.cell-title a selector")
+            for title, href in links['title_cell']:
+                # Skip if we've reached the limit
+                if len(cases) >= limit:
+                    break
+                
+                # Skip empty links or navigation
+                if not title or not href:
+                    continue
+                
+                # Get metadata - looking for date/court information in the title
+                meta = {}
+                
+                # Extract date from title if present
+                date_match = LISTING_DATE_RE.search(title)
+                if date_match:
+                    meta['Date'] = date_match.group(1)
+                
+                # Extract case type if present
+                type_match = LISTING_TYPE_RE.search(title)
+                if type_match:
+                    meta['Type'] = type_match.group(1)
+                
+                # Extract case number if present
+                case_num_match = LISTING_CASE_NUMBER_RE.search(title)
+                if case_num_match:
+                    meta['Case Number'] = case_num_match.group(0).strip('()')
+                
+                # Create case dictionary and add to results
+                cases.append({
+                    'title': title,
+                    'link': self._normalize_link(href),
+                    'metadata': meta
+                })
+        
+        # If no cases found, look for all links that point to judgment URLs
+        if not cases:
+            logger.info(f"Found {len(links['judgment'])} judgment links by URL pattern")
+            for title, href in links['judgment']:
+                # Skip if we've reached the limit
+                if len(cases) >= limit:
+                    break
+                
+                # Skip links without text or with very short text
+                if len(title) < 15:  # Skip very short titles, likely navigation
+                    continue
+                
+                # Get metadata from title if available
+                meta = {}
+                
+                # Extract date from title if present
+                date_match = TITLE_DATE_RE.search(title)
+                if date_match:
+                    meta['Date'] = date_match.group(1)
+                
+                # Extract case number if present
+                case_num_match = TITLE_CASE_NUMBER_RE.search(title)
+                if case_num_match:
+                    meta['Case Number'] = case_num_match.group(0)
+                
+                # Create case dictionary and add to results
+                cases.append({
+                    'title': title,
+                    'link': self._normalize_link(href),
+                    'metadata': meta
+                })
+        
+        # Last resort: find any links with "KLR" in the text, which indicates Kenya Law Reports
+        if not cases:
+            logger.info(f"Found {len(links['klr'])} KLR links as last resort")
+            for title, href in links['klr'][:limit]:
+                # Create case dictionary and add to results (minimal metadata)
+                cases.append({
+                    'title': title,
+                    'link': self._normalize_link(href),
+                    'metadata': {}
+                })
+        
+        return cases
+    
+    def _parse_case_metadata(self, case, section_texts):
+        """
+        Fill in a case's citation, court, judges, date and parties
+        
+        Args:
+            case: Case details with the title set
+            section_texts: Text of each metadata section found on the judgment page
+        """
+        for section_text in section_texts:
+            # Look for common patterns in the text
+            if 'Citation' in section_text:
+                citation_match = CITATION_RE.search(section_text)
+                if citation_match:
+                    case['citation'] = citation_match.group(1).strip()
+            
+            if 'Court' in section_text:
+                court_match = COURT_RE.search(section_text)
+                if court_match:
+                    case['court'] = court_match.group(1).strip()
+            
+            if 'Judge' in section_text or 'Coram' in section_text:
+                judge_match = JUDGES_RE.search(section_text)
+                if judge_match:
+                    judges_text = judge_match.group(1).strip()
+                    case['judges'] = [j.strip() for j in JUDGE_SEPARATOR_RE.split(judges_text)]
+            
+            if 'Date' in section_text:
+                date_match = DATE_RE.search(section_text)
+                if date_match:
+                    case['date'] = date_match.group(1).strip()
+        
+        # Try to extract parties from structured data or the title
+        if 'v' in case['title'] or 'vs' in case['title'].lower():
+            parties_match = PARTIES_RE.search(case['title'])
+            if parties_match:
+                case['parties']['applicant'] = parties_match.group(1).strip()
+                case['parties']['respondent'] = parties_match.group(2).strip()
+    
     def get_case_details(self, case_url):
         """
         Retrieve full details of a specific case
@@ -207,15 +552,14 @@ class KenyaLawScraper:
         try:
             logger.info(f"Fetching case details from {case_url}")
             
+            # Fetch the page once and parse it twice
+            html = self._fetch_html(case_url, page_type='judgment')
+            
             # Use trafilatura to get clean text
-            downloaded = trafilatura.fetch_url(case_url)
-            text_content = trafilatura.extract(downloaded)
+            text_content = trafilatura.extract(html)
             
             # Also get structured data with BeautifulSoup
-            response = self.session.get(case_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._make_soup(html)
             
             # Extract case info
             case = {
@@ -239,53 +583,15 @@ class KenyaLawScraper:
                 case['title'] = title_elem.text.strip()
             
             # Get metadata from different possible containers
-            meta_sections = [
-                soup.select_one('.decision-details'),
-                soup.select_one('.case-meta'),
-                soup.select_one('.document-metadata'),
-                soup.select_one('header')
-            ]
-            
-            for meta_section in meta_sections:
-                if meta_section:
-                    # Extract all text data from the section
-                    section_text = meta_section.text.strip()
-                    
-                    # Look for common patterns in the text
-                    if 'Citation' in section_text:
-                        citation_match = re.search(r'Citation:?\s*([^\n]+)', section_text)
-                        if citation_match:
-                            case['citation'] = citation_match.group(1).strip()
-                    
-                    if 'Court' in section_text:
-                        court_match = re.search(r'Court:?\s*([^\n]+)', section_text)
-                        if court_match:
-                            case['court'] = court_match.group(1).strip()
-                    
-                    if 'Judge' in section_text or 'Coram' in section_text:
-                        judge_match = re.search(r'(?:Judge|Coram):?\s*([^\n]+)', section_text)
-                        if judge_match:
-                            judges_text = judge_match.group(1).strip()
-                            case['judges'] = [j.strip() for j in re.split(r',|;', judges_text)]
-                    
-                    if 'Date' in section_text:
-                        date_match = re.search(r'Date:?\s*([^\n]+)', section_text)
-                        if date_match:
-                            case['date'] = date_match.group(1).strip()
-            
-            # Try to extract parties from structured data or the title
-            if 'v' in case['title'] or 'vs' in case['title'].lower():
-                parties_match = re.search(r'([^v]+)\s+v\.?\s+([^(]+)', case['title'], re.IGNORECASE)
-                if parties_match:
-                    case['parties']['applicant'] = parties_match.group(1).strip()
-                    case['parties']['respondent'] = parties_match.group(2).strip()
+            meta_sections = [soup.select_one(selector) for selector in META_SECTIONS]
+            self._parse_case_metadata(case, [section.text.strip() for section in meta_sections if section])
             
             # Extract ruling content (main text of the judgment)
             main_content = soup.select_one('main') or soup.select_one('article') or soup.select_one('.document-content')
             if main_content:
                 ruling_text = main_content.text.strip()
                 # Remove any headers or metadata from the start
-                ruling_text = re.sub(r'^.*?(?:JUDGMENT|RULING)', 'JUDGMENT', ruling_text, flags=re.DOTALL)
+                ruling_text = RULING_PREAMBLE_RE.sub('JUDGMENT', ruling_text)
                 case['ruling'] = ruling_text
             else:
                 # If we can't find structured content, use the trafilatura extracted text
@@ -297,6 +603,101 @@ class KenyaLawScraper:
             logger.error(f"Error retrieving case details for {case_url}: {str(e)}")
             return None
     
+    def _stream_html(self, url):
+        """
+        Fetch a page in chunks without holding the whole body
+        
+        A fresh copy in the HTTP cache is used as is; otherwise the page is downloaded
+        and not cached, since caching it would need the whole body.
+        
+        Args:
+            url: Page URL
+            
+        Yields:
+            Decoded HTML, a chunk at a time
+        """
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached and cached.is_fresh:
+            self.http_cache.record('hits')
+            yield cached.text
+            return
+        
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+            text = decoder.decode(b'', final=True)
+            if text:
+                yield text
+    
+    def stream_case_details(self, case_url, text_store=None):
+        """
+        Retrieve a case's details, streaming its text straight to the ruling text store
+        
+        Unlike get_case_details, the page is parsed as it downloads and neither the
+        page, a parse tree nor the ruling text is ever held in memory in full, which
+        keeps memory flat for very long judgments. The ruling text is the text of the
+        page's first main, article or .document-content element, cleaned up as in
+        get_case_details; pages without one fall back to their body text.
+        
+        Args:
+            case_url: URL of the case
+            text_store: Store for the ruling text (defaults to the shared store)
+            
+        Returns:
+            Dict containing case details, with the stored text's key in 'text_key' and
+            its length in 'text_length' instead of the text itself
+        """
+        text_store = text_store or get_text_store()
+        if text_store is None:
+            return self.get_case_details(case_url)
+        key = text_store.key_for(case_url)
+        
+        if lxml is None:
+            case = self.get_case_details(case_url)
+            if case:
+                text = case['ruling'] or ''
+                text_store.write(key, text)
+                case.update(full_text='', ruling='', text_key=key, text_length=len(text))
+            return case
+        
+        try:
+            logger.info(f"Streaming case details from {case_url}")
+            with text_store.writer(key) as writer:
+                target = JudgmentPageTarget(RulingTextSink(writer))
+                parser = lxml.etree.HTMLParser(target=target)
+                for text in self._stream_html(case_url):
+                    parser.feed(text)
+                parser.close()
+            
+            case = {
+                'title': (target.title or '').strip(),
+                'full_text': '',
+                'citation': '',
+                'court': '',
+                'judges': [],
+                'date': '',
+                'parties': {
+                    'applicant': '',
+                    'respondent': ''
+                },
+                'ruling': '',
+                'url': case_url,
+                'text_key': key,
+                'text_length': writer.length
+            }
+            section_texts = [target.meta_sections[selector].strip() for selector in META_SECTIONS
+                             if selector in target.meta_sections]
+            self._parse_case_metadata(case, section_texts)
+            return case
+        
+        except Exception as e:
+            logger.error(f"Error streaming case details for {case_url}: {str(e)}")
+            return None
+    
     def search_cases(self, query, page=1):
         """
         Search for cases using the search functionality
@@ -312,172 +713,11 @@ class KenyaLawScraper:
         
         try:
             logger.info(f"Searching for cases with query: {query}")
-            response = self.session.get(url, params={
+            html = self._fetch_html(url, params={
                 'q': query,
                 'page': page
-            })
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            
-            # First approach: Look for links in search result containers
-            result_items = []
-            for selector in ['.search-list-item', '.search-result-item', '.document-list-item', 'article']:
-                if not result_items:
-                    result_items = soup.select(selector)
-            
-            logger.info(f"Found {len(result_items)} search result items with container selectors")
-            
-            for item in result_items:
-                # Try to find title and link
-                title_elem = None
-                for selector in ['h3 a', 'h4 a', '.document-title a', 'a.document-title', 'a.title']:
-                    if title_elem is None:
-                        title_elem = item.select_one(selector)
-                
-                # If still not found, try any link with content
-                if title_elem is None:
-                    links = item.select('a')
-                    for a in links:
-                        if a.text.strip() and not a.has_attr('aria-label'):
-                            title_elem = a
-                            break
-                
-                if title_elem:
-                    title = title_elem.text.strip()
-                    href = title_elem.get('href', '')
-                    
-                    # Skip irrelevant links
-                    if not href or href == '#' or 'javascript:' in href:
-                        continue
-                    
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    # Get snippet or excerpt
-                    excerpt = ''
-                    excerpt_elem = None
-                    for selector in ['.search-snippet', '.excerpt', '.summary', 'p']:
-                        if excerpt_elem is None:
-                            excerpt_elem = item.select_one(selector)
-                    
-                    if excerpt_elem:
-                        excerpt = excerpt_elem.text.strip()
-                    
-                    results.append({
-                        'title': title,
-                        'link': link,
-                        'excerpt': excerpt
-                    })
-            
-            # Alternative approach: look for all links that point to judgment URLs
-            if not results:
-                logger.info("No results found with container selectors, trying URL pattern approach")
-                all_links = soup.find_all('a')
-                judgment_links = [link for link in all_links if link.get('href') and 
-                                ('/judgment/' in link.get('href') or 
-                                '/akn/ke/judgment/' in link.get('href'))]
-                
-                logger.info(f"Found {len(judgment_links)} judgment links by URL pattern")
-                for link_elem in judgment_links[:10]:  # Limit to first 10 results
-                    title = link_elem.text.strip()
-                    if len(title) < 15:  # Skip very short titles, likely navigation
-                        continue
-                        
-                    href = link_elem.get('href', '')
-                    
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    # Get parent element to look for excerpt
-                    parent = link_elem.parent
-                    excerpt = ''
-                    
-                    # Try to find paragraph text near the link
-                    if parent:
-                        sibling = parent.find_next_sibling('p')
-                        if sibling:
-                            excerpt = sibling.text.strip()
-                    
-                    results.append({
-                        'title': title,
-                        'link': link,
-                        'excerpt': excerpt
-                    })
-            
-            # If still no results, look for any content with the search term
-            if not results:
-                logger.info("No results found with URL patterns, searching for content with query term")
-                paragraphs = soup.find_all('p')
-                
-                potential_results = []
-                for p in paragraphs:
-                    if query.lower() in p.text.lower():
-                        # Find nearby links
-                        nearby_links = []
-                        
-                        # Check siblings
-                        prev_sibling = p.find_previous_sibling()
-                        if prev_sibling:
-                            nearby_links.extend(prev_sibling.find_all('a'))
-                            
-                        next_sibling = p.find_next_sibling()
-                        if next_sibling:
-                            nearby_links.extend(next_sibling.find_all('a'))
-                            
-                        # Check parent's siblings
-                        if p.parent:
-                            prev_parent_sibling = p.parent.find_previous_sibling()
-                            if prev_parent_sibling:
-                                nearby_links.extend(prev_parent_sibling.find_all('a'))
-                                
-                            next_parent_sibling = p.parent.find_next_sibling()
-                            if next_parent_sibling:
-                                nearby_links.extend(next_parent_sibling.find_all('a'))
-                        
-                        # Also check links inside the paragraph
-                        nearby_links.extend(p.find_all('a'))
-                        
-                        for link in nearby_links:
-                            title = link.text.strip()
-                            href = link.get('href', '')
-                            
-                            if not title or not href or href == '#' or 'javascript:' in href:
-                                continue
-                                
-                            # Normalize the URL
-                            if href.startswith('/'):
-                                result_link = urljoin(self.base_url, href)
-                            elif href.startswith('http'):
-                                result_link = href
-                            else:
-                                result_link = urljoin(self.base_url, '/' + href)
-                                
-                            potential_results.append({
-                                'title': title,
-                                'link': result_link,
-                                'excerpt': p.text.strip(),
-                                'relevance': len(p.text)  # Sort by length of text
-                            })
-                
-                # Sort by relevance (length of excerpt)
-                potential_results.sort(key=lambda x: x['relevance'], reverse=True)
-                
-                # Take top 5 results
-                for result in potential_results[:5]:
-                    del result['relevance']
-                    results.append(result)
+            }, page_type='search')
+            results = self.parse_search_results(html, query)
             
             # Final debug information
             if results:
@@ -485,9 +725,7 @@ class KenyaLawScraper:
             else:
                 logger.warning(f"No search results found for query: {query}")
                 # Save HTML for debugging
-                with open('search_debug.html', 'w', encoding='utf-8') as f:
-                    f.write(soup.prettify())
-                logger.info("Saved HTML to search_debug.html for inspection")
+                self._save_debug_html('search_debug.html', html)
             
             return results
         
@@ -498,147 +736,172 @@ class KenyaLawScraper:
             logger.error(traceback.format_exc())
             return []
     
-    def get_legislation(self, limit=10):
+    def parse_search_results(self, html, query):
         """
-        Retrieve legislation listings
+        Extract results from a search page
         
         Args:
-            limit: Number of results to retrieve
+            html: HTML of the search page
+            query: Search query the page was returned for
             
         Returns:
-            List of legislation with links
+            List of search results
         """
-        url = f"{self.base_url}/legislation/"
+        soup = self._make_soup(html)
+        results = []
         
-        try:
-            logger.info(f"Fetching legislation from {url}")
-            response = self.session.get(url)
-            response.raise_for_status()
+        # First approach: Look for links in search result containers
+        result_items = []
+        for selector in ['.search-list-item', '.search-result-item', '.document-list-item', 'article']:
+            if not result_items:
+                result_items = soup.select(selector)
+        
+        logger.info(f"Found {len(result_items)} search result items with container selectors")
+        
+        for item in result_items:
+            # Try to find title and link
+            title_elem = None
+            for selector in ['h3 a', 'h4 a', '.document-title a', 'a.document-title', 'a.title']:
+                if title_elem is None:
+                    title_elem = item.select_one(selector)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            legislation = []
-            
-            # Direct approach: Look for links in table cells with cell-title class (similar to cases)
-            legislation_links = soup.select('td.cell-title a')
-            if legislation_links:
-                logger.info(f"Found {len(legislation_links)} legislation links using td.cell-title a selector")
-                count = 0
-                for link_elem in legislation_links:
-                    # Skip if we've reached the limit
-                    if count >= limit:
-                        break
-                    
-                    # Get title and URL
-                    title = link_elem.text.strip()
-                    href = link_elem.get('href', '')
-                    
-                    # Skip empty links or navigation
-                    if not title or not href:
-                        continue
-                    
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    legislation.append({
-                        'title': title,
-                        'link': link
-                    })
-                    count += 1
-            
-            # If no links found with that approach, try traditional container selectors
-            if not legislation:
-                # Try multiple potential selectors for legislation listings
-                legislation_items = []
-                for selector in ['.legislation-item', '.document-list-item', 'article']:
-                    if not legislation_items:
-                        legislation_items = soup.select(selector)
-                
-                logger.info(f"Found {len(legislation_items)} legislation items with container selectors")
-                count = 0
-                for item in legislation_items:
-                    # Skip if we've reached the limit
-                    if count >= limit:
+            # If still not found, try any link with content
+            if title_elem is None:
+                for a in item.find_all('a'):
+                    if a.get_text().strip() and not a.has_attr('aria-label'):
+                        title_elem = a
                         break
+            
+            if title_elem:
+                title = title_elem.get_text().strip()
+                href = title_elem.get('href', '')
+                
+                # Skip irrelevant links
+                if not href or href == '#' or 'javascript:' in href:
+                    continue
+                
+                # Get snippet or excerpt
+                excerpt = ''
+                excerpt_elem = None
+                for selector in ['.search-snippet', '.excerpt', '.summary', 'p']:
+                    if excerpt_elem is None:
+                        excerpt_elem = item.select_one(selector)
+                
+                if excerpt_elem:
+                    excerpt = excerpt_elem.get_text().strip()
+                
+                results.append({
+                    'title': title,
+                    'link': self._normalize_link(href),
+                    'excerpt': excerpt
+                })
+        
+        # Alternative approach: look for all links that point to judgment URLs
+        if not results:
+            logger.info("No results found with container selectors, trying URL pattern approach")
+            judgment_links = [link for link in soup.find_all('a') if '/judgment/' in link.get('href', '')]
+            
+            logger.info(f"Found {len(judgment_links)} judgment links by URL pattern")
+            for link_elem in judgment_links[:10]:  # Limit to first 10 results
+                title = link_elem.get_text().strip()
+                if len(title) < 15:  # Skip very short titles, likely navigation
+                    continue
+                
+                href = link_elem.get('href', '')
+                
+                # Get parent element to look for excerpt
+                parent = link_elem.parent
+                excerpt = ''
+                
+                # Try to find paragraph text near the link
+                if parent:
+                    sibling = parent.find_next_sibling('p')
+                    if sibling:
+                        excerpt = sibling.get_text().strip()
+                
+                results.append({
+                    'title': title,
+                    'link': self._normalize_link(href),
+                    'excerpt': excerpt
+                })
+        
+        # If still no results, look for any content with the search term
+        if not results:
+            logger.info("No results found with URL patterns, searching for content with query term")
+            query_lower = query.lower()
+            
+            potential_results = []
+            for p in soup.find_all('p'):
+                paragraph_text = p.get_text()
+                if query_lower not in paragraph_text.lower():
+                    continue
+                
+                # Find nearby links
+                nearby_links = []
+                
+                # Check siblings
+                prev_sibling = p.find_previous_sibling()
+                if prev_sibling:
+                    nearby_links.extend(prev_sibling.find_all('a'))
+                
+                next_sibling = p.find_next_sibling()
+                if next_sibling:
+                    nearby_links.extend(next_sibling.find_all('a'))
+                
+                # Check parent's siblings
+                if p.parent:
+                    prev_parent_sibling = p.parent.find_previous_sibling()
+                    if prev_parent_sibling:
+                        nearby_links.extend(prev_parent_sibling.find_all('a'))
                     
-                    # Try to find title and link
-                    title_elem = None
-                    for selector in ['h3 a', 'h4 a', '.legislation-title a', 'a.title']:
-                        if title_elem is None:
-                            title_elem = item.select_one(selector)
-                    
-                    # If still not found, try any link with content
-                    if title_elem is None:
-                        links = item.select('a')
-                        for a in links:
-                            if a.text.strip() and not a.has_attr('aria-label'):
-                                title_elem = a
-                                break
-                    
-                    if title_elem:
-                        title = title_elem.text.strip()
-                        href = title_elem.get('href', '')
-                        
-                        # Skip irrelevant links
-                        if not href or href == '#' or 'javascript:' in href:
-                            continue
-                        
-                        # Normalize the URL
-                        if href.startswith('/'):
-                            link = urljoin(self.base_url, href)
-                        elif href.startswith('http'):
-                            link = href
-                        else:
-                            link = urljoin(self.base_url, '/' + href)
-                        
-                        legislation.append({
-                            'title': title,
-                            'link': link
-                        })
-                        count += 1
-            
-            # If still no results, look for all links that might be legislation
-            if not legislation:
-                # Get all links on the page
-                all_links = soup.find_all('a')
-                # Look for links with legislation-related path or text
-                legislation_links = [link for link in all_links if link.get('href') and 
-                                    ('/akn/ke/act/' in link.get('href') or 
-                                     '/legislation/' in link.get('href') or
-                                     'Act' in link.text or 
-                                     'Constitution' in link.text)]
-                
-                logger.info(f"Found {len(legislation_links)} legislation links by URL pattern or keyword")
-                count = 0
-                for link_elem in legislation_links:
-                    # Skip if we've reached the limit
-                    if count >= limit:
-                        break
+                    next_parent_sibling = p.parent.find_next_sibling()
+                    if next_parent_sibling:
+                        nearby_links.extend(next_parent_sibling.find_all('a'))
+                
+                # Also check links inside the paragraph
+                nearby_links.extend(p.find_all('a'))
+                
+                excerpt = paragraph_text.strip()
+                for link in nearby_links:
+                    title = link.get_text().strip()
+                    href = link.get('href', '')
                     
-                    # Skip links without text or with very short text
-                    title = link_elem.text.strip()
-                    if len(title) < 5:  # Skip very short titles, likely navigation
+                    if not title or not href or href == '#' or 'javascript:' in href:
                         continue
-                        
-                    href = link_elem.get('href', '')
                     
-                    # Normalize the URL
-                    if href.startswith('/'):
-                        link = urljoin(self.base_url, href)
-                    elif href.startswith('http'):
-                        link = href
-                    else:
-                        link = urljoin(self.base_url, '/' + href)
-                    
-                    legislation.append({
+                    potential_results.append({
                         'title': title,
-                        'link': link
+                        'link': self._normalize_link(href),
+                        'excerpt': excerpt,
+                        'relevance': len(paragraph_text)  # Sort by length of text
                     })
-                    count += 1
+            
+            # Sort by relevance (length of excerpt)
+            potential_results.sort(key=lambda x: x['relevance'], reverse=True)
+            
+            # Take top 5 results
+            for result in potential_results[:5]:
+                del result['relevance']
+                results.append(result)
+        
+        return results
+    
+    def get_legislation(self, limit=10):
+        """
+        Retrieve legislation listings
+        
+        Args:
+            limit: Number of results to retrieve
+            
+        Returns:
+            List of legislation with links
+        """
+        url = f"{self.base_url}/legislation/"
+        
+        try:
+            logger.info(f"Fetching legislation from {url}")
+            html = self._fetch_html(url, page_type='listing')
+            legislation = self.parse_legislation(html, limit=limit)
             
             # Print debug information
             if legislation:
@@ -646,9 +909,7 @@ class KenyaLawScraper:
             else:
                 logger.warning("No legislation found on the page")
                 # Save HTML for debugging
-                with open('legislation_debug.html', 'w', encoding='utf-8') as f:
-                    f.write(soup.prettify())
-                logger.info("Saved HTML to legislation_debug.html for inspection")
+                self._save_debug_html('legislation_debug.html', html)
             
             return legislation
         
@@ -659,6 +920,98 @@ class KenyaLawScraper:
             logger.error(traceback.format_exc())
             return []
     
+    def parse_legislation(self, html, limit=10):
+        """
+        Extract legislation from a legislation listing page
+        
+        Args:
+            html: HTML of the listing page
+            limit: Maximum number of items to return
+            
+        Returns:
+            List of legislation with links
+        """
+        links = self._scan_links(html)
+        legislation = []
+        
+        # Direct approach: Look for links in table cells with cell-title class (similar to cases)
+        if links['title_cell']:
+            logger.info(f"Found {len(links['title_cell'])} legislation links using td.cell-title a selector")
+            for title, href in links['title_cell']:
+                # Skip if we've reached the limit
+                if len(legislation) >= limit:
+                    break
+                
+                # Skip empty links or navigation
+                if not title or not href:
+                    continue
+                
+                legislation.append({
+                    'title': title,
+                    'link': self._normalize_link(href)
+                })
+        
+        # If no links found with that approach, try traditional container selectors
+        if not legislation:
+            soup = self._make_soup(html)
+            
+            # Try multiple potential selectors for legislation listings
+            legislation_items = []
+            for selector in ['.legislation-item', '.document-list-item', 'article']:
+                if not legislation_items:
+                    legislation_items = soup.select(selector)
+            
+            logger.info(f"Found {len(legislation_items)} legislation items with container selectors")
+            for item in legislation_items:
+                # Skip if we've reached the limit
+                if len(legislation) >= limit:
+                    break
+                
+                # Try to find title and link
+                title_elem = None
+                for selector in ['h3 a', 'h4 a', '.legislation-title a', 'a.title']:
+                    if title_elem is None:
+                        title_elem = item.select_one(selector)
+                
+                # If still not found, try any link with content
+                if title_elem is None:
+                    for a in item.find_all('a'):
+                        if a.get_text().strip() and not a.has_attr('aria-label'):
+                            title_elem = a
+                            break
+                
+                if title_elem:
+                    title = title_elem.get_text().strip()
+                    href = title_elem.get('href', '')
+                    
+                    # Skip irrelevant links
+                    if not href or href == '#' or 'javascript:' in href:
+                        continue
+                    
+                    legislation.append({
+                        'title': title,
+                        'link': self._normalize_link(href)
+                    })
+        
+        # If still no results, look for all links with legislation-related path or text
+        if not legislation:
+            logger.info(f"Found {len(links['legislation'])} legislation links by URL pattern or keyword")
+            for title, href in links['legislation']:
+                # Skip if we've reached the limit
+                if len(legislation) >= limit:
+                    break
+                
+                # Skip links without text or with very short text
+                if len(title) < 5:  # Skip very short titles, likely navigation
+                    continue
+                
+                legislation.append({
+                    'title': title,
+                    'link': self._normalize_link(href)
+                })
+        
+        return legislation
+    
     def get_legislation_details(self, legislation_url):
         """
         Retrieve full details of a specific legislation
@@ -672,15 +1025,14 @@ class KenyaLawScraper:
         try:
             logger.info(f"Fetching legislation details from {legislation_url}")
             
+            # Fetch the page once and parse it twice
+            html = self._fetch_html(legislation_url, page_type='legislation')
+            
             # Use trafilatura to get clean text
-            downloaded = trafilatura.fetch_url(legislation_url)
-            text_content = trafilatura.extract(downloaded)
+            text_content = trafilatura.extract(html)
             
             # Also get structured data with BeautifulSoup
-            response = self.session.get(legislation_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._make_soup(html)
             
             # Extract legislation info
             legislation = {
@@ -764,7 +1116,7 @@ class KenyaLawScraper:
         """
         try:
             logger.info(f"Extracting text content from {url}")
-            downloaded = trafilatura.fetch_url(url)
+            downloaded = self._fetch_html(url)
             text = trafilatura.extract(downloaded)
             return text
         except Exception as e:
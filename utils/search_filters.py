@@ -0,0 +1,213 @@
+"""
+Metadata normalization and filters for vector and hybrid search.
+Court, date, category, landmark and organization fields are stored on every indexed
+record in one normalized form (Kenya Law court codes from config.COURT_LEVELS, dates as
+YYYYMMDD integers) so searches can pass filters to Chroma as `where` clauses instead of
+over-fetching and discarding results.
+"""
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import config
+
+DATE_FORMATS = ['%Y-%m-%d', '%d %B %Y', '%d %b %Y', '%B %d, %Y']
+
+COURT_CODES = frozenset(config.COURT_LEVELS.values())
+
+
+def _court_key(name: str) -> str:
+    """Court name without case, plurals or punctuation ("Magistrates' Courts" -> "magistrate court")"""
+    words = re.sub(r'[^a-z ]', '', name.lower()).split()
+    return ' '.join(word[:-1] if len(word) > 3 and word.endswith('s') else word for word in words)
+
+
+_COURT_NAMES = {_court_key(name): code for name, code in config.COURT_LEVELS.items()}
+# Court codes as they appear in Kenya Law URLs (/akn/ke/judgment/kehc/...) and citations ([2023] KEHC 101)
+_COURT_CODE_RE = re.compile(
+    r'(?<![a-z])(' + '|'.join(sorted(COURT_CODES, key=len, reverse=True)) + r')(?![a-z])', re.IGNORECASE
+)
+
+FILTER_KEYS = ('court', 'date_from', 'date_to', 'category', 'is_landmark', 'organization_id')
+
+
+def court_code_for(court: str = '', url: str = '', citation: str = '') -> str:
+    """
+    Find the Kenya Law code of a court
+
+    Args:
+        court: Court name or code ("High Court", "KEHC")
+        url: Kenya Law URL of the judgment
+        citation: Neutral citation ("[2023] KEHC 101 (KLR)")
+
+    Returns:
+        One of COURT_CODES, or '' if the court isn't recognized
+    """
+    if court:
+        if court.strip().upper() in COURT_CODES:
+            return court.strip().upper()
+        code = _COURT_NAMES.get(_court_key(court))
+        if code:
+            return code
+    for text in (url, citation):
+        match = _COURT_CODE_RE.search(text or '')
+        if match:
+            return match.group(1).upper()
+    if court:
+        # Longer names first, so "Environment and Land Court" isn't taken for another court
+        key = _court_key(court)
+        for name in sorted(_COURT_NAMES, key=len, reverse=True):
+            if name in key:
+                return _COURT_NAMES[name]
+    return ''
+
+
+def date_to_int(value: Any) -> Optional[int]:
+    """
+    Convert a date to a sortable YYYYMMDD integer
+
+    Args:
+        value: date, datetime, YYYYMMDD integer or date text ('2023-03-12', '12 March 2023')
+
+    Returns:
+        The integer, or None if the value isn't a recognizable date
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.year * 10000 + value.month * 100 + value.day
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if 10000101 <= value <= 99991231 else None
+    if isinstance(value, str) and value.strip():
+        text = value.strip()
+        # ISO timestamps ('2023-03-12T10:00:00') keep their date
+        if re.match(r'^\d{4}-\d{2}-\d{2}T', text):
+            text = text[:10]
+        for fmt in DATE_FORMATS:
+            try:
+                return date_to_int(datetime.strptime(text, fmt).date())
+            except ValueError:
+                continue
+    return None
+
+
+def normalize_category(category: Any) -> str:
+    """Category in the form it is stored and filtered on ("constitutional " -> "Constitutional")"""
+    return str(category).strip().title() if category else ''
+
+
+def index_metadata(record: Dict[str, Any], date_key: str = 'date') -> Dict[str, Any]:
+    """
+    Normalized filter fields for an indexed record
+
+    Args:
+        record: Record being indexed (court, url, citation, date, category, is_landmark, organization_id)
+        date_key: Field holding the record's date
+
+    Returns:
+        The filter fields the record has: 'court_code', 'date_int', 'category', 'is_landmark'
+        and 'organization_id' (fields it doesn't have are left out, as Chroma can't store None)
+    """
+    metadata = {}
+    court_code = court_code_for(record.get('court') or '', record.get('url') or '', record.get('citation') or '')
+    if court_code:
+        metadata['court_code'] = court_code
+    date_int = date_to_int(record.get(date_key))
+    if date_int is not None:
+        metadata['date_int'] = date_int
+    category = normalize_category(record.get('category'))
+    if category:
+        metadata['category'] = category
+    if record.get('is_landmark') is not None:
+        metadata['is_landmark'] = bool(record['is_landmark'])
+    if record.get('organization_id') is not None:
+        metadata['organization_id'] = int(record['organization_id'])
+    return metadata
+
+
+def _as_list(value: Any) -> List[Any]:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [item for item in value if item not in (None, '')]
+    return [] if value in (None, '') else [value]
+
+
+def _court_codes(value: Any) -> List[str]:
+    codes = []
+    for court in _as_list(value):
+        code = court_code_for(court)
+        if not code:
+            raise ValueError(f"Unknown court '{court}'")
+        codes.append(code)
+    return codes
+
+
+def build_where(filters: Optional[Dict[str, Any]] = None, **conditions: Any) -> Optional[Dict[str, Any]]:
+    """
+    Build a Chroma `where` clause from search filters
+
+    Args:
+        filters: Any of 'court' (name or code, or a list of them), 'date_from' / 'date_to'
+            (inclusive), 'category' (or a list), 'is_landmark' and 'organization_id';
+            empty values are ignored
+        **conditions: Extra equality conditions on stored metadata (e.g. parent_kind='ruling')
+
+    Returns:
+        The where clause, or None if there is nothing to filter on
+    """
+    filters = filters or {}
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown search filters: {', '.join(sorted(unknown))}")
+
+    clauses = [{key: value} for key, value in conditions.items() if value is not None]
+    codes = _court_codes(filters.get('court'))
+    if codes:
+        clauses.append({'court_code': codes[0]} if len(codes) == 1 else {'court_code': {'$in': codes}})
+    for key, operator in (('date_from', '$gte'), ('date_to', '$lte')):
+        if filters.get(key) not in (None, ''):
+            value = date_to_int(filters[key])
+            if value is None:
+                raise ValueError(f"Invalid {key} '{filters[key]}'")
+            clauses.append({'date_int': {operator: value}})
+    categories = [normalize_category(category) for category in _as_list(filters.get('category'))]
+    if categories:
+        clauses.append({'category': categories[0]} if len(categories) == 1 else {'category': {'$in': categories}})
+    if filters.get('is_landmark') is not None:
+        clauses.append({'is_landmark': bool(filters['is_landmark'])})
+    if filters.get('organization_id') is not None:
+        clauses.append({'organization_id': int(filters['organization_id'])})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+def matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check stored metadata against a where clause from build_where (for in-memory indexes)
+
+    Args:
+        metadata: Normalized metadata of a record
+        where: Clause built by build_where, or None
+
+    Returns:
+        Whether the record passes the filters
+    """
+    if not where:
+        return True
+    if '$and' in where:
+        return all(matches(metadata, clause) for clause in where['$and'])
+    for key, condition in where.items():
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            return value == condition
+        for operator, operand in condition.items():
+            if value is None:
+                return False
+            if operator == '$in' and value not in operand:
+                return False
+            if operator == '$gte' and value < operand:
+                return False
+            if operator == '$lte' and value > operand:
+                return False
+    return True
@@ -0,0 +1,41 @@
+"""
+Helpers for streaming LLM output to the browser as server-sent events.
+"""
+import json
+import logging
+from typing import Dict, Any, Iterator, Optional
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """
+    Format a server-sent event
+    
+    Args:
+        data: JSON-serializable event payload
+        event: Event name (defaults to the unnamed 'message' event)
+        
+    Returns:
+        The encoded event, ready to be written to the response
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: Iterator[str]) -> Response:
+    """
+    Build a streaming response from an iterator of encoded events
+    
+    Args:
+        events: Iterator yielding strings built with sse_event()
+        
+    Returns:
+        Flask response that keeps the request context alive while streaming
+    """
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    # Stop proxies (nginx) and browsers from buffering the stream
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,300 @@
+"""
+Token estimation and section-aware chunking for long legal texts.
+Kenyan judgments run to hundreds of pages, so they are split along their own structure
+(JUDGMENT/RULING headings, then numbered paragraphs) into chunks that fit a model's context.
+"""
+import logging
+import math
+import re
+from typing import List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Use tiktoken for exact counts when it is installed
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    _ENCODING = None
+    TIKTOKEN_AVAILABLE = False
+
+# Upper-case heading lines such as "JUDGMENT", "RULING", "ANALYSIS AND DETERMINATION",
+# optionally numbered ("A. BACKGROUND", "III. ISSUES FOR DETERMINATION")
+_HEADING_RE = re.compile(r'^\s*(?:[A-Z]{1,4}[.)]\s+|\d{1,2}[.)]\s+)?([A-Z][A-Z0-9 ,&\'/()-]{3,80}?)[:.]?\s*$')
+# Numbered paragraphs: "12. The appellant..." or "[12] The appellant..."
+_PARAGRAPH_RE = re.compile(r'^\s*(?:\d{1,4}\.|\[\d{1,4}\])\s+\S', re.MULTILINE)
+_PARAGRAPH_NUMBER_RE = re.compile(r'^\s*(?:(\d{1,4})\.|\[(\d{1,4})\])\s+')
+_BLANK_LINE_RE = re.compile(r'\n\s*\n')
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+_WORD_RE = re.compile(r'\S+')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Token count (exact with tiktoken, otherwise a conservative estimate)
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # Roughly 4 characters or 0.75 words per token for English legal prose;
+    # take the larger estimate so prompts are never undercounted
+    return max(math.ceil(len(text) / 4), math.ceil(len(_WORD_RE.findall(text)) * 4 / 3))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text down to at most max_tokens tokens
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+
+    Returns:
+        The text, shortened if needed
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if _ENCODING is not None:
+        return _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:max_tokens])
+    # Shrink proportionally until the estimate fits
+    end = int(len(text) * max_tokens / estimate_tokens(text))
+    while end > 0 and estimate_tokens(text[:end]) > max_tokens:
+        end = int(end * 0.95)
+    return text[:end]
+
+
+def split_into_sections(text: str) -> List[Dict[str, str]]:
+    """
+    Split a judgment into sections at its upper-case headings
+
+    Args:
+        text: Full judgment or ruling text
+
+    Returns:
+        List of dictionaries with 'heading' ('' for text before the first heading) and 'text'
+    """
+    sections = []
+    heading = ""
+    lines = []
+    has_body = False
+
+    for line in text.splitlines():
+        match = _HEADING_RE.match(line)
+        if match and len(match.group(1).split()) <= 8:
+            # Consecutive headings (e.g. "REPUBLIC OF KENYA" / "JUDGMENT") stay in one section
+            if has_body:
+                sections.append({"heading": heading, "text": "\n".join(lines).strip()})
+                lines = []
+                has_body = False
+            heading = match.group(1).strip()
+        elif line.strip():
+            has_body = True
+        # Heading lines stay in the text so no content is lost
+        lines.append(line)
+
+    if any(line.strip() for line in lines) or not sections:
+        sections.append({"heading": heading, "text": "\n".join(lines).strip()})
+    return sections
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Split text that is too long for one chunk, preferring paragraph boundaries"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    # Numbered paragraphs first, then blank lines, then sentences
+    starts = [match.start() for match in _PARAGRAPH_RE.finditer(text)]
+    if len(starts) > 1:
+        if starts[0] != 0:
+            starts.insert(0, 0)
+        pieces = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+    elif len(_BLANK_LINE_RE.findall(text)) > 0:
+        pieces = _BLANK_LINE_RE.split(text)
+    else:
+        pieces = _SENTENCE_END_RE.split(text)
+
+    if len(pieces) <= 1:
+        # One enormous sentence - fall back to a hard cut
+        head = truncate_to_tokens(text, max_tokens)
+        if not head:
+            return [text]
+        return [head] + _split_oversized(text[len(head):], max_tokens)
+
+    parts = []
+    for piece in pieces:
+        piece = piece.strip()
+        if piece:
+            parts.extend(_split_oversized(piece, max_tokens))
+    return _pack(parts, max_tokens)
+
+
+def _pack(pieces: List[str], max_tokens: int) -> List[str]:
+    """Greedily join consecutive pieces into chunks of at most max_tokens"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int) -> List[Dict[str, Any]]:
+    """
+    Split a long legal text into chunks that each fit within max_tokens
+
+    Sections are kept whole where possible; oversized sections are split on numbered
+    paragraphs, then blank lines, then sentences. Each chunk remembers its section heading.
+
+    Args:
+        text: Full text to split
+        max_tokens: Maximum tokens per chunk
+
+    Returns:
+        List of dictionaries with 'index', 'heading', 'text' and 'tokens'
+    """
+    chunks = []
+    for section in split_into_sections(text):
+        body = section["text"]
+        if not body:
+            continue
+        for part in _split_oversized(body, max_tokens):
+            chunks.append({
+                "index": len(chunks),
+                "heading": section["heading"],
+                "text": part,
+                "tokens": estimate_tokens(part)
+            })
+
+    # Merge neighbouring small chunks of different sections so short headings don't
+    # each cost a model call
+    merged = []
+    for chunk in chunks:
+        if merged and merged[-1]["tokens"] + chunk["tokens"] <= max_tokens:
+            previous = merged[-1]
+            previous["text"] = f"{previous['text']}\n\n{chunk['text']}"
+            previous["tokens"] = estimate_tokens(previous["text"])
+        else:
+            merged.append(dict(chunk))
+    for index, chunk in enumerate(merged):
+        chunk["index"] = index
+    return merged
+
+
+def _numbered_pieces(text: str, max_tokens: int) -> List[Dict[str, Any]]:
+    """Split a section into paragraphs of at most max_tokens, each with the number of the paragraph it belongs to"""
+    starts = [match.start() for match in _PARAGRAPH_RE.finditer(text)]
+    if starts:
+        if starts[0] != 0:
+            starts.insert(0, 0)
+        paragraphs = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+    else:
+        paragraphs = _BLANK_LINE_RE.split(text)
+
+    pieces = []
+    number = None
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        match = _PARAGRAPH_NUMBER_RE.match(paragraph)
+        if match:
+            number = int(match.group(1) or match.group(2))
+        # Unnumbered text after a numbered paragraph continues it
+        for part in _split_oversized(paragraph, max_tokens):
+            pieces.append({"text": part, "paragraph": number, "tokens": estimate_tokens(part)})
+    return pieces
+
+
+def _overlap_tail(text: str, max_tokens: int) -> str:
+    """The end of text within max_tokens: whole sentences if any fit, otherwise words"""
+    for pieces in (_SENTENCE_END_RE.split(text), text.split()):
+        tail = []
+        for piece in reversed(pieces[1:]):
+            if estimate_tokens(" ".join([piece] + tail)) > max_tokens:
+                break
+            tail.insert(0, piece)
+        if tail:
+            return " ".join(tail)
+    return ""
+
+
+def chunk_passages(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[Dict[str, Any]]:
+    """
+    Split a legal text into overlapping passages for semantic search
+
+    Unlike chunk_text, passages never span two sections and are not merged up to the
+    limit, so each one stays about a single point. Consecutive passages of a section
+    share up to overlap_tokens of text: whole paragraphs where they fit, otherwise the
+    closing sentences of the previous passage.
+
+    Args:
+        text: Full text to split
+        max_tokens: Maximum tokens per passage (overlap included)
+        overlap_tokens: Tokens repeated from the end of the previous passage
+
+    Returns:
+        List of dictionaries with 'index', 'heading', 'text', 'tokens' and
+        'paragraph_start' / 'paragraph_end' (None where the text has no numbered paragraphs)
+    """
+    passages = []
+    for section in split_into_sections(text or ""):
+        pieces = _numbered_pieces(section["text"], max_tokens)
+        start = 0
+        carry = None
+        while start < len(pieces):
+            window = [carry] if carry else []
+            tokens = carry["tokens"] if carry else 0
+            end = start
+            while end < len(pieces) and (end == start or tokens + pieces[end]["tokens"] <= max_tokens):
+                window.append(pieces[end])
+                tokens += pieces[end]["tokens"]
+                end += 1
+            # An oversized carry can't leave room for the next paragraph - drop it
+            if carry and tokens > max_tokens:
+                window = window[1:]
+
+            passage_text = "\n\n".join(piece["text"] for piece in window)
+            numbers = [piece["paragraph"] for piece in window if piece["paragraph"] is not None]
+            passages.append({
+                "index": len(passages),
+                "heading": section["heading"],
+                "text": passage_text,
+                "tokens": estimate_tokens(passage_text),
+                "paragraph_start": numbers[0] if numbers else None,
+                "paragraph_end": numbers[-1] if numbers else None
+            })
+            if end >= len(pieces) or overlap_tokens <= 0:
+                start = end
+                carry = None
+                continue
+
+            # Step back over whole paragraphs that fit in the overlap, keeping progress
+            next_start = end
+            overlap = 0
+            while next_start - 1 > start and overlap + pieces[next_start - 1]["tokens"] <= overlap_tokens:
+                next_start -= 1
+                overlap += pieces[next_start]["tokens"]
+            carry = None
+            if next_start == end:
+                tail = _overlap_tail(pieces[end - 1]["text"], overlap_tokens)
+                if tail:
+                    carry = {"text": tail, "paragraph": pieces[end - 1]["paragraph"], "tokens": estimate_tokens(tail)}
+            start = next_start
+    return passages
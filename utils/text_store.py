@@ -0,0 +1,159 @@
+"""
+Compressed on-disk store for the full text of rulings.
+Texts are gzip files keyed by the ruling's Kenya Law URL, written as they are extracted
+(see KenyaLawScraper.stream_case_details) so a long judgment never has to be held in
+memory, and read back lazily through Ruling.full_text. Writes go to a temporary file that
+replaces the stored text only once it is complete.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, TextIO
+
+import config
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = 6
+
+
+class TextWriter:
+    """
+    Incremental writer for one stored text
+    """
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+        self.length = 0
+
+    def write(self, text: str) -> None:
+        """Append text"""
+        if text:
+            self._stream.write(text)
+            self.length += len(text)
+
+
+class TextStore:
+    """
+    Directory of gzip-compressed texts sharded by key prefix
+    """
+
+    def __init__(self, path: str, compression_level: int = COMPRESSION_LEVEL):
+        """
+        Initialize the text store
+
+        Args:
+            path: Directory holding the texts
+            compression_level: gzip compression level (1-9)
+        """
+        self.path = path
+        self.compression_level = compression_level
+
+    def key_for(self, url: str) -> str:
+        """Build the storage key for a ruling URL"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _file_for(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.txt.gz")
+
+    def exists(self, key: str) -> bool:
+        """Whether a text is stored under the key"""
+        return os.path.exists(self._file_for(key))
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[TextWriter]:
+        """
+        Write a text incrementally
+
+        The text replaces any stored under the key when the block exits cleanly; if the
+        block raises, the partial text is discarded and the stored one is kept.
+
+        Args:
+            key: Storage key
+
+        Yields:
+            TextWriter to append the text to
+        """
+        path = self._file_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=self.compression_level) as stream:
+                yield TextWriter(stream)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def write(self, key: str, text: str) -> None:
+        """Store a text that is already in memory"""
+        with self.writer(key) as writer:
+            writer.write(text)
+
+    def open(self, key: str) -> Optional[TextIO]:
+        """
+        Open a stored text for streaming reads
+
+        Args:
+            key: Storage key
+
+        Returns:
+            Text stream (close it when done), or None if nothing is stored under the key
+        """
+        try:
+            return gzip.open(self._file_for(key), 'rt', encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def read(self, key: str, max_chars: Optional[int] = None) -> Optional[str]:
+        """
+        Read a stored text
+
+        Args:
+            key: Storage key
+            max_chars: Read only the start of the text (only that much is decompressed)
+
+        Returns:
+            The text, or None if nothing is stored under the key
+        """
+        stream = self.open(key)
+        if stream is None:
+            return None
+        try:
+            with stream:
+                return stream.read() if max_chars is None else stream.read(max_chars)
+        except (OSError, EOFError) as e:
+            logger.error(f"Error reading stored text {key}: {str(e)}")
+            return None
+
+    def delete(self, key: str) -> None:
+        """Remove a stored text"""
+        try:
+            os.remove(self._file_for(key))
+        except FileNotFoundError:
+            pass
+
+
+_text_store = None
+_text_store_lock = threading.Lock()
+
+
+def get_text_store() -> Optional[TextStore]:
+    """
+    Get the process-wide ruling text store
+
+    Returns:
+        The shared TextStore, or None if full texts are kept in the ruling table
+    """
+    global _text_store
+    if not config.RULING_TEXT_DIR:
+        return None
+    if _text_store is None:
+        with _text_store_lock:
+            if _text_store is None:
+                _text_store = TextStore(config.RULING_TEXT_DIR)
+                logger.info(f"Initialized ruling text store at {config.RULING_TEXT_DIR}")
+    return _text_store
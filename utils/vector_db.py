@@ -1,22 +1,48 @@
 import os
 import json
 import logging
+import time
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 import uuid
 from utils.llm import OllamaClient
+from utils.text_chunking import chunk_passages
+from utils.search_filters import build_where, index_metadata
 import config
 
 logger = logging.getLogger(__name__)
 
+def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Make metadata values storable in Chroma (no None, dates as ISO strings, other objects as text)"""
+    cleaned = {}
+    for key, value in metadata.items():
+        if value is None:
+            value = ''
+        elif isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif not isinstance(value, (str, int, float, bool)):
+            value = str(value)
+        cleaned[key] = value
+    return cleaned
+
 class VectorDatabase:
     """
     Vector database for semantic search of legal documents
     """
     
+    # Search filters each collection stores the metadata for (see utils.search_filters)
+    FILTERABLE = {
+        'cases': ('court', 'date_from', 'date_to', 'category', 'is_landmark', 'organization_id'),
+        'statutes': ('date_from', 'date_to'),
+        'documents': ('date_from', 'date_to', 'organization_id'),
+        'contracts': ('date_from', 'date_to', 'organization_id')
+    }
+    
     def __init__(self, db_path=None, llm_client=None):
         """
         Initialize vector database
@@ -48,8 +74,11 @@ class VectorDatabase:
                     self.llm_client = llm_client
                 
                 def __call__(self, texts):
-                    # Get embeddings for each text
-                    embeddings = [self.llm_client.get_embedding(text) for text in texts]
+                    # Embed all texts in batched requests when the client supports it
+                    if hasattr(self.llm_client, 'get_embeddings'):
+                        embeddings = self.llm_client.get_embeddings(list(texts))
+                    else:
+                        embeddings = [self.llm_client.get_embedding(text) for text in texts]
                     
                     # Convert numpy arrays to lists if needed
                     processed_embeddings = []
@@ -68,6 +97,7 @@ class VectorDatabase:
             self.statute_collection = self._get_or_create_collection("statutes")
             self.document_collection = self._get_or_create_collection("documents")
             self.contract_collection = self._get_or_create_collection("contracts")
+            self.passage_collection = self._get_or_create_collection("passages")
             
             logger.info("Vector database collections created/loaded")
         
@@ -86,6 +116,75 @@ class VectorDatabase:
             # Fallback to creating without embedding function
             return self.chroma_client.get_or_create_collection(name=name)
     
+    def _case_entry(self, case_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Build the text to embed and the metadata stored for a case"""
+        text_for_embedding = f"""
+            Title: {case_data.get('title', '')}
+            Citation: {case_data.get('citation', '')}
+            Court: {case_data.get('court', '')}
+            Parties: {case_data.get('parties', {})}
+            Summary: {case_data.get('summary', '')}
+            """
+        metadata = {
+            'title': case_data.get('title', ''),
+            'citation': case_data.get('citation', ''),
+            'court': case_data.get('court', ''),
+            'date': case_data.get('date', ''),
+            'url': case_data.get('url', '')
+        }
+        metadata.update(index_metadata(case_data))
+        return text_for_embedding, metadata
+    
+    def _statute_entry(self, statute_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Build the text to embed and the metadata stored for a statute"""
+        text_for_embedding = f"""
+            Title: {statute_data.get('title', '')}
+            Chapter: {statute_data.get('chapter', '')}
+            Summary: {statute_data.get('summary', '')}
+            """
+        metadata = {
+            'title': statute_data.get('title', ''),
+            'chapter': statute_data.get('chapter', ''),
+            'date': statute_data.get('date', ''),
+            'url': statute_data.get('url', '')
+        }
+        metadata.update(index_metadata(statute_data))
+        return text_for_embedding, metadata
+    
+    def _document_entry(self, document_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Build the text to embed and the metadata stored for a document"""
+        text_for_embedding = f"""
+            Title: {document_data.get('title', '')}
+            Type: {document_data.get('document_type', '')}
+            Content: {document_data.get('content', '')}
+            """
+        metadata = {
+            'title': document_data.get('title', ''),
+            'document_type': document_data.get('document_type', ''),
+            'status': document_data.get('status', ''),
+            'created_at': document_data.get('created_at', '')
+        }
+        metadata.update(index_metadata(document_data, date_key='created_at'))
+        return text_for_embedding, metadata
+    
+    def _contract_entry(self, contract_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Build the text to embed and the metadata stored for a contract"""
+        text_for_embedding = f"""
+            Title: {contract_data.get('title', '')}
+            Type: {contract_data.get('contract_type', '')}
+            Content: {contract_data.get('content', '')}
+            Key Terms: {contract_data.get('key_terms', '')}
+            """
+        metadata = {
+            'title': contract_data.get('title', ''),
+            'contract_type': contract_data.get('contract_type', ''),
+            'status': contract_data.get('status', ''),
+            'start_date': contract_data.get('start_date', ''),
+            'end_date': contract_data.get('end_date', '')
+        }
+        metadata.update(index_metadata(contract_data, date_key='start_date'))
+        return text_for_embedding, metadata
+    
     def add_case(self, case_data: Dict[str, Any]) -> str:
         """
         Add a case to the vector database
@@ -101,25 +200,13 @@ class VectorDatabase:
             doc_id = case_data.get('id', str(uuid.uuid4()))
             
             # Prepare text for embedding
-            text_for_embedding = f"""
-            Title: {case_data.get('title', '')}
-            Citation: {case_data.get('citation', '')}
-            Court: {case_data.get('court', '')}
-            Parties: {case_data.get('parties', {})}
-            Summary: {case_data.get('summary', '')}
-            """
+            text_for_embedding, metadata = self._case_entry(case_data)
             
             # Add document to collection
             self.case_collection.add(
                 ids=[doc_id],
                 documents=[text_for_embedding],
-                metadatas=[{
-                    'title': case_data.get('title', ''),
-                    'citation': case_data.get('citation', ''),
-                    'court': case_data.get('court', ''),
-                    'date': case_data.get('date', ''),
-                    'url': case_data.get('url', '')
-                }]
+                metadatas=[metadata]
             )
             
             logger.info(f"Added case to vector database with ID: {doc_id}")
@@ -144,22 +231,13 @@ class VectorDatabase:
             doc_id = statute_data.get('id', str(uuid.uuid4()))
             
             # Prepare text for embedding
-            text_for_embedding = f"""
-            Title: {statute_data.get('title', '')}
-            Chapter: {statute_data.get('chapter', '')}
-            Summary: {statute_data.get('summary', '')}
-            """
+            text_for_embedding, metadata = self._statute_entry(statute_data)
             
             # Add document to collection
             self.statute_collection.add(
                 ids=[doc_id],
                 documents=[text_for_embedding],
-                metadatas=[{
-                    'title': statute_data.get('title', ''),
-                    'chapter': statute_data.get('chapter', ''),
-                    'date': statute_data.get('date', ''),
-                    'url': statute_data.get('url', '')
-                }]
+                metadatas=[metadata]
             )
             
             logger.info(f"Added statute to vector database with ID: {doc_id}")
@@ -184,22 +262,13 @@ class VectorDatabase:
             doc_id = document_data.get('id', str(uuid.uuid4()))
             
             # Prepare text for embedding
-            text_for_embedding = f"""
-            Title: {document_data.get('title', '')}
-            Type: {document_data.get('document_type', '')}
-            Content: {document_data.get('content', '')}
-            """
+            text_for_embedding, metadata = self._document_entry(document_data)
             
             # Add document to collection
             self.document_collection.add(
                 ids=[doc_id],
                 documents=[text_for_embedding],
-                metadatas=[{
-                    'title': document_data.get('title', ''),
-                    'document_type': document_data.get('document_type', ''),
-                    'status': document_data.get('status', ''),
-                    'created_at': document_data.get('created_at', '')
-                }]
+                metadatas=[metadata]
             )
             
             logger.info(f"Added document to vector database with ID: {doc_id}")
@@ -224,24 +293,13 @@ class VectorDatabase:
             doc_id = contract_data.get('id', str(uuid.uuid4()))
             
             # Prepare text for embedding
-            text_for_embedding = f"""
-            Title: {contract_data.get('title', '')}
-            Type: {contract_data.get('contract_type', '')}
-            Content: {contract_data.get('content', '')}
-            Key Terms: {contract_data.get('key_terms', '')}
-            """
+            text_for_embedding, metadata = self._contract_entry(contract_data)
             
             # Add document to collection
             self.contract_collection.add(
                 ids=[doc_id],
                 documents=[text_for_embedding],
-                metadatas=[{
-                    'title': contract_data.get('title', ''),
-                    'contract_type': contract_data.get('contract_type', ''),
-                    'status': contract_data.get('status', ''),
-                    'start_date': contract_data.get('start_date', ''),
-                    'end_date': contract_data.get('end_date', '')
-                }]
+                metadatas=[metadata]
             )
             
             logger.info(f"Added contract to vector database with ID: {doc_id}")
@@ -251,22 +309,414 @@ class VectorDatabase:
             logger.error(f"Error adding contract to vector database: {str(e)}")
             return ""
     
-    def search_cases(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def _add_bulk(self, collection, name: str, records: Iterable[Dict[str, Any]],
+                  build_entry: Callable[[Dict[str, Any]], Tuple[str, Dict[str, Any]]], id_prefix: str,
+                  batch_size: Optional[int] = None, progress: Optional[Callable[[float, str], None]] = None,
+                  total: Optional[int] = None,
+                  on_written: Optional[Callable[[List[str], List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """
+        Embed and upsert records in batches as they are read from the iterable
+        
+        Each record's ID is '<id_prefix>-<record id>', so indexing the same rows again
+        updates them instead of adding duplicates. Records without an 'id' are skipped.
+        A batch that fails to embed or write is logged and counted, and the rest carry on.
+        
+        Args:
+            collection: Chroma collection to write to
+            name: Collection name for logs and the report
+            records: Records to index (read once, a batch at a time)
+            build_entry: Function building the text to embed and the metadata for a record
+            id_prefix: Prefix of the document IDs, naming the table the records come from
+            batch_size: Records embedded and written together (defaults to config.VECTOR_DB_BULK_BATCH_SIZE)
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of records, for progress (defaults to len(records) when available)
+            on_written: Optional callback receiving the IDs and metadata of each batch once it is written
+            
+        Returns:
+            Throughput report: records indexed, skipped and failed, batches, time spent
+            embedding and writing, and documents per second
+        """
+        batch_size = max(1, batch_size or config.VECTOR_DB_BULK_BATCH_SIZE)
+        if total is None and hasattr(records, '__len__'):
+            total = len(records)
+        try:
+            max_write = self.chroma_client.get_max_batch_size()
+        except Exception:
+            max_write = batch_size
+        
+        report = {
+            'collection': name,
+            'indexed': 0,
+            'skipped': 0,
+            'errors': 0,
+            'batches': 0,
+            'embed_seconds': 0.0,
+            'write_seconds': 0.0
+        }
+        started = time.perf_counter()
+        batch = {}
+        
+        def flush():
+            ids = list(batch)
+            documents = [batch[doc_id][0] for doc_id in ids]
+            metadatas = [batch[doc_id][1] for doc_id in ids]
+            batch.clear()
+            try:
+                embed_started = time.perf_counter()
+                embeddings = self.embedding_function(documents)
+                write_started = time.perf_counter()
+                for start in range(0, len(ids), max_write):
+                    end = start + max_write
+                    collection.upsert(ids=ids[start:end], embeddings=embeddings[start:end],
+                                      documents=documents[start:end], metadatas=metadatas[start:end])
+                report['embed_seconds'] += write_started - embed_started
+                report['write_seconds'] += time.perf_counter() - write_started
+                report['indexed'] += len(ids)
+            except Exception as e:
+                logger.error(f"Error indexing a batch of {len(ids)} records in {name}: {str(e)}")
+                report['errors'] += len(ids)
+            else:
+                if on_written:
+                    try:
+                        on_written(ids, metadatas)
+                    except Exception as e:
+                        logger.warning(f"Error after writing a batch of {len(ids)} records in {name}: {str(e)}")
+            report['batches'] += 1
+            if progress:
+                done = report['indexed'] + report['skipped'] + report['errors']
+                progress(done / total if total else 0.0, f"Indexed {report['indexed']} {name}")
+        
+        for record in records:
+            record_id = record.get('id')
+            if record_id is None or record_id == '':
+                report['skipped'] += 1
+                continue
+            text_for_embedding, metadata = build_entry(record)
+            metadata.setdefault('source_id', record_id)
+            # A repeated record replaces the earlier copy in the batch
+            batch[f"{id_prefix}-{record_id}"] = (text_for_embedding, _clean_metadata(metadata))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        
+        elapsed = time.perf_counter() - started
+        report['seconds'] = round(elapsed, 3)
+        report['docs_per_second'] = round(report['indexed'] / elapsed, 1) if elapsed > 0 else 0.0
+        report['embed_seconds'] = round(report['embed_seconds'], 3)
+        report['write_seconds'] = round(report['write_seconds'], 3)
+        logger.info(
+            f"Indexed {report['indexed']} {name} in {report['batches']} batches ({report['skipped']} skipped, "
+            f"{report['errors']} errors) in {report['seconds']}s: {report['docs_per_second']} docs/s, "
+            f"{report['embed_seconds']}s embedding, {report['write_seconds']}s writing"
+        )
+        return report
+    
+    def add_cases_bulk(self, cases: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                       progress: Optional[Callable[[float, str], None]] = None,
+                       total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Add or update many cases, embedding them in batches
+        
+        Args:
+            cases: Case dictionaries as for add_case, with 'id' set to the ruling's primary key
+            batch_size: Cases embedded and written together
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of cases, for progress
+            
+        Returns:
+            Throughput report (see _add_bulk)
+        """
+        return self._add_bulk(self.case_collection, 'cases', cases, self._case_entry, 'ruling',
+                              batch_size, progress, total)
+    
+    def add_statutes_bulk(self, statutes: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                          progress: Optional[Callable[[float, str], None]] = None,
+                          total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Add or update many statutes, embedding them in batches
+        
+        Args:
+            statutes: Statute dictionaries as for add_statute, with 'id' set to a stable primary key
+            batch_size: Statutes embedded and written together
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of statutes, for progress
+            
+        Returns:
+            Throughput report (see _add_bulk)
+        """
+        return self._add_bulk(self.statute_collection, 'statutes', statutes, self._statute_entry, 'statute',
+                              batch_size, progress, total)
+    
+    def add_documents_bulk(self, documents: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                           progress: Optional[Callable[[float, str], None]] = None,
+                           total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Add or update many documents, embedding them in batches
+        
+        Args:
+            documents: Document dictionaries as for add_document, with 'id' set to the document's primary key
+            batch_size: Documents embedded and written together
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of documents, for progress
+            
+        Returns:
+            Throughput report (see _add_bulk)
+        """
+        return self._add_bulk(self.document_collection, 'documents', documents, self._document_entry, 'document',
+                              batch_size, progress, total)
+    
+    def add_contracts_bulk(self, contracts: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                           progress: Optional[Callable[[float, str], None]] = None,
+                           total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Add or update many contracts, embedding them in batches
+        
+        Args:
+            contracts: Contract dictionaries as for add_contract, with 'id' set to the contract's primary key
+            batch_size: Contracts embedded and written together
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of contracts, for progress
+            
+        Returns:
+            Throughput report (see _add_bulk)
+        """
+        return self._add_bulk(self.contract_collection, 'contracts', contracts, self._contract_entry, 'contract',
+                              batch_size, progress, total)
+    
+    def _passage_entry(self, passage: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Build the text to embed and the metadata stored for a passage of a ruling or statute"""
+        heading = passage.get('heading', '')
+        text_for_embedding = f"{passage.get('title', '')}\n{heading}\n\n{passage.get('text', '')}"
+        metadata = {
+            'parent_id': passage['parent_id'],
+            'parent_kind': passage['parent_kind'],
+            'source_id': passage['source_id'],
+            'title': passage.get('title', ''),
+            'citation': passage.get('citation', ''),
+            'court': passage.get('court', ''),
+            'date': passage.get('date', ''),
+            'url': passage.get('url', ''),
+            'heading': heading,
+            'passage_index': passage['index']
+        }
+        # Paragraph numbers are only known for texts with numbered paragraphs
+        for key in ('paragraph_start', 'paragraph_end'):
+            if passage.get(key) is not None:
+                metadata[key] = passage[key]
+        metadata.update(index_metadata(passage))
+        return text_for_embedding, metadata
+    
+    def _index_passages(self, parents: Iterable[Dict[str, Any]], kind: str, get_text: Callable[[Dict[str, Any]], str],
+                        batch_size: Optional[int] = None, progress: Optional[Callable[[float, str], None]] = None,
+                        total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Split documents into overlapping passages and index them in the passages collection
+        
+        Once a batch of passages is written, passages its documents had beyond their new
+        count are removed, so a shorter text doesn't leave stale passages behind. A
+        document whose batch fails keeps its old passages.
+        
+        Args:
+            parents: Documents with 'id' (primary key, or URL for statutes without one) and their fields
+            kind: 'ruling' or 'statute'
+            get_text: Function returning a document's full text
+            batch_size: Passages embedded and written together
+            progress: Optional callback receiving the fraction of documents done and a step description
+            total: Number of documents, for progress (defaults to len(parents) when available)
+            
+        Returns:
+            Throughput report (see _add_bulk) with the number of 'parents' split
+        """
+        if total is None and hasattr(parents, '__len__'):
+            total = len(parents)
+        done = {'parents': 0}
+        # parent_id -> number of passages in its new text
+        counts = {}
+        emptied = []
+        
+        def passages():
+            for parent in parents:
+                source_id = parent.get('id') or parent.get('url')
+                if not source_id:
+                    continue
+                parent_id = f"{kind}-{source_id}"
+                chunks = chunk_passages(get_text(parent), config.PASSAGE_MAX_TOKENS, config.PASSAGE_OVERLAP_TOKENS)
+                counts[parent_id] = len(chunks)
+                if not chunks:
+                    emptied.append(parent_id)
+                for passage in chunks:
+                    yield dict(
+                        passage,
+                        id=f"{source_id}-{passage['index']}",
+                        parent_id=parent_id,
+                        parent_kind=kind,
+                        source_id=source_id,
+                        title=parent.get('title', ''),
+                        citation=parent.get('citation', ''),
+                        court=parent.get('court', ''),
+                        date=parent.get('date', ''),
+                        url=parent.get('url', ''),
+                        category=parent.get('category'),
+                        is_landmark=parent.get('is_landmark'),
+                        organization_id=parent.get('organization_id')
+                    )
+                done['parents'] += 1
+        
+        def report_progress(fraction, message):
+            if progress:
+                progress(done['parents'] / total if total else 0.0, f"{message} from {done['parents']} {kind}s")
+        
+        def remove_stale(ids, metadatas):
+            parent_ids = sorted({metadata['parent_id'] for metadata in metadatas})
+            existing = self.passage_collection.get(where={'parent_id': {'$in': parent_ids}}, include=['metadatas'])
+            stale = [
+                doc_id for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+                if metadata['passage_index'] >= counts.get(metadata['parent_id'], 0)
+            ]
+            if stale:
+                self.passage_collection.delete(ids=stale)
+        
+        report = self._add_bulk(self.passage_collection, 'passages', passages(), self._passage_entry, kind,
+                                batch_size, report_progress, on_written=remove_stale)
+        # Documents without text keep no passages
+        step = max(1, batch_size or config.VECTOR_DB_BULK_BATCH_SIZE)
+        for start in range(0, len(emptied), step):
+            try:
+                self.passage_collection.delete(where={'parent_id': {'$in': emptied[start:start + step]}})
+            except Exception as e:
+                logger.warning(f"Could not remove the passages of documents without text: {str(e)}")
+        report['parents'] = done['parents']
+        return report
+    
+    def index_ruling_passages(self, rulings: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                              progress: Optional[Callable[[float, str], None]] = None,
+                              total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Index the full text of rulings as passages
+        
+        Args:
+            rulings: Ruling dictionaries with 'id', 'full_text' and the fields of add_case
+            batch_size: Passages embedded and written together
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of rulings, for progress
+            
+        Returns:
+            Throughput report (see _index_passages)
+        """
+        return self._index_passages(rulings, 'ruling', lambda ruling: ruling.get('full_text') or '',
+                                    batch_size, progress, total)
+    
+    def index_statute_passages(self, statutes: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                               progress: Optional[Callable[[float, str], None]] = None,
+                               total: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Index the body of statutes as passages
+        
+        Args:
+            statutes: Statute dictionaries as returned by KenyaLawScraper.get_legislation_details
+                ('full_text', or 'chapters' when the text couldn't be extracted), keyed by 'id' or 'url'
+            batch_size: Passages embedded and written together
+            progress: Optional callback receiving the fraction complete and a step description
+            total: Number of statutes, for progress
+            
+        Returns:
+            Throughput report (see _index_passages)
+        """
+        def statute_text(statute):
+            if statute.get('full_text'):
+                return statute['full_text']
+            # Chapter titles become headings, so passages keep them as their section
+            return "\n\n".join(f"{chapter.get('title', '').upper()}\n{chapter.get('content', '')}"
+                                for chapter in statute.get('chapters') or [])
+        
+        return self._index_passages(statutes, 'statute', statute_text, batch_size, progress, total)
+    
+    def search_passages(self, query: str, n_results: int = 5, per_document: Optional[int] = None,
+                        kind: Optional[str] = None, query_embedding: Optional[List[float]] = None,
+                        filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search passages and group the best ones by the ruling or statute they come from
+        
+        Args:
+            query: Search query
+            n_results: Number of documents to return
+            per_document: Passages kept per document (defaults to config.PASSAGES_PER_DOCUMENT)
+            kind: Only search passages of 'ruling' or 'statute' documents
+            query_embedding: Embedding of the query, if already computed
+            filters: Search filters applied in the index (see utils.search_filters.build_where)
+            
+        Returns:
+            Documents best first, each with its fields, best passage 'score' (distance) and
+            its 'passages' ('heading', 'paragraph_start', 'paragraph_end', 'text', 'score')
+        """
+        per_document = per_document or config.PASSAGES_PER_DOCUMENT
+        try:
+            if query_embedding is None:
+                query_embedding = self.embedding_function([query])[0]
+            results = self.passage_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results * per_document * 2,
+                where=build_where(filters, parent_kind=kind)
+            )
+            
+            documents = {}
+            ids = results.get('ids') or [[]]
+            for i, doc_id in enumerate(ids[0]):
+                metadata = results['metadatas'][0][i]
+                distance = results['distances'][0][i] if results.get('distances') else None
+                parent_id = metadata.get('parent_id')
+                document = documents.get(parent_id)
+                if document is None:
+                    if len(documents) >= n_results:
+                        continue
+                    document = documents[parent_id] = {
+                        'id': parent_id,
+                        'kind': metadata.get('parent_kind', ''),
+                        'source_id': metadata.get('source_id'),
+                        'title': metadata.get('title', ''),
+                        'citation': metadata.get('citation', ''),
+                        'court': metadata.get('court', ''),
+                        'date': metadata.get('date', ''),
+                        'url': metadata.get('url', ''),
+                        'score': distance,
+                        'passages': []
+                    }
+                if len(document['passages']) < per_document:
+                    document['passages'].append({
+                        'id': doc_id,
+                        'heading': metadata.get('heading', ''),
+                        'paragraph_start': metadata.get('paragraph_start'),
+                        'paragraph_end': metadata.get('paragraph_end'),
+                        'text': results['documents'][0][i] if results.get('documents') else '',
+                        'score': distance
+                    })
+            
+            logger.info(f"Found passages in {len(documents)} documents for query: {query}")
+            return list(documents.values())
+        
+        except Exception as e:
+            logger.error(f"Error searching passages in vector database: {str(e)}")
+            return []
+    
+    def search_cases(self, query: str, n_results: int = 5,
+                     query_embedding: Optional[List[float]] = None,
+                     filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search for cases semantically similar to the query
         
         Args:
             query: Search query
             n_results: Number of results to return
+            query_embedding: Embedding of the query, if already computed
+            filters: Search filters applied in the index (see utils.search_filters.build_where)
             
         Returns:
             List of search results
         """
         try:
-            results = self.case_collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            results = self._query_collection(self.case_collection, query, n_results, query_embedding,
+                                             build_where(filters))
             
             # Format results
             formatted_results = []
@@ -294,22 +744,24 @@ class VectorDatabase:
             logger.error(f"Error searching cases in vector database: {str(e)}")
             return []
     
-    def search_statutes(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def search_statutes(self, query: str, n_results: int = 5,
+                        query_embedding: Optional[List[float]] = None,
+                        filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search for statutes semantically similar to the query
         
         Args:
             query: Search query
             n_results: Number of results to return
+            query_embedding: Embedding of the query, if already computed
+            filters: Search filters applied in the index (see utils.search_filters.build_where)
             
         Returns:
             List of search results
         """
         try:
-            results = self.statute_collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            results = self._query_collection(self.statute_collection, query, n_results, query_embedding,
+                                             build_where(filters))
             
             # Format results
             formatted_results = []
@@ -336,22 +788,24 @@ class VectorDatabase:
             logger.error(f"Error searching statutes in vector database: {str(e)}")
             return []
     
-    def search_documents(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def search_documents(self, query: str, n_results: int = 5,
+                         query_embedding: Optional[List[float]] = None,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search for documents semantically similar to the query
         
         Args:
             query: Search query
             n_results: Number of results to return
+            query_embedding: Embedding of the query, if already computed
+            filters: Search filters applied in the index (see utils.search_filters.build_where)
             
         Returns:
             List of search results
         """
         try:
-            results = self.document_collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            results = self._query_collection(self.document_collection, query, n_results, query_embedding,
+                                             build_where(filters))
             
             # Format results
             formatted_results = []
@@ -378,22 +832,24 @@ class VectorDatabase:
             logger.error(f"Error searching documents in vector database: {str(e)}")
             return []
     
-    def search_contracts(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def search_contracts(self, query: str, n_results: int = 5,
+                         query_embedding: Optional[List[float]] = None,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search for contracts semantically similar to the query
         
         Args:
             query: Search query
             n_results: Number of results to return
+            query_embedding: Embedding of the query, if already computed
+            filters: Search filters applied in the index (see utils.search_filters.build_where)
             
         Returns:
             List of search results
         """
         try:
-            results = self.contract_collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            results = self._query_collection(self.contract_collection, query, n_results, query_embedding,
+                                             build_where(filters))
             
             # Format results
             formatted_results = []
@@ -421,23 +877,69 @@ class VectorDatabase:
             logger.error(f"Error searching contracts in vector database: {str(e)}")
             return []
     
-    def search_all(self, query: str, n_results: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+    def _query_collection(self, collection, query: str, n_results: int,
+                          query_embedding: Optional[List[float]] = None,
+                          where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Query a collection by a precomputed query embedding, or by the query text, within a where clause"""
+        if query_embedding is not None:
+            return collection.query(query_embeddings=[query_embedding], n_results=n_results, where=where)
+        return collection.query(query_texts=[query], n_results=n_results, where=where)
+    
+    def search_all(self, query: str, n_results: int = 5,
+                   filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Search all collections for the query
         
+        The query is embedded once and the four collections are queried concurrently with
+        that embedding. Their results are also merged into one ranking: each result's
+        distance is turned into a relevance between 0 and 1 (1 / (1 + distance)), which
+        keeps results from different collections comparable as they share one embedding model.
+        
         Args:
             query: Search query
             n_results: Number of results to return per collection
+            filters: Search filters (see utils.search_filters.build_where); each collection
+                applies those it stores metadata for (FILTERABLE), so a court filter narrows
+                the cases without emptying the statutes
             
         Returns:
-            Dictionary with search results for each collection
+            Dictionary with search results for each collection, and under 'merged' the
+            results of all collections ordered by relevance, each with its 'collection'
+            and 'relevance'
         """
-        return {
-            'cases': self.search_cases(query, n_results),
-            'statutes': self.search_statutes(query, n_results),
-            'documents': self.search_documents(query, n_results),
-            'contracts': self.search_contracts(query, n_results)
+        searches = {
+            'cases': self.search_cases,
+            'statutes': self.search_statutes,
+            'documents': self.search_documents,
+            'contracts': self.search_contracts
         }
+        
+        try:
+            query_embedding = self.embedding_function([query])[0]
+        except Exception as e:
+            logger.error(f"Error embedding query for vector database search: {str(e)}")
+            results = {name: [] for name in searches}
+            results['merged'] = []
+            return results
+        
+        with ThreadPoolExecutor(max_workers=len(searches), thread_name_prefix="vector-search") as executor:
+            futures = {
+                name: executor.submit(search, query, n_results, query_embedding, {
+                    key: value for key, value in (filters or {}).items() if key in self.FILTERABLE[name]
+                })
+                for name, search in searches.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        
+        merged = []
+        for name, collection_results in results.items():
+            for result in collection_results:
+                distance = result.get('score')
+                relevance = 1.0 / (1.0 + max(distance, 0.0)) if distance is not None else 0.0
+                merged.append(dict(result, collection=name, relevance=relevance))
+        merged.sort(key=lambda result: result['relevance'], reverse=True)
+        results['merged'] = merged
+        return results
     
     def delete_document(self, collection_name: str, doc_id: str) -> bool:
         """